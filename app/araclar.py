@@ -10,6 +10,7 @@ from datetime import datetime
 from sqlalchemy import func
 from app.enums import FinansIslemTuru, FaturaTuru
 from app.models import Sayac
+from app.services.numara_servisi import BLOK, NumaraServisi
 from decimal import Decimal, InvalidOperation
 from sqlalchemy.orm import joinedload
 import logging
@@ -193,405 +194,83 @@ def get_muhasebe_hesaplari():
         return []    
 
 # --- 3.İŞ MANTIĞI YARDIMCILARI ---
-def hesapla_ve_guncelle_ortalama_odeme(cari_id):
+def hesapla_ve_guncelle_ortalama_odeme(cari_id, tenant_db=None):
     """
-    Bir cariye ait tüm satış faturalarını ve tahsilatları çeker.
-    FIFO (İlk Giren İlk Çıkar) mantığıyla ödemeleri faturalarla eşleştirir.
-    Ortalama gecikme/ödeme gününü hesaplayıp cari karta yazar.
-    
-    PERFORMANS İYİLEŞTİRMELERİ:
-    - Bulk query (tek sorguda tüm veri)
-    - Transaction yönetimi
-    - Hata yakalama
-    - Logging
-    - Edge case kontrolü
-    
+    Tek carinin borç/alacak hareketlerini FIFO ile eşleştirip ortalama ödeme
+    gününü cari karta yazar (OdemeAnalizMotoru üzerinden).
+
     Args:
-        cari_id (int): Hesaplanacak carinin ID'si
-        
+        cari_id: Hesaplanacak carinin ID'si
+        tenant_db: Tenant session (varsayılan: get_tenant_db())
+
     Returns:
-        dict: {
-            'success': bool,
-            'ortalama_gun': int,
-            'toplam_fatura':  int,
-            'toplam_tahsilat': int,
-            'kapanan_tutar': Decimal,
-            'kalan_borc': Decimal
-        }
+        dict: {'success', 'ortalama_gun', 'ortalama_sure', 'gecikme_sikligi',
+               'kapanan_tutar', 'kalan_borc'}
     """
-    
+    from app.modules.cari.odeme_analizi import OdemeAnalizMotoru
+
+    if not cari_id:
+        logger.error("Cari ID boş olamaz")
+        return {'success': False, 'error': 'Geçersiz cari ID', 'ortalama_gun': 0}
+
+    tenant_db = tenant_db or get_tenant_db()
     try:
-        # ========================================
-        # 1.VERİ DOĞRULAMA
-        # ========================================
-        if not cari_id:
-            logger.error("Cari ID boş olamaz")
-            return {
-                'success': False,
-                'error': 'Geçersiz cari ID',
-                'ortalama_gun': 0
-            }
-        
-        # Cari var mı kontrol et
-        cari = db.session.get(CariHesap, cari_id)
-        if not cari: 
-            logger.error(f"Cari bulunamadı: {cari_id}")
-            return {
-                'success': False,
-                'error': 'Cari hesap bulunamadı',
-                'ortalama_gun': 0
-            }
-        
-        # ========================================
-        # 2.FATURALARI TEK SORGUDA ÇEK (OPTIMIZED)
-        # ========================================
-        # NOT: Sadece ödenmemiş veya kısmen ödenmiş faturaları al
-        faturalar = Fatura.query.filter(
-            and_(
-                Fatura.cari_id == cari_id,
-                Fatura.fatura_turu == FaturaTuru.SATIS.value,
-                Fatura.durum != 'iptal',  # İptal edilenleri dahil etme
-                or_(
-                    Fatura.odeme_durumu == 'bekliyor',
-                    Fatura.odeme_durumu == 'kismen'
-                )
-            )
-        ).order_by(Fatura.vade_tarihi.asc()).all()
-        
-        # ========================================
-        # 3.TAHSİLATLARI TEK SORGUDA ÇEK
-        # ========================================
-        tahsilatlar = FinansIslem.query.filter(
-            and_(
-                FinansIslem.cari_id == cari_id,
-                FinansIslem.islem_turu == FinansIslemTuru.TAHSILAT.value,
-                FinansIslem.durum == 'onaylandi'  # Sadece onaylı tahsilatlar
-            )
-        ).order_by(FinansIslem.tarih.asc()).all()
-        
-        # ========================================
-        # 4.EDGE CASE KONTROL
-        # ========================================
-        if not faturalar: 
-            logger.info(f"Cari {cari_id} için fatura bulunamadı")
-            return {
-                'success': True,
-                'ortalama_gun': 0,
-                'toplam_fatura': 0,
-                'toplam_tahsilat': len(tahsilatlar),
-                'kapanan_tutar':  Decimal('0.00'),
-                'kalan_borc':  Decimal('0.00')
-            }
-        
-        if not tahsilatlar:
-            logger.info(f"Cari {cari_id} için tahsilat bulunamadı")
-            # Ortalama gecikmeyi hesapla (bugüne göre)
-            bugun = datetime.now().date()
-            toplam_gecikme = 0
-            toplam_tutar = Decimal('0.00')
-            
-            for fatura in faturalar:
-                vade = fatura.vade_tarihi
-                if isinstance(vade, datetime):
-                    vade = vade.date()
-                    
-                gun_farki = (bugun - vade).days
-                tutar = Decimal(str(fatura.genel_toplam or 0))
-                
-                toplam_gecikme += (gun_farki * float(tutar))
-                toplam_tutar += tutar
-            
-            ortalama_gun = int(toplam_gecikme / float(toplam_tutar)) if toplam_tutar > 0 else 0
-            
-            # Veritabanına kaydet
-            cari.ortalama_odeme_gunu = ortalama_gun
-            if ortalama_gun > 30:
-                cari.risk_skoru = min((cari.risk_skoru or 0) + 10, 100)
-            
-            db.session.commit()
-            
-            return {
-                'success': True,
-                'ortalama_gun': ortalama_gun,
-                'toplam_fatura':  len(faturalar),
-                'toplam_tahsilat':  0,
-                'kapanan_tutar':  Decimal('0.00'),
-                'kalan_borc': toplam_tutar
-            }
-        
-        # ========================================
-        # 5.FIFO ALGORİTMASI (İYİLEŞTİRİLMİŞ)
-        # ========================================
-        toplam_gecikme_puani = Decimal('0.00')
-        toplam_kapanan_tutar = Decimal('0.00')
-        
-        # Faturaların kalan tutarlarını takip etmek için dictionary kullan
-        fatura_bakiyeleri = {}
-        for fatura in faturalar: 
-            fatura_bakiyeleri[fatura.id] = {
-                'kalan':  Decimal(str(fatura.genel_toplam or 0)),
-                'vade':  fatura.vade_tarihi,
-                'fatura':  fatura
-            }
-        
-        # Her tahsilatı sırayla faturalara dağıt
-        for tahsilat in tahsilatlar: 
-            kalan_odeme = Decimal(str(tahsilat.genel_toplam or 0))
-            
-            if kalan_odeme <= 0:
-                continue
-            
-            # Ödeme tarihini standartlaştır
-            odeme_tarihi = tahsilat.tarih
-            if isinstance(odeme_tarihi, datetime):
-                odeme_tarihi = odeme_tarihi.date()
-            
-            # Faturaları vade tarihine göre sırayla dolaş (FIFO)
-            for fatura in faturalar:
-                if kalan_odeme <= 0:
-                    break
-                
-                fatura_data = fatura_bakiyeleri[fatura.id]
-                
-                if fatura_data['kalan'] <= 0:
-                    continue
-                
-                # Eşleşen Tutar (Hangi miktar kadar kapatılacak?)
-                eslesen_tutar = min(kalan_odeme, fatura_data['kalan'])
-                
-                # Vade Tarihini Standartlaştır
-                vade = fatura_data['vade']
-                if isinstance(vade, datetime):
-                    vade = vade.date()
-                
-                # Gün Farkını Hesapla (Pozitif = Geç, Negatif = Erken)
-                gun_farki = (odeme_tarihi - vade).days
-                
-                # Ağırlıklı Puan (Tutar × Gün)
-                # Örn: 1000 TL × 5 gün gecikme = 5000 puan
-                puan = eslesen_tutar * Decimal(str(gun_farki))
-                toplam_gecikme_puani += puan
-                toplam_kapanan_tutar += eslesen_tutar
-                
-                # Bakiyeleri Güncelle
-                kalan_odeme -= eslesen_tutar
-                fatura_data['kalan'] -= eslesen_tutar
-                
-                logger.debug(
-                    f"Fatura {fatura.id}:  {eslesen_tutar} TL kapandı, "
-                    f"Gecikme: {gun_farki} gün, Puan:  {puan}"
-                )
-        
-        # ========================================
-        # 6.ORTALAMA HESAPLAMA
-        # ========================================
-        ortalama_gun = 0
-        if toplam_kapanan_tutar > 0:
-            # Ağırlıklı ortalama:  Toplam Puan / Toplam Tutar
-            ortalama_gun = int(float(toplam_gecikme_puani) / float(toplam_kapanan_tutar))
-        
-        # Kalan toplam borç (Kapanmamış fatura tutarları)
-        kalan_borc = sum(
-            data['kalan'] 
-            for data in fatura_bakiyeleri.values()
-        )
-        
-        logger.info(
-            f"Cari {cari_id} - Ortalama Ödeme: {ortalama_gun} gün, "
-            f"Kapanan:  {toplam_kapanan_tutar} TL, Kalan: {kalan_borc} TL"
-        )
-        
-        # ========================================
-        # 7.CARİ KARTI GÜNCELLE (TRANSACTION)
-        # ========================================
-        try:
-            cari.ortalama_odeme_gunu = ortalama_gun
-            
-            # Risk Skoru Güncelleme (İş Mantığı)
-            if ortalama_gun > 60:
-                cari.risk_skoru = min((cari.risk_skoru or 0) + 20, 100)
-            elif ortalama_gun > 30:
-                cari.risk_skoru = min((cari.risk_skoru or 0) + 10, 100)
-            elif ortalama_gun < 0:  # Erken ödüyorsa (İyi müşteri)
-                cari.risk_skoru = max((cari.risk_skoru or 0) - 5, 0)
-            
-            # Son güncelleme zamanını kaydet
-            cari.son_guncelleme = datetime.now()
-            
-            db.session.commit()
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Cari güncelleme hatası: {e}")
-            raise
-        
-        # ========================================
-        # 8.SONUÇ DÖNDÜR
-        # ========================================
-        return {
-            'success': True,
-            'ortalama_gun': ortalama_gun,
-            'toplam_fatura': len(faturalar),
-            'toplam_tahsilat': len(tahsilatlar),
-            'kapanan_tutar': toplam_kapanan_tutar,
-            'kalan_borc': kalan_borc,
-            'risk_skoru': cari.risk_skoru
-        }
-        
+        sonuc = OdemeAnalizMotoru.cari_hesapla(cari_id, tenant_db=tenant_db)
+        tenant_db.commit()
+        return {'success': True, **sonuc}
     except Exception as e:
-        logger.exception(f"Ortalama ödeme hesaplama hatası (Cari:  {cari_id}): {e}")
-        db.session.rollback()
-        
-        return {
-            'success':  False,
-            'error': str(e),
-            'ortalama_gun': 0
-        }
+        tenant_db.rollback()
+        logger.exception(f"Ortalama ödeme hesaplama hatası (Cari: {cari_id}): {e}")
+        return {'success': False, 'error': str(e), 'ortalama_gun': 0}
+
 
 # ========================================
-# TOPLU HESAPLAMA FONKSİYONU (BONUS)
+# TOPLU HESAPLAMA FONKSİYONU
 # ========================================
-def toplu_ortalama_odeme_hesapla(firma_id=None, limit=None):
+def toplu_ortalama_odeme_hesapla(firma_id=None, limit=None, isci=1, tam=False, tenant_db=None):
     """
-    Tüm carilerin ortalama ödeme günlerini toplu hesaplar.
-    Gece batch job'ı olarak çalıştırılabilir.
-    
+    Carilerin ortalama ödeme günlerini toplu hesaplar (gece batch job'ı).
+    Varsayılan olarak sadece son çalışmadan sonra hareketi değişen cariler işlenir.
+
     Args:
-        firma_id (int, optional): Sadece belirli bir firmayı hesapla
+        firma_id (str, optional): Sadece belirli bir firmayı hesapla
         limit (int, optional): Kaç cari işlensin (test için)
-        
-    Returns: 
+        isci (int): Paralel işçi süreci sayısı
+        tam (bool): True → tüm aktif carileri yeniden hesapla
+
+    Returns:
         dict: İstatistikler
     """
-    
+    from app.modules.cari.odeme_analizi import OdemeAnalizMotoru
+
     try:
-        # İşlenecek carileri bul
-        query = CariHesap.query
-        
-        if firma_id: 
-            query = query.filter_by(firma_id=firma_id)
-        
-        # Sadece aktif carileri işle
-        query = query.filter_by(aktif=True)
-        
-        if limit:
-            query = query.limit(limit)
-        
-        cariler = query.all()
-        
-        basarili = 0
-        basarisiz = 0
-        toplam_sure = 0
-        
-        logger.info(f"Toplu hesaplama başladı:  {len(cariler)} cari işlenecek")
-        
-        for cari in cariler:
-            baslangic = datetime.now()
-            
-            sonuc = hesapla_ve_guncelle_ortalama_odeme(cari.id)
-            
-            bitis = datetime.now()
-            sure = (bitis - baslangic).total_seconds()
-            toplam_sure += sure
-            
-            if sonuc['success']: 
-                basarili += 1
-            else:
-                basarisiz += 1
-                logger.warning(
-                    f"Cari {cari.id} ({cari.unvan}) işlenemedi: "
-                    f"{sonuc.get('error', 'Bilinmeyen hata')}"
-                )
-        
-        ortalama_sure = toplam_sure / len(cariler) if cariler else 0
-        
-        logger.info(
-            f"Toplu hesaplama tamamlandı: "
-            f"Başarılı: {basarili}, Başarısız: {basarisiz}, "
-            f"Ortalama Süre: {ortalama_sure:.2f}s"
-        )
-        
-        return {
-            'success': True,
-            'toplam_cari': len(cariler),
-            'basarili': basarili,
-            'basarisiz': basarisiz,
-            'toplam_sure': toplam_sure,
-            'ortalama_sure': ortalama_sure
-        }
-        
+        sonuc = OdemeAnalizMotoru.calistir(tenant_db=tenant_db, firma_id=firma_id, limit=limit,
+                                           isci=isci, tam=tam)
+        return {'success': True, **sonuc}
     except Exception as e:
         logger.exception(f"Toplu hesaplama hatası: {e}")
-        return {
-            'success':  False,
-            'error': str(e)
-        }
-
-
-# ========================================
-# KULLANIM ÖRNEKLERİ
-# ========================================
-"""
-# Tekil kullanım: 
-sonuc = hesapla_ve_guncelle_ortalama_odeme(cari_id=123)
-if sonuc['success']:
-    print(f"Ortalama ödeme günü: {sonuc['ortalama_gun']}")
-    print(f"Kalan borç: {sonuc['kalan_borc']} TL")
-
-# Toplu kullanım (Flask CLI komutu olarak):
-@app.cli.command()
-def hesapla_odemeler():
-    with app.app_context():
-        sonuc = toplu_ortalama_odeme_hesapla(limit=100)
-        print(f"İşlenen:  {sonuc['toplam_cari']}, Süre: {sonuc['toplam_sure']:.2f}s")
-
-# Cron Job (Her gece 02:00):
-# 0 2 * * * cd /app && flask hesapla_odemeler
-"""
+        return {'success': False, 'error': str(e)}
 
 
 # ---------------------------------------------------------
 # 4.NUMARA ÜRETME MOTORU (ATOMİK & GÜVENLİ)
 # ---------------------------------------------------------
-def numara_uret(firma_id, kod, donem_yili, on_ek='', hane_sayisi=6, tenant_db=None):
+def numara_uret(firma_id, kod, donem_yili, on_ek='', hane_sayisi=6, tenant_db=None, mod=None):
     """
     Belirtilen kod ve döneme ait sıradaki evrak/belge numarasını üretir.
-    Tenant DB uyumludur. (Concurrency/Eşzamanlılık için row-level lock kullanır)
-    """
-    if tenant_db is None:
-        tenant_db = get_tenant_db()
-        
-    # Sayac modeli genelde app.models veya app.modules.firmalar.models içindedir.
-    # Senin yapında app.models içinde olduğunu biliyoruz.
-    from app.models import Sayac 
-    
-    try:
-        # with_for_update() -> Aynı anda iki kişi makbuz keserse numaralar çakışmasın diye satırı kilitler
-        sayac = tenant_db.query(Sayac).filter_by(
-            firma_id=str(firma_id),
-            kod=kod,
-            donem_yili=donem_yili
-        ).with_for_update().first()
+    Tenant DB uyumludur. Ayrıntılar: app.services.numara_servisi.NumaraServisi
 
-        if not sayac:
-            sayac = Sayac(
-                firma_id=str(firma_id),
-                donem_yili=donem_yili,
-                kod=kod,
-                on_ek=on_ek,
-                son_no=1,
-                hane_sayisi=hane_sayisi
-            )
-            tenant_db.add(sayac)
-            tenant_db.flush()
-            son_no = 1
-        else:
-            sayac.son_no += 1
-            tenant_db.flush()
-            son_no = sayac.son_no
+    mod:
+        None / 'kesintisiz' → boşluksuz, çağıranın transaction'ında (sayaç kilidi commit'e kadar)
+        'blok'              → boşluk toleranslı hi-lo blok; belge transaction'ı sayacı kilitlemez
 
-        numara_str = str(son_no).zfill(hane_sayisi)
-        return f"{on_ek}{numara_str}"
+    Yasal belgelerde numara commit'ten önce gerekmiyorsa NumaraServisi.ertele() tercih edilmeli
+    (kilit sadece commit anında tutulur).
+    """
+    try:
+        if mod == BLOK:
+            return NumaraServisi.sonraki(firma_id, kod, donem_yili, on_ek, hane_sayisi, tenant_db=tenant_db)
+        return NumaraServisi.aninda(firma_id, kod, donem_yili, on_ek, hane_sayisi, tenant_db=tenant_db)
 
     except Exception as e:
         print(f"Numara Üretme Hatası: {e}")
@@ -1,85 +1,114 @@
 # cli/commands.py
 
-import sys
-import os
-
-# Import fix (çifte garanti)
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-if BASE_DIR not in sys.path:
-    sys.path.insert(0, BASE_DIR)
-
 import click
-from flask import current_app
-from datetime import datetime
+from flask import current_app, session
+from flask.cli import AppGroup
 
-# Artık import çalışacak
-from araclar import hesapla_ve_guncelle_ortalama_odeme, toplu_ortalama_odeme_hesapla
-from models import db, CariHesap, Firma
+from app.araclar import hesapla_ve_guncelle_ortalama_odeme, toplu_ortalama_odeme_hesapla
 
 
-@click.group()
-def cari_cli():
-    """Cari hesap yönetim komutları"""
-    pass
+cari_cli = AppGroup('cari', help='Cari hesap yönetim komutları')
 
 
 @cari_cli.command('hesapla-odemeler')
-@click.option('--firma-id', '-f', type=int, help='Sadece belirli bir firmayı işle')
+@click.argument('tenant_id')
+@click.option('--firma-id', '-f', help='Sadece belirli bir firmayı işle')
 @click.option('--limit', '-l', type=int, help='İşlenecek maksimum cari sayısı')
-@click.option('--cari-id', '-c', type=int, help='Sadece tek bir cariyi işle')
+@click.option('--cari-id', '-c', help='Sadece tek bir cariyi işle')
+@click.option('--isci', '-i', default=1, show_default=True, help='Paralel işçi süreci sayısı')
+@click.option('--tam', is_flag=True, help='Filigranı yok say, tüm aktif carileri yeniden hesapla')
 @click.option('--verbose', '-v', is_flag=True, help='Detaylı çıktı')
-def hesapla_odemeler(firma_id, limit, cari_id, verbose):
-    """Cari hesapların ortalama ödeme günlerini hesaplar"""
-    
+def hesapla_odemeler(tenant_id, firma_id, limit, cari_id, isci, tam, verbose):
+    """
+    Cari hesapların ortalama ödeme günlerini hesaplar.
+
+    Kullanım: flask cari hesapla-odemeler <tenant_id> --isci 4 [--tam]
+    """
+
     click.echo("=" * 60)
     click.echo("📊 CARİ ÖDEME ANALİZİ BAŞLATILIYOR...")
     click.echo("=" * 60)
-    
-    # TEKİL CARİ
-    if cari_id: 
-        click.echo(f"\n🔍 Cari ID {cari_id} işleniyor...")
-        
-        cari = db.session.get(CariHesap, cari_id)
-        if not cari:
-            click.echo(f"❌ Cari bulunamadı: {cari_id}", err=True)
+
+    with current_app.test_request_context('/'):
+        session['tenant_id'] = str(tenant_id)
+
+        # TEKİL CARİ
+        if cari_id:
+            click.echo(f"\n🔍 Cari ID {cari_id} işleniyor...")
+            sonuc = hesapla_ve_guncelle_ortalama_odeme(cari_id)
+
+            if sonuc['success']:
+                click.echo(f"✅ Başarılı! Ortalama: {sonuc['ortalama_gun']} gün")
+                if verbose:
+                    click.echo(f"   Kapanan: {sonuc['kapanan_tutar']} TL, Kalan: {sonuc['kalan_borc']} TL, "
+                               f"Gecikme sıklığı: %{sonuc['gecikme_sikligi']}")
+            else:
+                click.echo(f"❌ Hata: {sonuc.get('error')}", err=True)
             return
-        
-        sonuc = hesapla_ve_guncelle_ortalama_odeme(cari_id)
-        
-        if sonuc['success']:
-            click.echo(f"✅ Başarılı!  Ortalama:  {sonuc['ortalama_gun']} gün")
-        else:
-            click.echo(f"❌ Hata: {sonuc.get('error')}", err=True)
-        
+
+        # TOPLU İŞLEM
+        click.echo(f"\n🔄 {'Tam' if tam else 'Artımlı'} hesaplama başlatılıyor ({isci} işçi)...")
+        sonuc = toplu_ortalama_odeme_hesapla(firma_id=firma_id, limit=limit, isci=isci, tam=tam)
+
+    if not sonuc['success']:
+        click.echo(f"❌ Hata: {sonuc.get('error')}", err=True)
         return
-    
-    # TOPLU İŞLEM
-    click.echo("\n🔄 Toplu hesaplama başlatılıyor...")
-    
-    query = CariHesap.query.filter_by(aktif=True)
-    
-    if firma_id:
-        query = query.filter_by(firma_id=firma_id)
-    
-    if limit:
-        query = query.limit(limit)
-    
-    cariler = query.all()
-    
-    if not cariler: 
-        click.echo("⚠️ İşlenecek cari bulunamadı!")
+
+    if not sonuc['toplam_cari']:
+        click.echo("⚠️ Son çalışmadan beri hareketi değişen cari yok.")
         return
-    
-    basarili = 0
-    basarisiz = 0
-    
-    with click.progressbar(cariler, label='İşleniyor') as bar:
-        for cari in bar:
-            sonuc = hesapla_ve_guncelle_ortalama_odeme(cari.id)
-            if sonuc['success']:
-                basarili += 1
-            else:
-                basarisiz += 1
-    
-    click.echo(f"\n✅ Başarılı: {basarili}")
-    click.echo(f"❌ Başarısız: {basarisiz}")
\ No newline at end of file
+
+    click.echo(f"\n✅ İşlenen: {sonuc['toplam_cari']} cari ({sonuc['bolum']} bölüm, {sonuc['isci']} işçi)")
+    click.echo(f"⏱️ Süre: {sonuc['sure']}s")
+
+
+@cari_cli.command('sema-guncelle')
+@click.argument('tenant_id')
+def sema_guncelle(tenant_id):
+    """
+    Ödeme analizi filigran kolonunu (cari_hesaplar.odeme_analiz_tarihi) ekler.
+    Bu sürüme geçerken her tenant için bir kez çalıştırılır; tekrar çalıştırmak güvenlidir.
+
+    Kullanım: flask cari sema-guncelle <tenant_id>
+    """
+    from app.extensions import get_tenant_db
+    from app.modules.cari.odeme_analizi import OdemeAnalizMotoru
+
+    with current_app.test_request_context('/'):
+        session['tenant_id'] = str(tenant_id)
+        tenant_db = get_tenant_db()
+        try:
+            eklendi = OdemeAnalizMotoru.sema_guncelle(tenant_db.connection())
+            tenant_db.commit()
+        except Exception as e:
+            tenant_db.rollback()
+            click.echo(f"❌ Hata: {e}", err=True)
+            return
+
+    if eklendi:
+        click.echo("✅ cari_hesaplar.odeme_analiz_tarihi kolonu eklendi")
+    else:
+        click.echo("⏭️ cari_hesaplar.odeme_analiz_tarihi zaten var, atlandı")
+
+
+@cari_cli.command('risk-ozeti')
+@click.argument('tenant_id')
+@click.option('--firma-id', '-f', help='Sadece belirli bir firmayı işle')
+def risk_ozeti(tenant_id, firma_id):
+    """
+    Cari risk özetlerini (yaşlandırma, çek riski) ham kayıtlardan yeniden kurar.
+    Gece çalıştırılır; yaşlandırma dilimleri güne göre kaydığı için gereklidir.
+
+    Kullanım: flask cari risk-ozeti <tenant_id>
+    """
+    from app.modules.cari.risk_ozeti import CariRiskMotoru
+
+    with current_app.test_request_context('/'):
+        session['tenant_id'] = str(tenant_id)
+        try:
+            sonuc = CariRiskMotoru.tam_uzlastir(firma_id=firma_id)
+        except Exception as e:
+            click.echo(f"❌ Hata: {e}", err=True)
+            return
+
+    click.echo(f"✅ Risk özeti uzlaştırıldı: {sonuc['toplam_cari']} cari, {sonuc['fark']} fark, {sonuc['sure']}s")
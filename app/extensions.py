@@ -15,7 +15,7 @@ from flask_babel import Babel
 from werkzeug.exceptions import HTTPException 
 from flask_wtf.csrf import CSRFProtect
 from sqlalchemy import create_engine, event, text
-from sqlalchemy.orm import scoped_session, sessionmaker, DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase
 from flask import abort, g, session, request, current_app
 
 # Logger
@@ -30,7 +30,7 @@ celery = Celery(
     "erp_saas",
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=['app.modules.efatura.tasks', 'app.modules.eirsaliye.tasks'] # ✨ EKLENDİ
+    include=['app.modules.efatura.tasks', 'app.modules.eirsaliye.tasks', 'app.modules.rapor.tasks'] # ✨ EKLENDİ
 )
 
 
@@ -82,6 +82,14 @@ babel = Babel()
 csrf = CSRFProtect()
 
 
+# ========================================
+# 🔌 TENANT ENGINE REGISTRY (Process-wide pool)
+# ========================================
+from app.utils.tenant_engine_registry import TenantEngineRegistry
+
+tenant_engine_registry = TenantEngineRegistry()
+
+
 # ========================================
 # 🏢 TENANT DATABASE CONNECTION (MySQL Multi-Tenant)
 # ========================================
@@ -94,7 +102,7 @@ def get_tenant_db():
         - ✅ Tenant code validation (SQL injection)
         - ✅ Database name validation
         - ✅ Database existence check
-        - ✅ Connection pooling
+        - ✅ Connection pooling (process-wide TenantEngineRegistry)
     
     Returns:
         Session: SQLAlchemy session or None
@@ -120,21 +128,23 @@ def get_tenant_db():
             logger.error(f"❌ Geçersiz tenant ID: {tenant_id} ({error})")
             abort(400, f"Geçersiz firma ID formatı")
         
-        # 4. Tenant metadata'sını al (Master DB)
-        from app.models.master import Tenant
-        tenant = db.session.get(Tenant, tenant_id)
+        # 4. Tenant metadata'sını al (TenantContextResolver cache'i, gerekirse Master DB)
+        from app.services.tenant_context import TenantContextResolver
+        ctx = TenantContextResolver.resolve(tenant_id)
         
-        if not tenant:
+        if not ctx:
             logger.error(f"❌ Tenant bulunamadı: {tenant_id}")
             abort(404, "Firma bulunamadı")
         
+        tenant = ctx['tenant']
+        
         # 5. Tenant aktif mi?
-        if not tenant.is_active:
+        if not tenant['is_active']:
             logger.warning(f"⚠️ Pasif tenant erişim denemesi: {tenant_id}")
             abort(403, "Bu firma devre dışı bırakılmış")
         
         # 6. ✅ SECURITY: Tenant code validation
-        tenant_code = tenant.kod
+        tenant_code = tenant['kod']
         
         is_valid_code, error = SecurityValidator.validate_tenant_code(tenant_code)
         if not is_valid_code:
@@ -142,8 +152,8 @@ def get_tenant_db():
             abort(400, f"Geçersiz firma kodu: {error}")
         
         # 7. Database adını belirle
-        if hasattr(tenant, 'db_name') and tenant.db_name:
-            tenant_db_name = tenant.db_name
+        if tenant['db_name']:
+            tenant_db_name = tenant['db_name']
             
             # ✅ SECURITY: Database name validation
             is_valid_db, error = SecurityValidator.validate_db_name(tenant_db_name)
@@ -161,8 +171,9 @@ def get_tenant_db():
                 logger.error(f"❌ Oluşturulan database adı geçersiz: {tenant_db_name}")
                 abort(500, "Database adı oluşturulamadı")
         
-        # 8. ✅ SECURITY: Database existence check
-        if not check_database_exists(tenant_db_name):
+        # 8. ✅ SECURITY: Database existence check (sonuç context paketinde cache'li)
+        db_exists = ctx['db_exists'] if ctx['db_name'] == tenant_db_name else check_database_exists(tenant_db_name)
+        if not db_exists:
             logger.error(f"❌ Database bulunamadı: {tenant_db_name}")
             abort(404, f"Firma veritabanı bulunamadı: {tenant_db_name}")
         
@@ -171,27 +182,19 @@ def get_tenant_db():
             tenant_code=tenant_db_name
         )
         
-        # 10. Engine oluştur
-        engine = create_engine(
-            tenant_db_url,
-            pool_pre_ping=True,
-            pool_recycle=3600,
-            pool_size=10,
-            max_overflow=20,
-            echo=False
-        )
+        # 10. Engine'i registry'den al (process boyunca paylaşılır, her istekte açılmaz)
+        engine = tenant_engine_registry.get_engine(tenant_db_name, tenant_db_url)
         
         # 11. Session oluştur
-        Session = scoped_session(sessionmaker(bind=engine))
-        tenant_db_session = Session()
+        tenant_db_session = tenant_engine_registry.get_session(tenant_db_name, tenant_db_url)
         
         # 12. g nesnesine kaydet (cache)
         g.tenant_db_session = tenant_db_session
         g.tenant_db_engine = engine
         g.tenant_metadata = {
-            'id': tenant.id,
-            'kod': tenant.kod,
-            'unvan': tenant.unvan,
+            'id': tenant['id'],
+            'kod': tenant['kod'],
+            'unvan': tenant['unvan'],
             'db_name': tenant_db_name
         }
         
@@ -256,10 +259,11 @@ def close_tenant_db(exception=None):
     """
     Tenant DB session'ını güvenli şekilde kapat
     
-    ✅ FIX: Engine dispose eklendi
+    ✅ Engine dispose EDİLMEZ: engine TenantEngineRegistry'de yaşar,
+    bağlantı sadece pool'a iade edilir.
     """
     tenant_db = g.pop('tenant_db_session', None)
-    tenant_engine = g.pop('tenant_engine', None)
+    g.pop('tenant_db_engine', None)
     
     if tenant_db is not None:
         try:
@@ -275,14 +279,6 @@ def close_tenant_db(exception=None):
         
         except Exception as e:
             logger.debug(f"⚠️ Tenant session kapatma uyarısı: {e}")
-    
-    # ✅ Engine'i dispose et (connection pool temizle)
-    if tenant_engine is not None:
-        try:
-            tenant_engine.dispose()
-            logger.debug("✅ Tenant engine dispose edildi")
-        except Exception as e:
-            logger.debug(f"⚠️ Engine dispose uyarısı: {e}")
 
 
 # ========================================
@@ -463,7 +459,9 @@ def init_extensions(app):
         3. Login Manager
         4. Babel (i18n)
         5. CSRF Protection
-        6. Teardown handlers
+        6. Tenant Engine Registry
+        7. Tenant context invalidation hook'ları
+        8. Teardown handlers
     """
     
     # 1. Master DB (MySQL)
@@ -501,11 +499,23 @@ def init_extensions(app):
     csrf.init_app(app)
     logger.info("✅ CSRF Protection başlatıldı")
     
-    # 6. Teardown handler (Tenant DB cleanup)
+    # 6. Tenant Engine Registry (limitler config'den)
+    tenant_engine_registry.init_app(app)
+    logger.info(
+        f"✅ Tenant engine registry başlatıldı "
+        f"(max_engines={tenant_engine_registry.max_engines}, "
+        f"max_connections={tenant_engine_registry.max_connections})"
+    )
+    
+    # 7. Tenant context cache invalidation (Tenant/Rol/Lisans değişiklikleri)
+    from app.services.tenant_context import register_invalidation_listeners
+    register_invalidation_listeners()
+    
+    # 8. Teardown handler (Tenant DB cleanup)
     app.teardown_appcontext(close_tenant_db)
     logger.info("✅ Teardown handler kaydedildi")
     
-    # 7. CSRF Logger (debug modda)
+    # 9. CSRF Logger (debug modda)
     if app.debug:
         init_csrf_logger(app)
         logger.info("✅ CSRF Logger aktif (debug mode)")
@@ -537,20 +547,34 @@ def clear_tenant_cache(tenant_id):
     for key in cache_keys:
         cache.delete(key)
     
+    from app.services.tenant_context import TenantContextResolver
+    TenantContextResolver.invalidate(tenant_id)
+    
     logger.info(f"🗑️ Tenant cache temizlendi: {tenant_id}")
 
 
 def get_all_tenant_engines():
     """
-    Tüm aktif tenant engine'lerini döner (nadiren kullanılır)
+    Bu process'te canlı olan tüm tenant engine'lerini döner
     
     Returns:
-        dict: {tenant_id: engine}
+        dict: {db_name: engine}
     """
-    # Cache'deki tüm engine'leri topla
-    # Redis kullanıyorsanız keys() ile bulabilirsiniz
-    # Bu fonksiyon genelde admin panelinde kullanılır
-    pass
+    return tenant_engine_registry.engines()
+
+
+def get_tenant_engine_stats():
+    """
+    Tenant engine registry ve tenant bazlı pool istatistikleri (monitoring)
+    
+    Returns:
+        dict: {
+            'engines': int, 'capacity': int, 'checked_out': int,
+            'misses': int, 'evictions': int,
+            'tenants': [{'db_name', 'pool_size', 'checked_out', 'hits', ...}]
+        }
+    """
+    return tenant_engine_registry.stats()
 
 
 # ========================================
@@ -601,4 +625,12 @@ def health_check():
     else:
         status['tenant_db'] = 'not_connected'
     
+    # 4. Tenant engine registry özeti
+    stats = tenant_engine_registry.stats()
+    status['tenant_engines'] = {
+        'engines': stats['engines'],
+        'capacity': stats['capacity'],
+        'checked_out': stats['checked_out']
+    }
+    
     return status
\ No newline at end of file
@@ -1,19 +1,17 @@
 import json
 import os
 from dotenv import load_dotenv # 👈 BU SATIRI EKLEYİN
-import google.generativeai as genai
-from google.api_core import retry
+
+from app.services.ai_client import AIIstemcisi, TembelGenai
 
 # .env dosyasını hemen burada yükle ki kodlar çalışmadan anahtar hazır olsun
 load_dotenv()
 
-# Google Generative AI kütüphanesi kontrolü
-try:
-    import google.generativeai as genai
-    HAS_GENAI = True
-except ImportError:
-    HAS_GENAI = False
+# Google Generative AI kütüphanesi kontrolü (import + configure ilk kullanımda yapılır)
+HAS_GENAI = AIIstemcisi.kutuphane_var()
+if not HAS_GENAI:
     print("UYARI: 'google-generativeai' kütüphanesi yüklü değil.'pip install google-generativeai' çalıştırın.")
+genai = TembelGenai()
 
 # 1.API Key Kontrolü
 # Google AI Studio'dan aldığınız anahtarı GEMINI_API_KEY olarak kaydedin
@@ -22,16 +20,10 @@ api_key = os.environ.get("GEMINI_API_KEY")
 #MODEL_NAME =  "gemini-1.5-flash-latest"
 #MODEL_NAME = "gemini-pro-vision"
 MODEL_NAME = "gemini-1.5-flash"  # rota için
-is_active = False
+is_active = HAS_GENAI and bool(api_key)
 
-if HAS_GENAI and api_key:
-    try:
-        genai.configure(api_key=api_key)
-        is_active = True
-        print(f"✅ Gemini AI ({MODEL_NAME}) entegrasyonu aktif.")
-    except Exception as e:
-        print(f"❌ Gemini Başlatma Hatası: {e}")
-        is_active = False
+if is_active:
+    print(f"✅ Gemini AI ({MODEL_NAME}) entegrasyonu aktif.")
 else:
     print("⚠️ UYARI: GEMINI_API_KEY bulunamadı.Modül 'Simülasyon Modu'nda çalışacak.")
 
@@ -25,7 +25,13 @@ class DataGrid:
     def __init__(self, name: str, model: Type[BaseModel], title: str = "Veri Listesi", 
                  per_page: int = 10,
                  enable_grouping: bool = False, enable_summary: bool = False,
-                 summary_fields: Optional[List[str]] = None, target=None):
+                 summary_fields: Optional[List[str]] = None, target=None,
+                 pagination_mode: str = 'offset', count_mode: str = 'exact',
+                 count_cap: int = 10000):
+        """
+        pagination_mode: 'offset' (sayfa numarası) | 'keyset' (cursor, büyük tablolar için)
+        count_mode: 'exact' (COUNT(*)) | 'estimated' (üst sınırlı + cache'li sayım, "10.000+")
+        """
         self.name = name
         self.model = model
         self.title = title
@@ -42,6 +48,10 @@ class DataGrid:
         self.current_sort_field: Optional[str] = None
         self.current_sort_direction: str = 'asc' 
         
+        self.pagination_mode = pagination_mode
+        self.count_mode = count_mode
+        self.count_cap = count_cap
+        
         # Başlangıçta tüm model alanlarını oluştur
         self._auto_generate_columns()
         self.target=target
@@ -148,6 +158,154 @@ class DataGrid:
 
     def process_query(self, query, default_sort: tuple = None):
         """Request argümanlarını alır ve sorguyu işler."""
+        query = self._apply_filters(query)
+
+        # C.SIRALAMA
+        sort_col = request.args.get('sort')
+        sort_dir = request.args.get('direction', 'asc')
+        
+        if not sort_col and default_sort:
+            sort_col, sort_dir = default_sort
+
+        if self.pagination_mode == 'keyset':
+            return self._process_keyset(query, sort_col, sort_dir)
+        
+        query = self._apply_sort(query, sort_col, sort_dir)
+        
+        # D.SAYFALAMA (✅ SQLAlchemy 2.0 Uyumlu)
+        try:  
+            page = int(request.args.get('page', 1))
+        except: 
+            page = 1
+        
+        # ✅ MANUEL PAGINATION (query.paginate() yerine)
+        from sqlalchemy import func
+        
+        # Toplam kayıt sayısı
+        total, is_capped = self._count(query)
+        
+        # Sayfa hesaplama
+        total_pages = (total + self.per_page - 1) // self.per_page if self.per_page > 0 else 1
+        
+        # Sayfa sınır kontrolü
+        if page < 1:
+            page = 1
+        elif page > total_pages and total_pages > 0:
+            page = total_pages
+        
+        # Offset hesaplama
+        offset = (page - 1) * self.per_page
+        
+        # Veriyi çek
+        items = query.limit(self.per_page).offset(offset).all()
+        
+        # Pagination objesi oluştur
+        pagination_info = {
+            'page': page,
+            'per_page':  self.per_page,
+            'total_pages': total_pages,
+            'total_items': total,
+            'total_capped': is_capped
+        }
+        
+        self.load_data(items, pagination_info)
+        
+        return self
+
+    def export(self, query=None, default_sort: tuple = None, filename: str = None, kaynak: str = None):
+        """
+        Grid'in filtre/sıralamasıyla sorguyu streaming export eder.
+
+        URL protokolü: ?scope=page|all (&format=csv|xlsx, varsayılan add_export_action formatı)
+        'page' sadece mevcut sayfayı, 'all' filtrelenmiş tüm kaydı indirir.
+        Satırlar yield_per ile parça parça çekilir, bellekte tutulmaz.
+
+        kaynak: Kayıtlı export kaynağı (@export_source). Verilirse export_or_enqueue
+                üzerinden gider: EXPORT_ASYNC_ROW_THRESHOLD'u aşan export arka plan
+                işine çevrilir (kaynak sorguyu export_sorgusu() ile yeniden kurar).
+        """
+        from app.modules.rapor.stream_export import StreamingExporter, export_or_enqueue
+
+        default_format = self.export_action['format'] if self.export_action else 'csv'
+        fmt = request.args.get('format', default_format)
+
+        if kaynak:
+            params = {k: v for k, v in request.args.items() if v}
+            return export_or_enqueue(kaynak, params, fmt, filename or self.name)
+
+        query, columns = self.export_sorgusu(query, default_sort)
+        return StreamingExporter(query, columns).response(fmt, filename or self.name)
+
+    def export_sorgusu(self, query, default_sort: tuple = None):
+        """
+        Request argümanlarındaki filtre / sıralama / scope ile export sorgusu ve kolonları.
+
+        Returns:
+            tuple: (query, [(alan_yolu, başlık), ...])
+        """
+        query = self._apply_filters(query)
+
+        sort_col = request.args.get('sort')
+        sort_dir = request.args.get('direction', 'asc')
+        if not sort_col and default_sort:
+            sort_col, sort_dir = default_sort
+
+        pk_attr = getattr(self.model, self.model.__mapper__.primary_key[0].key)
+
+        if request.args.get('scope') == 'page' and self.pagination_mode == 'keyset':
+            # Ekrandaki keyset sayfası (after/before cursor'ı) aynı sırayla
+            query = self._keyset_export_page(query, sort_col, sort_dir, pk_attr)
+        else:
+            query = self._apply_sort(query, sort_col, sort_dir).order_by(pk_attr)
+
+        if request.args.get('scope') == 'page' and self.pagination_mode != 'keyset':
+            try:
+                page = max(int(request.args.get('page', 1)), 1)
+            except ValueError:
+                page = 1
+            query = query.limit(self.per_page).offset((page - 1) * self.per_page)
+
+        columns = [(col['name'], col['label']) for col in self.columns if col['visible']]
+        return query, columns
+
+    def _keyset_sort(self, sort_col, sort_dir):
+        """Keyset modunda geçerli sıralama kolonu ve yönü: (sort_attr | None, sort_dir)"""
+        sort_attr = None
+        if sort_col and hasattr(self.model, sort_col):
+            candidate = getattr(self.model, sort_col)
+            if hasattr(candidate, 'ilike'):  # Sadece gerçek SQL kolonları
+                sort_attr = candidate
+        if sort_attr is None:
+            sort_dir = sort_dir if sort_col else 'desc'
+        return sort_attr, sort_dir
+
+    def _keyset_export_page(self, query, sort_col, sort_dir, pk_attr):
+        """Mevcut keyset sayfasının satırlarını, grid sırasıyla dönen sorgu"""
+        from .keyset import keyset_order, keyset_page, is_nullable
+
+        sort_attr, sort_dir = self._keyset_sort(sort_col, sort_dir)
+        page = keyset_page(
+            query, sort_attr, pk_attr, direction=sort_dir,
+            after=request.args.get('after'), before=request.args.get('before'),
+            per_page=self.per_page
+        )
+        ids = [getattr(item, pk_attr.key) for item in page['items']]
+        keys = [sort_attr, pk_attr] if sort_attr is not None and sort_attr is not pk_attr else [pk_attr]
+        return query.filter(pk_attr.in_(ids)).order_by(None).order_by(
+            *keyset_order(keys, sort_dir == 'desc', len(keys) == 2 and is_nullable(sort_attr)))
+
+    def _apply_sort(self, query, sort_col, sort_dir):
+        if sort_col and hasattr(self.model, sort_col):
+            column_attr = getattr(self.model, sort_col)
+            try:
+                query = query.order_by(desc(column_attr) if sort_dir == 'desc' else asc(column_attr))
+                self.current_sort_field = sort_col
+                self.current_sort_direction = sort_dir
+            except:  pass
+        return query
+
+    def _apply_filters(self, query):
+        """Kapsam (şube/dönem), kolon filtreleri ve global arama"""
 
         # ✨ 1. KURUMSAL KAPSAM (DATA SCOPING) - OTOMATİK ŞUBE/DÖNEM FİLTRESİ ✨
         # Bu kod sayesinde hiçbir sayfada manuel şube filtresi yazmana gerek kalmayacak!
@@ -250,58 +408,52 @@ class DataGrid:
             if search_filters:
                 query = query.filter(or_(*search_filters))
 
-        # C.SIRALAMA
-        sort_col = request.args.get('sort')
-        sort_dir = request.args.get('direction', 'asc')
-        
-        if not sort_col and default_sort:
-            sort_col, sort_dir = default_sort
+        return query
+
+    def _count(self, query):
+        """Toplam kayıt sayısı: (count, is_capped)"""
+        if self.count_mode == 'estimated':
+            from .keyset import capped_count
+            return capped_count(query, cap=self.count_cap)
+        return query.count(), False
+
+    def _process_keyset(self, query, sort_col, sort_dir):
+        """
+        Keyset (seek) sayfalama: sort kolonu + primary key ile cursor tabanlı.
+        URL protokolü: ?after=<cursor> (sonraki sayfa), ?before=<cursor> (önceki sayfa)
+        """
+        from .keyset import keyset_page
+
+        pk_attr = getattr(self.model, self.model.__mapper__.primary_key[0].key)
+        sort_attr, sort_dir = self._keyset_sort(sort_col, sort_dir)
+        if sort_attr is not None:
+            self.current_sort_field = sort_col
+        self.current_sort_direction = sort_dir
+
+        if self.count_mode == 'none':
+            total, is_capped = None, False
+        else:
+            total, is_capped = self._count(query)
+
+        page = keyset_page(
+            query, sort_attr, pk_attr, direction=sort_dir,
+            after=request.args.get('after'), before=request.args.get('before'),
+            per_page=self.per_page
+        )
 
-        if sort_col and hasattr(self.model, sort_col):
-            column_attr = getattr(self.model, sort_col)
-            try:
-                query = query.order_by(desc(column_attr) if sort_dir == 'desc' else asc(column_attr))
-                self.current_sort_field = sort_col
-                self.current_sort_direction = sort_dir
-            except:  pass
-        
-        # D.SAYFALAMA (✅ SQLAlchemy 2.0 Uyumlu)
-        try:  
-            page = int(request.args.get('page', 1))
-        except: 
-            page = 1
-        
-        # ✅ MANUEL PAGINATION (query.paginate() yerine)
-        from sqlalchemy import func
-        
-        # Toplam kayıt sayısı
-        total = query.count()
-        
-        # Sayfa hesaplama
-        total_pages = (total + self.per_page - 1) // self.per_page if self.per_page > 0 else 1
-        
-        # Sayfa sınır kontrolü
-        if page < 1:
-            page = 1
-        elif page > total_pages and total_pages > 0:
-            page = total_pages
-        
-        # Offset hesaplama
-        offset = (page - 1) * self.per_page
-        
-        # Veriyi çek
-        items = query.limit(self.per_page).offset(offset).all()
-        
-        # Pagination objesi oluştur
         pagination_info = {
-            'page': page,
-            'per_page':  self.per_page,
-            'total_pages': total_pages,
-            'total_items': total
+            'mode': 'keyset',
+            'page': None,
+            'per_page': self.per_page,
+            'total_pages': None,
+            'total_items': total,
+            'total_capped': is_capped,
+            'next_cursor': page['next_cursor'],
+            'prev_cursor': page['prev_cursor'],
+            'has_next': page['has_next'],
+            'has_prev': page['has_prev'],
         }
-        
-        self.load_data(items, pagination_info)
-        
+        self.load_data(page['items'], pagination_info)
         return self
 
 
@@ -380,6 +532,7 @@ class DataGrid:
                         sort_icon = '<i class="fas fa-sort-down fa-sm ms-1"></i>'
                 
                 args = request.args.to_dict()
+                args.pop('after', None); args.pop('before', None)
                 args.update({'sort': field_name, 'direction': new_dir, 'page': 1})
                 label = f'<a href="{url_for(base_url_name, **args)}" class="text-decoration-none text-dark">{col["label"]} {sort_icon}</a>'
             
@@ -542,8 +695,46 @@ class DataGrid:
             return '<span class="badge bg-success">Aktif</span>' if value else '<span class="badge bg-secondary">Pasif</span>'
         return str(value)
 
+    def _render_keyset_pagination(self, base_url_name: str) -> str:
+        info = self.pagination
+        if not info.get('has_prev') and not info.get('has_next'): return ''
+
+        def get_url(**cursor):
+            args = request.args.to_dict()
+            args.pop('after', None); args.pop('before', None); args.pop('page', None)
+            args.update(cursor)
+            return url_for(base_url_name, **args)
+
+        first_url = get_url()
+        prev_url = get_url(before=info['prev_cursor']) if info.get('has_prev') else '#'
+        next_url = get_url(after=info['next_cursor']) if info.get('has_next') else '#'
+        prev_dis = '' if info.get('has_prev') else 'disabled'
+        next_dis = '' if info.get('has_next') else 'disabled'
+
+        return (
+            '<nav><ul class="pagination pagination-sm justify-content-center mb-0">'
+            f'<li class="page-item {prev_dis}"><a class="page-link" href="{first_url if info.get("has_prev") else "#"}">&laquo;&laquo;</a></li>'
+            f'<li class="page-item {prev_dis}"><a class="page-link" href="{prev_url}">&laquo;</a></li>'
+            f'<li class="page-item {next_dis}"><a class="page-link" href="{next_url}">&raquo;</a></li>'
+            '</ul></nav>'
+        )
+
+    def _render_total(self) -> str:
+        info = self.pagination
+        total = info.get('total_items')
+        if total is None:
+            total_str = ''
+        else:
+            from .keyset import format_count
+            total_str = f'Toplam {format_count(total, info.get("total_capped", False))} kayıt'
+        if info.get('mode') == 'keyset':
+            return total_str
+        return f'{total_str}, Sayfa {info["page"]}/{info["total_pages"]}'
+
     def _render_pagination(self, base_url_name: str) -> str:
         info = self.pagination
+        if info.get('mode') == 'keyset':
+            return self._render_keyset_pagination(base_url_name)
         current, total = info['page'], info['total_pages']
         if total <= 1: return ''
 
@@ -584,8 +775,11 @@ class DataGrid:
             html.append(f'<div class="card-header bg-light d-flex justify-content-between align-items-center"><h5 class="mb-0">{self.title}</h5>')
             # Export Butonları
             if self.export_action:
-                export_url_page = url_for(f"{base_url_name}_export", scope='page')
-                export_url_all = url_for(f"{base_url_name}_export", scope='all')
+                # Filtre / sıralama / sayfa (veya keyset cursor'ı) export linkine taşınır
+                args = {k: v for k, v in request.args.items() if k not in ('scope', 'format')}
+                sayfasiz = {k: v for k, v in args.items() if k not in ('page', 'after', 'before')}
+                export_url_page = url_for(f"{base_url_name}_export", **args, scope='page')
+                export_url_all = url_for(f"{base_url_name}_export", **sayfasiz, scope='all')
                 html.append('<div>') 
                 html.append(f'<a href="{export_url_page}" class="btn btn-sm {self.export_action["class_page"]} me-1" target="_blank"><i class="{self.export_action["icon_page"]}"></i> {self.export_action["label_page"]}</a>')
                 html.append(f'<a href="{export_url_all}" class="btn btn-sm {self.export_action["class_all"]}" target="_blank"><i class="{self.export_action["icon_all"]}"></i> {self.export_action["label_all"]}</a>')
@@ -610,7 +804,7 @@ class DataGrid:
             html.append(f'<tr><td colspan="{cols}" class="text-center py-4 text-muted">Kayıt bulunamadı.</td></tr>')
             
         html.append('</tbody></table></div>')
-        html.append(f'<div class="small text-muted mt-2">Toplam {self.pagination["total_items"]} kayıt, Sayfa {self.pagination["page"]}/{self.pagination["total_pages"]}</div>')
+        html.append(f'<div class="small text-muted mt-2">{self._render_total()}</div>')
         html.append('</div></div>')
         
         return ''.join(html)
\ No newline at end of file
@@ -0,0 +1,246 @@
+# keyset.py
+"""
+Keyset (Seek) Pagination Yardımcıları
+
+OFFSET yerine "son görülen satırdan sonrası" mantığıyla sayfalama yapar:
+    WHERE (sort_col, id) > (:son_deger, :son_id) ORDER BY sort_col, id LIMIT n
+
+Derin sayfalarda da maliyet sabittir (index seek). Cursor'lar istemciye
+opak (base64) string olarak verilir; içerikleri sıralama değeri + primary key'dir.
+
+NULL olabilen sıralama kolonlarında sıralama açıkça tanımlanır: artanda NULL'lar
+sonda, azalanda başta (azalan = artanın tam tersi; geri sayfalama buna dayanır).
+
+Ayrıca tam COUNT(*) yerine üst sınırlı ("10.000+") ve cache'li
+tahmini toplam sayım desteği içerir.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, or_, case, func, select, asc, desc
+
+logger = logging.getLogger(__name__)
+
+
+# =================================================================
+# 1. CURSOR KODLAMA
+# =================================================================
+
+def _encode_value(value):
+    """JSON'a sığmayan tipleri etiketle"""
+    if isinstance(value, datetime):
+        return {'t': 'dt', 'v': value.isoformat()}
+    if isinstance(value, date):
+        return {'t': 'd', 'v': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'t': 'dec', 'v': str(value)}
+    if hasattr(value, 'value'):  # Enum
+        return value.value
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 't' in value:
+        t, v = value['t'], value['v']
+        if t == 'dt':
+            return datetime.fromisoformat(v)
+        if t == 'd':
+            return date.fromisoformat(v)
+        if t == 'dec':
+            return Decimal(v)
+    return value
+
+
+def encode_cursor(sort_value, pk_value) -> str:
+    """(sıralama değeri, primary key) çiftini opak cursor'a çevirir."""
+    payload = json.dumps([_encode_value(sort_value), _encode_value(pk_value)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Cursor'ı çözer.
+
+    Returns:
+        tuple: (sort_value, pk_value) veya geçersizse None
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, pk_value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return _decode_value(sort_value), _decode_value(pk_value)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"⚠️ Geçersiz sayfalama cursor'ı: {e}")
+        return None
+
+
+# =================================================================
+# 2. SEEK SORGUSU
+# =================================================================
+
+def keyset_page(query, sort_attr, pk_attr, direction='asc', after=None, before=None, per_page=20):
+    """
+    Keyset sayfası getirir.
+
+    Args:
+        query: SQLAlchemy Query (filtreler uygulanmış, sıralamasız olabilir)
+        sort_attr: Sıralama kolonu (InstrumentedAttribute) veya None (sadece PK)
+        pk_attr: Primary key kolonu (eşitlik durumunda kesin sıralama için)
+        direction: 'asc' | 'desc'
+        after: Bu cursor'dan SONRAKİ sayfa (ileri)
+        before: Bu cursor'dan ÖNCEKİ sayfa (geri)
+        per_page: Sayfa boyutu
+
+    Returns:
+        dict: {items, next_cursor, prev_cursor, has_next, has_prev}
+    """
+    backward = bool(before) and not after
+    cursor = decode_cursor(before if backward else after)
+
+    # Geri giderken sıralamayı ters çevirip sonucu tekrar düzeltiyoruz
+    descending = (direction == 'desc') != backward
+
+    keys = [sort_attr, pk_attr] if sort_attr is not None and sort_attr is not pk_attr else [pk_attr]
+    nullable = len(keys) == 2 and is_nullable(sort_attr)
+
+    query = query.order_by(None).order_by(*keyset_order(keys, descending, nullable))
+
+    if cursor is not None:
+        sort_value, pk_value = cursor
+        values = [sort_value, pk_value] if len(keys) == 2 else [pk_value]
+        query = query.filter(_seek_condition(keys, values, descending, nullable))
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backward:
+        rows.reverse()
+
+    def _cursor_of(row):
+        pk = getattr(row, pk_attr.key)
+        sv = getattr(row, sort_attr.key) if len(keys) == 2 else pk
+        return encode_cursor(sv, pk)
+
+    next_cursor = _cursor_of(rows[-1]) if rows else None
+    prev_cursor = _cursor_of(rows[0]) if rows else None
+
+    if backward:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = cursor is not None, has_more
+
+    return {
+        'items': rows,
+        'next_cursor': next_cursor if has_next else None,
+        'prev_cursor': prev_cursor if has_prev else None,
+        'has_next': has_next,
+        'has_prev': has_prev,
+    }
+
+
+def is_nullable(attr):
+    """Kolon NULL içerebilir mi (belirlenemezse evet kabul edilir)"""
+    try:
+        return bool(attr.property.columns[0].nullable)
+    except (AttributeError, IndexError):
+        return True
+
+
+def keyset_order(keys, descending, nullable=False):
+    """
+    Seek koşuluyla tutarlı ORDER BY ifadeleri.
+    nullable ise önce "NULL mu" bayrağı: artanda NULL'lar sonda, azalanda başta.
+    """
+    order = desc if descending else asc
+    ifadeler = [order(k) for k in keys]
+    if nullable:
+        ifadeler.insert(0, order(case((keys[0].is_(None), 1), else_=0)))
+    return ifadeler
+
+
+def _seek_condition(keys, values, descending, nullable=False):
+    """
+    (k1, k2) > (v1, v2) koşulunu index dostu OR/AND açılımı ile üretir:
+        k1 > v1 OR (k1 = v1 AND k2 > v2)
+
+    nullable ise NULL grubu keyset_order() sırasına göre açıkça eklenir:
+        artan:  v1 dolu → ... OR k1 IS NULL          v1 NULL → k1 IS NULL AND k2 > v2
+        azalan: v1 dolu → ... (NULL'lar geride kaldı)  v1 NULL → (k1 IS NULL AND k2 < v2) OR k1 IS NOT NULL
+    """
+    cmp = (lambda c, v: c < v) if descending else (lambda c, v: c > v)
+
+    if len(keys) == 1:
+        return cmp(keys[0], values[0])
+
+    (k1, k2), (v1, v2) = keys, values
+    if v1 is None:
+        null_grubu = and_(k1.is_(None), cmp(k2, v2))
+        return or_(null_grubu, k1.isnot(None)) if descending else null_grubu
+
+    kosul = or_(cmp(k1, v1), and_(k1 == v1, cmp(k2, v2)))
+    if nullable and not descending:
+        return or_(kosul, k1.is_(None))
+    return kosul
+
+
+# =================================================================
+# 3. TAHMİNİ / ÜST SINIRLI SAYIM
+# =================================================================
+
+def capped_count(query, cap=10000, cache_timeout=60):
+    """
+    COUNT(*) maliyetini üst sınırla.
+
+    SELECT COUNT(*) FROM (SELECT id ... LIMIT cap+1) şeklinde sayar; en fazla
+    cap+1 satır taranır. Sonuç kısa süreli cache'lenir (tenant + sorgu + parametre hash'i).
+
+    Returns:
+        tuple: (count: int, is_capped: bool)
+    """
+    from app.extensions import cache
+
+    cache_key = None
+    try:
+        stmt = query.statement.compile(compile_kwargs={'literal_binds': False})
+        from flask import has_request_context, session
+        tenant_id = session.get('tenant_id') if has_request_context() else None
+        raw = f"{tenant_id}|{stmt}|{sorted(stmt.params.items(), key=lambda x: x[0])}|{cap}"
+        cache_key = 'grid_count:' + hashlib.md5(raw.encode()).hexdigest()
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return tuple(cached)
+    except Exception as e:
+        logger.debug(f"Count cache anahtarı üretilemedi: {e}")
+
+    # Sadece PK seçilir (covering index ile tablo satırlarına gidilmez)
+    inner_query = query.order_by(None)
+    try:
+        entity = query.column_descriptions[0]['entity']
+        inner_query = inner_query.with_entities(*entity.__mapper__.primary_key)
+    except (AttributeError, IndexError, KeyError, TypeError):
+        pass
+    inner = inner_query.limit(cap + 1).subquery()
+    total = query.session.execute(select(func.count()).select_from(inner)).scalar() or 0
+
+    result = (min(total, cap), total > cap)
+
+    if cache_key:
+        try:
+            cache.set(cache_key, result, timeout=cache_timeout)
+        except Exception:
+            pass
+
+    return result
+
+
+def format_count(count, is_capped):
+    """10000, True -> '10.000+'"""
+    text = f"{count:,}".replace(',', '.')
+    return f"{text}+" if is_capped else text
@@ -0,0 +1,313 @@
+# app/form_builder/lookup.py
+"""
+Form Seçenek Kaynakları (Lookup Registry)
+
+Her seçenek listesi (Şube, Depo, Hesap Planı, Şehir ...) BİR KEZ tanımlanır:
+
+    @LookupRegistry.kaynak('sube', modeller=(Sube,))
+    def _subeler(tenant_db, firma_id):
+        return [(s.id, s.ad, s.bolge_id) for s in ...]
+
+- Sonuç tenant + firma (+ parametreler) bazında TenantCache 'lookup' alanında saklanır.
+- Kaynağın modellerinden biri değişip commit edilince tenant'ın tüm lookup'ları geçersiz olur.
+- Satır sayısı kaynağın uzak_esik değerini aşarsa form alanı <option> listesi yerine
+  /api/lookup/<ad> üzerinden (kelime başı indeksli) AJAX araması kullanır.
+
+Kaynak tanımları: app/form_builder/lookup_kaynaklari.py (açılışta LookupRegistry.init_app ile
+kaydedilir; böylece model listener'ları ilk lookup okunmadan önce de çalışır)
+"""
+
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.extensions import get_tenant_db
+from app.services.tenant_cache import TenantCache
+
+logger = logging.getLogger(__name__)
+
+_DIRTY_KEY = '_lookup_dirty'
+_TR_KUCUK = str.maketrans({'İ': 'i', 'I': 'ı'})
+
+
+def normalize(metin):
+    """Türkçe uyumlu küçük harf (arama karşılaştırmaları için)"""
+    return str(metin or '').translate(_TR_KUCUK).lower()
+
+
+class LookupKaynagi:
+    """Tek bir seçenek kaynağının tanımı"""
+
+    __slots__ = ('ad', 'yukleyici', 'modeller', 'timeout', 'uzak_esik')
+
+    def __init__(self, ad, yukleyici, modeller=(), timeout=3600, uzak_esik=None):
+        self.ad = ad
+        self.yukleyici = yukleyici
+        self.modeller = tuple(modeller)
+        self.timeout = timeout
+        self.uzak_esik = uzak_esik
+
+
+class AramaIndeksi:
+    """
+    Etiketteki her kelimenin başından arama için sıralı indeks.
+    "120.01 - ABC Ticaret" → '120.01', 'abc', 'ticaret' ile başlayan aramalar eşleşir.
+    """
+
+    __slots__ = ('satirlar', '_kelimeler', '_sira')
+
+    def __init__(self, satirlar):
+        self.satirlar = satirlar
+        ciftler = sorted(
+            (kelime, i)
+            for i, satir in enumerate(satirlar)
+            for kelime in set(normalize(satir[1]).replace(' - ', ' ').split())
+        )
+        self._kelimeler = [k for k, _ in ciftler]
+        self._sira = [i for _, i in ciftler]
+
+    def ara(self, terim, limit=20, atla=0):
+        """(satır listesi, devamı_var) — satırlar kaynak sırasında döner"""
+        parcalar = normalize(terim).split()
+        if not parcalar:
+            secilen = range(len(self.satirlar))
+        else:
+            secilen = None
+            for parca in parcalar:
+                bas = bisect.bisect_left(self._kelimeler, parca)
+                bit = bisect.bisect_left(self._kelimeler, parca + '\uffff', bas)
+                eslesen = set(self._sira[bas:bit])
+                secilen = eslesen if secilen is None else secilen & eslesen
+                if not secilen:
+                    return [], False
+            secilen = sorted(secilen)
+        sayfa = [self.satirlar[i] for i in secilen[atla:atla + limit + 1]]
+        return sayfa[:limit], len(sayfa) > limit
+
+
+class LookupRegistry:
+    """Seçenek kaynakları kaydı, tenant bazlı cache ve AJAX arama"""
+
+    # Bu sayının üzerindeki listeler varsayılan olarak AJAX ile aranır
+    UZAK_ESIK = 300
+    SAYFA_BOYUTU = 20
+    # Process içi arama indeksi sayısı (LRU)
+    INDEKS_LIMIT = 64
+
+    _kaynaklar = {}
+    _indeksler = OrderedDict()  # {cache_key: (gecerlilik_monotonic, AramaIndeksi)}
+    _izlenen_modeller = set()
+    _lock = threading.Lock()
+    _tanimlar_yuklendi = False
+
+    # ========================================
+    # 📝 KAYIT
+    # ========================================
+
+    @classmethod
+    def kaynak(cls, ad, modeller=(), timeout=3600, uzak_esik=None):
+        """
+        Dekoratör: yukleyici(tenant_db, firma_id, **parametreler) → [(id, etiket, *ek), ...]
+        """
+        def decorator(f):
+            cls._kaynaklar[ad] = LookupKaynagi(ad, f, modeller, timeout, uzak_esik)
+            for model in modeller:
+                cls._izle(model)
+            return f
+        return decorator
+
+    @classmethod
+    def tanimlari_yukle(cls):
+        """
+        Kaynak tanımlarını (ve modellerin commit listener'larını) kaydeder.
+        Modeller yüklendikten sonra çağrılmalı (modül import döngüsünü önler).
+        """
+        if not cls._tanimlar_yuklendi:
+            from app.form_builder import lookup_kaynaklari  # noqa: F401
+            cls._tanimlar_yuklendi = True
+
+    @classmethod
+    def init_app(cls, app):
+        # Listener'lar açılışta kayıtlı olmalı: aksi halde ilk lookup okunana kadar
+        # yapılan değişiklikler önbelleği geçersiz kılmaz
+        cls.tanimlari_yukle()
+
+    @classmethod
+    def _tanim(cls, ad):
+        cls.tanimlari_yukle()
+        try:
+            return cls._kaynaklar[ad]
+        except KeyError:
+            raise ValueError(f"Tanımsız lookup kaynağı: {ad}")
+
+    # ========================================
+    # 📦 SEÇENEKLER
+    # ========================================
+
+    @classmethod
+    def satirlar(cls, ad, tenant_db=None, firma_id=None, **parametreler):
+        """Kaynağın tüm satırları (tenant + firma + parametre bazlı cache'li)"""
+        tanim = cls._tanim(ad)
+        firma_id = firma_id or cls._firma_id()
+        key = cls._anahtar(ad, firma_id, parametreler)
+
+        def _yukle():
+            db_session = tenant_db or get_tenant_db()
+            if db_session is None:
+                return []
+            return [tuple(s) for s in tanim.yukleyici(db_session, firma_id, **parametreler)]
+
+        return TenantCache.get_or_set('lookup', key, _yukle, timeout=tanim.timeout)
+
+    @classmethod
+    def secenekler(cls, ad, bos_secenek=None, **kwargs):
+        """FormField(options=...) için liste; bos_secenek verilirse başa ("", etiket) eklenir"""
+        satirlar = cls.satirlar(ad, **kwargs)
+        return ([('', bos_secenek)] if bos_secenek is not None else []) + list(satirlar)
+
+    @classmethod
+    def parametre_adlari(cls, ad):
+        """Yükleyicinin tenant_db / firma_id dışındaki parametreleri (AJAX sorgusundan kabul edilenler)"""
+        import inspect
+        parametreler = inspect.signature(cls._tanim(ad).yukleyici).parameters
+        return [p for p in list(parametreler)[2:] if parametreler[p].kind == inspect.Parameter.POSITIONAL_OR_KEYWORD]
+
+    @classmethod
+    def uzak_mi(cls, ad, satir_sayisi):
+        tanim = cls._tanim(ad)
+        esik = cls.UZAK_ESIK if tanim.uzak_esik is None else tanim.uzak_esik
+        return satir_sayisi > esik
+
+    @classmethod
+    def alan_ayarlari(cls, ad, secili=None, bos_secenek=None, html_attributes=None, satirlar=None, **kwargs):
+        """
+        FormField için options / html_attributes.
+
+        Küçük listeler → tüm seçenekler inline.
+        Büyük listeler → sadece seçili değer(ler) + data-ajax-url (select2 uzaktan arama).
+
+        Aynı kaynağı kullanan birden çok alan için satirlar bir kez alınıp verilebilir.
+
+        Kullanım:
+            FormField('hesap_id', FieldType.SELECT, 'Hesap',
+                      **LookupRegistry.alan_ayarlari('hesap_plani', secili=kayit.hesap_id))
+        """
+        if satirlar is None:
+            satirlar = cls.satirlar(ad, **kwargs)
+        html_attributes = dict(html_attributes or {})
+        bas = [('', bos_secenek)] if bos_secenek is not None else []
+
+        if not cls.uzak_mi(ad, len(satirlar)):
+            return {'options': bas + list(satirlar), 'html_attributes': html_attributes}
+
+        secililer = {str(s) for s in (secili if isinstance(secili, (list, tuple, set)) else [secili]) if s}
+        html_attributes['data-ajax-url'] = cls._arama_url(ad, kwargs)
+        return {
+            'options': bas + [s for s in satirlar if str(s[0]) in secililer],
+            'html_attributes': html_attributes,
+        }
+
+    # ========================================
+    # 🔎 ARAMA (AJAX)
+    # ========================================
+
+    @classmethod
+    def ara(cls, ad, terim='', sayfa=1, limit=None, **kwargs):
+        """Select2 formatında sonuç: {'results': [{'id', 'text'}], 'pagination': {'more'}}"""
+        limit = limit or cls.SAYFA_BOYUTU
+        sayfa = max(int(sayfa or 1), 1)
+        indeks = cls._indeks(ad, **kwargs)
+        bulunan, devami = indeks.ara(terim, limit=limit, atla=(sayfa - 1) * limit)
+        return {
+            'results': [{'id': str(s[0]), 'text': s[1]} for s in bulunan],
+            'pagination': {'more': devami},
+        }
+
+    @classmethod
+    def _indeks(cls, ad, firma_id=None, **kwargs):
+        firma_id = firma_id or cls._firma_id()
+        parametreler = {k: v for k, v in kwargs.items() if k != 'tenant_db'}
+        # Sürüm anahtara girdiği için invalidation sonrası eski indeks kullanılmaz
+        key = TenantCache.key('lookup', cls._anahtar(ad, firma_id, parametreler))
+        simdi = time.monotonic()
+        with cls._lock:
+            kayit = cls._indeksler.get(key)
+            if kayit is not None and kayit[0] > simdi:
+                cls._indeksler.move_to_end(key)
+                return kayit[1]
+
+        indeks = AramaIndeksi(cls.satirlar(ad, firma_id=firma_id, **kwargs))
+        with cls._lock:
+            cls._indeksler[key] = (simdi + cls._tanim(ad).timeout, indeks)
+            while len(cls._indeksler) > cls.INDEKS_LIMIT:
+                cls._indeksler.popitem(last=False)
+        return indeks
+
+    # ========================================
+    # ♻️ INVALIDATION
+    # ========================================
+
+    @classmethod
+    def invalidate(cls, tenant_id=None):
+        """Tenant'ın tüm lookup listelerini geçersiz kıl"""
+        TenantCache.invalidate('lookup', tenant_id)
+
+    @classmethod
+    def _izle(cls, model):
+        if model in cls._izlenen_modeller:
+            return
+        for evt in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, evt, _isaretle)
+        cls._izlenen_modeller.add(model)
+
+    # ========================================
+    # 🔧 YARDIMCILAR
+    # ========================================
+
+    @staticmethod
+    def _firma_id():
+        try:
+            return getattr(current_user, 'firma_id', None)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _anahtar(ad, firma_id, parametreler):
+        if not parametreler:
+            return f"{ad}:{firma_id}"
+        ozet = '|'.join(f"{k}={parametreler[k]!r}" for k in sorted(parametreler))
+        return f"{ad}:{firma_id}:{hashlib.md5(ozet.encode()).hexdigest()[:12]}"
+
+    @staticmethod
+    def _arama_url(ad, parametreler):
+        from urllib.parse import urlencode
+        sorgu = {k: v for k, v in parametreler.items() if k not in ('tenant_db', 'firma_id') and v is not None}
+        return f"/api/lookup/{ad}" + (f"?{urlencode(sorgu)}" if sorgu else '')
+
+
+# ========================================
+# 🔔 ORM EVENT HOOK'LARI
+# ========================================
+def _isaretle(mapper, connection, target):
+    from sqlalchemy.orm import object_session
+    s = object_session(target)
+    if s is not None:
+        s.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _lookup_commit(s):
+    if s.info.pop(_DIRTY_KEY, None):
+        LookupRegistry.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _lookup_rollback(s):
+    s.info.pop(_DIRTY_KEY, None)
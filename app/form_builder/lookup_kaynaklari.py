@@ -0,0 +1,119 @@
+# app/form_builder/lookup_kaynaklari.py
+"""
+Form seçenek kaynaklarının tanımları (LookupRegistry).
+
+Her yükleyici (tenant_db, firma_id, **parametreler) alır ve
+[(id, etiket, *ek_alanlar), ...] döner. Ek alanlar formda filtreleme içindir
+(ör. şubenin bölgesi); FormField sadece ilk iki elemanı kullanır.
+"""
+
+from app.form_builder.lookup import LookupRegistry
+from app.modules.depo.models import Depo
+from app.modules.fiyat.models import FiyatListesi
+from app.modules.kategori.models import StokKategori
+from app.modules.lokasyon.models import Sehir, Ilce
+from app.modules.muhasebe.models import HesapPlani
+from app.modules.siparis.models import OdemePlani
+from app.modules.stok.models import StokMuhasebeGrubu, StokKDVGrubu
+from app.modules.sube.models import Sube
+
+
+# ========================================
+# 🏢 ORGANİZASYON
+# ========================================
+
+@LookupRegistry.kaynak('sube', modeller=(Sube,))
+def _subeler(tenant_db, firma_id):
+    """(id, ad, bolge_id)"""
+    return tenant_db.query(Sube.id, Sube.ad, Sube.bolge_id).filter(Sube.aktif == True).order_by(Sube.ad).all()
+
+
+@LookupRegistry.kaynak('depo', modeller=(Depo, Sube))
+def _depolar(tenant_db, firma_id):
+    """(id, ad, sube_id, bolge_id)"""
+    return (
+        tenant_db.query(Depo.id, Depo.ad, Depo.sube_id, Sube.bolge_id)
+        .outerjoin(Sube, Sube.id == Depo.sube_id)
+        .filter(Depo.firma_id == firma_id, Depo.aktif == True)
+        .order_by(Depo.ad)
+        .all()
+    )
+
+
+# ========================================
+# 💰 TİCARİ
+# ========================================
+
+@LookupRegistry.kaynak('fiyat_listesi', modeller=(FiyatListesi,))
+def _fiyat_listeleri(tenant_db, firma_id):
+    return tenant_db.query(FiyatListesi.id, FiyatListesi.ad).filter(FiyatListesi.aktif == True).all()
+
+
+@LookupRegistry.kaynak('odeme_plani', modeller=(OdemePlani,))
+def _odeme_planlari(tenant_db, firma_id):
+    return tenant_db.query(OdemePlani.id, OdemePlani.ad).all()
+
+
+# ========================================
+# 📦 STOK
+# ========================================
+
+@LookupRegistry.kaynak('stok_kategori', modeller=(StokKategori,))
+def _stok_kategorileri(tenant_db, firma_id):
+    return (
+        tenant_db.query(StokKategori.id, StokKategori.ad)
+        .filter(StokKategori.firma_id == firma_id)
+        .order_by(StokKategori.ad)
+        .all()
+    )
+
+
+@LookupRegistry.kaynak('stok_muhasebe_grubu', modeller=(StokMuhasebeGrubu,))
+def _stok_muhasebe_gruplari(tenant_db, firma_id):
+    return [
+        (g.id, f"{g.kod} - {g.ad}")
+        for g in tenant_db.query(StokMuhasebeGrubu.id, StokMuhasebeGrubu.kod, StokMuhasebeGrubu.ad)
+        .filter(StokMuhasebeGrubu.firma_id == firma_id, StokMuhasebeGrubu.aktif == True)
+        .order_by(StokMuhasebeGrubu.kod)
+    ]
+
+
+@LookupRegistry.kaynak('stok_kdv_grubu', modeller=(StokKDVGrubu,))
+def _stok_kdv_gruplari(tenant_db, firma_id):
+    """(id, ad, alis_kdv_orani, satis_kdv_orani) — etiket dile göre formda kurulur"""
+    return (
+        tenant_db.query(StokKDVGrubu.id, StokKDVGrubu.ad, StokKDVGrubu.alis_kdv_orani, StokKDVGrubu.satis_kdv_orani)
+        .filter(StokKDVGrubu.firma_id == firma_id)
+        .order_by(StokKDVGrubu.kod)
+        .all()
+    )
+
+
+# ========================================
+# 📒 MUHASEBE
+# ========================================
+
+@LookupRegistry.kaynak('hesap_plani', modeller=(HesapPlani,), uzak_esik=200)
+def _hesap_plani(tenant_db, firma_id):
+    return [
+        (h.id, f"{h.kod} - {h.ad}")
+        for h in tenant_db.query(HesapPlani.id, HesapPlani.kod, HesapPlani.ad)
+        .filter(HesapPlani.firma_id == firma_id, HesapPlani.aktif == True)
+        .order_by(HesapPlani.kod)
+    ]
+
+
+# ========================================
+# 📍 LOKASYON
+# ========================================
+
+@LookupRegistry.kaynak('sehir', modeller=(Sehir,), timeout=24 * 3600)
+def _sehirler(tenant_db, firma_id):
+    return [(s.id, f"{s.kod} - {s.ad}") for s in tenant_db.query(Sehir.id, Sehir.kod, Sehir.ad).order_by(Sehir.kod)]
+
+
+@LookupRegistry.kaynak('ilce', modeller=(Ilce,), timeout=24 * 3600)
+def _ilceler(tenant_db, firma_id, sehir_id=None):
+    if not sehir_id:
+        return []
+    return tenant_db.query(Ilce.id, Ilce.ad).filter(Ilce.sehir_id == sehir_id).order_by(Ilce.ad).all()
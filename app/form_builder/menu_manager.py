@@ -1,93 +1,190 @@
+import hashlib
 import logging
-from flask import session, g, url_for
+import re
+import threading
+import time
+
+from flask import session, g, url_for, current_app, request, has_request_context
+from markupsafe import Markup
 from app.extensions import cache, get_tenant_db
+from app.services.tenant_cache import TenantCache
 from app.modules.firmalar.models import SystemMenu
-from sqlalchemy import asc
+from sqlalchemy import asc, event
+from sqlalchemy.orm import Session, object_session
 
 logger = logging.getLogger(__name__)
 
+# Lisansla açılıp kapanan modüller (blueprint adı = lisans modül kodu).
+# Diğer menüler (sistem, firmalar, kullanıcı...) lisanstan bağımsız görünür.
+LISANSLI_MODULLER = frozenset(['fatura', 'cari', 'stok', 'kasa', 'banka', 'muhasebe', 'rapor'])
+
+# Derlenmiş HTML'de aktif menü işareti: [[aktif:<id>:<tür>]]
+_AKTIF_RE = re.compile(r'\[\[aktif:([^:\]]+):(\w+)\]\]')
+_AKTIF_SINIFLAR = {
+    'nav': ('active text-primary fw-bold', ''),
+    'drop': ('active fw-bold', ''),
+    'ikon': ('text-primary', 'text-muted'),
+}
+
+
 class MenuManager:
     """
-    Menü Yönetimi - Cache Destekli ve Link Hesaplamalı
+    Menü Yönetimi - Derlenmiş (Compiled) Menü Cache'i
+
+    Anahtar: (tenant, menü sürümü, tenant context sürümü, roller, aktif modüller, dil)
+    Değer  : URL'leri çözülmüş, yetkiye göre filtrelenmiş ağaç + önceden render edilmiş HTML
+
+    Her template render'ında sadece cache okuması ve aktif menü işaretinin
+    (request.path) tek regex ile yerleştirilmesi yapılır.
+
+    Geçersiz kılma:
+        - SystemMenu değişince (ORM event → commit sonrası) veya clear_cache() → 'menu' alanının sürümü artar (TenantCache)
+        - Rol / lisans (modül) değişince TenantContextResolver sürümü artar
     """
 
+    SHARED_TTL = 3600
+
+    _local = {}        # {anahtar: derlenmis}
+    _lock = threading.Lock()
+
     @staticmethod
     def get_tree():
         """
-        Aktif Tenant için menü ağacını getirir.
-        Veriyi Cache'den alır, ancak Linkleri (url_for) anlık hesaplar.
+        Aktif Tenant için menü ağacını getirir (URL'ler çözülmüş, yetki filtresi uygulanmış).
         """
+        derlenmis = MenuManager._derlenmis()
+        return derlenmis['tree'] if derlenmis else []
+
+    @staticmethod
+    def get_html():
+        """Navbar menüsünün HTML'i (aktif menü request.path'e göre işaretlenir)"""
+        derlenmis = MenuManager._derlenmis()
+        if not derlenmis:
+            return Markup('')
+
+        yol = request.path if has_request_context() else None
+        aktif = derlenmis['url_map'].get(yol, ())
+
+        def _yerlestir(m):
+            siniflar = _AKTIF_SINIFLAR.get(m.group(2), ('', ''))
+            return siniflar[0] if m.group(1) in aktif else siniflar[1]
+
+        return Markup(_AKTIF_RE.sub(_yerlestir, derlenmis['html']))
+
+    # ========================================
+    # 🧱 DERLEME
+    # ========================================
+
+    @classmethod
+    def _derlenmis(cls):
         tenant_id = session.get('tenant_id')
         if not tenant_id:
-            return []
+            return None
 
         # 1. Kullanıcı Rollerini Belirle
         current_role_str = session.get('tenant_role', 'user')
-        user_roles = [r.strip() for r in current_role_str.split(',')]
-        
+        user_roles = {r.strip() for r in current_role_str.split(',')}
+
         # Admin ve Patron her şeyi görür
         if getattr(g, 'user', None) and g.user.is_superadmin:
-            user_roles.append('admin')
+            user_roles.add('admin')
 
-        # 2. CACHE KATMANI
-        cache_key = f"menu_raw_{tenant_id}"
-        menu_data = cache.get(cache_key)
+        moduller, ctx_gen = cls._aktif_moduller(tenant_id)
+        locale = session.get('locale', 'tr')
+        modul_ozeti = hashlib.md5(','.join(sorted(moduller or ['*'])).encode()).hexdigest()[:8]
 
-        if menu_data is None:
-            tenant_db = get_tenant_db()
-            if not tenant_db:
-                return []
-            
-            try:
-                # DB'den çek
-                items = tenant_db.query(SystemMenu).filter_by(aktif=True).order_by(asc(SystemMenu.sira)).all()
-                
-                # SÖZLÜĞE ÇEVİR (Ham Veri)
-                menu_data = []
-                for item in items:
-                    menu_data.append({
-                        'id': item.id,
-                        'baslik': item.baslik,
-                        'icon': item.icon,
-                        'endpoint': item.endpoint, 
-                        'url': item.url, # Statik URL (Varsa)
-                        'parent_id': item.parent_id,
-                        'yetkili_roller': item.yetkili_roller,
-                        'sira': item.sira
-                    })
-                
-                cache.set(cache_key, menu_data, timeout=3600)
-                
-            except Exception as e:
-                logger.error(f"Menü DB Hatası: {e}")
-                return []
+        anahtar = (
+            f"menu_tree:{tenant_id}:{cls._generation(tenant_id)}:{ctx_gen}:"
+            f"{','.join(sorted(user_roles))}:{modul_ozeti}:{locale}"
+        )
+
+        derlenmis = cls._local.get(anahtar)
+        if derlenmis is not None:
+            return derlenmis
 
-        # 3. AĞACI OLUŞTUR (Runtime)
         try:
-            return MenuManager._build_tree(menu_data, user_roles)
+            derlenmis = cache.get(anahtar)
         except Exception as e:
-            logger.error(f"Menü Tree Hatası: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
+            logger.debug(f"Menü cache okunamadı: {e}")
+
+        if derlenmis is None:
+            try:
+                basla = time.perf_counter()
+                derlenmis = cls._derle(tenant_id, user_roles, moduller)
+                logger.debug(
+                    f"🧭 Menü derlendi: {anahtar} ({(time.perf_counter() - basla) * 1000:.1f} ms)"
+                )
+            except Exception as e:
+                logger.error(f"Menü Tree Hatası: {e}")
+                return None
+            try:
+                cache.set(anahtar, derlenmis, timeout=cls.SHARED_TTL)
+            except Exception as e:
+                logger.debug(f"Menü cache'e yazılamadı: {e}")
+
+        with cls._lock:
+            # Eski sürümlere ait anahtarlar birikmesin
+            if len(cls._local) > 500:
+                cls._local.clear()
+            cls._local[anahtar] = derlenmis
+        return derlenmis
+
+    @classmethod
+    def _derle(cls, tenant_id, user_roles, moduller):
+        tenant_db = get_tenant_db()
+        if not tenant_db:
+            return {'tree': [], 'html': '', 'url_map': {}}
+
+        # DB'den çek (ORM nesnesi yüklemeden)
+        t = SystemMenu.__table__
+        menu_data = [
+            dict(row._mapping) for row in tenant_db.execute(
+                t.select().with_only_columns(
+                    t.c.id, t.c.baslik, t.c.icon, t.c.endpoint, t.c.url, t.c.parent_id, t.c.yetkili_roller, t.c.sira
+                ).where(t.c.aktif == True).order_by(asc(t.c.sira))
+            )
+        ]
+
+        tree = cls._build_tree(menu_data, user_roles, moduller)
+
+        url_map = {}
+
+        def _topla(nodes):
+            for node in nodes:
+                if node['url'] != '#':
+                    url_map.setdefault(node['url'], set()).add(node['id'])
+                _topla(node['children'])
+
+        _topla(tree)
+
+        # render_template yerine doğrudan Jinja: context processor'lar (ve dolayısıyla
+        # bu derleme) tekrar tetiklenmesin
+        sablon = current_app.jinja_env.get_template('partials/navbar_menu_compiled.html')
+        html = sablon.render(dynamic_menu=tree)
+        return {'tree': tree, 'html': html, 'url_map': url_map}
 
     @staticmethod
-    def _build_tree(menu_items, user_roles):
+    def _build_tree(menu_items, user_roles, moduller=None):
         """
         Düz listeyi ağaca çevirir + URL'leri hesaplar.
+        moduller verilmişse lisansı olmayan modüllerin menüleri gizlenir.
         """
         if not menu_items:
             return []
 
         items_map = {}
-        
+
         for item in menu_items:
-            # --- 🔗 URL HESAPLAMA (DÜZELTİLDİ) ---
+            # --- 🔗 URL HESAPLAMA ---
             final_url = "#"
             endpoint = item.get('endpoint')
             static_url = item.get('url')
 
             if endpoint:
+                if moduller is not None:
+                    modul = endpoint.split('.')[0]
+                    if modul in LISANSLI_MODULLER and modul not in moduller:
+                        continue
                 try:
                     # Endpoint varsa (örn: 'cek.index') URL üret
                     final_url = url_for(endpoint)
@@ -129,22 +226,95 @@ class MenuManager:
                     required = [r.strip() for r in node['yetkili_roller'].split(',')]
                     if not set(required).intersection(set(user_roles)):
                         allowed = False
-                
+
                 if allowed:
                     if node['children']:
                         node['children'] = filter_recursive(node['children'])
-                    
+
                     # Linki yoksa ve çocuğu da yoksa gizle
                     if node['url'] == "#" and not node['children']:
                         continue
-                        
+
                     filtered.append(node)
             return filtered
 
         return filter_recursive(root_items)
 
     @staticmethod
-    def clear_cache():
-        tenant_id = session.get('tenant_id')
-        if tenant_id:
-            cache.delete(f"menu_raw_{tenant_id}")
\ No newline at end of file
+    def _aktif_moduller(tenant_id):
+        """
+        Lisansla açık modüller ve tenant context sürümü.
+        Lisans açıkça modül listesi vermiyorsa None (filtre uygulanmaz).
+        """
+        from app.services.tenant_context import TenantContextResolver
+
+        ctx_gen = TenantContextResolver._generation(tenant_id)
+        try:
+            ctx = TenantContextResolver.resolve(tenant_id) or {}
+        except Exception as e:
+            logger.debug(f"Menü için tenant context alınamadı: {e}")
+            return None, ctx_gen
+
+        lisans = ctx.get('license') or {}
+        moduller = (lisans.get('data') or {}).get('modules') if lisans.get('valid') else None
+        return (frozenset(moduller) if moduller else None), ctx_gen
+
+    # ========================================
+    # ♻️ SÜRÜM / INVALIDATION
+    # ========================================
+
+    @staticmethod
+    def _generation(tenant_id):
+        return TenantCache.generation('menu', tenant_id)
+
+    @classmethod
+    def clear_cache(cls, tenant_id=None):
+        """Tenant'ın tüm derlenmiş menülerini (tüm rol/dil varyantları) geçersiz kıl"""
+        tenant_id = tenant_id or (session.get('tenant_id') if has_request_context() else None)
+        if not tenant_id:
+            return
+        TenantCache.invalidate('menu', tenant_id)
+        with cls._lock:
+            for anahtar in [k for k in cls._local if k.startswith(f"menu_tree:{tenant_id}:")]:
+                cls._local.pop(anahtar, None)
+
+
+class LazyMenuHtml:
+    """Context processor için: menü HTML'i sadece template gerçekten basarsa hesaplanır"""
+
+    def __html__(self):
+        try:
+            return MenuManager.get_html()
+        except Exception as e:
+            logger.warning(f"⚠️ Menü yüklenirken hata: {e}")
+            return ''
+
+    def __str__(self):
+        return str(self.__html__())
+
+
+# ========================================
+# 🔔 ORM EVENT HOOK'LARI
+# ========================================
+_DIRTY_KEY = '_menu_dirty'
+
+
+def _isaretle(mapper, connection, target):
+    s = object_session(target)
+    if s is not None:
+        s.info[_DIRTY_KEY] = True
+
+
+for _evt in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(SystemMenu, _evt, _isaretle)
+
+
+@event.listens_for(Session, 'after_commit')
+def _menu_commit(s):
+    if s.info.pop(_DIRTY_KEY, None):
+        MenuManager.clear_cache()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _menu_rollback(s):
+    s.info.pop(_DIRTY_KEY, None)
@@ -1,22 +1,39 @@
 # form_builder/pivot.py
 
 import json
-from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Desteklenen toplama fonksiyonları
+AGGREGATORLER = ('sum', 'count', 'avg', 'min', 'max')
+# Boyut değeri olmayan satırların etiketi
+BOS_ETIKET = 'Diğer'
+
 
 class PivotEngine:
     """
     Veri Analiz ve Raporlama Motoru.
     Veriyi alır, gruplar (Pivot) ve hem Tablo hem Grafik üretir.
+
+    - Çoklu satır / sütun boyutu, çoklu ölçü (measure) ve ara toplamlar
+    - Veri SQLAlchemy select / Query ise gruplama SQL GROUP BY ile veritabanında,
+      liste / DataFrame ise pandas ile sütunsal (vektörel) yapılır
+    - cube() → ön yüzün tekrar sorgu atmadan çizip detaya inebileceği kompakt JSON
     """
     
-    def __init__(self, data, rows, values, aggregator='sum', title="Analiz Raporu", chart_type="bar"):
+    def __init__(self, data, rows, values=None, aggregator='sum', title="Analiz Raporu", chart_type="bar",
+                 columns=None, measures=None, session=None):
         """
         Args:
-            data: Veri listesi (List of Dicts)
-            rows: Satırda gruplanacak alan (örn: 'category')
-            values: Hesaplanacak sayısal alan (örn: 'amount')
-            aggregator: 'sum', 'count', 'avg'
+            data: Veri listesi (List of Dicts), pandas DataFrame veya SQLAlchemy select / Query
+            rows: Satırda gruplanacak alan(lar) (örn: 'category' veya ['bolge', 'sube'])
+            values: Hesaplanacak sayısal alan(lar) (örn: 'amount')
+            aggregator: 'sum', 'count', 'avg', 'min', 'max' (values için ortak)
             chart_type: 'bar', 'line', 'pie', 'doughnut'
+            columns: Sütunda gruplanacak alan(lar) (opsiyonel)
+            measures: [(alan, aggregator), ...] veya [{'alan', 'agg', 'ad'}] (values yerine)
+            session: data bir select ise çalıştırılacak session
         """
         self.data = data
         self.rows = rows
@@ -25,29 +42,325 @@ class PivotEngine:
         self.title = title
         self.chart_type = chart_type
         self.chart_id = f"chart_{id(self)}"
+        self.session = session
+
+        self.satirlar = self._liste(rows)
+        self.sutunlar = self._liste(columns)
+        self.olculer = self._olcu_listesi(values, aggregator, measures)
+        self._yaprak = None
+
+    @staticmethod
+    def _liste(deger):
+        if not deger:
+            return []
+        return [deger] if isinstance(deger, str) else list(deger)
+
+    @staticmethod
+    def _olcu_listesi(values, aggregator, measures):
+        olculer = []
+        for olcu in measures or [(v, aggregator) for v in PivotEngine._liste(values)]:
+            if isinstance(olcu, dict):
+                alan, agg, ad = olcu['alan'], olcu.get('agg', 'sum'), olcu.get('ad')
+            else:
+                alan, agg = olcu[0], olcu[1] if len(olcu) > 1 else 'sum'
+                ad = olcu[2] if len(olcu) > 2 else None
+            if agg not in AGGREGATORLER:
+                raise ValueError(f"Desteklenmeyen aggregator: {agg}")
+            olculer.append({'alan': alan, 'agg': agg, 'ad': ad or alan})
+        return olculer
+
+    # ========================================
+    # 🧮 YAPRAK (EN ALT SEVİYE) TOPLAMLAR
+    # ========================================
+
+    def _yaprak_toplamlar(self):
+        """
+        Tüm boyutlar (satır + sütun) bazında ara değerler:
+        her alan için __sum, __count, __min, __max (gerekenler). Ara toplamlar buradan türetilir.
+        """
+        if self._yaprak is None:
+            if hasattr(self.data, 'subquery') or hasattr(self.data, 'statement'):
+                self._yaprak = self._sql_toplamlar()
+            else:
+                self._yaprak = self._pandas_toplamlar()
+        return self._yaprak
+
+    def _gerekenler(self):
+        """{alan: {'sum', 'count', ...}} - her alan için hesaplanacak ara değerler"""
+        gerekenler = {}
+        for olcu in self.olculer:
+            parcalar = gerekenler.setdefault(olcu['alan'], {'count'})
+            if olcu['agg'] in ('sum', 'avg'):
+                parcalar.add('sum')
+            elif olcu['agg'] in ('min', 'max'):
+                parcalar.add(olcu['agg'])
+        return gerekenler
+
+    def _pandas_toplamlar(self):
+        """
+        Sütunsal gruplama: her boyut bir kez factorize edilir, birleşik grup kodu
+        üzerinden np.bincount (sum / count) ve sıralı reduceat (min / max) uygulanır.
+        """
+        boyutlar = self.satirlar + self.sutunlar
+        df = self.data if isinstance(self.data, pd.DataFrame) else pd.DataFrame.from_records(self.data)
+        n = len(df)
+
+        # 1. Boyut kodları
+        kodlar, etiketler = [], []
+        for boyut in boyutlar:
+            if boyut in df:
+                kod, degerler = pd.factorize(df[boyut])
+                if (kod < 0).any():
+                    # Boş değerler → 'Diğer'
+                    kod = np.where(kod < 0, len(degerler), kod)
+                    degerler = degerler.append(pd.Index([BOS_ETIKET]))
+            else:
+                kod, degerler = np.zeros(n, dtype=np.intp), pd.Index([BOS_ETIKET])
+            kodlar.append(kod)
+            etiketler.append(degerler)
+
+        if kodlar and n:
+            birlesik = np.ravel_multi_index(kodlar, [max(len(e), 1) for e in etiketler]) if len(kodlar) > 1 else kodlar[0]
+            grup, anahtar = pd.factorize(birlesik)
+            grup_sayisi = len(anahtar)
+            sonuc = {
+                boyut: etiketler[i].take(k)
+                for i, (boyut, k) in enumerate(zip(
+                    boyutlar, np.unravel_index(anahtar, [len(e) for e in etiketler]) if len(kodlar) > 1 else [anahtar]
+                ))
+            }
+        else:
+            grup = np.zeros(n, dtype=np.intp)
+            grup_sayisi = 1 if (n or not boyutlar) else 0
+            sonuc = {}
+
+        # 2. Ölçüler
+        sira = None
+        adet = np.bincount(grup, minlength=grup_sayisi).astype('float64')
+        for alan, parcalar in self._gerekenler().items():
+            if alan in df:
+                # Eski davranış: eksik / boş değer 0 kabul edilir
+                deger = pd.to_numeric(df[alan], errors='coerce').fillna(0.0).to_numpy(dtype='float64')
+            else:
+                deger = np.zeros(n)
+            sonuc[f"{alan}__count"] = adet
+            if 'sum' in parcalar:
+                sonuc[f"{alan}__sum"] = np.bincount(grup, weights=deger, minlength=grup_sayisi)
+            for parca in parcalar & {'min', 'max'}:
+                if not n:
+                    sonuc[f"{alan}__{parca}"] = np.zeros(grup_sayisi)
+                    continue
+                if sira is None:
+                    sira = np.argsort(grup, kind='stable')
+                    baslar = np.flatnonzero(np.r_[True, np.diff(grup[sira]) != 0])
+                islem = np.minimum if parca == 'min' else np.maximum
+                sonuc[f"{alan}__{parca}"] = islem.reduceat(deger[sira], baslar)
+        return pd.DataFrame(sonuc, columns=boyutlar + [k for k in sonuc if k not in boyutlar])
+
+    def _sql_toplamlar(self):
+        from sqlalchemy import func, select
+
+        sorgu = self.data
+        session = self.session
+        if hasattr(sorgu, 'statement'):
+            # ORM Query
+            session = session or sorgu.session
+            sorgu = sorgu.statement
+        alt = sorgu.subquery()
+        boyutlar = self.satirlar + self.sutunlar
+
+        kolonlar = [alt.c[b].label(b) for b in boyutlar]
+        for alan, parcalar in self._gerekenler().items():
+            for parca in sorted(parcalar):
+                if parca == 'count':
+                    kolonlar.append(func.count().label(f"{alan}__count"))
+                else:
+                    ifade = func.coalesce(alt.c[alan], 0)
+                    kolonlar.append(getattr(func, parca)(ifade).label(f"{alan}__{parca}"))
+
+        stmt = select(*kolonlar)
+        if boyutlar:
+            stmt = stmt.group_by(*[alt.c[b] for b in boyutlar])
+        sonuc = session.execute(stmt)
+        df = pd.DataFrame(sonuc.fetchall(), columns=list(sonuc.keys()))
+        for boyut in boyutlar:
+            df[boyut] = df[boyut].where(df[boyut].notna(), BOS_ETIKET)
+        for kolon in df.columns[len(boyutlar):]:
+            df[kolon] = pd.to_numeric(df[kolon], errors='coerce').fillna(0.0).astype('float64')
+        return df
+
+    # ========================================
+    # 📊 SEVİYE TOPLAMLARI
+    # ========================================
+
+    def _seviye(self, boyutlar):
+        """Yaprak toplamlardan verilen boyut kümesine göre (roll-up) ölçüler"""
+        yaprak = self._yaprak_toplamlar()
+        ara = [k for k in yaprak.columns if '__' in k]
+        birlesim = {k: ('min' if k.endswith('__min') else 'max' if k.endswith('__max') else 'sum') for k in ara}
+        if boyutlar:
+            if yaprak.empty:
+                grup = pd.DataFrame(columns=boyutlar + ara)
+            else:
+                grup = yaprak.groupby(boyutlar, sort=False, dropna=False).agg(birlesim).reset_index()
+        else:
+            grup = pd.DataFrame({k: [getattr(yaprak[k], f)() if len(yaprak) else 0.0] for k, f in birlesim.items()})
+
+        sonuc = grup[boyutlar].copy()
+        for i, olcu in enumerate(self.olculer):
+            alan, agg = olcu['alan'], olcu['agg']
+            if agg == 'count':
+                deger = grup[f"{alan}__count"]
+            elif agg == 'avg':
+                adet = grup[f"{alan}__count"].astype('float64')
+                deger = grup[f"{alan}__sum"].astype('float64') / adet.where(adet != 0, np.nan)
+            else:
+                deger = grup[f"{alan}__{agg}"]
+            sonuc[f"m{i}"] = pd.to_numeric(deger, errors='coerce').fillna(0.0).astype('float64')
+        return sonuc
 
     def _process_data(self):
-        """Veriyi işler ve gruplar"""
-        grouped = defaultdict(list)
-        
-        # 1.Gruplama
-        for item in self.data:
-            key = item.get(self.rows, 'Diğer')
-            val = float(item.get(self.values, 0))
-            grouped[key].append(val)
-            
-        # 2.Hesaplama (Aggregation)
-        results = {}
-        for key, vals in grouped.items():
-            if self.aggregator == 'sum':
-                results[key] = sum(vals)
-            elif self.aggregator == 'count':
-                results[key] = len(vals)
-            elif self.aggregator == 'avg':
-                results[key] = sum(vals) / len(vals) if vals else 0
-                
-        # 3.Sıralama (Değere göre azalan)
-        return dict(sorted(results.items(), key=lambda item: item[1], reverse=True))
+        """Veriyi işler ve gruplar (ilk satır boyutu + ilk ölçü, değere göre azalan)"""
+        seviye = self._seviye(self.satirlar[:1])
+        if seviye.empty:
+            return {}
+        seviye = seviye.sort_values('m0', ascending=False, kind='stable')
+        return dict(zip(seviye[self.satirlar[0]].tolist(), seviye['m0'].tolist()))
+
+    # ========================================
+    # 🧊 JSON KÜP
+    # ========================================
+
+    def cube(self, ondalik=4):
+        """
+        Ön yüz için kompakt küp.
+
+        Returns:
+            dict: {
+              'satirlar': [...], 'sutunlar': [...], 'olculer': [{'alan','agg','ad'}],
+              'sozluk': {boyut: [değerler]},              # boyut değerleri bir kez yazılır
+              'hucreler': [[i_boyut..., m0, m1...]],       # en alt seviye (detaya inme için)
+              'ara_toplamlar': {'satir:a,b': [[i_a, i_b, m0...]], 'sutun:c': [...]},
+              'genel_toplam': [m0, m1...]
+            }
+        """
+        boyutlar = self.satirlar + self.sutunlar
+        yaprak = self._seviye(boyutlar)
+
+        sozluk, kodlar = {}, {}
+        for boyut in boyutlar:
+            try:
+                _, degerler = pd.factorize(yaprak[boyut], sort=True)
+            except TypeError:
+                # Karışık tipler (ör. sayı + 'Diğer') sıralanamaz
+                _, degerler = pd.factorize(yaprak[boyut])
+            sozluk[boyut] = [self._json_deger(d) for d in degerler]
+            kodlar[boyut] = dict(zip(degerler, range(len(degerler))))
+
+        olcu_kolonlari = [f"m{i}" for i in range(len(self.olculer))]
+
+        def _satirlar(cerceve, seviye_boyutlari):
+            for boyut in seviye_boyutlari:
+                cerceve[boyut] = cerceve[boyut].map(kodlar[boyut])
+            cerceve[olcu_kolonlari] = cerceve[olcu_kolonlari].round(ondalik)
+            sutunlar = [cerceve[b].astype('int64').tolist() for b in seviye_boyutlari]
+            sutunlar += [cerceve[k].tolist() for k in olcu_kolonlari]
+            return [list(satir) for satir in zip(*sutunlar)]
+
+        ara_toplamlar = {}
+        for k in range(1, len(self.satirlar) + (0 if not self.sutunlar else 1)):
+            ara_toplamlar[f"satir:{','.join(self.satirlar[:k])}"] = _satirlar(self._seviye(self.satirlar[:k]), self.satirlar[:k])
+        for k in range(1, len(self.sutunlar) + 1):
+            if self.satirlar or k < len(self.sutunlar):
+                ara_toplamlar[f"sutun:{','.join(self.sutunlar[:k])}"] = _satirlar(self._seviye(self.sutunlar[:k]), self.sutunlar[:k])
+
+        genel = self._seviye([])
+        return {
+            'satirlar': self.satirlar,
+            'sutunlar': self.sutunlar,
+            'olculer': self.olculer,
+            'sozluk': sozluk,
+            'hucreler': _satirlar(yaprak, boyutlar),
+            'ara_toplamlar': ara_toplamlar,
+            'genel_toplam': [round(float(genel[k].iloc[0]), ondalik) for k in olcu_kolonlari],
+        }
+
+    def to_json(self):
+        return json.dumps(self.cube(), ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def _json_deger(deger):
+        if isinstance(deger, np.generic):
+            return deger.item()
+        if hasattr(deger, 'isoformat'):
+            return deger.isoformat()
+        return deger
+
+    # ========================================
+    # ⏱️ BENCHMARK
+    # ========================================
+
+    @classmethod
+    def benchmark(cls, kayit=100000, tekrar=3):
+        """
+        Eski yol (tüm satırları dict olarak çek + Python döngüsü) ile
+        SQL GROUP BY itmesi ve sütunsal (DataFrame) gruplamayı karşılaştırır.
+        Bellek içi SQLite üzerinde, tek boyut + toplam (eski motorun yapabildiği) ölçülür.
+        """
+        import random
+        import time
+        from collections import defaultdict
+
+        from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine, select
+        from sqlalchemy.orm import Session
+
+        rnd = random.Random(42)
+        tablo = Table('pivot_bench', MetaData(), Column('id', Integer, primary_key=True),
+                      Column('banka', String(30)), Column('ay', String(7)), Column('tutar', Float))
+        engine = create_engine('sqlite://')
+        tablo.create(engine)
+        with engine.begin() as conn:
+            conn.execute(tablo.insert(), [
+                {'banka': f'Banka {rnd.randint(1, 25)}', 'ay': f'2026-{rnd.randint(1, 12):02d}',
+                 'tutar': round(rnd.uniform(100, 50000), 2)}
+                for _ in range(kayit)
+            ])
+        session = Session(engine)
+        sorgu = select(tablo.c.banka, tablo.c.ay, tablo.c.tutar)
+
+        def _eski():
+            veri = [dict(s._mapping) for s in session.execute(sorgu)]
+            gruplar = defaultdict(float)
+            for item in veri:
+                gruplar[item.get('banka', BOS_ETIKET)] += float(item.get('tutar', 0))
+            return dict(sorted(gruplar.items(), key=lambda x: x[1], reverse=True))
+
+        def _olc(f):
+            en_iyi = None
+            for _ in range(tekrar):
+                bas = time.perf_counter()
+                f()
+                sure = time.perf_counter() - bas
+                en_iyi = sure if en_iyi is None else min(en_iyi, sure)
+            return round(en_iyi * 1000, 2)
+
+        df = pd.DataFrame(session.execute(sorgu).fetchall(), columns=['banka', 'ay', 'tutar'])
+        try:
+            eski_ms = _olc(_eski)
+            sql_ms = _olc(lambda: cls(sorgu, 'banka', 'tutar', session=session)._process_data())
+            df_ms = _olc(lambda: cls(df, 'banka', 'tutar')._process_data())
+            kup_ms = _olc(lambda: cls(sorgu, ['banka'], columns=['ay'], session=session,
+                                      measures=[('tutar', 'sum'), ('tutar', 'avg', 'ortalama')]).cube())
+        finally:
+            session.close()
+        return {
+            'kayit': kayit,
+            'eski_ms': eski_ms,
+            'sql_group_by_ms': sql_ms,
+            'dataframe_ms': df_ms,
+            'kup_sql_2_boyut_ms': kup_ms,
+            'fark': f"{eski_ms / sql_ms:.1f}x" if sql_ms else '-',
+        }
 
     def render(self):
         processed_data = self._process_data()
@@ -64,7 +377,7 @@ class PivotEngine:
         chart_data = {
             'labels': labels,
             'datasets': [{
-                'label': self.values.title(),
+                'label': self.olculer[0]['ad'].title() if self.olculer else '',
                 'data': values,
                 'backgroundColor': colors[:len(labels)],
                 'borderColor': '#ffffff',
@@ -96,8 +409,8 @@ class PivotEngine:
                             <table class="table table-bordered table-sm table-hover">
                                 <thead class="table-light">
                                     <tr>
-                                        <th>{self.rows.title()}</th>
-                                        <th class="text-end">{self.aggregator.upper()}</th>
+                                        <th>{self.satirlar[0].title()}</th>
+                                        <th class="text-end">{self.olculer[0]['agg'].upper() if self.olculer else ''}</th>
                                     </tr>
                                 </thead>
                                 <tbody>
@@ -1,71 +1,227 @@
 # form_builder/workflow.py
+import ast
+import hashlib
+import json
 import logging
-from simpleeval import simple_eval # pip install simpleeval
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from simpleeval import SimpleEval, simple_eval # pip install simpleeval
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Kaydı bekletmeden, commit sonrası arka planda çalışan yan etkili eylemler
+ASENKRON_EYLEMLER = frozenset(['send_email', 'trigger_n8n'])
+_BEKLEYEN_KEY = '_workflow_eylemleri'
+
+
+class DerlenmisKosul:
+    """
+    Koşul ifadesi BİR KEZ derlenir:
+      - Güvenli alt küme (karşılaştırma, and/or/not, + - / // %, in, sabitler,
+        int/float/str çağrıları) → Python code object (eval, builtins kapalı)
+      - Diğer ifadeler → simpleeval ile önceden parse edilmiş AST (tekrar parse yok)
+    """
+
+    FONKSIYONLAR = {'int': int, 'float': float, 'str': str}
+    _IZINLI_DUGUMLER = (
+        ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+        ast.BinOp, ast.Add, ast.Sub, ast.Div, ast.FloorDiv, ast.Mod,
+        ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+        ast.IfExp, ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.List, ast.Subscript, ast.Call,
+    )
+
+    __slots__ = ('ifade', '_kod', '_agac')
+
+    def __init__(self, ifade):
+        self.ifade = ifade
+        self._kod = None
+        self._agac = None
+        agac = ast.parse(ifade.strip(), mode='eval')
+        if self._guvenli_mi(agac):
+            self._kod = compile(agac, '<workflow-kosul>', 'eval')
+        else:
+            self._agac = SimpleEval().parse(ifade.strip())
+
+    def _guvenli_mi(self, agac):
+        for dugum in ast.walk(agac):
+            if not isinstance(dugum, self._IZINLI_DUGUMLER):
+                return False
+            if isinstance(dugum, ast.Name) and dugum.id.startswith('_'):
+                return False
+            if isinstance(dugum, ast.Call):
+                if (not isinstance(dugum.func, ast.Name) or dugum.func.id not in self.FONKSIYONLAR
+                        or dugum.keywords or len(dugum.args) > 1):
+                    return False
+            if isinstance(dugum, ast.Subscript) and not isinstance(dugum.slice, (ast.Constant, ast.Name)):
+                return False
+        return True
+
+    def __call__(self, veri):
+        if self._kod is not None:
+            return eval(self._kod, {'__builtins__': {}, **self.FONKSIYONLAR}, veri)
+        return SimpleEval(names=veri).eval(self.ifade, previously_parsed=self._agac)
+
+
+class DerlenmisAkis:
+    """Bir iş akışı tanımının derlenmiş hali (adımlar + koşul fonksiyonları)"""
+
+    __slots__ = ('surum', 'steps', 'start_step', 'kosullar')
+
+    def __init__(self, definition, surum):
+        self.surum = surum
+        self.steps = definition.get('steps', {})
+        self.start_step = definition.get('start_step', 'start')
+        self.kosullar = {}
+        for step_id, step in self.steps.items():
+            if step.get('type') == 'condition':
+                try:
+                    self.kosullar[step_id] = DerlenmisKosul(step['condition'])
+                except (SyntaxError, KeyError, ValueError) as e:
+                    logging.error(f"Kural Hatası ({step_id}): {e}")
+                    self.kosullar[step_id] = None
+
 
 class WorkflowEngine:
     """
     Basit ama güçlü bir State Machine (Durum Makinesi).
     Verilen 'context' (form verisi) üzerinde kuralları çalıştırır ve bir sonraki adıma geçer.
+
+    Tanım içerik özeti başına bir kez derlenir (aynı 'version' numarasını taşıyan
+    farklı iş akışları ayrı derlenir; 'version' sadece bilgi amaçlı tutulur).
+    Yan etkili eylemler (e-posta, n8n) kaydı bekletmez: session verilirse commit
+    sonrası, verilmezse hemen arka plan havuzuna gönderilir.
     """
-    
+
+    # Process içinde tutulacak derlenmiş tanım sayısı
+    DERLEME_LIMIT = 256
+    # Yan etkili eylemler için arka plan worker sayısı
+    EYLEM_WORKER_SAYISI = 4
+
+    _derlenmis = {}  # {içerik özeti: DerlenmisAkis}
+    _lock = threading.Lock()
+    _havuz = None
+
     def __init__(self, definition):
         """
-        definition: İş akışının JSON haritası
+        definition: İş akışının JSON haritası (dict) veya JSON metni
         """
-        self.steps = definition.get('steps', {})
-        self.start_step = definition.get('start_step', 'start')
+        self._akis = self.derle(definition)
+        self.steps = self._akis.steps
+        self.start_step = self._akis.start_step
+
+    # ========================================
+    # 🧩 DERLEME
+    # ========================================
+
+    @staticmethod
+    def _ozet(definition):
+        if isinstance(definition, str):
+            return hashlib.sha1(definition.encode()).hexdigest()
+        return hashlib.sha1(json.dumps(definition, sort_keys=True, default=str).encode()).hexdigest()
 
-    def run(self, current_step_id, context_data):
+    @classmethod
+    def derle(cls, definition):
+        """Tanımı içerik özetine göre derlenmiş önbellekten getirir (yoksa derler)"""
+        anahtar = cls._ozet(definition)
+        akis = cls._derlenmis.get(anahtar)
+        if akis is not None:
+            return akis
+
+        if isinstance(definition, str):
+            definition = json.loads(definition)
+        akis = DerlenmisAkis(definition, definition.get('version') or anahtar)
+        with cls._lock:
+            if len(cls._derlenmis) >= cls.DERLEME_LIMIT:
+                cls._derlenmis.pop(next(iter(cls._derlenmis)))
+            cls._derlenmis[anahtar] = akis
+        return akis
+
+    @classmethod
+    def derleme_temizle(cls):
+        with cls._lock:
+            cls._derlenmis.clear()
+
+    # ========================================
+    # ▶️ ÇALIŞTIRMA
+    # ========================================
+
+    def run(self, current_step_id, context_data, session=None):
         """
         Mevcut adımdan başlar, bir duraklama noktasına (WAIT) veya bitişe (END) kadar ilerler.
+
+        session: Verilirse yan etkili eylemler bu session commit edildikten sonra
+                 gönderilir (rollback olursa iptal edilir).
         """
         step_id = current_step_id or self.start_step
         history = []
+        bekleyenler = []
 
-        while step_id and step_id != 'END':
-            step = self.steps.get(step_id)
-            if not step:
-                break
-
-            history.append(f"Running: {step_id}")
-            
-            # 1.Action (Eylem) Var mı? (Örn: E-posta at, Statü güncelle)
-            if 'action' in step:
-                self._execute_action(step['action'], context_data)
-
-            # 2.Transition (Geçiş) Mantığı
-            next_step = None
-            
-            # Eğer tip 'condition' (Karar) ise
-            if step.get('type') == 'condition':
-                if self._evaluate(step['condition'], context_data):
-                    next_step = step.get('true_step')
+        try:
+            while step_id and step_id != 'END':
+                step = self.steps.get(step_id)
+                if not step:
+                    break
+
+                history.append(f"Running: {step_id}")
+
+                # 1.Action (Eylem) Var mı? (Örn: E-posta at, Statü güncelle)
+                if 'action' in step:
+                    if step['action'].get('type') in ASENKRON_EYLEMLER:
+                        # Context o anki haliyle kopyalanır (sonraki adımlar değiştirebilir)
+                        bekleyenler.append((step['action'], dict(context_data)))
+                    else:
+                        self._execute_action(step['action'], context_data)
+
+                # 2.Transition (Geçiş) Mantığı
+                next_step = None
+
+                # Eğer tip 'condition' (Karar) ise
+                if step.get('type') == 'condition':
+                    if self._kosul_calistir(step_id, context_data):
+                        next_step = step.get('true_step')
+                    else:
+                        next_step = step.get('false_step')
+
+                # Eğer tip 'task' (Görev) ise ve onay bekleniyorsa dur
+                elif step.get('type') == 'approval':
+                    return {
+                        'status': 'WAITING',
+                        'current_step': step_id,
+                        'context': context_data,
+                        'history': history
+                    }
+
+                # Düz geçiş
                 else:
-                    next_step = step.get('false_step')
-            
-            # Eğer tip 'task' (Görev) ise ve onay bekleniyorsa dur
-            elif step.get('type') == 'approval':
-                return {
-                    'status': 'WAITING', 
-                    'current_step': step_id, 
-                    'context': context_data,
-                    'history': history
-                }
-            
-            # Düz geçiş
-            else:
-                next_step = step.get('next_step')
-
-            # Döngü için adımı güncelle
-            step_id = next_step or 'END'
+                    next_step = step.get('next_step')
+
+                # Döngü için adımı güncelle
+                step_id = next_step or 'END'
+        finally:
+            if bekleyenler:
+                self._eylemleri_planla(bekleyenler, session)
 
         return {
-            'status': 'COMPLETED', 
-            'current_step': 'END', 
+            'status': 'COMPLETED',
+            'current_step': 'END',
             'context': context_data,
             'history': history
         }
 
+    def _kosul_calistir(self, step_id, data):
+        kosul = self._akis.kosullar.get(step_id)
+        if kosul is None:
+            return False
+        try:
+            return bool(kosul(data))
+        except Exception as e:
+            logging.error(f"Kural Hatası: {e}")
+            return False
+
     def _evaluate(self, condition_str, data):
         try:
             # Python'un tehlikeli fonksiyonlarına erişimi kapatır
@@ -79,12 +235,12 @@ class WorkflowEngine:
         Tanımlı eylemleri gerçekleştirir.
         """
         action_type = action_config.get('type')
-        
+
         if action_type == 'update_status':
             # Veri içindeki statüyü güncelle
             data['status'] = action_config.get('value')
             print(f"⚡ ACTION: Statü '{action_config.get('value')}' olarak güncellendi.")
-            
+
         elif action_type == 'send_email':
             to = action_config.get('to')
             subject = action_config.get('subject')
@@ -94,11 +250,111 @@ class WorkflowEngine:
             from app.services.n8n_client import N8NClient
             webhook = action_config.get('webhook')
             payload = action_config.get('payload', {})
-            
+
             # Context verisini payload ile birleştir
-            full_payload = {**data, **payload} 
-            
+            full_payload = {**data, **payload}
+
+            # Outbox'a yazılır; gönderim WebhookDispatcher worker havuzunda yapılır
             N8NClient.trigger(webhook, full_payload)
-            print(f"🔗 WORKFLOW: n8n '{webhook}' tetiklendi.")
-            
-        
\ No newline at end of file
+            print(f"🔗 WORKFLOW: n8n '{webhook}' kuyruğa alındı.")
+
+    # ========================================
+    # 📬 ASENKRON EYLEMLER
+    # ========================================
+
+    def _eylemleri_planla(self, eylemler, session):
+        if session is not None:
+            session.info.setdefault(_BEKLEYEN_KEY, []).extend((self, a, d) for a, d in eylemler)
+        else:
+            self.eylemleri_gonder([(self, a, d) for a, d in eylemler])
+
+    @classmethod
+    def eylemleri_gonder(cls, eylemler):
+        """[(engine, action, context), ...] → arka plan havuzu (uygulama context'i ile)"""
+        try:
+            from flask import current_app
+            app = current_app._get_current_object()
+        except RuntimeError:
+            app = None
+        havuz = cls._eylem_havuzu()
+        for engine, action, data in eylemler:
+            havuz.submit(cls._eylem_calistir, app, engine, action, data)
+
+    @classmethod
+    def _eylem_havuzu(cls):
+        if cls._havuz is None:
+            with cls._lock:
+                if cls._havuz is None:
+                    cls._havuz = ThreadPoolExecutor(max_workers=cls.EYLEM_WORKER_SAYISI,
+                                                    thread_name_prefix='workflow-eylem')
+        return cls._havuz
+
+    @staticmethod
+    def _eylem_calistir(app, engine, action, data):
+        try:
+            if app is None:
+                engine._execute_action(action, data)
+                return
+            with app.app_context():
+                engine._execute_action(action, data)
+        except Exception as e:
+            logger.error(f"❌ Workflow eylemi başarısız ({action.get('type')}): {e}")
+
+    # ========================================
+    # 📊 BENCHMARK
+    # ========================================
+
+    @classmethod
+    def benchmark(cls, kayit=1000, kural=20):
+        """
+        `kural` koşul adımlı bir akışı `kayit` belge kaydı için çalıştırır:
+        eski yol (her koşulda simple_eval ile parse) / derlenmiş akış.
+        """
+        steps = {}
+        for i in range(kural):
+            steps[f"k{i}"] = {
+                'type': 'condition',
+                'condition': f"tutar > {i * 500} and tur == 'satis' or iskonto >= {i % 5}",
+                'true_step': f"k{i + 1}" if i + 1 < kural else 'END',
+                'false_step': f"k{i + 1}" if i + 1 < kural else 'END',
+            }
+        definition = {'start_step': 'k0', 'steps': steps}
+        belgeler = [{'tutar': (n * 37) % 12000, 'tur': 'satis' if n % 3 else 'alis', 'iskonto': n % 7}
+                    for n in range(kayit)]
+
+        eski = cls.__new__(cls)
+        baslangic = time.perf_counter()
+        for belge in belgeler:
+            for step in steps.values():
+                eski._evaluate(step['condition'], belge)
+        eski_ms = (time.perf_counter() - baslangic) * 1000
+
+        cls._derlenmis.pop(cls._ozet(definition), None)
+        baslangic = time.perf_counter()
+        for belge in belgeler:
+            cls(definition).run(None, belge)
+        derlenmis_ms = (time.perf_counter() - baslangic) * 1000
+
+        return {
+            'kayit': kayit,
+            'kural': kural,
+            'eski_ms': round(eski_ms, 1),
+            'derlenmis_ms': round(derlenmis_ms, 1),
+            'kayit_basina_us': round(derlenmis_ms * 1000 / kayit, 1),
+            'fark': f"{eski_ms / derlenmis_ms:.1f}x" if derlenmis_ms else '-',
+        }
+
+
+# ========================================
+# 🔔 COMMIT SONRASI EYLEM GÖNDERİMİ
+# ========================================
+@event.listens_for(Session, 'after_commit')
+def _workflow_commit(s):
+    eylemler = s.info.pop(_BEKLEYEN_KEY, None)
+    if eylemler:
+        WorkflowEngine.eylemleri_gonder(eylemler)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _workflow_rollback(s):
+    s.info.pop(_BEKLEYEN_KEY, None)
@@ -19,6 +19,7 @@ from app.models.master.accounting_period import AccountingPeriod
 from app.models.master.audit import AuditLog
 from app.models.master.backup_config import BackupConfig
 from app.models.master.master_active_session import MasterActiveSession
+from app.models.master.webhook_outbox import WebhookOutbox
 
 # 🚨 SUPERVISOR MODELLER (Supervisor dizininden)
 # Dosya adlarınla (supervisor.py, setting.py vb.) tam eşleşmeli
@@ -169,7 +169,7 @@ from app.modules.kullanici.models import Kullanici
 from app.modules.sube.models import Sube
 
 # Muhasebe
-from app.modules.muhasebe.models import HesapPlani, MuhasebeFisi, MuhasebeFisiDetay
+from app.modules.muhasebe.models import HesapPlani, MuhasebeFisi, MuhasebeFisiDetay, BakiyeOzeti
 
 # Kasa
 from app.modules.kasa.models import Kasa
@@ -178,7 +178,7 @@ from app.modules.kasa.models import Kasa
 from app.modules.banka.models import BankaHesap
 
 # Cari
-from app.modules.cari.models import CariHesap, CariHareket, CRMHareket
+from app.modules.cari.models import CariHesap, CariHareket, CRMHareket, CariRiskOzeti
 
 # Depo
 from app.modules.depo.models import Depo
@@ -189,7 +189,7 @@ from app.modules.kategori.models import StokKategori
 # Stok
 from app.modules.stok.models import (
     StokKart, StokHareketi, StokPaketIcerigi,
-    StokMuhasebeGrubu, StokKDVGrubu, StokDepoDurumu
+    StokMuhasebeGrubu, StokKDVGrubu, StokDepoDurumu, StokMaliyetDefteri
 )
 
 # Fiyat
@@ -259,19 +259,19 @@ __all__ = [
     'Bolge', 'Sube', 'Kullanici',
     
     # Muhasebe
-    'HesapPlani', 'MuhasebeFisi', 'MuhasebeFisiDetay',
+    'HesapPlani', 'MuhasebeFisi', 'MuhasebeFisiDetay', 'BakiyeOzeti',
     
     # Finans
     'Kasa', 'BankaHesap', 'KasaHareket', 'BankaHareket',
     'FinansIslem', 'CekSenet',
     
     # Cari
-    'CariHesap', 'CariHareket', 'CRMHareket', 
+    'CariHesap', 'CariHareket', 'CRMHareket', 'CariRiskOzeti', 
     
     # Stok
     'Depo', 'StokKategori', 'StokKart', 'StokHareketi',
     'StokPaketIcerigi', 'StokMuhasebeGrubu', 'StokKDVGrubu',
-    'StokDepoDurumu', 'StokFisiDetay', 'StokFisi',
+    'StokDepoDurumu', 'StokMaliyetDefteri', 'StokFisiDetay', 'StokFisi',
     
     # Fiyat
     'FiyatListesi', 'FiyatListesiDetay',
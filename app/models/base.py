@@ -147,6 +147,16 @@ class PaginationResult:
             yield num
             last = num
 
+class KeysetPaginationResult:
+    """Cursor tabanlı sayfa sonucu (toplam sayı / sayfa numarası yoktur)"""
+    def __init__(self, items, per_page, next_cursor, prev_cursor, has_next, has_prev):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = has_next
+        self.has_prev = has_prev
+
 # ========================================
 # CUSTOM QUERY (SaaS İzolasyon ve Güvenlik Motoru)
 # ========================================
@@ -257,8 +267,14 @@ class FirmaFilteredQuery(Query):
         
         return query
     
-    def paginate(self, page=None, per_page=None, error_out=False, max_per_page=None, **kwargs):
-        """Pagination desteği"""
+    def paginate(self, page=None, per_page=None, error_out=False, max_per_page=None,
+                 count_mode='exact', count_cap=10000, **kwargs):
+        """
+        Pagination desteği
+        
+        count_mode='estimated': COUNT(*) yerine üst sınırlı ve cache'li sayım
+        (büyük hareket tablolarında ilk sayfa bile saniyeler sürmesin diye)
+        """
         if page is None: 
             try:
                 page = request.args.get('page', 1, type=int)
@@ -269,7 +285,11 @@ class FirmaFilteredQuery(Query):
         if page < 1: page = 1
         
         query = self._apply_filters()
-        total = query.count()
+        if count_mode == 'estimated':
+            from app.form_builder.keyset import capped_count
+            total, _ = capped_count(query, cap=count_cap)
+        else:
+            total = query.count()
         pages = (total + per_page - 1) // per_page if per_page > 0 else 0
         
         if page > pages > 0: page = pages
@@ -279,6 +299,33 @@ class FirmaFilteredQuery(Query):
         
         return PaginationResult(items=items, page=page, per_page=per_page, total=total, pages=pages)
     
+    def keyset_paginate(self, sort_column=None, direction='asc', after=None, before=None, per_page=20):
+        """
+        Keyset (seek) pagination - OFFSET kullanmaz, derin sayfalarda da hızlıdır.
+        
+        Args:
+            sort_column: Sıralama kolonu (örn. CariHareket.tarih). None ise sadece PK.
+            direction: 'asc' | 'desc'
+            after / before: Önceki sonuçtan dönen opak cursor'lar
+                            (verilmezse request.args'tan okunur)
+        
+        Returns:
+            KeysetPaginationResult
+        """
+        from app.form_builder.keyset import keyset_page
+        
+        if after is None and before is None:
+            after = request.args.get('after')
+            before = request.args.get('before')
+        
+        query = self._apply_filters()
+        model_class = self.column_descriptions[0]['type']
+        pk_attr = getattr(model_class, model_class.__mapper__.primary_key[0].key)
+        
+        page = keyset_page(query, sort_column, pk_attr, direction=direction,
+                           after=after, before=before, per_page=per_page)
+        return KeysetPaginationResult(per_page=per_page, **page)
+    
     def first_or_404(self, description=None):
         obj = self._apply_filters().first()
         if obj is None:
@@ -8,6 +8,7 @@ Master DB Modelleri (SQLite)
 - Tenant:  Firmalar (Multi-tenant)
 - License: Lisanslar
 - AuditLog: Güvenlik logları
+- WebhookOutbox: Giden webhook kuyruğu
 """
 
 from app.models.master.user import User, UserTenantRole
@@ -16,5 +17,6 @@ from app.models.master.license import License
 from app.models.master.audit import AuditLog
 from app.models.master.backup_config import BackupConfig
 from app.models.master.master_active_session import MasterActiveSession
+from app.models.master.webhook_outbox import WebhookOutbox
 
-__all__ = ['User', 'UserTenantRole', 'Tenant', 'License', 'AuditLog', 'BackupConfig', 'MasterActiveSession']
\ No newline at end of file
+__all__ = ['User', 'UserTenantRole', 'Tenant', 'License', 'AuditLog', 'BackupConfig', 'MasterActiveSession', 'WebhookOutbox']
\ No newline at end of file
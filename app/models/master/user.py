@@ -93,8 +93,10 @@ class User(UserMixin, db.Model):
         # 2. ✅ Session'daki rol
         current_role = session.get('tenant_role', 'user')
         
-        # 3. ✅ PermissionManager'a sor
-        has_access = PermissionManager.check(current_role, permission)
+        # 3. ✅ PermissionManager'a sor (istek içinde hatırlanır, log bir kez basılır)
+        has_access, ilk_kez = PermissionManager.istek_icin_kontrol(current_role, permission)
+        if not ilk_kez:
+            return has_access
         
         if has_access:
             logger.debug(f"✅ Yetki onaylandı: user={self.email}, permission={permission}, role={current_role}")
@@ -122,6 +124,20 @@ class User(UserMixin, db.Model):
         return self.has_permission(permission)
     
     
+    def has_permissions(self, permissions):
+        """
+        ✅ Toplu yetki kontrolü (template'lerde tek çağrı)
+        
+        Kullanım:
+            {% set yetki = current_user.has_permissions(['fatura.view', 'fatura.delete']) %}
+            {% if yetki['fatura.delete'] %}...{% endif %}
+        
+        Returns:
+            dict: {yetki_kodu: bool}
+        """
+        return {p: self.has_permission(p) for p in permissions}
+    
+    
     def get_permissions(self):
         """
         Kullanıcının tüm yetkilerini listeler.
@@ -0,0 +1,43 @@
+# app/models/master/webhook_outbox.py
+
+from app.extensions import db
+from datetime import datetime
+import uuid
+
+
+class WebhookOutbox(db.Model):
+    """
+    Dışarı giden webhook olaylarının kalıcı kuyruğu (Outbox).
+    Olay önce buraya yazılır, WebhookDispatcher arka planda gönderir;
+    process yeniden başlasa da bekleyen olaylar kaybolmaz.
+
+    Durumlar: bekliyor → isleniyor → gonderildi | olu (dead-letter)
+    """
+    __tablename__ = 'webhook_outbox'
+    __bind_key__ = None  # Master DB
+    __table_args__ = (
+        db.Index('ix_webhook_outbox_durum_sonraki', 'durum', 'sonraki_deneme'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id = db.Column(db.String(36), index=True)
+
+    # Hedef: N8N_WEBHOOK_URL + webhook_path
+    webhook_path = db.Column(db.String(255), nullable=False)
+    method = db.Column(db.String(10), default='POST', nullable=False)
+    payload = db.Column(db.JSON)
+
+    durum = db.Column(db.String(20), default='bekliyor', nullable=False)
+    deneme_sayisi = db.Column(db.Integer, default=0, nullable=False)
+    sonraki_deneme = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    son_hata = db.Column(db.Text)
+
+    # İşleyen worker'ın talep işareti (çökme sonrası KILIT_TTL ile geri alınır)
+    kilit = db.Column(db.String(36), index=True)
+    kilit_zamani = db.Column(db.DateTime)
+
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    gonderildi_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<WebhookOutbox {self.webhook_path} [{self.durum}] #{self.deneme_sayisi}>"
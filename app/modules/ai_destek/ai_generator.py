@@ -1,20 +1,18 @@
 import json
 import os
 from dotenv import load_dotenv # 👈 BU SATIRI EKLEYİN
-import google.generativeai as genai
-from google.api_core import retry
 from datetime import datetime
 
+from app.services.ai_client import AIIstemcisi, TembelGenai
+
 # .env dosyasını hemen burada yükle ki kodlar çalışmadan anahtar hazır olsun
 load_dotenv()
 
-# Google Generative AI kütüphanesi kontrolü
-try:
-    import google.generativeai as genai
-    HAS_GENAI = True
-except ImportError:
-    HAS_GENAI = False
+# Google Generative AI kütüphanesi kontrolü (import edilmeden; ilk kullanımda yüklenir)
+HAS_GENAI = AIIstemcisi.kutuphane_var()
+if not HAS_GENAI:
     print("UYARI: 'google-generativeai' kütüphanesi yüklü değil.'pip install google-generativeai' çalıştırın.")
+genai = TembelGenai()
 
 # 1.API Key Kontrolü
 # Google AI Studio'dan aldığınız anahtarı GEMINI_API_KEY olarak kaydedin
@@ -22,65 +20,21 @@ api_key = os.environ.get("GEMINI_API_KEY")
 # --- AKILLI MODEL SEÇİCİ ---
 def get_best_available_model():
     """
-    Sunucuda mevcut olan modelleri tarar ve en uygununu seçer.
+    Kullanılacak modeli döner. Keşif (list_models) ilk çağrıda yapılır ve
+    önbelleklenir; ağ yoksa varsayılan modele düşülür (bkz. AIIstemcisi).
     """
-    if not api_key: return None
+    return AIIstemcisi.aktif_model()
 
-    try:
-        genai.configure(api_key=api_key)
-        print("📡 AI Modelleri taranıyor...")
-        
-        # Tüm modelleri listele
-        all_models = list(genai.list_models())
-        
-        # Sadece içerik üretebilenleri (generateContent) filtrele
-        available_models = [m.name for m in all_models if 'generateContent' in m.supported_generation_methods]
-        
-        if not available_models:
-            print("⚠️ Hiçbir uygun model bulunamadı!")
-            return "models/gemini-pro" # Fallback
-
-        # Tercih Sırası (En yeni ve hızlıdan eskiye)
-        preferences = [
-            'models/gemini-1.5-flash',
-            'models/gemini-1.5-pro',
-            'models/gemini-1.0-pro',
-            'models/gemini-pro'
-        ]
-
-        # Tercih listesindekilerden biri var mı?
-        for pref in preferences:
-            if pref in available_models:
-                print(f"✅ Seçilen Model: {pref}")
-                return pref
-        
-        # Listede yoksa ilk bulduğunu seç
-        selected = available_models[0]
-        print(f"✅ Otomatik Seçilen Model: {selected}")
-        return selected
-
-    except Exception as e:
-        print(f"❌ Model Seçimi Hatası: {e}")
-        return "models/gemini-pro" # Hata olursa varsayılanı dene
-
-# Başlangıçta modeli belirle
-ACTIVE_MODEL_NAME = None
-
-try:
-    if api_key:
-        ACTIVE_MODEL_NAME = get_best_available_model()
-        is_active = True
-    else:
-        print("⚠️ [AI MODÜLÜ] API Key bulunamadı (.env dosyasını kontrol edin).")
-except Exception as e:
-    print(f"❌ [AI MODÜLÜ] Başlatma Hatası: {e}")
-    is_active = False
+# Model import anında DEĞİL, ilk AI çağrısında belirlenir
+is_active = HAS_GENAI and bool(api_key)
+if not api_key:
+    print("⚠️ [AI MODÜLÜ] API Key bulunamadı (.env dosyasını kontrol edin).")
 
 def get_gemini_response(system_instruction, user_prompt):
     """
     Gemini modelini JSON modunda çalıştırarak yanıt alır.
     """
-    if not is_active or not ACTIVE_MODEL_NAME:
+    if not is_active:
         return None
 
     try:
@@ -94,9 +48,8 @@ def get_gemini_response(system_instruction, user_prompt):
         }
 
         # Modeli Başlat (Sistem talimatı ile)
-        # ✨ KRİTİK DÜZELTME: MODEL_NAME yerine ACTIVE_MODEL_NAME kullanıldı
         model = genai.GenerativeModel(
-            model_name=ACTIVE_MODEL_NAME, 
+            model_name=get_best_available_model(), 
             generation_config=generation_config,
             system_instruction=system_instruction
         )
@@ -206,10 +159,10 @@ def verify_gemini_model():
         return "Gemini API anahtarı yok veya hatalı."
     
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
+        model = genai.GenerativeModel(get_best_available_model())
         # Basit bir test
         response = model.generate_content("Merhaba, hangi modelsin?")
-        return f"✅ Bağlantı Başarılı! Aktif Model: {MODEL_NAME}\nModel Cevabı: {response.text}"
+        return f"✅ Bağlantı Başarılı! Aktif Model: {get_best_available_model()}\nModel Cevabı: {response.text}"
     except Exception as e:
         return f"❌ Model Erişim Hatası: {e}"  
 
@@ -253,7 +206,7 @@ def analyze_stock_trends(sales_data_json):
     
     # Gemini'den yanıt al (JSON değil, direkt HTML metin istiyoruz)
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
+        model = genai.GenerativeModel(get_best_available_model())
         response = model.generate_content([system_prompt, user_prompt])
         return response.text
     except Exception as e:
@@ -322,7 +275,7 @@ def analyze_customer_risk(customer_data_json):
     
     try:
         # JSON dönmesini engellemek için response_mime_type kullanmıyoruz
-        model = genai.GenerativeModel(MODEL_NAME)
+        model = genai.GenerativeModel(get_best_available_model())
         response = model.generate_content([system_prompt, user_prompt])
         return response.text
     except Exception as e:
@@ -549,7 +502,7 @@ def optimize_sales_route1(start_location, customers_list):
             "response_mime_type": "application/json"
         }
         
-        model = genai.GenerativeModel(MODEL_NAME, generation_config=generation_config, system_instruction=system_prompt)
+        model = genai.GenerativeModel(get_best_available_model(), generation_config=generation_config, system_instruction=system_prompt)
         response = model.generate_content(user_prompt)
         
         return json.loads(response.text)
@@ -558,69 +511,59 @@ def optimize_sales_route1(start_location, customers_list):
         return {"error": f"Rota oluşturulurken hata: {str(e)}"}
 
 # ----------------------------------------------------------------
-# 1.ROTA OPTİMİZASYONU (Metin)
+# 1.ROTA OPTİMİZASYONU (Yerel motor, ağ gerektirmez)
 # ----------------------------------------------------------------
 def optimize_sales_route(start_location, customers_list):
-    if not is_active or not ACTIVE_MODEL_NAME:
-        return {"error": "AI Modülü aktif değil.API Key veya Model bulunamadı."}
+    """
+    Plasiyer rotasını RotaMotoru ile (vektörel matris + 2-opt / Or-opt) sıralar.
+    Çıktı formatı eski LLM yanıtıyla aynıdır; müşteri "konum" alanı "lat,lng"
+    metni veya {"lat": .., "lng": ..} olabilir.
+    """
+    from app.modules.cari.rota import RotaMotoru
 
-    simdi = datetime.now().strftime("%A %H:%M")
+    def _konum(deger):
+        if isinstance(deger, dict):
+            return float(deger['lat']), float(deger['lng'])
+        lat, lng = str(deger).split(',')
+        return float(lat), float(lng)
 
-    system_prompt = """
-    Sen uzman bir Lojistik Planlama Yapay Zekasısın.
-    Görevin: Verilen müşteri listesini EN KISA MESAFE ve EN AZ YAKIT tüketimi sağlayacak şekilde sıralamak.
-    
-    ÇIKTI FORMATI (SAF JSON):
-    {
-        "rota_siralamasi": [
+    try:
+        baslangic = _konum(start_location)
+        duraklar = [(m, _konum(m['konum'])) for m in customers_list if m.get('konum')]
+        if not duraklar:
+            return {"error": "Konumu olan müşteri bulunamadı."}
+
+        cozum = RotaMotoru.coz(baslangic, [k for _, k in duraklar], donus=True)
+        sira = cozum['rotalar'][0]
+        bacaklar = cozum['bacak_km'][0]
+
+        rota_siralamasi = [
             {
-                "sira": 1, 
-                "unvan": "Müşteri Adı", 
-                "mesafe_tahmini": "X km", 
-                "neden": "Başlangıca en yakın nokta"
+                "sira": i,
+                "unvan": duraklar[idx][0].get('unvan'),
+                "mesafe_tahmini": f"{mesafe:.1f} km",
+                "neden": "Başlangıca en yakın nokta" if i == 1 else "Önceki duraktan rota optimizasyonu"
             }
-        ],
-        "toplam_tahmini_mesafe": "XX km",
-        "tasarruf_notu": "Bu rota ile yaklaşık %X yakıt tasarrufu sağlanır.",
-        "google_maps_link": "URL"
-    }
-    
-    GOOGLE MAPS LINK FORMATI:
-    https://www.google.com/maps/dir/{BAŞLANGIÇ}/{KONUM_1}/{KONUM_2}/.../{KONUM_N}/{BAŞLANGIÇ}
-    Konumlar "lat,lng" formatında olmalı.
-    """
-    
-    user_prompt = f"""
-    Zaman: {simdi}
-    Başlangıç Noktası: {start_location}
-    
-    Ziyaret Edilecek Müşteriler:
-    {json.dumps(customers_list, ensure_ascii=False)}
-    
-    Bu listeyi en verimli rota olacak şekilde sırala ve JSON döndür.
-    """
-    
-    try:
-        # Config (Sıcaklık 0.2 daha tutarlı sonuç verir)
-        generation_config = {"temperature": 0.2}
-        
-        # Dinamik seçilen modeli kullan
-        model = genai.GenerativeModel(ACTIVE_MODEL_NAME, generation_config=generation_config)
-        
-        response = model.generate_content(f"{system_prompt}\n\n{user_prompt}")
-        
-        clean_text = response.text.replace('```json', '').replace('```', '').strip()
-        return json.loads(clean_text)
-        
+            for i, (idx, mesafe) in enumerate(zip(sira, bacaklar), 1)
+        ]
+        noktalar = [baslangic] + [duraklar[idx][1] for idx in sira] + [baslangic]
+
+        return {
+            "rota_siralamasi": rota_siralamasi,
+            "toplam_tahmini_mesafe": f"{cozum['toplam_km']:.1f} km",
+            "tasarruf_notu": f"Bu rota ile en yakın komşu sıralamasına göre yaklaşık %{cozum['iyilestirme_yuzde']:.0f} yol tasarrufu sağlanır.",
+            "google_maps_link": "https://www.google.com/maps/dir/" + "/".join(f"{lat},{lng}" for lat, lng in noktalar)
+        }
+
     except Exception as e:
-        print(f"AI Rota Hatası: {e}")
+        print(f"Rota Hatası: {e}")
         return {"error": f"Rota oluşturulamadı.({str(e)})"}
 
 # ----------------------------------------------------------------
 # 2.ÇEK ANALİZİ (Resim)
 # ----------------------------------------------------------------
 def analyze_check_image(image_path):
-    if not is_active or not ACTIVE_MODEL_NAME:
+    if not is_active:
         return {"error": "AI Modülü aktif değil."}
 
     try:
@@ -641,7 +584,7 @@ def analyze_check_image(image_path):
         }
         """
         
-        model = genai.GenerativeModel(ACTIVE_MODEL_NAME)
+        model = genai.GenerativeModel(get_best_available_model())
         response = model.generate_content([system_prompt, img])
         
         clean_text = response.text.replace('```json', '').replace('```', '').strip()
@@ -658,7 +601,7 @@ def generate_ceo_briefing(summary_data_json):
     """
     Tüm modüllerden gelen verileri özetleyerek CEO için şık bir HTML brifing hazırlar.
     """
-    if not is_active or not ACTIVE_MODEL_NAME:
+    if not is_active:
         return "<div class='alert alert-warning shadow-sm'><i class='bi bi-exclamation-triangle me-2'></i>AI Modülü kapalı veya API Key eksik.</div>"
 
     system_prompt = """
@@ -677,7 +620,7 @@ def generate_ceo_briefing(summary_data_json):
     """
     
     try:
-        model = genai.GenerativeModel(ACTIVE_MODEL_NAME)
+        model = genai.GenerativeModel(get_best_available_model())
         response = model.generate_content([system_prompt, f"Bugünün ERP Verileri:\n{summary_data_json}"])
         
         # ✨ İŞTE HAYAT KURTARAN TIRAŞLAMA SATIRI:
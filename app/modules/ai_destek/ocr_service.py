@@ -12,19 +12,16 @@ from datetime import datetime
 from PIL import Image
 import io
 
-from .ai_generator import get_gemini_response, ACTIVE_MODEL_NAME
+from .ai_generator import get_gemini_response
+from app.services.ai_client import AIIstemcisi, TembelGenai
 from app.extensions import db
 from flask import current_app
 
 logger = logging.getLogger(__name__)
 
-# Gemini Vision için import
-try:
-    import google.generativeai as genai
-    HAS_VISION = True
-except ImportError:
-    HAS_VISION = False
-    logger.warning("google-generativeai paketi yüklü değil. OCR çalışmayacak.")
+# Gemini Vision: kütüphane import'u + configure ilk gerçek kullanımda (bkz. AIIstemcisi)
+HAS_VISION = AIIstemcisi.kutuphane_var()
+genai = TembelGenai()
 
 
 class FaturaOCRService:
@@ -32,17 +29,23 @@ class FaturaOCRService:
     Fatura OCR İşlemleri (Gemini Vision)
     """
     
+    # Vision için model (gemini-1.5-flash veya gemini-1.5-pro)
+    VISION_MODEL = "gemini-1.5-flash"
+    
     def __init__(self):
-        self.api_key = os.environ.get("GEMINI_API_KEY")
-        if self.api_key and HAS_VISION:
-            genai.configure(api_key=self.api_key)
-            # Vision için model (gemini-1.5-flash veya gemini-1.5-pro)
-            self.vision_model = genai.GenerativeModel(model_name="gemini-1.5-flash")
-            self.is_active = True
-        else:
-            self.is_active = False
+        self.api_key = AIIstemcisi.api_key()
+        self.is_active = AIIstemcisi.aktif_mi()
+        self._vision_model = None
+        if not self.is_active:
             logger.warning("⚠️ Gemini API Key bulunamadı veya kütüphane eksik!")
     
+    @property
+    def vision_model(self):
+        """Gemini modeli ilk OCR isteğinde kurulur"""
+        if self._vision_model is None:
+            self._vision_model = genai.GenerativeModel(model_name=self.VISION_MODEL)
+        return self._vision_model
+    
     def fatura_gorselden_oku(self, image_file, fatura_turu: str = 'satis') -> Dict:
         """
         Fatura görselini Gemini Vision ile okur
@@ -258,5 +261,12 @@ Sen bir muhasebe uzmanısın. Bu görseldeki {fatura_turu} FATURASINI detaylı 
             }
 
 
-# Singleton instance
-ocr_service = FaturaOCRService()
\ No newline at end of file
+# Singleton instance (ilk kullanımda oluşturulur; blueprint kaydı Gemini'yi yüklemez)
+_ocr_service = None
+
+
+def get_ocr_service():
+    global _ocr_service
+    if _ocr_service is None:
+        _ocr_service = FaturaOCRService()
+    return _ocr_service
@@ -3,6 +3,7 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, g
 from sqlalchemy import func
 from datetime import datetime
+from decimal import Decimal
 import uuid
 
 from app.extensions import get_tenant_db
@@ -14,10 +15,20 @@ from app.modules.stok.models import StokKart
 from app.modules.siparis.models import Siparis, SiparisDetay
 from app.modules.cari.models import CariHareket, CariHesap
 from app.modules.cari.services import CariService
+from app.modules.fiyat.pricebook import FiyatKitabi
 from app.enums import CariIslemTuru, SiparisDurumu
 
 b2b_bp = Blueprint('b2b', __name__)
 
+
+def _bayi_musteri_grubu(tenant_db):
+    """Oturumdaki bayinin müşteri grubu (grup fiyat listesi seçimi için)"""
+    cari_id = session.get('b2b_cari_id')
+    if not cari_id:
+        return None
+    return tenant_db.query(CariHesap.musteri_grubu).filter(CariHesap.id == str(cari_id)).scalar()
+
+
 @b2b_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Bayi Portalı Giriş Ekranı"""
@@ -98,7 +109,6 @@ def katalog():
     per_page = 12 # Her sayfada 12 ürün (3x4 grid için idealdir)
     
     from app.modules.stok.models import StokKart, StokDepoDurumu
-    from app.modules.fiyat.models import FiyatListesi, FiyatListesiDetay
     from sqlalchemy import func, or_
     
     # 1. SADECE STOKTA OLANLARI GETİR (SUM > 0)
@@ -123,24 +133,17 @@ def katalog():
     
     stok_sonuclari = query.order_by(StokKart.ad).limit(per_page).offset((page - 1) * per_page).all()
     
-    # 3. ÖZEL B2B FİYATLARINI EKRANA YANSITMA
-    aktif_fiyat_listesi = tenant_db.query(FiyatListesi).filter_by(aktif=True, varsayilan=True).order_by(FiyatListesi.oncelik.desc()).first()
-    fiyat_map = {}
-    if aktif_fiyat_listesi:
-        detaylar = tenant_db.query(FiyatListesiDetay).filter_by(fiyat_listesi_id=str(aktif_fiyat_listesi.id)).all()
-        fiyat_map = {str(d.stok_id): d for d in detaylar}
+    # 3. ÖZEL B2B FİYATLARI (Derlenmiş fiyat kitabı: bayi grubu → varsayılan liste)
+    fiyatlar = FiyatKitabi.toplu_fiyatla(
+        [(stok.id, 1) for stok, _ in stok_sonuclari],
+        musteri_grubu=_bayi_musteri_grubu(tenant_db),
+        varsayilan_liste=True
+    )
         
     katalog_verisi = []
     for stok, toplam_miktar in stok_sonuclari:
-        birim_fiyat = float(stok.satis_fiyati or 0)
-        
-        # Ürüne özel iskontolu fiyatı bul
-        if str(stok.id) in fiyat_map:
-            detay = fiyat_map[str(stok.id)]
-            if detay.fiyat and float(detay.fiyat) > 0:
-                birim_fiyat = float(detay.fiyat)
-            elif detay.iskonto_orani and float(detay.iskonto_orani) > 0:
-                birim_fiyat = birim_fiyat - (birim_fiyat * (float(detay.iskonto_orani) / 100))
+        fiyat = fiyatlar.get(str(stok.id))
+        birim_fiyat = float(fiyat['net_fiyat']) if fiyat else float(stok.satis_fiyati or 0)
                 
         katalog_verisi.append({
             'id': stok.id,
@@ -206,31 +209,14 @@ def sepete_ekle():
     # ==========================================
     # 🚀 2. DEV: DİNAMİK B2B FİYAT VE İSKONTO MOTORU
     # ==========================================
-    birim_fiyat = float(getattr(stok, 'satis_fiyati', 0.0) or 0.0)
-    
-    from app.modules.fiyat.models import FiyatListesi, FiyatListesiDetay
-    
-    # Sisteme tanımlı "Varsayılan" veya "B2B" öncelikli fiyat listesini bul
-    aktif_fiyat_listesi = tenant_db.query(FiyatListesi).filter_by(aktif=True, varsayilan=True).order_by(FiyatListesi.oncelik.desc()).first()
-    
-    if aktif_fiyat_listesi:
-        # Ürünün bu listedeki özel fiyatını/iskontosunu bul
-        ozel_fiyat_detay = tenant_db.query(FiyatListesiDetay).filter_by(
-            fiyat_listesi_id=str(aktif_fiyat_listesi.id), 
-            stok_id=stok_id
-        ).first()
-        
-        if ozel_fiyat_detay:
-            # Bayi, toptan satış (min_miktar) baremini aştı mı?
-            min_alim_sarti = float(ozel_fiyat_detay.min_miktar or 0.0)
-            if istenen_toplam_miktar >= min_alim_sarti:
-                # 1. Seçenek: Listede net fiyat (Örn: 50 TL) verilmişse onu kullan
-                if ozel_fiyat_detay.fiyat and float(ozel_fiyat_detay.fiyat) > 0:
-                    birim_fiyat = float(ozel_fiyat_detay.fiyat)
-                # 2. Seçenek: Listede İskonto (Örn: %10) verilmişse ana fiyattan düş
-                elif ozel_fiyat_detay.iskonto_orani and float(ozel_fiyat_detay.iskonto_orani) > 0:
-                    iskonto_yuzde = float(ozel_fiyat_detay.iskonto_orani)
-                    birim_fiyat = birim_fiyat - (birim_fiyat * (iskonto_yuzde / 100))
+    # Toplam sepet miktarı toptan (min_miktar) baremini belirler
+    fiyat = FiyatKitabi.fiyatla(
+        stok_id,
+        miktar=Decimal(str(istenen_toplam_miktar)),
+        musteri_grubu=_bayi_musteri_grubu(tenant_db),
+        varsayilan_liste=True
+    )
+    birim_fiyat = float(fiyat['net_fiyat']) if fiyat else float(getattr(stok, 'satis_fiyati', 0.0) or 0.0)
 
     # ==========================================
     # 3. NİHAİ SEPETE EKLEME İŞLEMİ
@@ -414,40 +400,27 @@ def odeme_yap():
 @b2b_bp.route('/ekstre')
 @b2b_login_required
 def ekstre():
+    from app.modules.cari.ekstre import CariEkstreMotoru
+
     tenant_db = get_tenant_db()
     cari_id = session.get('b2b_cari_id')
-    
-    # ✨ DÜZELTME: deleted_at filtresi kaldırıldı ve sıralama id'ye göre garantiye alındı
-    hareketler = tenant_db.query(CariHareket).filter(
-        CariHareket.cari_id == str(cari_id)
-    ).order_by(
-        CariHareket.tarih.asc(), 
-        CariHareket.id.asc() 
-    ).all()
-    
-    guncel_bakiye = 0
-    ekstre_verisi = []
-    
-    for h in hareketler:
-        borc = float(h.borc or 0)
-        alacak = float(h.alacak or 0)
-        guncel_bakiye += (borc - alacak)
-        
-        # ✨ Enum String Koruması
-        islem_turu_str = h.islem_turu.value if hasattr(h.islem_turu, 'value') else str(h.islem_turu)
-        
-        ekstre_verisi.append({
-            'tarih': h.tarih.strftime('%d.%m.%Y') if h.tarih else '-',
-            'islem_turu': islem_turu_str,
-            'belge_no': h.belge_no or '-', 
-            'aciklama': h.aciklama or '-',
-            'borc': borc,
-            'alacak': alacak,
-            'bakiye': guncel_bakiye
-        })
-        
-    ekstre_verisi.reverse()
-    return render_template('b2b/ekstre.html', hareketler=ekstre_verisi, guncel_bakiye=guncel_bakiye)
+
+    # En yeni hareketler önce; sayfa sayfa (keyset) gelir, yürüyen bakiye her sayfada doğru
+    motor = CariEkstreMotoru(cari_id, request.args.get('baslangic'), request.args.get('bitis'), tenant_db=tenant_db)
+    sayfa = motor.sayfa(after=request.args.get('after'), before=request.args.get('before'), direction='desc')
+    guncel_bakiye = float(CariEkstreMotoru(cari_id, tenant_db=tenant_db).toplamlar()['kapanis'])
+
+    ekstre_verisi = [{
+        'tarih': h['tarih'].strftime('%d.%m.%Y') if h['tarih'] else '-',
+        'islem_turu': h['islem_turu'],
+        'belge_no': h['belge_no'] or '-',
+        'aciklama': h['aciklama'] or '-',
+        'borc': float(h['borc']),
+        'alacak': float(h['alacak']),
+        'bakiye': float(h['bakiye'])
+    } for h in sayfa['items']]
+
+    return render_template('b2b/ekstre.html', hareketler=ekstre_verisi, guncel_bakiye=guncel_bakiye, sayfa=sayfa)
     
 @b2b_bp.route('/siparislerim')
 @b2b_login_required
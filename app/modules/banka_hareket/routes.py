@@ -4,6 +4,7 @@ from flask import Blueprint, render_template, request, jsonify, flash, g, sessio
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 from app.form_builder import DataGrid, FieldType
+from app.modules.rapor.stream_export import export_source
 from .forms import create_banka_hareket_form
 from .services import BankaHareketService
 from app.modules.banka_hareket.models import BankaHareket
@@ -16,13 +17,11 @@ from app.extensions import get_tenant_db # ✨ YENİ: Tenant DB Importu
 
 banka_hareket_bp = Blueprint('banka_hareket', __name__)
 
-@banka_hareket_bp.route('/')
-@login_required
-def index():
-    tenant_db = get_tenant_db() # ✨ TENANT DB SORGUSU
-    
-    grid = DataGrid("banka_hareket_list", BankaHareket, "Banka Hareketleri")
-    
+def _banka_hareket_grid():
+    """Liste ve export ekranlarının ortak grid tanımı"""
+    grid = DataGrid("banka_hareket_list", BankaHareket, "Banka Hareketleri",
+                    pagination_mode='keyset', count_mode='estimated')
+
     grid.add_column('tarih', 'Tarih', type='date', width='100px')
     grid.add_column('belge_no', 'Dekont No')
     grid.add_column('banka.banka_adi', 'Banka')
@@ -53,13 +52,37 @@ def index():
     
     for col in hidden_cols:
         grid.hide_column(col)
-    
+
+    grid.add_export_action()
+    return grid
+
+
+@banka_hareket_bp.route('/')
+@login_required
+def index():
+    tenant_db = get_tenant_db()
+    grid = _banka_hareket_grid()
+
     query = tenant_db.query(BankaHareket).filter_by(firma_id=str(current_user.firma_id)).order_by(BankaHareket.tarih.desc())
-    
-    grid.process_query(query)
+    grid.process_query(query, default_sort=('tarih', 'desc'))
     
     return render_template('banka_hareket/index.html', grid=grid)
 
+
+@banka_hareket_bp.route('/export')
+@login_required
+def index_export():
+    """Grid filtreleriyle streaming CSV/XLSX export (büyük export'lar arka plan işine düşer)"""
+    return _banka_hareket_grid().export(kaynak='banka_hareket_grid')
+
+
+@export_source('banka_hareket_grid')
+def _banka_hareket_grid_export(tenant_db, params):
+    """Grid export kaynağı: Celery işi de aynı filtre/sıralamayla sorguyu yeniden kurar"""
+    query = tenant_db.query(BankaHareket).filter_by(firma_id=params['firma_id'])
+    return _banka_hareket_grid().export_sorgusu(query, default_sort=('tarih', 'desc'))
+
+
 @banka_hareket_bp.route('/ekle', methods=['GET', 'POST'])
 @login_required
 def ekle():
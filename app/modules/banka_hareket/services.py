@@ -11,6 +11,7 @@ from app.modules.banka.models import BankaHesap
 from app.modules.banka_hareket.models import BankaHareket
 from app.enums import BankaIslemTuru, CariIslemTuru
 from app.araclar import para_cevir, numara_uret
+from app.modules.muhasebe.bakiye import BakiyeMotoru
 
 # Muhasebe ve Cari servislerini içerde çağıracağız (Circular import önlemek için)
 from app.signals import banka_hareket_olusturuldu
@@ -60,33 +61,17 @@ class BankaHareketService:
 
     @staticmethod
     def bakiye_guncelle(banka_id: str):
-        """Banka bakiyesini yeniden hesaplar (Tenant DB)."""
+        """
+        Banka bakiyesi (Tenant DB).
+
+        `banka_hesaplari.bakiye` hareketler flush edilirken delta ile güncellenir
+        (bkz. app.modules.muhasebe.bakiye); tam yeniden hesaplama için
+        `flask muhasebe-bakiye-dogrula <tenant_id> --onar`.
+        """
         if not banka_id: return
         
         tenant_db = get_tenant_db()
-        
-        # Girişler
-        girisler = tenant_db.query(func.coalesce(func.sum(BankaHareket.tutar), 0)).filter(
-            BankaHareket.banka_id == str(banka_id),
-            BankaHareket.islem_turu.in_([
-                BankaIslemTuru.TAHSILAT, 
-                BankaIslemTuru.VIRMAN_GIRIS,
-                BankaIslemTuru.POS_TAHSILAT
-            ])
-        ).scalar()
-
-        # Çıkışlar
-        cikislar = tenant_db.query(func.coalesce(func.sum(BankaHareket.tutar), 0)).filter(
-            BankaHareket.banka_id == str(banka_id),
-            BankaHareket.islem_turu.in_([
-                BankaIslemTuru.TEDIYE, 
-                BankaIslemTuru.VIRMAN_CIKIS
-            ])
-        ).scalar()
-
-        banka = tenant_db.get(BankaHesap, str(banka_id))
-        if banka:
-            banka.bakiye = Decimal(str(girisler)) - Decimal(str(cikislar))
+        if tenant_db.get(BankaHesap, str(banka_id)):
             tenant_db.commit()
 
     @staticmethod
@@ -121,7 +106,7 @@ class BankaHareketService:
                 if not hareket: return False, "Hareket bulunamadı."
             else:
                 hareket = BankaHareket()
-                hareket.belge_no = numara_uret(data['firma_id'], 'BANKA', datetime.now().year, 'DEC-', 6)
+                hareket.belge_no = numara_uret(data['firma_id'], 'BANKA', datetime.now().year, 'DEC-', 6, mod='blok')
 
             # 3. VERİ ATAMA
             hareket.firma_id = data['firma_id']
@@ -243,6 +228,7 @@ class BankaHareketService:
                 if fis:
                     if fis.resmi_defter_basildi:
                         return False, "Muhasebe fişi resmileştiği için bu banka hareketi silinemez!"
+                    BakiyeMotoru.fis_uygula(tenant_db, fis, isaret=-1)
                     tenant_db.query(MuhasebeFisiDetay).filter_by(fis_id=fis.id).delete()
                     tenant_db.delete(fis)
 
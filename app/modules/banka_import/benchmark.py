@@ -0,0 +1,125 @@
+# app/modules/banka_import/benchmark.py
+"""
+Banka ekstresi eşleştirme benchmark'ı (sentetik veri)
+
+Eski algoritma (kurallar için doğrusal `in`, her satır için tüm carilerle
+kelime kümesi kesişimi) ile indeksli motoru aynı sentetik ekstre üzerinde
+çalıştırır; süreleri ve sonuç farklarını raporlar.
+
+Kullanım:
+    flask banka-eslestirme-benchmark --satir 5000 --cari 40000
+"""
+
+import random
+import time
+
+from app.modules.banka_import.matcher import CariEslestirmeIndeksi, kelimeler, normalize_et
+from app.modules.banka_import.models import BankaImportKurali
+
+_ADLAR = ['AHMET', 'MEHMET', 'AYSE', 'FATMA', 'MUSTAFA', 'EMRE', 'ZEYNEP', 'ELIF', 'BURAK', 'CAN']
+_SOYADLAR = ['YILMAZ', 'KAYA', 'DEMIR', 'CELIK', 'SAHIN', 'YILDIZ', 'AYDIN', 'OZTURK', 'ARSLAN', 'DOGAN']
+_SEKTORLER = ['MOBILYA', 'ELEKTRIK', 'KIRTASIYE', 'NAKLIYE', 'MATBAA', 'YAZILIM', 'BOYA', 'HIRDAVAT']
+_EKLER = ['LTD. STI.', 'A.S.', 'TIC. SAN.', '']
+
+
+def sentetik_veri(cari_sayisi=40000, satir_sayisi=5000, kural_sayisi=200, seed=42):
+    """Cari satırları, kurallar ve ekstre açıklamaları üretir"""
+    rnd = random.Random(seed)
+
+    cariler = []
+    for i in range(cari_sayisi):
+        unvan = (f"{rnd.choice(_ADLAR)} {rnd.choice(_SOYADLAR)} {rnd.choice(_SEKTORLER)} "
+                 f"{i:05d}{rnd.choice('ABCDEFGH')} {rnd.choice(_EKLER)}").strip()
+        vkn = f"{rnd.randrange(10 ** 9, 10 ** 10)}" if rnd.random() < 0.5 else None
+        cariler.append((f"C{i}", unvan, vkn, None))
+
+    kurallar = [BankaImportKurali(anahtar_kelime=f"POSKOD{i:04d}", hedef_turu='muhasebe', kural_tipi='standart')
+                for i in range(kural_sayisi)]
+
+    satirlar = []
+    for _ in range(satir_sayisi):
+        secim = rnd.random()
+        cari = rnd.choice(cariler)
+        if secim < 0.1:
+            satirlar.append(f"UYE ISYERI {kurallar[rnd.randrange(kural_sayisi)].anahtar_kelime} SATIS")
+        elif secim < 0.3 and cari[2]:
+            satirlar.append(f"HAVALE VKN {cari[2]} ODEME")
+        elif secim < 0.8:
+            satirlar.append(f"FAST GELEN {cari[1]} FATURA ODEMESI")
+        else:
+            satirlar.append(f"EFT {rnd.choice(_ADLAR)} {rnd.choice(_SOYADLAR)} KIRA")
+    return cariler, kurallar, satirlar
+
+
+def _eski_eslestirme(kurallar, cari_listesi, vkn_map, aciklama):
+    """Eski doğrusal algoritmanın (kural → VKN → kelime) sade kopyası"""
+    import re
+    aciklama_upper = aciklama.upper()
+    for kural in kurallar:
+        if kural.anahtar_kelime.upper() in aciklama_upper:
+            return ('kural', kural.anahtar_kelime)
+    for vkn in re.findall(r'\b\d{10,11}\b', aciklama):
+        if vkn in vkn_map:
+            return ('vkn_eslesmesi', vkn_map[vkn])
+    banka = kelimeler(normalize_et(aciklama))
+    en_iyi_skor, en_iyi = 0, None
+    for cari_id, kume in cari_listesi:
+        if not kume:
+            continue
+        ortak = len(kume & banka)
+        if ortak and ortak / len(kume) > en_iyi_skor:
+            en_iyi_skor, en_iyi = ortak / len(kume), cari_id
+    if en_iyi_skor >= 0.60:
+        return ('isim_eslesmesi', en_iyi)
+    return None
+
+
+def calistir(cari_sayisi=40000, satir_sayisi=5000, kural_sayisi=200, eski_ornek=500, seed=42):
+    """
+    Returns:
+        dict: indeks_derleme_sn, yeni_sn, eski_sn (tahmini, örneklemden),
+              satir_basina_ms (yeni/eski), fark (örneklemde farklı sonuç sayısı)
+    """
+    from app.modules.banka_import.engine import BankaImportEngine
+
+    cariler, kurallar, satirlar = sentetik_veri(cari_sayisi, satir_sayisi, kural_sayisi, seed)
+
+    basla = time.perf_counter()
+    index = CariEslestirmeIndeksi.indeks_olustur(cariler)
+    derleme = time.perf_counter() - basla
+
+    motor = BankaImportEngine(None, kurallar=kurallar, cari_indeksi=index)
+    basla = time.perf_counter()
+    yeni = [motor.akilli_eslestirme(a, 100.0) for a in satirlar]
+    yeni_sure = time.perf_counter() - basla
+
+    # Eski algoritma çok yavaş olduğundan örneklem üzerinde ölçülür
+    cari_listesi = [(c[0], kelimeler(normalize_et(c[1]))) for c in cariler]
+    vkn_map = {c[2]: c[0] for c in cariler if c[2]}
+    ornek = satirlar[:eski_ornek]
+    basla = time.perf_counter()
+    eski = [_eski_eslestirme(kurallar, cari_listesi, vkn_map, a) for a in ornek]
+    eski_sure = time.perf_counter() - basla
+
+    fark = 0
+    for e, y in zip(eski, yeni):
+        if e is None:
+            fark += bool(y['bulundu'])
+        elif e[0] == 'kural':
+            fark += y.get('kural_anahtar') != e[1]
+        else:
+            fark += y.get('target_id') != e[1]
+
+    eski_satir_ms = eski_sure / max(len(ornek), 1) * 1000
+    return {
+        'cari': cari_sayisi,
+        'satir': satir_sayisi,
+        'kural': kural_sayisi,
+        'indeks_derleme_sn': round(derleme, 3),
+        'yeni_sn': round(yeni_sure, 3),
+        'eski_sn_tahmini': round(eski_satir_ms * satir_sayisi / 1000, 1),
+        'yeni_satir_basina_ms': round(yeni_sure / max(satir_sayisi, 1) * 1000, 3),
+        'eski_satir_basina_ms': round(eski_satir_ms, 3),
+        'bulunan': sum(1 for y in yeni if y['bulundu']),
+        'fark': fark,
+    }
@@ -1,65 +1,31 @@
 # app/modules/banka_import/engine.py
 
-import pandas as pd
 import hashlib
-import re
-from datetime import datetime
+import logging
+
+import pandas as pd
 from app.extensions import db 
-from app.modules.cari.models import CariHesap
 from .models import BankaImportKurali, BankaImportGecmisi
+from .matcher import (AnahtarKelimeOtomati, CariEslestirmeIndeksi, ISIM_ESIGI, TR_MAP,
+                      VKN_RE, ibanlari_bul, kelimeler, normalize_et)
+
+logger = logging.getLogger(__name__)
 
 class BankaImportEngine:
-    def __init__(self, firma_id):
+    def __init__(self, firma_id, tenant_db=None, kurallar=None, cari_indeksi=None):
         self.firma_id = firma_id
+        self.tenant_db = tenant_db or db.session
         
-        # Kuralları Yükle
-        self.kurallar = BankaImportKurali.query.filter_by(firma_id=firma_id).all()
-        
-        # Carileri Yükle
-        # Performans için sadece gerekli alanları çekiyoruz
-        cariler_raw = db.session.query(CariHesap.id, CariHesap.unvan, CariHesap.vergi_no).filter_by(firma_id=firma_id, aktif=True).all()
-        
-        self.cari_listesi = []
-        self.vkn_map = {} 
-        
-        for c in cariler_raw:
-            self.cari_listesi.append({
-                'id': c.id,
-                'unvan': c.unvan,
-                'unvan_clean': self._temizle(c.unvan) # Önceden temizlenmiş halini sakla (Hız için)
-            })
-            if c.vergi_no:
-                vkn_clean = str(c.vergi_no).strip()
-                if len(vkn_clean) >= 10:
-                    self.vkn_map[vkn_clean] = {'id': c.id, 'unvan': c.unvan}
-
-    def _temizle(self, text):
-        """
-        Metni temizler: Türkçe karakterleri düzeltir, noktalama işaretlerini siler,
-        şirket uzantılarını (A.Ş, LTD) kaldırır.
-        """
-        if not text: return set()
-        
-        # 1.Türkçe Karakter Düzeltme ve Büyütme
-        tr_map = str.maketrans("ğüşıöçĞÜŞİÖÇ", "GUSIOCGUSIOC")
-        text = text.translate(tr_map).upper()
-        
-        # 2.Gereksiz Kelimeler (Stop Words)
-        stop_words = [
-            'AS', 'AS.', 'A.S.', 'LTD', 'LTD.', 'STI', 'STI.', 'TIC', 'TIC.', 'SAN', 'SAN.', 
-            'VE', 'LIMITED', 'SIRKETI', 'TURIZM', 'INSAAT', 'GIDA', 'OTOMOTIV', 'TEKSTIL',
-            'IHRACAT', 'ITHALAT', 'ANKARA', 'ISTANBUL', 'IZMIR', 'TR'
-        ]
+        # Kuralları Yükle (tanım sırası korunur: ilk eşleşen kural kazanır)
+        if kurallar is None:
+            kurallar = self.tenant_db.query(BankaImportKurali).filter_by(firma_id=firma_id).all()
+        self.kurallar = kurallar
+        self.kural_otomati = AnahtarKelimeOtomati([(k.anahtar_kelime or '').upper() for k in self.kurallar])
         
-        # 3.Kelimelere Böl ve Filtrele
-        # Sadece harf ve rakamları al (Noktalama işaretlerini boşluğa çevir)
-        text = re.sub(r'[^A-Z0-9\s]', ' ', text)
-        words = text.split()
-        
-        # Anlamsız kelimeleri at ve SET (küme) olarak döndür
-        meaningful_words = set([w for w in words if w not in stop_words and len(w) > 2])
-        
-        return meaningful_words
+        # Cari indeksi (ters kelime indeksi + VKN/TCKN + IBAN), tenant bazında cache'li
+        if cari_indeksi is None:
+            cari_indeksi = CariEslestirmeIndeksi.getir(firma_id, tenant_db=self.tenant_db)
+        self.cari_indeksi = cari_indeksi
 
     def dosya_hash_hesapla(self, file_stream):
         """Dosyanın benzersiz parmak izini çıkarır"""
@@ -70,7 +36,7 @@ class BankaImportEngine:
 
     def mukerrer_dosya_kontrol(self, file_hash):
         """Daha önce yüklenmiş mi kontrol eder"""
-        return BankaImportGecmisi.query.filter_by(firma_id=self.firma_id, dosya_hash=file_hash).first()
+        return self.tenant_db.query(BankaImportGecmisi).filter_by(firma_id=self.firma_id, dosya_hash=file_hash).first()
 
     def excel_oku_ve_isle(self, file_stream, sablon):
         try:
@@ -103,83 +69,20 @@ class BankaImportEngine:
             if eksik_sutunlar:
                 raise Exception(f"Şablonda belirtilen şu sütunlar Excel dosyasında bulunamadı: {', '.join(eksik_sutunlar)}.Excel'deki başlıkların tam adını yazdığınızdan emin olun.")
 
-            islenmis_veri = []
-            
-            for index, row in df.iterrows():
-                # Veri Güvenliği: Tarih sütunu boşsa satırı atla
-                if pd.isna(row.get(sablon.col_tarih)): continue
-
-                # Verileri Al
-                tarih_raw = row[sablon.col_tarih]
-                aciklama = str(row[sablon.col_aciklama]).strip() if pd.notnull(row.get(sablon.col_aciklama)) else ""
-                belge_no = str(row[sablon.col_belge_no]) if sablon.col_belge_no and pd.notnull(row.get(sablon.col_belge_no)) else ""
-                
-                # Tarih Formatlama
-                try:
-                    tarih_obj = None
-                    if isinstance(tarih_raw, str):
-                        # Enpara'da saat bilgisi de gelebilir, sadece tarihi al
-                        tarih_clean = tarih_raw.split()[0] 
-                        tarih_obj = datetime.strptime(tarih_clean, sablon.tarih_formati).date()
-                    elif isinstance(tarih_raw, datetime):
-                        tarih_obj = tarih_raw.date()
-                    elif hasattr(tarih_raw, 'date'): # Timestamp ise
-                        tarih_obj = tarih_raw.date()
-                        
-                    if not tarih_obj: continue
-                except Exception as date_err:
-                    print(f"Satır {index+1} Tarih Hatası: {tarih_raw} - {str(date_err)}")
-                    continue # Tarih hatası varsa satırı atla
-
-                # Tutar Hesaplama
-                tutar = 0.0
-                yon = 'giris'
-                
-                if sablon.tutar_yapis_tipi == 'tek':
-                    val = row.get(sablon.col_tutar)
-                    if pd.notnull(val):
-                        # Enpara'da binlik ayracı nokta, ondalık virgül olabilir veya tam tersi.
-                        # Pandas genelde float okur ama string gelirse temizle:
-                        if isinstance(val, str):
-                            val = val.replace('.', '').replace(',', '.')
-                        
-                        try:
-                            ham_tutar = float(val)
-                        except:
-                            ham_tutar = 0
-
-                        if ham_tutar < 0:
-                            yon = 'cikis'
-                            tutar = abs(ham_tutar)
-                        else:
-                            yon = 'giris'
-                            tutar = ham_tutar
-                else:
-                    # Çift Sütun Mantığı (Borç/Alacak Ayrı Sütunlar)
-                    borc_val = row.get(sablon.col_borc)
-                    alacak_val = row.get(sablon.col_alacak)
-                    
-                    try:
-                        borc = float(str(borc_val).replace('.', '').replace(',', '.')) if pd.notnull(borc_val) else 0
-                        alacak = float(str(alacak_val).replace('.', '').replace(',', '.')) if pd.notnull(alacak_val) else 0
-                    except:
-                        borc, alacak = 0, 0
-                    
-                    if borc > 0:
-                        yon = 'giris'
-                        tutar = borc
-                    elif alacak > 0:
-                        yon = 'cikis'
-                        tutar = alacak
-                    else:
-                        continue # 0 liralık işlem
+            # 4.Vektörel Ön Normalizasyon (satır satır iterrows yerine sütun bazında)
+            tablo = self._tabloyu_normalize_et(df, sablon)
 
-                # --- YAPAY ZEKA VE EŞLEŞTİRME ---
-                net_tutar = tutar 
-                eslesme = self.akilli_eslestirme(aciklama, net_tutar)
+            # 5.Eşleştirme (normalize edilmiş sütunlar üzerinden)
+            islenmis_veri = []
+            for tarih, aciklama, belge_no, tutar, yon, ust, normal in zip(
+                tablo['tarih'], tablo['aciklama'], tablo['belge_no'], tablo['tutar'],
+                tablo['yon'], tablo['aciklama_upper'], tablo['aciklama_normal']
+            ):
+                net_tutar = tutar
+                eslesme = self._eslestir(aciklama, ust, normal, net_tutar)
                 
                 satir_verisi = {
-                    'tarih': tarih_obj.strftime('%Y-%m-%d'),
+                    'tarih': tarih,
                     'aciklama': aciklama,
                     'belge_no': belge_no,
                     'tutar': tutar,
@@ -196,63 +99,132 @@ class BankaImportEngine:
             traceback.print_exc() # Terminale bas
             raise Exception(f"İşlem Hatası: {str(e)}")
 
+    @staticmethod
+    def _tutar_serisi(seri):
+        """Sayı sütununu float'a çevirir (metin hücrelerde '1.234,56' → 1234.56)"""
+        metin_mi = seri.map(lambda v: isinstance(v, str))
+        sonuc = pd.to_numeric(seri.where(~metin_mi), errors='coerce')
+        if metin_mi.any():
+            temiz = seri[metin_mi].str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+            sonuc[metin_mi] = pd.to_numeric(temiz, errors='coerce')
+        return sonuc.astype(float)
+
+    def _tabloyu_normalize_et(self, df, sablon):
+        """
+        Ekstre sütunlarını tek seferde (pandas vektörel işlemleri ile) normalize eder.
+        Tarihi geçersiz ve tutarı 0 olan (çift sütun) satırlar atılır.
+        """
+        ham_tarih = df[sablon.col_tarih]
+        metin_mi = ham_tarih.map(lambda v: isinstance(v, str))
+        tarih_mi = ham_tarih.map(lambda v: hasattr(v, 'date'))
+
+        tarih = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+        if metin_mi.any():
+            # Enpara'da saat bilgisi de gelebilir, sadece tarihi al
+            tarih[metin_mi] = pd.to_datetime(
+                ham_tarih[metin_mi].str.split().str[0], format=sablon.tarih_formati, errors='coerce'
+            )
+        if tarih_mi.any():
+            tarih[tarih_mi] = pd.to_datetime(ham_tarih[tarih_mi], errors='coerce')
+
+        def _metin(col, strip=False):
+            if not col or col not in df.columns:
+                return pd.Series('', index=df.index)
+            seri = df[col]
+            metin = seri.astype(str).where(seri.notna(), '')
+            return metin.str.strip() if strip else metin
+
+        aciklama = _metin(sablon.col_aciklama, strip=True)
+        belge_no = _metin(sablon.col_belge_no)
+
+        if sablon.tutar_yapis_tipi == 'tek':
+            ham_tutar = self._tutar_serisi(df[sablon.col_tutar]).fillna(0)
+            yon = ham_tutar.lt(0).map({True: 'cikis', False: 'giris'})
+            tutar = ham_tutar.abs()
+            gecerli = tarih.notna()
+        else:
+            # Çift Sütun Mantığı (Borç/Alacak Ayrı Sütunlar)
+            borc = self._tutar_serisi(df[sablon.col_borc]).fillna(0)
+            alacak = self._tutar_serisi(df[sablon.col_alacak]).fillna(0)
+            yon = borc.gt(0).map({True: 'giris', False: 'cikis'})
+            tutar = borc.where(borc > 0, alacak)
+            gecerli = tarih.notna() & ((borc > 0) | (alacak > 0))  # 0 liralık işlem atlanır
+
+        atlanan = int((~tarih.notna() & ham_tarih.notna()).sum())
+        if atlanan:
+            logger.warning(f"⚠️ Banka ekstresi: tarihi okunamayan {atlanan} satır atlandı")
+
+        # Eşleştirme için açıklamanın iki normal formu
+        aciklama_upper = aciklama.str.upper()
+        aciklama_normal = aciklama.str.translate(TR_MAP).str.upper().str.replace(r'[^A-Z0-9\s]', ' ', regex=True)
+
+        return {
+            'tarih': tarih[gecerli].dt.strftime('%Y-%m-%d').tolist(),
+            'aciklama': aciklama[gecerli].tolist(),
+            'belge_no': belge_no[gecerli].tolist(),
+            'tutar': tutar[gecerli].astype(float).tolist(),
+            'yon': yon[gecerli].tolist(),
+            'aciklama_upper': aciklama_upper[gecerli].tolist(),
+            'aciklama_normal': aciklama_normal[gecerli].tolist(),
+        }
+
     def akilli_eslestirme(self, aciklama, net_tutar):
         """
-        Gelişmiş Eşleştirme Algoritması
+        Gelişmiş Eşleştirme Algoritması (tek açıklama için)
+        """
+        aciklama = str(aciklama)
+        return self._eslestir(aciklama, aciklama.upper(), normalize_et(aciklama), net_tutar)
+
+    def _eslestir(self, aciklama, aciklama_upper, aciklama_normal, net_tutar):
+        """
+        Sıra: Kural → VKN/TCKN → IBAN → Unvan kelimeleri.
+        Sonuca 'skor' (0-1) ve 'gerekce' (kullanıcıya gösterilecek açıklama) eklenir.
         """
-        # 1.ADIM: MEVCUT KURALLAR (En Hızlısı - Kesin Eşleşme)
-        aciklama_upper = str(aciklama).upper()
-        for kural in self.kurallar:
-            if kural.anahtar_kelime.upper() in aciklama_upper:
-                return self._kural_sonuc_olustur(kural, net_tutar)
+        index = self.cari_indeksi
+
+        # 1.ADIM: MEVCUT KURALLAR (Otomat ile tek geçiş - Kesin Eşleşme)
+        kural_no = self.kural_otomati.ilk_eslesen(aciklama_upper)
+        if kural_no is not None:
+            kural = self.kurallar[kural_no]
+            sonuc = self._kural_sonuc_olustur(kural, net_tutar)
+            sonuc.update(skor=1.0, gerekce=f"Kural: '{kural.anahtar_kelime}' açıklamada geçiyor")
+            return sonuc
 
         # 2.ADIM: VKN/TCKN ARAMA (Kesin Eşleşme)
-        potansiyel_vknler = re.findall(r'\b\d{10,11}\b', str(aciklama))
-        for vkn in potansiyel_vknler:
-            if vkn in self.vkn_map:
-                cari_data = self.vkn_map[vkn]
-                return self._manuel_sonuc(cari_data, 'vkn_eslesmesi', vkn, net_tutar)
+        for vkn in VKN_RE.findall(aciklama):
+            i = index['vkn'].get(vkn)
+            if i is not None:
+                return self._indeks_sonuc(i, 'vkn_eslesmesi', vkn, net_tutar, 1.0,
+                                          f"VKN/TCKN {vkn} cari kartıyla aynı")
 
-        # 3.ADIM: KELİME BAZLI SKORLAMA (Bulanık Eşleşme)
-        # Banka açıklamasını temizle ve kelimelerine ayır
-        banka_kelimeleri = self._temizle(aciklama)
-        
-        en_iyi_skor = 0
-        en_iyi_cari = None
-        
-        for cari in self.cari_listesi:
-            cari_kelimeleri = cari['unvan_clean']
-            if not cari_kelimeleri: continue
-            
-            # Kesişim Kümesi (Ortak Kelimeler)
-            ortak_kelimeler = cari_kelimeleri.intersection(banka_kelimeleri)
-            match_count = len(ortak_kelimeler)
-            
-            if match_count == 0: continue
-            
-            # SKORLAMA MANTIĞI:
-            # Cari unvanındaki önemli kelimelerin kaçı banka açıklamasında geçiyor?
-            basari_orani = match_count / len(cari_kelimeleri)
-            
-            # EŞİK DEĞERLERİ (Tuning)
-            # 1.Eğer cari tek kelimeyse (örn: "KOÇTAŞ") ve bu kelime varsa -> %100 kabul et
-            # 2.Eğer cari çok kelimeyse (örn: "AHMET YILMAZ") en az %60'ı tutmalı
-            
-            if basari_orani > en_iyi_skor:
-                en_iyi_skor = basari_orani
-                en_iyi_cari = cari
+        # 3.ADIM: IBAN ARAMA (Önceki hareketlerden öğrenilmiş)
+        for iban in ibanlari_bul(aciklama_upper):
+            i = index['iban'].get(iban)
+            if i is not None:
+                return self._indeks_sonuc(i, 'iban_eslesmesi', iban, net_tutar, 0.95,
+                                          f"IBAN {iban} daha önce bu cariye işlenmiş")
+
+        # 4.ADIM: KELİME BAZLI SKORLAMA (Ters indeks ile bulanık eşleşme)
+        banka_kelimeleri = kelimeler(aciklama_normal)
+        i, skor = CariEslestirmeIndeksi.isim_eslestir(index, banka_kelimeleri)
 
         # Eşik Değer Kontrolü (Yanlış eşleşmeyi önlemek için)
-        # %60 ve üzeri benzerlik varsa kabul et (Veya tek kelimelik tam eşleşme)
-        if en_iyi_skor >= 0.60 or (en_iyi_skor > 0 and len(en_iyi_cari['unvan_clean']) == 1 and en_iyi_skor == 1.0):
-             return self._manuel_sonuc(
-                 {'id': en_iyi_cari['id'], 'unvan': en_iyi_cari['unvan']}, 
-                 'isim_eslesmesi', 
-                 en_iyi_cari['unvan'], # Kural olarak carinin tam adını öner
-                 net_tutar
-             )
+        if i is not None and skor >= ISIM_ESIGI:
+            cari_kelimeleri = index['cariler'][i][2]
+            ortak = sorted(cari_kelimeleri & banka_kelimeleri)
+            return self._indeks_sonuc(
+                i, 'isim_eslesmesi', index['cariler'][i][1],  # Kural olarak carinin tam adını öner
+                net_tutar, round(skor, 2),
+                f"Unvan kelimelerinin {len(ortak)}/{len(cari_kelimeleri)} tanesi geçiyor: {', '.join(ortak)}"
+            )
+
+        return {'bulundu': False, 'skor': round(skor, 2), 'gerekce': 'Eşleşme bulunamadı'}
 
-        return {'bulundu': False}
+    def _indeks_sonuc(self, i, kaynak, kural_anahtar, net_tutar, skor, gerekce):
+        cari_id, unvan, _ = self.cari_indeksi['cariler'][i]
+        sonuc = self._manuel_sonuc({'id': cari_id, 'unvan': unvan}, kaynak, kural_anahtar, net_tutar)
+        sonuc.update(skor=skor, gerekce=gerekce)
+        return sonuc
 
     def _manuel_sonuc(self, cari_data, kaynak, kural_anahtar, net_tutar):
         return {
@@ -0,0 +1,351 @@
+# app/modules/banka_import/matcher.py
+"""
+Banka Ekstresi Eşleştirme İndeksleri
+
+Eski akış her ekstre satırında tüm kuralları tek tek `in` ile, tüm carileri de
+kelime kümesi kesişimiyle deniyordu (satır × cari). 5.000 satır × 40.000 cari
+dakikalar sürüyordu.
+
+Bu modül:
+    - AnahtarKelimeOtomati : Kural anahtar kelimeleri için Aho-Corasick otomatı
+                             (açıklama tek geçişte taranır, ilk tanımlı kural kazanır)
+    - CariEslestirmeIndeksi: Cari unvan kelimeleri için ters indeks (kelime → cari),
+                             VKN/TCKN ve IBAN sözlükleri. Tenant + firma başına bir kez
+                             derlenip cache'lenir; cari değişince sürüm sayacı artar.
+
+IBAN'lar cari kartında tutulmadığından, daha önce bir cariye işlenmiş banka
+hareketlerinin açıklamalarından öğrenilir.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from flask import has_request_context, session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.extensions import cache
+from app.modules.banka_hareket.models import BankaHareket
+from app.modules.cari.models import CariHesap
+
+logger = logging.getLogger(__name__)
+
+
+TR_MAP = str.maketrans("ğüşıöçĞÜŞİÖÇ", "GUSIOCGUSIOC")
+
+STOP_WORDS = frozenset([
+    'AS', 'AS.', 'A.S.', 'LTD', 'LTD.', 'STI', 'STI.', 'TIC', 'TIC.', 'SAN', 'SAN.',
+    'VE', 'LIMITED', 'SIRKETI', 'TURIZM', 'INSAAT', 'GIDA', 'OTOMOTIV', 'TEKSTIL',
+    'IHRACAT', 'ITHALAT', 'ANKARA', 'ISTANBUL', 'IZMIR', 'TR'
+])
+
+VKN_RE = re.compile(r'\b\d{10,11}\b')
+IBAN_RE = re.compile(r'\bTR\d{2}(?:\s?\d{4}){5}\s?\d{2}\b')
+_NOKTALAMA_RE = re.compile(r'[^A-Z0-9\s]')
+
+# Bulanık isim eşleşmesinde kabul eşiği (cari unvan kelimelerinin oranı)
+ISIM_ESIGI = 0.60
+
+
+def normalize_et(text):
+    """Türkçe karakterleri düzeltir, büyütür, noktalama işaretlerini boşluğa çevirir"""
+    if not text:
+        return ''
+    return _NOKTALAMA_RE.sub(' ', str(text).translate(TR_MAP).upper())
+
+
+def kelimeler(normal_metin):
+    """Normalize edilmiş metnin anlamlı kelime kümesi (stop word ve ≤2 harf hariç)"""
+    return {w for w in normal_metin.split() if w not in STOP_WORDS and len(w) > 2}
+
+
+def ibanlari_bul(text):
+    return [m.replace(' ', '') for m in IBAN_RE.findall(str(text).upper())]
+
+
+# ========================================
+# 🔎 KURAL OTOMATI (Aho-Corasick)
+# ========================================
+
+class AnahtarKelimeOtomati:
+    """
+    Çoklu desen arama otomatı.
+
+    `ilk_eslesen(metin)` metinde geçen desenlerden listedeki sırası en küçük olanın
+    index'ini döndürür (eski "kuralları sırayla dene, ilk bulunanı al" davranışı).
+    """
+
+    def __init__(self, desenler):
+        self._gecis = [{}]
+        self._en_iyi = [None]  # Durumda biten (fail zinciri dahil) en küçük desen index'i
+
+        for i, desen in enumerate(desenler):
+            if not desen:
+                continue
+            durum = 0
+            for ch in desen:
+                sonraki = self._gecis[durum].get(ch)
+                if sonraki is None:
+                    sonraki = len(self._gecis)
+                    self._gecis[durum][ch] = sonraki
+                    self._gecis.append({})
+                    self._en_iyi.append(None)
+                durum = sonraki
+            if self._en_iyi[durum] is None:
+                self._en_iyi[durum] = i
+
+        # Fail linkleri (BFS)
+        self._fail = [0] * len(self._gecis)
+        kuyruk = deque(self._gecis[0].values())
+        while kuyruk:
+            durum = kuyruk.popleft()
+            for ch, sonraki in self._gecis[durum].items():
+                f = self._fail[durum]
+                while f and ch not in self._gecis[f]:
+                    f = self._fail[f]
+                hedef = self._gecis[f].get(ch, 0)
+                self._fail[sonraki] = hedef if hedef != sonraki else 0
+                self._en_iyi[sonraki] = _min_none(self._en_iyi[sonraki], self._en_iyi[self._fail[sonraki]])
+                kuyruk.append(sonraki)
+
+    def ilk_eslesen(self, metin):
+        gecis, fail, en_iyi = self._gecis, self._fail, self._en_iyi
+        durum, bulunan = 0, None
+        for ch in metin:
+            while durum and ch not in gecis[durum]:
+                durum = fail[durum]
+            durum = gecis[durum].get(ch, 0)
+            aday = en_iyi[durum]
+            if aday is not None and (bulunan is None or aday < bulunan):
+                bulunan = aday
+                if bulunan == 0:
+                    break
+        return bulunan
+
+
+def _min_none(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+# ========================================
+# 👥 CARİ İNDEKSİ
+# ========================================
+
+class CariEslestirmeIndeksi:
+    """
+    ✅ TERS KELİME İNDEKSİ + VKN/TCKN/IBAN SÖZLÜKLERİ
+
+    İndeks yapısı (pickle edilebilir, Redis'te paylaşılır):
+        cariler : [(id, unvan, frozenset(kelimeler)), ...]
+        tokenler: {KELIME: np.ndarray[int32] (cari_index listesi, artan)}
+        boyutlar: np.ndarray  (her carinin anlamlı kelime sayısı)
+        vkn     : {vkn_veya_tckn: cari_index}
+        iban    : {IBAN: cari_index}
+    """
+
+    SHARED_TTL = 12 * 3600
+    LOCAL_TTL = 2
+
+    _local = {}        # {(tenant_id, firma_id): (gen, index)}
+    _gen_checked = {}  # {tenant_id: (monotonic, gen)}
+    _lock = threading.Lock()
+
+    @classmethod
+    def getir(cls, firma_id, tenant_db=None, tenant_id=None):
+        tenant_id = tenant_id or cls._tenant_id()
+        gen = cls._generation(tenant_id)
+        anahtar = (tenant_id, str(firma_id))
+
+        yerel = cls._local.get(anahtar)
+        if yerel and yerel[0] == gen:
+            return yerel[1]
+
+        key = f"banka_eslestirme:{tenant_id}:{firma_id}:{gen}"
+        index = None
+        try:
+            index = cache.get(key)
+        except Exception as e:
+            logger.debug(f"Eşleştirme indeksi cache okunamadı: {e}")
+
+        if index is None:
+            basla = time.perf_counter()
+            index = cls.derle(firma_id, tenant_db)
+            logger.info(
+                f"🏦 Banka eşleştirme indeksi derlendi: tenant={tenant_id} gen={gen} "
+                f"cari={len(index['cariler'])} kelime={len(index['tokenler'])} "
+                f"({(time.perf_counter() - basla) * 1000:.0f} ms)"
+            )
+            try:
+                cache.set(key, index, timeout=cls.SHARED_TTL)
+            except Exception as e:
+                logger.debug(f"Eşleştirme indeksi cache'e yazılamadı: {e}")
+
+        with cls._lock:
+            cls._local[anahtar] = (gen, index)
+        return index
+
+    @classmethod
+    def derle(cls, firma_id, tenant_db=None):
+        """Firmanın aktif carilerinden ve geçmiş banka hareketlerinden indeks kurar (2 sorgu)"""
+        if tenant_db is None:
+            from app.extensions import db
+            tenant_db = db.session
+
+        c = CariHesap.__table__
+        cari_satirlari = tenant_db.execute(
+            select(c.c.id, c.c.unvan, c.c.vergi_no, c.c.tc_kimlik_no)
+            .where(c.c.firma_id == str(firma_id), c.c.aktif == True, c.c.deleted_at.is_(None))
+        )
+
+        bh = BankaHareket.__table__
+        iban_satirlari = tenant_db.execute(
+            select(bh.c.cari_id, bh.c.aciklama)
+            .where(bh.c.firma_id == str(firma_id), bh.c.cari_id.isnot(None), bh.c.aciklama.like('%TR%'))
+        )
+        return cls.indeks_olustur(cari_satirlari, iban_satirlari)
+
+    @staticmethod
+    def indeks_olustur(cari_satirlari, iban_satirlari=()):
+        """
+        Args:
+            cari_satirlari: (id, unvan, vergi_no, tc_kimlik_no) satırları
+            iban_satirlari: (cari_id, aciklama) satırları
+        """
+        cariler, tokenler, vkn = [], {}, {}
+        id_index = {}
+        for cari_id, unvan, vergi_no, tc_no in cari_satirlari:
+            i = len(cariler)
+            kume = frozenset(kelimeler(normalize_et(unvan)))
+            cariler.append((cari_id, unvan, kume))
+            id_index[cari_id] = i
+            for token in kume:
+                tokenler.setdefault(token, []).append(i)
+            for no in (vergi_no, tc_no):
+                no = str(no or '').strip()
+                if len(no) >= 10:
+                    vkn.setdefault(no, i)
+
+        iban = {}
+        for cari_id, aciklama in iban_satirlari:
+            i = id_index.get(cari_id)
+            if i is None:
+                continue
+            for numara in ibanlari_bul(aciklama):
+                iban[numara] = i  # En son işlenen kazanır
+
+        return {
+            'cariler': cariler,
+            'tokenler': {t: np.asarray(liste, dtype=np.int32) for t, liste in tokenler.items()},
+            'boyutlar': np.asarray([len(c[2]) for c in cariler], dtype=np.float64),
+            'vkn': vkn,
+            'iban': iban,
+        }
+
+    @staticmethod
+    def isim_eslestir(index, banka_kelimeleri):
+        """
+        Kelime bazlı skorlama: cari unvan kelimelerinin kaçı açıklamada geçiyor?
+        Sadece en az bir ortak kelimesi olan cariler sayılır (ters indeks).
+
+        Returns:
+            (cari_index, skor) veya (None, 0)
+        """
+        tokenler = index['tokenler']
+        diziler = [tokenler[t] for t in banka_kelimeleri if t in tokenler]
+        if not diziler:
+            return None, 0
+
+        # Ortak kelime sayıları tek bincount ile (satır × cari döngüsü yok)
+        sayac = np.bincount(np.concatenate(diziler), minlength=len(index['cariler']))
+        adaylar = np.flatnonzero(sayac)
+        skorlar = sayac[adaylar] / index['boyutlar'][adaylar]
+
+        # argmax ilk maksimumu verir → eşit skorda listede önce gelen cari (eski davranış)
+        j = int(np.argmax(skorlar))
+        en_iyi, en_iyi_skor = int(adaylar[j]), float(skorlar[j])
+        return en_iyi, en_iyi_skor
+
+    # ========================================
+    # ♻️ SÜRÜM / INVALIDATION
+    # ========================================
+
+    @staticmethod
+    def _tenant_id():
+        if has_request_context():
+            return session.get('tenant_id')
+        return None
+
+    @classmethod
+    def _generation(cls, tenant_id):
+        now = time.monotonic()
+        kontrol = cls._gen_checked.get(tenant_id)
+        if kontrol and kontrol[0] > now:
+            return kontrol[1]
+        gen = cache.get(f"banka_eslestirme_gen:{tenant_id}") or 0
+        cls._gen_checked[tenant_id] = (now + cls.LOCAL_TTL, gen)
+        return gen
+
+    @classmethod
+    def invalidate(cls, tenant_id=None):
+        """Tenant'ın eşleştirme indekslerini geçersiz kıl"""
+        tenant_id = tenant_id or cls._tenant_id()
+        key = f"banka_eslestirme_gen:{tenant_id}"
+        try:
+            cache.set(key, (cache.get(key) or 0) + 1, timeout=0)
+        except Exception as e:
+            logger.error(f"❌ Eşleştirme indeksi invalidation hatası: {e}")
+        with cls._lock:
+            for anahtar in [a for a in cls._local if a[0] == tenant_id]:
+                cls._local.pop(anahtar, None)
+            cls._gen_checked.pop(tenant_id, None)
+
+
+# ========================================
+# 🔔 ORM EVENT HOOK'LARI
+# ========================================
+_CARI_ALANLARI = ('unvan', 'vergi_no', 'tc_kimlik_no', 'aktif', 'deleted_at', 'firma_id')
+_DIRTY_KEY = '_banka_eslestirme_dirty'
+
+
+def _isaretle(target):
+    from sqlalchemy.orm import object_session
+    s = object_session(target)
+    if s is not None:
+        s.info[_DIRTY_KEY] = True
+
+
+for _evt in ('after_insert', 'after_delete'):
+    event.listen(CariHesap, _evt, lambda mapper, connection, target: _isaretle(target))
+
+
+@event.listens_for(CariHesap, 'after_update')
+def _cari_degisti(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[alan].history.has_changes() for alan in _CARI_ALANLARI):
+        _isaretle(target)
+
+
+@event.listens_for(BankaHareket, 'after_insert')
+def _banka_hareketi_eklendi(mapper, connection, target):
+    # IBAN öğrenimi: cariye işlenmiş ve açıklamasında IBAN geçen hareket
+    if target.cari_id and target.aciklama and IBAN_RE.search(str(target.aciklama).upper()):
+        _isaretle(target)
+
+
+@event.listens_for(Session, 'after_commit')
+def _banka_eslestirme_commit(s):
+    if s.info.pop(_DIRTY_KEY, None):
+        CariEslestirmeIndeksi.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _banka_eslestirme_rollback(s):
+    s.info.pop(_DIRTY_KEY, None)
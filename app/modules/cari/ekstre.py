@@ -0,0 +1,241 @@
+# app/modules/cari/ekstre.py
+"""
+Cari Ekstre Motoru (Pencereli)
+
+Ekstre tüm geçmiş hareketleri belleğe alıp Python'da yürüyen bakiye hesaplamaz:
+
+    - Devir (açılış bakiyesi): pencere başlangıcından önceki hareketlerin TEK SUM sorgusu
+      (idx_hareket_cari_tarih üzerinde aralık taraması)
+    - Pencere satırları: SUM(borc - alacak) OVER (ORDER BY tarih, id) + devir ile
+      veritabanında hesaplanan yürüyen bakiye, yield_per ile parça parça okunur
+    - Ekran sayfaları: (tarih, id) keyset (seek) sayfalama; sayfanın açılış bakiyesi
+      devir + pencere içinde imleçten önceki hareketlerin toplamı
+    - Export: aynı pencere sorgusu StreamingExporter / arka plan işi ile akıtılır
+
+Kullanım:
+    motor = CariEkstreMotoru(cari_id, baslangic, bitis, tenant_db=tenant_db)
+    motor.toplamlar()          → {'devir', 'borc', 'alacak', 'kapanis', 'adet'}
+    motor.sayfa(after=cursor)  → keyset sayfası (satırlarda 'bakiye')
+    motor.satirlar()           → tüm pencere (yürüyen bakiyeli) iterator
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, func, literal, or_
+
+from app.extensions import get_tenant_db
+from app.form_builder.keyset import keyset_page
+from app.modules.cari.models import CariHareket
+
+_SIFIR = Decimal('0.00')
+
+# Ekstre satırında taşınan alanlar (yazdırma şablonları da bu adları kullanır)
+EKSTRE_KOLONLARI = ('id', 'tarih', 'vade_tarihi', 'islem_turu', 'belge_no', 'aciklama',
+                    'borc', 'alacak', 'doviz_kodu', 'kaynak_turu')
+
+
+def tarih_coz(deger):
+    """'YYYY-MM-DD' veya 'DD.MM.YYYY' → date (geçersizse None)"""
+    if not deger:
+        return None
+    if isinstance(deger, datetime):
+        return deger.date()
+    if isinstance(deger, date):
+        return deger
+    for bicim in ('%Y-%m-%d', '%d.%m.%Y'):
+        try:
+            return datetime.strptime(str(deger).strip(), bicim).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _ondalik(deger):
+    return Decimal(str(deger)) if deger is not None else _SIFIR
+
+
+class CariEkstreMotoru:
+    """
+    Tek cari için tarih pencereli ekstre.
+
+    Args:
+        cari_id: Cari hesap id
+        baslangic / bitis: date veya tarih metni (None → sınırsız)
+        tenant_db: Tenant session (varsayılan: get_tenant_db())
+    """
+
+    SAYFA_BOYUTU = 100
+    # Yazdırılan belgede sayfa başına satır (devreden / nakli yekün için)
+    BASKI_SAYFA_SATIR = 40
+
+    def __init__(self, cari_id, baslangic=None, bitis=None, tenant_db=None):
+        self.cari_id = str(cari_id)
+        self.baslangic = tarih_coz(baslangic)
+        self.bitis = tarih_coz(bitis)
+        self.tenant_db = tenant_db or get_tenant_db()
+        self._devir = None
+
+    # ========================================
+    # 🔎 SORGU PARÇALARI
+    # ========================================
+
+    def _pencere_kosullari(self):
+        kosullar = [CariHareket.cari_id == self.cari_id]
+        if self.baslangic:
+            kosullar.append(CariHareket.tarih >= self.baslangic)
+        if self.bitis:
+            kosullar.append(CariHareket.tarih <= self.bitis)
+        return kosullar
+
+    def _toplam(self, *kosullar):
+        """(borc, alacak, adet) - tek aggregate sorgu"""
+        borc, alacak, adet = self.tenant_db.query(
+            func.coalesce(func.sum(CariHareket.borc), 0),
+            func.coalesce(func.sum(CariHareket.alacak), 0),
+            func.count(CariHareket.id),
+        ).filter(*kosullar).one()
+        return _ondalik(borc), _ondalik(alacak), int(adet or 0)
+
+    def _kolonlar(self):
+        return [getattr(CariHareket, k) for k in EKSTRE_KOLONLARI]
+
+    # ========================================
+    # 💰 BAKİYELER
+    # ========================================
+
+    def devir(self):
+        """Pencere başlangıcından önceki bakiye (borç - alacak)"""
+        if self._devir is None:
+            if not self.baslangic:
+                self._devir = _SIFIR
+            else:
+                borc, alacak, _ = self._toplam(CariHareket.cari_id == self.cari_id,
+                                               CariHareket.tarih < self.baslangic)
+                self._devir = borc - alacak
+        return self._devir
+
+    def toplamlar(self):
+        """Pencere toplamları + devir ve kapanış bakiyesi"""
+        borc, alacak, adet = self._toplam(*self._pencere_kosullari())
+        devir = self.devir()
+        return {'devir': devir, 'borc': borc, 'alacak': alacak,
+                'kapanis': devir + borc - alacak, 'adet': adet}
+
+    def bakiye_oncesi(self, tarih, hareket_id):
+        """Pencere içinde (tarih, id) konumundan önceki bakiye (devir dahil)"""
+        borc, alacak, _ = self._toplam(
+            *self._pencere_kosullari(),
+            or_(CariHareket.tarih < tarih, and_(CariHareket.tarih == tarih, CariHareket.id < str(hareket_id))),
+        )
+        return self.devir() + borc - alacak
+
+    # ========================================
+    # 📜 TÜM PENCERE (SQL WINDOW)
+    # ========================================
+
+    def sorgu(self):
+        """
+        Pencere satırları + veritabanında hesaplanan yürüyen bakiye ('bakiye' kolonu).
+        Export ve yazdırma bu sorguyu akıtarak kullanır.
+        """
+        yuruyen = func.sum(CariHareket.borc - CariHareket.alacak).over(
+            order_by=(CariHareket.tarih, CariHareket.id), rows=(None, 0)
+        )
+        return (
+            self.tenant_db.query(*self._kolonlar(), (yuruyen + literal(self.devir())).label('bakiye'))
+            .filter(*self._pencere_kosullari())
+            .order_by(CariHareket.tarih, CariHareket.id)
+        )
+
+    def satirlar(self, chunk_size=1000):
+        """Pencere satırlarını (dict) sırayla üretir; bellek kullanımı chunk_size ile sınırlı"""
+        for satir in self.sorgu().yield_per(chunk_size):
+            yield self._satir(satir._mapping, _ondalik(satir.bakiye))
+
+    def baski_sayfalari(self, satir_sayisi=None):
+        """
+        Yazdırma şablonu için sayfalar: [{'sayfa_no', 'hareketler', 'devreden_bakiye', 'son_sayfa_mi'}]
+        Hareketlerde 'yuruyen_bakiye' alanı bulunur (eski şablon uyumu).
+        """
+        satir_sayisi = satir_sayisi or self.BASKI_SAYFA_SATIR
+        sayfalar, sayfa = [], None
+        devreden = self.devir()
+        for satir in self.satirlar():
+            if sayfa is None or len(sayfa['hareketler']) >= satir_sayisi:
+                sayfa = {'sayfa_no': len(sayfalar) + 1, 'hareketler': [],
+                         'devreden_bakiye': devreden, 'son_sayfa_mi': False}
+                sayfalar.append(sayfa)
+            sayfa['hareketler'].append(satir)
+            devreden = satir['bakiye']
+        if not sayfalar:
+            sayfalar.append({'sayfa_no': 1, 'hareketler': [], 'devreden_bakiye': devreden, 'son_sayfa_mi': True})
+        sayfalar[-1]['son_sayfa_mi'] = True
+        return sayfalar
+
+    # ========================================
+    # 📄 KEYSET SAYFALAMA
+    # ========================================
+
+    def sayfa(self, after=None, before=None, per_page=None, direction='asc'):
+        """
+        Ekran için tek sayfa (derin sayfalarda da sabit maliyet).
+
+        Returns:
+            dict: keyset_page çıktısı; items → [{..., 'bakiye'}],
+                  ek olarak 'acilis_bakiyesi' (sayfanın ilk hareketinden önceki bakiye)
+        """
+        per_page = min(int(per_page or self.SAYFA_BOYUTU), 500)
+        sorgu = self.tenant_db.query(*self._kolonlar()).filter(*self._pencere_kosullari())
+        sonuc = keyset_page(sorgu, CariHareket.tarih, CariHareket.id, direction=direction,
+                            after=after, before=before, per_page=per_page)
+
+        kronolojik = sorted(sonuc['items'], key=lambda s: (s.tarih, s.id))
+        if kronolojik:
+            ilk = kronolojik[0]
+            bakiye = acilis = self.bakiye_oncesi(ilk.tarih, ilk.id)
+        else:
+            bakiye = acilis = self.devir()
+
+        bakiyeler = {}
+        for s in kronolojik:
+            bakiye += _ondalik(s.borc) - _ondalik(s.alacak)
+            bakiyeler[s.id] = bakiye
+
+        sonuc['items'] = [self._satir(s._mapping, bakiyeler[s.id]) for s in sonuc['items']]
+        sonuc['acilis_bakiyesi'] = acilis
+        return sonuc
+
+    # ========================================
+    # 📤 EXPORT
+    # ========================================
+
+    EXPORT_KOLONLARI = [
+        ('tarih', 'Tarih'),
+        ('islem_turu', 'İşlem Türü'),
+        ('belge_no', 'Belge No'),
+        ('aciklama', 'Açıklama'),
+        ('vade_tarihi', 'Vade'),
+        ('borc', 'Borç'),
+        ('alacak', 'Alacak'),
+        ('bakiye', 'Bakiye'),
+    ]
+
+    def export_kaynagi(self):
+        """StreamingExporter için (query, columns)"""
+        return self.sorgu(), list(self.EXPORT_KOLONLARI)
+
+    # ========================================
+    # 🔧 YARDIMCILAR
+    # ========================================
+
+    @staticmethod
+    def _satir(mapping, bakiye):
+        satir = {k: mapping[k] for k in EKSTRE_KOLONLARI}
+        tur = satir['islem_turu']
+        satir['islem_turu'] = tur.value if hasattr(tur, 'value') else tur
+        satir['borc'] = _ondalik(satir['borc'])
+        satir['alacak'] = _ondalik(satir['alacak'])
+        satir['bakiye'] = bakiye
+        satir['yuruyen_bakiye'] = bakiye
+        return satir
@@ -8,6 +8,7 @@ from app.extensions import get_tenant_db, cache # 👈 Firebird Bağlantısı
 # Modelleri Firebird sorgusu için import ediyoruz
 from app.modules.lokasyon.models import Sehir, Ilce
 from app.modules.muhasebe.models import HesapPlani
+from app.form_builder.lookup import LookupRegistry
 
 # Cache timeout
 CACHE_TIMEOUT = 300
@@ -33,51 +34,23 @@ def create_cari_form(cari=None):
     # VERİ HAZIRLIĞI (CACHED)
     # ========================================
 
-    # 1. Şehirler (Cached)
-    cache_key_sehir = f"cari_form_sehirler:{current_user.firma_id}"
-    sehir_opts = cache.get(cache_key_sehir)
-    
-    if sehir_opts is None:
-        sehirler = tenant_db.query(Sehir).order_by(Sehir.kod).all()
-        sehir_opts = [(str(s.id), f"{s.kod} - {s.ad}") for s in sehirler]
-        cache.set(cache_key_sehir, sehir_opts, timeout=CACHE_TIMEOUT)
+    # 1. Şehirler (LookupRegistry - tenant bazlı cache)
+    sehir_opts = LookupRegistry.satirlar('sehir', tenant_db=tenant_db)
     
     # 2. İlçeler (edit modunda)
     ilce_opts = []
     if cari and cari.sehir_id:
-        cache_key_ilce = f"ilceler:{cari.sehir_id}"
-        ilce_opts = cache.get(cache_key_ilce)
-        
-        if ilce_opts is None:
-            ilceler = tenant_db.query(Ilce).filter_by(
-                sehir_id=cari.sehir_id
-            ).order_by(Ilce.ad).all()
-            ilce_opts = [(str(i.id), i.ad) for i in ilceler]
-            cache.set(cache_key_ilce, ilce_opts, timeout=CACHE_TIMEOUT)
-    
-    # 3. Muhasebe Hesapları (Cached)
-    cache_key_hesap = f"cari_form_hesaplar:{current_user.firma_id}"
-    muhasebe_opts = cache.get(cache_key_hesap)
-    
-    if muhasebe_opts is None:
-        hesaplar = tenant_db.query(HesapPlani).filter_by(
-            firma_id=current_user.firma_id,
-            aktif=True
-        ).order_by(HesapPlani.kod).all()
-        
-        muhasebe_opts = []
-        for h in hesaplar:
-            is_muavin = (
-                getattr(h, 'hesap_tipi', 'muavin') == 'muavin' or
-                getattr(h, 'tur', 'ALT') == 'ALT'
-            )
-            if is_muavin:
-                muhasebe_opts.append((str(h.id), f"{h.kod} - {h.ad}"))
-        
-        cache.set(cache_key_hesap, muhasebe_opts, timeout=CACHE_TIMEOUT)
+        ilce_opts = LookupRegistry.satirlar('ilce', tenant_db=tenant_db, sehir_id=cari.sehir_id)
     
-
- 
+    # 3. Muhasebe Hesapları (büyük hesap planında AJAX arama)
+    alis_hesap_ayarlari = LookupRegistry.alan_ayarlari(
+        'hesap_plani', tenant_db=tenant_db,
+        secili=getattr(cari, 'alis_muhasebe_hesap_id', None) if cari else None
+    )
+    satis_hesap_ayarlari = LookupRegistry.alan_ayarlari(
+        'hesap_plani', tenant_db=tenant_db,
+        secili=getattr(cari, 'satis_muhasebe_hesap_id', None) if cari else None
+    )
 
     # --- 1. KİMLİK BİLGİLERİ ---
     kod = FormField('kod', FieldType.AUTO_NUMBER, _('Cari Kodu'), required=True, value=cari.kod if cari else '', endpoint='/cari/api/siradaki-kod', icon='bi bi-person-badge')
@@ -120,18 +93,18 @@ def create_cari_form(cari=None):
         'alis_muhasebe_hesap_id', 
         FieldType.SELECT, 
         _('Alış Muhasebe Kodu (320)'), 
-        options=muhasebe_opts, 
         value=cari.alis_muhasebe_hesap_id if cari and hasattr(cari, 'alis_muhasebe_hesap_id') else '',
-        help_text="Alış faturalarında kullanılacak hesap."
+        help_text="Alış faturalarında kullanılacak hesap.",
+        **alis_hesap_ayarlari
     )
 
     satis_muhasebe = FormField(
         'satis_muhasebe_hesap_id', 
         FieldType.SELECT, 
         _('Satış Muhasebe Kodu (120)'), 
-        options=muhasebe_opts, 
         value=cari.satis_muhasebe_hesap_id if cari and hasattr(cari, 'satis_muhasebe_hesap_id') else '',
-        help_text="Satış faturalarında kullanılacak hesap."
+        help_text="Satış faturalarında kullanılacak hesap.",
+        **satis_hesap_ayarlari
     )
 
     # --- LAYOUT DÜZENLEMESİ ---
@@ -258,7 +258,13 @@ class CariHesap(db.Model, TimestampMixin, SoftDeleteMixin):
         default=Decimal('0.00'),
         comment='Ödemelerin yüzde kaçı gecikiyor (%)'
     )
-    
+
+    odeme_analiz_tarihi = db.Column(
+        db.DateTime,
+        nullable=True,
+        comment='Ödeme analizinin son çalıştığı an (artımlı hesaplama filigranı)'
+    )
+
     # ========================================
     # CRM & SEGMENTASYON
     # ========================================
@@ -1193,6 +1199,59 @@ class CRMHareket(db.Model, TimestampMixin):
         return f"<CRMHareket {self.islem_turu} - {self.cari.unvan if self.cari else 'N/A'}>"
 
 
+# ========================================
+# CARİ RİSK ÖZETİ (Snapshot)
+# ========================================
+class CariRiskOzeti(db.Model):
+    """
+    Cari bazında risk snapshot'ı (tek satır / cari).
+
+    Bakiye, yaşlandırma dilimleri (FIFO ile kapanmamış borçlar), açık / vadesi geçmiş
+    müşteri çeki, ortalama ödeme günü ve son ödeme tarihi. Hareket ve çek kayıtlarında
+    etkilenen cariler için yeniden hesaplanır, gece tam uzlaştırma ile tazelenir.
+    Fatura / sipariş risk kontrolleri bu tablodan tek satır okur.
+    """
+    __tablename__ = 'cari_risk_ozetleri'
+
+    cari_id = db.Column(CHAR(36), primary_key=True)
+    firma_id = db.Column(CHAR(36), nullable=False)
+
+    bakiye = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+
+    # Yaşlandırma (vadesi geçen gün dilimleri)
+    vadesi_gelmemis = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+    gecikme_0_30 = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+    gecikme_31_60 = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+    gecikme_61_90 = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+    gecikme_90_ustu = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+    vadesi_gecen_toplam = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+
+    # Müşteri çekleri (portföyde / tahsilde / protestolu / karşılıksız)
+    acik_cek_tutari = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+    vadesi_gecmis_cek_tutari = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+
+    ortalama_odeme_gunu = db.Column(db.Integer, default=0)
+    son_odeme_tarihi = db.Column(db.Date, nullable=True)
+    hareket_sayisi = db.Column(db.Integer, default=0)
+
+    # Yaşlandırmanın referans günü (dilimler bu güne göre)
+    hesaplama_tarihi = db.Column(db.Date, nullable=False)
+    guncelleme_zamani = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    __table_args__ = (
+        Index('idx_risk_ozeti_firma_vadesi_gecen', 'firma_id', 'vadesi_gecen_toplam'),
+        {'comment': 'Cari risk snapshot (yaşlandırma, çek riski, ödeme performansı)'}
+    )
+
+    @property
+    def toplam_risk(self):
+        """Limit kontrolünde kullanılan risk: bakiye + açık müşteri çekleri"""
+        return (self.bakiye or Decimal('0.00')) + (self.acik_cek_tutari or Decimal('0.00'))
+
+    def __repr__(self):
+        return f"<CariRiskOzeti {self.cari_id} bakiye={self.bakiye}>"
+
+
 # ========================================
 # EVENT LISTENERS (Otomatik İşlemler)
 # ========================================
@@ -0,0 +1,369 @@
+# app/modules/cari/odeme_analizi.py
+"""
+Cari Ödeme Analizi Motoru (Toplu / Vektörel)
+
+Ortalama ödeme günü eskiden her cari için ayrı sorgu + Python FIFO döngüsüyle
+seri hesaplanıyordu. Motor bunu küme bazlı yapar:
+
+    - Cari bölümü (BOLUM_BOYUTU cari) için borç / alacak hareketleri TEK akıtılan sorgu
+    - FIFO eşleştirme: her carinin borç ve alacakları kümülatif tutar aralıklarına
+      çevrilir, kesişen aralık parçaları searchsorted ile bulunur (döngü yok)
+    - Sonuçlar executemany UPDATE ile toplu yazılır
+    - Bölümler ProcessPoolExecutor ile paralel işçilerde çalışır
+    - Artımlı: sadece filigranından (odeme_analiz_tarihi) sonra hareketi değişen
+      cariler + açık borcu olup bugün hesaplanmamış cariler (açık borcun gecikmesi
+      hareket olmasa da her gün büyür)
+
+Kullanım:
+    OdemeAnalizMotoru.calistir(tenant_db=tenant_db, isci=4)
+    OdemeAnalizMotoru.cari_hesapla(cari_id, tenant_db=tenant_db)
+
+Sürüm geçişi: odeme_analiz_tarihi kolonu mevcut tenant veritabanlarına
+`flask cari sema-guncelle <tenant_id>` ile eklenir (idempotent).
+"""
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, bindparam, create_engine, exists, inspect, or_, select, text
+from sqlalchemy.pool import NullPool
+
+from app.modules.cari.models import CariHareket, CariHesap
+
+logger = logging.getLogger(__name__)
+
+_HAREKET = CariHareket.__table__
+_CARI = CariHesap.__table__
+
+# Sonuç kolonları (cari_hesaplar'a yazılanlar + bilgi amaçlı tutarlar)
+SONUC_KOLONLARI = ('ortalama_odeme_gunu', 'ortalama_odeme_suresi', 'gecikme_sikligi',
+                   'odeme_performansi', 'kapanan_tutar', 'kalan_borc')
+
+
+def _gun(seri):
+    """date / datetime serisi → epoch gün (int64)"""
+    return pd.to_datetime(seri).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def _kurus(seri):
+    """Tutar serisi → kuruş (int64); float toplama hatası olmadan kümülatif toplam için"""
+    return np.rint(pd.to_numeric(seri, errors='coerce').fillna(0).to_numpy(dtype=float) * 100).astype(np.int64)
+
+
+def _grup_toplami(tutar, grup, n):
+    toplam = np.zeros(n, dtype=np.int64)
+    np.add.at(toplam, grup, tutar)
+    return toplam
+
+
+def _grup_kumulatif(tutar, grup, toplam, ofset):
+    """Her grubun kendi içindeki kümülatif (başlangıç, bitiş) aralıkları, grubun global ofsetine kaydırılmış"""
+    onceki = np.concatenate(([0], np.cumsum(toplam)[:-1]))
+    bitis = np.cumsum(tutar) - onceki[grup] + ofset[grup]
+    return bitis - tutar, bitis
+
+
+def _tl(kurus):
+    return (Decimal(int(kurus)) / 100).quantize(Decimal('0.01'))
+
+
+class OdemeAnalizMotoru:
+    """Ortalama ödeme günü / süresi ve gecikme sıklığı hesaplayıcı"""
+
+    # Bir işçiye / transaction'a düşen cari sayısı
+    BOLUM_BOYUTU = 2000
+    # Akıtılan sorguda tek seferde çekilen satır
+    AKIS_PARCA = 5000
+
+    # ========================================
+    # 🧮 VEKTÖREL FIFO
+    # ========================================
+
+    @staticmethod
+    def fifo_eslestir(borclar, alacaklar, bugun=None, kalemler=False):
+        """
+        Borçları (vade sırası) alacaklarla (tarih sırası) FIFO kapatır.
+
+        Args:
+            borclar: DataFrame [cari_id, vade, tarih, tutar]  (vade/tarih: epoch gün, tutar: kuruş)
+            alacaklar: DataFrame [cari_id, tarih, tutar]
+            bugun: epoch gün; eşleşme yoksa açık borcun bugüne göre gecikmesi için
+            kalemler: True → açık (kapanmamış) borç kalemleri de döner (yaşlandırma için)
+
+        Returns:
+            DataFrame (index=cari_id): SONUC_KOLONLARI (tutarlar kuruş)
+            kalemler=True ise (sonuc, DataFrame [cari_id, vade, acik])
+        """
+        if bugun is None:
+            bugun = int(np.datetime64(date.today(), 'D').astype(np.int64))
+
+        borclar = borclar[borclar['tutar'] > 0].sort_values(['cari_id', 'vade', 'tarih'], kind='stable')
+        alacaklar = alacaklar[alacaklar['tutar'] > 0].sort_values(['cari_id', 'tarih'], kind='stable')
+
+        # Sıralı cari sözlüğü: iki tablo da cari_id sıralı olduğundan grup kodları monoton artar
+        cariler = pd.Index(np.concatenate([borclar['cari_id'].to_numpy(dtype=object),
+                                           alacaklar['cari_id'].to_numpy(dtype=object)])).unique().sort_values()
+        n = len(cariler)
+        if n == 0:
+            bos = pd.DataFrame(columns=list(SONUC_KOLONLARI))
+            return (bos, pd.DataFrame(columns=['cari_id', 'vade', 'acik'])) if kalemler else bos
+
+        b_g = cariler.get_indexer(borclar['cari_id'])
+        a_g = cariler.get_indexer(alacaklar['cari_id'])
+        b_tutar = borclar['tutar'].to_numpy(dtype=np.int64)
+        a_tutar = alacaklar['tutar'].to_numpy(dtype=np.int64)
+        b_vade = borclar['vade'].to_numpy(dtype=np.int64)
+        b_tarih = borclar['tarih'].to_numpy(dtype=np.int64)
+        a_tarih = alacaklar['tarih'].to_numpy(dtype=np.int64)
+
+        # Cariler aynı eksende çakışmasın diye her cariye max(borç, alacak) genişliğinde şerit
+        b_top = _grup_toplami(b_tutar, b_g, n)
+        a_top = _grup_toplami(a_tutar, a_g, n)
+        genislik = np.maximum(b_top, a_top)
+        ofset = np.concatenate(([0], np.cumsum(genislik)[:-1]))
+
+        b_bas, b_bit = _grup_kumulatif(b_tutar, b_g, b_top, ofset)
+        a_bas, a_bit = _grup_kumulatif(a_tutar, a_g, a_top, ofset)
+
+        # Tüm kesim noktaları → parçalar; her parça en fazla bir borç × bir alacak kesişimi
+        kesim = np.unique(np.concatenate((b_bas, b_bit, a_bas, a_bit)))
+        bas, uzunluk = kesim[:-1], np.diff(kesim)
+        i = np.searchsorted(b_bit, bas, side='right')
+        j = np.searchsorted(a_bit, bas, side='right')
+        gecerli = (i < len(b_bit)) & (j < len(a_bit)) & (uzunluk > 0)
+        i, j, bas, uzunluk = i[gecerli], j[gecerli], bas[gecerli], uzunluk[gecerli]
+        gecerli = (b_bas[i] <= bas) & (a_bas[j] <= bas) & (b_g[i] == a_g[j])
+        i, j, uzunluk = i[gecerli], j[gecerli], uzunluk[gecerli]
+
+        g = b_g[i]
+        agirlik = uzunluk.astype(float)
+        gun = a_tarih[j] - b_vade[i]
+        kapanan = np.bincount(g, weights=agirlik, minlength=n)
+        gun_puani = np.bincount(g, weights=agirlik * gun, minlength=n)
+        sure_puani = np.bincount(g, weights=agirlik * (a_tarih[j] - b_tarih[i]), minlength=n)
+        geciken = np.bincount(g, weights=agirlik * (gun > 0), minlength=n)
+
+        # Kapanmayan borçlar (eşleşme yoksa ortalama bugüne göre)
+        acik = b_tutar - np.bincount(i, weights=agirlik, minlength=len(b_tutar)).astype(np.int64)
+        kalan = np.bincount(b_g, weights=acik, minlength=n)
+        acik_puan = np.bincount(b_g, weights=acik * (bugun - b_vade).astype(float), minlength=n)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ortalama_gun = np.where(kapanan > 0, np.trunc(gun_puani / kapanan),
+                                    np.where(kalan > 0, np.trunc(acik_puan / kalan), 0))
+            ortalama_sure = np.where(kapanan > 0, np.trunc(sure_puani / kapanan), 0)
+            siklik = np.where(kapanan > 0, np.round(geciken / kapanan * 100, 2), 0)
+
+        sonuc = pd.DataFrame({
+            'ortalama_odeme_gunu': ortalama_gun.astype(np.int64),
+            'ortalama_odeme_suresi': ortalama_sure.astype(np.int64),
+            'gecikme_sikligi': siklik,
+            'kapanan_tutar': kapanan.astype(np.int64),
+            'kalan_borc': kalan.astype(np.int64),
+        }, index=cariler)
+        sonuc['odeme_performansi'] = OdemeAnalizMotoru.performans(sonuc['ortalama_odeme_gunu'])
+        sonuc = sonuc[list(SONUC_KOLONLARI)]
+        if kalemler:
+            acik_mi = acik > 0
+            return sonuc, pd.DataFrame({'cari_id': np.asarray(cariler)[b_g[acik_mi]], 'vade': b_vade[acik_mi],
+                                        'acik': acik[acik_mi]})
+        return sonuc
+
+    @staticmethod
+    def performans(ortalama_gun):
+        """Ortalama gecikme günü → HIZLI / NORMAL / YAVAS / GECİKMELİ"""
+        gun = np.asarray(ortalama_gun)
+        return np.select([gun <= 0, gun <= 15, gun <= 30], ['HIZLI', 'NORMAL', 'YAVAS'], 'GECİKMELİ')
+
+    # ========================================
+    # 📥 OKUMA / 📤 YAZMA
+    # ========================================
+
+    @classmethod
+    def hareketleri_oku(cls, conn, cari_ids):
+        """
+        Bölümdeki carilerin onaylı borç/alacak hareketleri (tek akıtılan sorgu).
+
+        Returns:
+            (borclar, alacaklar) DataFrame'leri (fifo_eslestir girdisi)
+        """
+        sorgu = (
+            select(_HAREKET.c.cari_id, _HAREKET.c.tarih, _HAREKET.c.vade_tarihi,
+                   _HAREKET.c.borc, _HAREKET.c.alacak)
+            .where(_HAREKET.c.cari_id.in_(list(cari_ids)),
+                   _HAREKET.c.durum == 'ONAYLANDI',
+                   or_(_HAREKET.c.borc > 0, _HAREKET.c.alacak > 0))
+        )
+        sonuc = conn.execution_options(yield_per=cls.AKIS_PARCA).execute(sorgu)
+        df = pd.DataFrame.from_records(list(chain.from_iterable(sonuc.partitions())),
+                                       columns=['cari_id', 'tarih', 'vade_tarihi', 'borc', 'alacak'])
+
+        tarih = _gun(df['tarih'])
+        vade = _gun(df['vade_tarihi'].fillna(df['tarih']))
+        borc, alacak = _kurus(df['borc']), _kurus(df['alacak'])
+
+        borclar = pd.DataFrame({'cari_id': df['cari_id'], 'vade': vade, 'tarih': tarih, 'tutar': borc})
+        alacaklar = pd.DataFrame({'cari_id': df['cari_id'], 'tarih': tarih, 'tutar': alacak})
+        return borclar[borc > 0], alacaklar[alacak > 0]
+
+    @staticmethod
+    def sonuclari_yaz(conn, sonuc, zaman):
+        """executemany UPDATE; zaman → carinin yeni filigranı"""
+        if sonuc.empty:
+            return 0
+        guncelle = (
+            _CARI.update()
+            .where(_CARI.c.id == bindparam('b_id'))
+            .values(ortalama_odeme_gunu=bindparam('b_gun'),
+                    ortalama_odeme_suresi=bindparam('b_sure'),
+                    gecikme_sikligi=bindparam('b_siklik'),
+                    odeme_performansi=bindparam('b_performans'),
+                    odeme_analiz_tarihi=bindparam('b_zaman'))
+        )
+        conn.execute(guncelle, [
+            {'b_id': cari_id, 'b_gun': int(s.ortalama_odeme_gunu), 'b_sure': int(s.ortalama_odeme_suresi),
+             'b_siklik': float(s.gecikme_sikligi), 'b_performans': s.odeme_performansi, 'b_zaman': zaman}
+            for cari_id, s in zip(sonuc.index, sonuc.itertuples(index=False))
+        ])
+        return len(sonuc)
+
+    @classmethod
+    def bolum_hesapla(cls, conn, cari_ids, zaman=None, bugun=None):
+        """Tek bölüm: oku → eşleştir → yaz. Hareketi olmayan cariler sıfırlanır."""
+        zaman = zaman or datetime.now()
+        borclar, alacaklar = cls.hareketleri_oku(conn, cari_ids)
+        sonuc = cls.fifo_eslestir(borclar, alacaklar, bugun=bugun)
+        bos = {'odeme_performansi': 'HIZLI', 'gecikme_sikligi': 0.0}
+        sonuc = sonuc.reindex(list(cari_ids))
+        for kolon in SONUC_KOLONLARI:
+            sonuc[kolon] = sonuc[kolon].fillna(bos.get(kolon, 0))
+        cls.sonuclari_yaz(conn, sonuc, zaman)
+        return sonuc
+
+    # ========================================
+    # 🔁 ARTIMLI SEÇİM + PARALEL ÇALIŞTIRMA
+    # ========================================
+
+    @staticmethod
+    def bekleyen_cariler(conn, firma_id=None, limit=None, tam=False):
+        """
+        Yeniden hesaplanacak aktif cariler:
+            - hiç hesaplanmamış
+            - filigranından sonra hareketi eklenen/değişen
+            - açık borcu olan (bakiye > 0) ve bugün henüz hesaplanmamış
+        """
+        sorgu = select(_CARI.c.id).where(_CARI.c.aktif.is_(True), _CARI.c.deleted_at.is_(None))
+        if firma_id:
+            sorgu = sorgu.where(_CARI.c.firma_id == str(firma_id))
+        if not tam:
+            degisen = exists().where(_HAREKET.c.cari_id == _CARI.c.id,
+                                     _HAREKET.c.updated_at > _CARI.c.odeme_analiz_tarihi)
+            bugun = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            acik_borclu = and_(_CARI.c.bakiye > 0, _CARI.c.odeme_analiz_tarihi < bugun)
+            sorgu = sorgu.where(or_(_CARI.c.odeme_analiz_tarihi.is_(None), degisen, acik_borclu))
+        sorgu = sorgu.order_by(_CARI.c.id)
+        if limit:
+            sorgu = sorgu.limit(limit)
+        return [r[0] for r in conn.execute(sorgu)]
+
+    @staticmethod
+    def sema_guncelle(conn):
+        """
+        cari_hesaplar.odeme_analiz_tarihi kolonunu yoksa ekler (idempotent).
+
+        Returns:
+            bool: Kolon eklendiyse True, zaten varsa False
+        """
+        kolonlar = {k['name'] for k in inspect(conn).get_columns(_CARI.name)}
+        if 'odeme_analiz_tarihi' in kolonlar:
+            return False
+        conn.execute(text(f"ALTER TABLE {_CARI.name} ADD COLUMN odeme_analiz_tarihi DATETIME NULL"))
+        return True
+
+    @classmethod
+    def calistir(cls, tenant_db=None, firma_id=None, limit=None, isci=1, tam=False, cari_ids=None):
+        """
+        Toplu hesaplama (gece işi / CLI).
+
+        Args:
+            isci: Paralel işçi süreci sayısı (1 → aynı süreçte, bölüm bölüm commit)
+            tam: True → filigranı yok say, tüm aktif carileri hesapla
+            cari_ids: Verilirse seçim yapılmadan sadece bu cariler
+
+        Returns:
+            dict: {'toplam_cari', 'bolum', 'isci', 'sure'}
+        """
+        if tenant_db is None:
+            from app.extensions import get_tenant_db
+            tenant_db = get_tenant_db()
+
+        baslangic = time.perf_counter()
+        # Filigran seçimden ÖNCE alınır: çalışma sırasında gelen hareketler sonraki turda yakalanır
+        zaman = datetime.now()
+        if cari_ids is None:
+            cari_ids = cls.bekleyen_cariler(tenant_db.connection(), firma_id=firma_id, limit=limit, tam=tam)
+        cari_ids = [str(c) for c in cari_ids]
+        bolumler = [cari_ids[i:i + cls.BOLUM_BOYUTU] for i in range(0, len(cari_ids), cls.BOLUM_BOYUTU)]
+
+        engine = tenant_db.get_bind()
+        paralel = isci and isci > 1 and len(bolumler) > 1 and engine.url.database not in (None, '', ':memory:')
+        logger.info(f"📊 Ödeme analizi: {len(cari_ids)} cari, {len(bolumler)} bölüm, "
+                    f"{isci if paralel else 1} işçi")
+
+        if paralel:
+            # Açık transaction işçilerin okuyacağı filigranı kilitlemesin
+            tenant_db.commit()
+            url = engine.url.render_as_string(hide_password=False)
+            with ProcessPoolExecutor(max_workers=isci) as havuz:
+                for adet in havuz.map(_bolum_isci, [url] * len(bolumler), bolumler, [zaman] * len(bolumler)):
+                    logger.debug(f"   ✅ Bölüm tamamlandı: {adet} cari")
+        else:
+            for bolum in bolumler:
+                try:
+                    cls.bolum_hesapla(tenant_db.connection(), bolum, zaman=zaman)
+                    tenant_db.commit()
+                except Exception:
+                    tenant_db.rollback()
+                    raise
+
+        sure = round(time.perf_counter() - baslangic, 2)
+        logger.info(f"✅ Ödeme analizi tamamlandı: {len(cari_ids)} cari, {sure}s")
+        return {'toplam_cari': len(cari_ids), 'bolum': len(bolumler),
+                'isci': isci if paralel else 1, 'sure': sure}
+
+    @classmethod
+    def cari_hesapla(cls, cari_id, tenant_db=None):
+        """
+        Tek cari (kayıt sonrası / ekran). Tutarlar Decimal TL olarak döner.
+        Commit çağırana bırakılır.
+        """
+        if tenant_db is None:
+            from app.extensions import get_tenant_db
+            tenant_db = get_tenant_db()
+
+        sonuc = cls.bolum_hesapla(tenant_db.connection(), [str(cari_id)]).iloc[0]
+        return {
+            'ortalama_gun': int(sonuc.ortalama_odeme_gunu),
+            'ortalama_sure': int(sonuc.ortalama_odeme_suresi),
+            'gecikme_sikligi': float(sonuc.gecikme_sikligi),
+            'odeme_performansi': sonuc.odeme_performansi,
+            'kapanan_tutar': _tl(sonuc.kapanan_tutar),
+            'kalan_borc': _tl(sonuc.kalan_borc),
+        }
+
+
+def _bolum_isci(url, cari_ids, zaman):
+    """ProcessPoolExecutor işçisi: kendi bağlantısıyla tek bölümü hesaplayıp commit eder"""
+    engine = create_engine(url, poolclass=NullPool)
+    try:
+        with engine.begin() as conn:
+            OdemeAnalizMotoru.bolum_hesapla(conn, cari_ids, zaman=zaman)
+        return len(cari_ids)
+    finally:
+        engine.dispose()
@@ -0,0 +1,314 @@
+# app/modules/cari/risk_ozeti.py
+"""
+Cari Risk Özeti Motoru (Snapshot)
+
+Risk ekranı ve fatura / sipariş limit kontrolleri her istekte cari_hareket
+üzerinde fan-out yapan aggregate sorgular çalıştırmaz; cari başına tek satırlık
+cari_risk_ozetleri tablosunu okur:
+
+    - bakiye, yaşlandırma dilimleri (FIFO ile kapanmamış borçların vadesine göre)
+    - açık / vadesi geçmiş müşteri çeki tutarı
+    - ortalama ödeme günü, son ödeme tarihi, hareket sayısı
+
+Güncelleme:
+    - CariHareket / CekSenet ekle-güncelle-sil → etkilenen cariler transaction boyunca
+      (tüm flush'lar) toplanır, commit öncesi tek seferde yeniden hesaplanır
+      (maliyet carinin kendi hareketleriyle orantılı)
+    - Yaşlandırma güne bağlı olduğundan gece tam uzlaştırma (CLI):
+      flask cari risk-ozeti <tenant_id>
+    - oku() yazmaz: satır yoksa, günü geçmişse veya carinin commit bekleyen
+      değişikliği varsa özet o cari için bellekte hesaplanır
+
+Kullanım:
+    CariRiskMotoru.oku(cari_id)                       → dict (tek satır)
+    CariRiskMotoru.limit_kontrol(cari_id, ek_tutar)   → {'asim', 'limit', 'toplam_risk', ...}
+"""
+
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, delete, event, func, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from app.enums import CekDurumu, PortfoyTipi
+from app.modules.cari.models import CariHareket, CariHesap, CariRiskOzeti
+from app.modules.cari.odeme_analizi import OdemeAnalizMotoru
+from app.modules.cek.models import CekSenet
+
+logger = logging.getLogger(__name__)
+
+_OZET = CariRiskOzeti.__table__
+_HAREKET = CariHareket.__table__
+_CARI = CariHesap.__table__
+_CEK = CekSenet.__table__
+
+_SIFIR = Decimal('0.00')
+_KIRLI_KEY = '_risk_ozeti_kirli'
+
+# (üst sınır gün, kolon) - vadesi geçen gün sayısına göre; son dilim sınırsız
+YASLANDIRMA_DILIMLERI = (
+    (0, 'vadesi_gelmemis'),
+    (30, 'gecikme_0_30'),
+    (60, 'gecikme_31_60'),
+    (90, 'gecikme_61_90'),
+    (None, 'gecikme_90_ustu'),
+)
+
+# Müşteri riski taşımaya devam eden çek durumları
+ACIK_CEK_DURUMLARI = (CekDurumu.PORTFOYDE, CekDurumu.TAHSILE_VERILDI, CekDurumu.TEMINATA_VERILDI,
+                      CekDurumu.TEMLIK_EDILDI, CekDurumu.PROTESTOLU, CekDurumu.KARSILIKSIZ)
+ODEME_TURLERI = ('TAHSILAT', 'CEK', 'SENET')
+
+
+class CariRiskMotoru:
+    """cari_risk_ozetleri bakım ve okuma servisi"""
+
+    BOLUM_BOYUTU = 2000
+
+    # ========================================
+    # 🧮 HESAPLAMA
+    # ========================================
+
+    @classmethod
+    def hesapla(cls, conn, cari_ids, bugun=None):
+        """
+        Verilen cariler için özet satırları (dict listesi, tutarlar Decimal TL).
+        Sorgular: hareketler (akıtılan) + hareket sayısı/son ödeme + çek riski + firma.
+        """
+        bugun = bugun or date.today()
+        cari_ids = [str(c) for c in cari_ids]
+        if not cari_ids:
+            return []
+        bugun_gun = int(np.datetime64(bugun, 'D').astype(np.int64))
+
+        firmalar = dict(conn.execute(select(_CARI.c.id, _CARI.c.firma_id).where(_CARI.c.id.in_(cari_ids))).all())
+
+        borclar, alacaklar = OdemeAnalizMotoru.hareketleri_oku(conn, cari_ids)
+        odeme, acik = OdemeAnalizMotoru.fifo_eslestir(borclar, alacaklar, bugun=bugun_gun, kalemler=True)
+
+        bakiye = (borclar.groupby('cari_id')['tutar'].sum()
+                  .sub(alacaklar.groupby('cari_id')['tutar'].sum(), fill_value=0))
+
+        # Açık borç kalemleri → vadesi geçen gün dilimleri
+        gecikme = bugun_gun - acik['vade'].to_numpy(dtype=np.int64)
+        sinirlar = [s for s, _ in YASLANDIRMA_DILIMLERI[:-1]]
+        acik = acik.assign(dilim=np.searchsorted(sinirlar, gecikme, side='left'))
+        dilimler = acik.groupby(['cari_id', 'dilim'])['acik'].sum().to_dict()
+
+        sayilar = {
+            r.cari_id: r for r in conn.execute(
+                select(_HAREKET.c.cari_id, func.count().label('adet'),
+                       func.max(case((_HAREKET.c.islem_turu.in_(ODEME_TURLERI) & (_HAREKET.c.alacak > 0),
+                                      _HAREKET.c.tarih))).label('son_odeme'))
+                .where(_HAREKET.c.cari_id.in_(cari_ids), _HAREKET.c.durum == 'ONAYLANDI')
+                .group_by(_HAREKET.c.cari_id)
+            )
+        }
+
+        tutar_tl = _CEK.c.tutar * func.coalesce(_CEK.c.kur, 1)
+        cekler = {
+            r.cari_id: r for r in conn.execute(
+                select(_CEK.c.cari_id,
+                       func.sum(tutar_tl).label('acik'),
+                       func.sum(case((_CEK.c.vade_tarihi < bugun, tutar_tl), else_=0)).label('vadesi_gecmis'))
+                .where(_CEK.c.cari_id.in_(cari_ids),
+                       _CEK.c.portfoy_tipi == PortfoyTipi.ALINAN,
+                       _CEK.c.cek_durumu.in_(ACIK_CEK_DURUMLARI),
+                       _CEK.c.deleted_at.is_(None))
+                .group_by(_CEK.c.cari_id)
+            )
+        }
+
+        zaman = datetime.now()
+        satirlar = []
+        for cari_id in cari_ids:
+            if cari_id not in firmalar:
+                continue
+            satir = {'cari_id': cari_id, 'firma_id': firmalar[cari_id],
+                     'bakiye': _tl(bakiye.get(cari_id, 0))}
+            for i, (_, kolon) in enumerate(YASLANDIRMA_DILIMLERI):
+                satir[kolon] = _tl(dilimler.get((cari_id, i), 0))
+            satir['vadesi_gecen_toplam'] = sum((satir[k] for _, k in YASLANDIRMA_DILIMLERI[1:]), _SIFIR)
+
+            cek = cekler.get(cari_id)
+            satir['acik_cek_tutari'] = _ondalik(cek.acik if cek else 0)
+            satir['vadesi_gecmis_cek_tutari'] = _ondalik(cek.vadesi_gecmis if cek else 0)
+
+            sayi = sayilar.get(cari_id)
+            satir['hareket_sayisi'] = int(sayi.adet) if sayi else 0
+            satir['son_odeme_tarihi'] = _tarih(sayi.son_odeme) if sayi else None
+            satir['ortalama_odeme_gunu'] = (int(odeme.at[cari_id, 'ortalama_odeme_gunu'])
+                                            if cari_id in odeme.index else 0)
+            satir['hesaplama_tarihi'] = bugun
+            satir['guncelleme_zamani'] = zaman
+            satirlar.append(satir)
+        return satirlar
+
+    @staticmethod
+    def yaz(conn, cari_ids, satirlar):
+        """Carilerin eski satırlarını silip yenilerini tek executemany ile ekler"""
+        conn.execute(delete(_OZET).where(_OZET.c.cari_id.in_([str(c) for c in cari_ids])))
+        if satirlar:
+            conn.execute(insert(_OZET), satirlar)
+        return len(satirlar)
+
+    @classmethod
+    def yenile(cls, conn, cari_ids, bugun=None):
+        """Verilen carilerin özetlerini bölüm bölüm yeniden hesaplayıp yazar"""
+        cari_ids = list(dict.fromkeys(str(c) for c in cari_ids if c))
+        adet = 0
+        for i in range(0, len(cari_ids), cls.BOLUM_BOYUTU):
+            bolum = cari_ids[i:i + cls.BOLUM_BOYUTU]
+            adet += cls.yaz(conn, bolum, cls.hesapla(conn, bolum, bugun=bugun))
+        return adet
+
+    # ========================================
+    # 🌙 GECE TAM UZLAŞTIRMA
+    # ========================================
+
+    @classmethod
+    def tam_uzlastir(cls, tenant_db=None, firma_id=None, bugun=None):
+        """
+        Tüm carilerin özetini ham kayıtlardan yeniden kurar (yaşlandırma günü kayar).
+        Bölüm başına commit; silinmiş carilerin satırları temizlenir.
+
+        Returns:
+            dict: {'toplam_cari', 'fark', 'sure'} - fark: bakiyesi/gecikmesi kayıtlıdan farklı çıkan cari
+        """
+        tenant_db = tenant_db or _tenant_db()
+        baslangic = datetime.now()
+
+        sorgu = select(_CARI.c.id).where(_CARI.c.deleted_at.is_(None)).order_by(_CARI.c.id)
+        if firma_id:
+            sorgu = sorgu.where(_CARI.c.firma_id == str(firma_id))
+        cari_ids = [r[0] for r in tenant_db.execute(sorgu)]
+
+        fark = 0
+        for i in range(0, len(cari_ids), cls.BOLUM_BOYUTU):
+            bolum = cari_ids[i:i + cls.BOLUM_BOYUTU]
+            conn = tenant_db.connection()
+            eski = {r.cari_id: (r.bakiye, r.vadesi_gecen_toplam) for r in conn.execute(
+                select(_OZET.c.cari_id, _OZET.c.bakiye, _OZET.c.vadesi_gecen_toplam)
+                .where(_OZET.c.cari_id.in_(bolum)))}
+            satirlar = cls.hesapla(conn, bolum, bugun=bugun)
+            fark += sum(1 for s in satirlar if eski.get(s['cari_id']) is None
+                        or tuple(_ondalik(v) for v in eski[s['cari_id']]) != (s['bakiye'], s['vadesi_gecen_toplam']))
+            cls.yaz(conn, bolum, satirlar)
+            tenant_db.commit()
+
+        silinen = _OZET.delete().where(~_OZET.c.cari_id.in_(select(_CARI.c.id).where(_CARI.c.deleted_at.is_(None))))
+        tenant_db.execute(silinen)
+        tenant_db.commit()
+
+        sure = round((datetime.now() - baslangic).total_seconds(), 2)
+        logger.info(f"✅ Risk özeti uzlaştırıldı: {len(cari_ids)} cari, {fark} fark, {sure}s")
+        return {'toplam_cari': len(cari_ids), 'fark': fark, 'sure': sure}
+
+    # ========================================
+    # 📖 OKUMA (TEK SATIR)
+    # ========================================
+
+    @classmethod
+    def oku(cls, cari_id, tenant_db=None):
+        """
+        Carinin risk özeti (dict). Satır yoksa, yaşlandırma günü geçmişse ya da carinin
+        bu transaction'da commit bekleyen değişikliği varsa sadece bu cari için bellekte
+        hesaplanır; okuma yolu özet tablosuna yazmaz (kilit / tekrar eden yazma yok).
+        """
+        tenant_db = tenant_db or _tenant_db()
+        cari_id = str(cari_id)
+        if cari_id not in tenant_db.info.get(_KIRLI_KEY, ()):
+            satir = tenant_db.execute(select(_OZET).where(_OZET.c.cari_id == cari_id)).mappings().first()
+            if satir is not None and satir['hesaplama_tarihi'] == date.today():
+                return dict(satir)
+        satirlar = cls.hesapla(tenant_db.connection(), [cari_id])
+        return satirlar[0] if satirlar else None
+
+    @classmethod
+    def limit_kontrol(cls, cari_id, ek_tutar=0, tenant_db=None):
+        """
+        Risk limiti kontrolü: bakiye + açık müşteri çekleri + ek_tutar (yeni belge) > limit ?
+        Limit tanımlı değilse (0) aşım yok sayılır.
+        """
+        tenant_db = tenant_db or _tenant_db()
+        ozet = cls.oku(cari_id, tenant_db=tenant_db) or {}
+        limit = _ondalik(tenant_db.execute(
+            select(_CARI.c.risk_limiti).where(_CARI.c.id == str(cari_id))).scalar())
+        toplam_risk = _ondalik(ozet.get('bakiye')) + _ondalik(ozet.get('acik_cek_tutari'))
+        yeni_risk = toplam_risk + _ondalik(ek_tutar)
+        return {
+            'asim': bool(limit > 0 and yeni_risk > limit),
+            'limit': limit,
+            'toplam_risk': toplam_risk,
+            'yeni_risk': yeni_risk,
+            'kalan_limit': limit - yeni_risk if limit > 0 else None,
+            'vadesi_gecen': _ondalik(ozet.get('vadesi_gecen_toplam')),
+            'vadesi_gecmis_cek': _ondalik(ozet.get('vadesi_gecmis_cek_tutari')),
+        }
+
+    @staticmethod
+    def yaslandirma(ozet):
+        """Özet satırından {dilim_kolonu: float} (ekran / JSON için)"""
+        return {k: float(ozet.get(k) or 0) for _, k in YASLANDIRMA_DILIMLERI} if ozet else {}
+
+
+def _ondalik(deger):
+    return Decimal(str(deger)).quantize(Decimal('0.01')) if deger is not None else _SIFIR
+
+
+def _tl(kurus):
+    return (Decimal(int(kurus)) / 100).quantize(Decimal('0.01'))
+
+
+def _tarih(deger):
+    """Sürücüden gelen date / datetime / metin → date"""
+    if deger is None:
+        return None
+    if isinstance(deger, datetime):
+        return deger.date()
+    if isinstance(deger, date):
+        return deger
+    return pd.Timestamp(deger).date()
+
+
+def _tenant_db():
+    from app.extensions import get_tenant_db
+    return get_tenant_db()
+
+
+# ========================================
+# 🔔 ORM EVENT'LERİ (etkilenen carileri işaretle → commit öncesi bir kez tazele)
+# ========================================
+
+def _isaretle(target):
+    state = inspect(target)
+    if state.session is None:
+        return
+    kirli = state.session.info.setdefault(_KIRLI_KEY, set())
+    gecmis = state.attrs.cari_id.history
+    for cari_id in (target.cari_id, *(gecmis.deleted or ())):
+        if cari_id:
+            kirli.add(str(cari_id))
+
+
+for _model in (CariHareket, CekSenet):
+    for _olay in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _olay, lambda mapper, connection, target: _isaretle(target))
+
+
+@event.listens_for(Session, 'before_commit')
+def risk_ozetlerini_tazele(session):
+    # Commit'in son flush'ındaki değişiklikler de işaretlensin
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    kirli = session.info.pop(_KIRLI_KEY, None)
+    if kirli:
+        CariRiskMotoru.yenile(session.connection(), kirli)
+
+
+@event.listens_for(Session, 'after_rollback')
+def risk_ozeti_isaretlerini_at(session):
+    session.info.pop(_KIRLI_KEY, None)
@@ -0,0 +1,434 @@
+# app/modules/cari/rota.py
+"""
+Saha Satış Rota Motoru (Vektörel)
+
+Plasiyer rotası eskiden saf Python O(n²) haversine döngüsüyle kurulan mesafe
+matrisi üzerinde açgözlü en yakın komşu turunda kalıyordu. Motor:
+
+    - Mesafe matrisi NumPy yayınlama (broadcasting) ile tek seferde hesaplanır
+    - Matris müşteri kümesi bazında process içi LRU'da tutulur (başlangıç noktası hariç)
+    - En yakın komşu turu 2-opt / Or-opt hamleleriyle süre bütçesi içinde iyileştirilir
+      (her turda tüm hamlelerin kazancı tek matris işlemiyle bulunur)
+    - İsteğe bağlı çok araç: önce tek tur, sonra yüke göre ardışık dilimlere bölme
+    - İsteğe bağlı zaman penceresi: gecikme dakikası ceza olarak amaç fonksiyonuna eklenir
+
+Düğüm düzeni (yerel matris): 0 = başlangıç, 1..n = duraklar, n+1 = bitiş
+(dönüşlü rotada başlangıcın kopyası, açık rotada her yere 0 km sanal düğüm).
+
+Kullanım:
+    sonuc = RotaMotoru.coz((41.01, 28.97), [(41.02, 28.98), ...], arac_sayisi=2)
+    sonuc['rotalar']  # [[durak_idx, ...], ...]
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DUNYA_YARICAPI_KM = 6371.0
+
+
+def haversine_matrisi(kaynak, hedef=None):
+    """
+    Koordinat dizileri arası büyük daire mesafeleri (km).
+
+    Args:
+        kaynak: (n, 2) [enlem, boylam] derece
+        hedef: (m, 2); verilmezse kaynak × kaynak
+
+    Returns:
+        (n, m) float64 matris
+    """
+    kaynak = np.radians(np.asarray(kaynak, dtype=float).reshape(-1, 2))
+    hedef = kaynak if hedef is None else np.radians(np.asarray(hedef, dtype=float).reshape(-1, 2))
+    enlem1, boylam1 = kaynak[:, 0:1], kaynak[:, 1:2]
+    enlem2, boylam2 = hedef[:, 0], hedef[:, 1]
+
+    a = (np.sin((enlem2 - enlem1) / 2) ** 2
+         + np.cos(enlem1) * np.cos(enlem2) * np.sin((boylam2 - boylam1) / 2) ** 2)
+    return 2 * DUNYA_YARICAPI_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class RotaMotoru:
+    """Plasiyer (TSP / çok araçlı) rota çözücü"""
+
+    # Ortalama şehir içi hız ve durak başına ziyaret süresi
+    ORTALAMA_HIZ_KMS = 40
+    ZIYARET_DK = 30
+    # İyileştirme için varsayılan süre bütçesi (saniye)
+    SURE_BUTCESI = 1.0
+    # Zaman penceresinde 1 dakika gecikmenin km karşılığı
+    GECIKME_CEZASI_KM = 10.0
+    # Or-opt ile taşınan ardışık durak dizisi uzunlukları
+    OR_OPT_BOYUTLARI = (1, 2, 3)
+    # Pencereli rotada tam takvimle denenecek en iyi aday hamle sayısı
+    PENCERE_ADAY = 20
+    # Process içi mesafe matrisi sayısı (LRU)
+    MATRIS_LIMIT = 32
+
+    _matrisler = OrderedDict()  # {küme_anahtarı: kanonik sıralı matris}
+    _lock = threading.Lock()
+    _istatistik = {'isabet': 0, 'iska': 0}
+
+    # ========================================
+    # 📏 MESAFE MATRİSİ (ÖNBELLEKLİ)
+    # ========================================
+
+    @classmethod
+    def matris(cls, konumlar):
+        """
+        Durak × durak mesafe matrisi (km), müşteri kümesi bazında önbellekli.
+
+        Aynı küme farklı sırayla gelse de tek kayıt kullanılır: matris koordinatların
+        kanonik (sıralı) düzeninde saklanır, çağrının sırasına geri dizilir.
+        """
+        konumlar = np.round(np.asarray(konumlar, dtype=float).reshape(-1, 2), 6)
+        sira = np.lexsort((konumlar[:, 1], konumlar[:, 0]))
+        kanonik = konumlar[sira]
+        anahtar = hashlib.sha1(kanonik.tobytes()).hexdigest()
+
+        with cls._lock:
+            matris = cls._matrisler.get(anahtar)
+            if matris is not None:
+                cls._matrisler.move_to_end(anahtar)
+                cls._istatistik['isabet'] += 1
+
+        if matris is None:
+            matris = haversine_matrisi(kanonik)
+            matris.setflags(write=False)
+            with cls._lock:
+                cls._istatistik['iska'] += 1
+                cls._matrisler[anahtar] = matris
+                while len(cls._matrisler) > cls.MATRIS_LIMIT:
+                    cls._matrisler.popitem(last=False)
+
+        geri = np.empty_like(sira)
+        geri[sira] = np.arange(len(sira))
+        return matris[np.ix_(geri, geri)]
+
+    @classmethod
+    def onbellek_durumu(cls):
+        with cls._lock:
+            return dict(cls._istatistik, kayit=len(cls._matrisler))
+
+    @classmethod
+    def onbellek_temizle(cls):
+        with cls._lock:
+            cls._matrisler.clear()
+            cls._istatistik.update(isabet=0, iska=0)
+
+    # ========================================
+    # 🧭 ÇÖZÜM
+    # ========================================
+
+    @classmethod
+    def coz(cls, baslangic, konumlar, arac_sayisi=1, pencereler=None, oncelikler=None,
+            donus=False, ziyaret_dk=None, sure_butcesi=None):
+        """
+        Args:
+            baslangic: (enlem, boylam) başlangıç (ofis / plasiyerin anlık konumu)
+            konumlar: [(enlem, boylam), ...] duraklar
+            arac_sayisi: plasiyer / araç sayısı (duraklar ardışık dilimlere bölünür)
+            pencereler: durak başına (erken_dk, gec_dk) veya None; dakika, rota başlangıcına göre
+            oncelikler: durak başına öncelik puanı; yüksek puanlı durağa giden yol
+                        max(0.5, 1 - puan/100) katsayısıyla "kısalır" (önce ziyaret edilir)
+            donus: True → her araç başlangıca geri döner
+            ziyaret_dk: durak başına ziyaret süresi (varsayılan ZIYARET_DK)
+            sure_butcesi: iyileştirme süresi (saniye, varsayılan SURE_BUTCESI)
+
+        Returns:
+            dict: rotalar (durak indeksleri), bacak_km, varis_dk, arac_km, toplam_km,
+                  gecikme_dk, ilk_tur_km, iyilestirme_yuzde, hamle, sure_ms
+        """
+        bas = time.perf_counter()
+        ziyaret_dk = cls.ZIYARET_DK if ziyaret_dk is None else ziyaret_dk
+        butce = cls.SURE_BUTCESI if sure_butcesi is None else sure_butcesi
+        n = len(konumlar)
+        if n == 0:
+            return {'rotalar': [], 'bacak_km': [], 'varis_dk': [], 'arac_km': [], 'toplam_km': 0.0,
+                    'gecikme_dk': 0.0, 'ilk_tur_km': 0.0, 'iyilestirme_yuzde': 0.0, 'hamle': 0, 'sure_ms': 0.0}
+
+        # Tam matris: 0 başlangıç, 1..n duraklar, n+1 bitiş
+        D = np.zeros((n + 2, n + 2))
+        D[1:n + 1, 1:n + 1] = cls.matris(konumlar)
+        depo = haversine_matrisi([baslangic], konumlar)[0]
+        D[0, 1:n + 1] = D[1:n + 1, 0] = depo
+        if donus:
+            D[n + 1, 1:n + 1] = D[1:n + 1, n + 1] = depo
+
+        # Amaç matrisi: öncelikte hedef sütunu ölçeklenir (asimetrik olabilir)
+        W = D
+        if oncelikler is not None:
+            carpan = np.ones(n + 2)
+            carpan[1:n + 1] = np.maximum(0.5, 1 - np.asarray(oncelikler, dtype=float) / 100)
+            W = D * carpan[None, :]
+
+        erken = np.zeros(n + 2)
+        gec = np.full(n + 2, np.inf)
+        if pencereler is not None:
+            for i, pencere in enumerate(pencereler, 1):
+                if pencere:
+                    erken[i] = pencere[0] if pencere[0] is not None else 0
+                    gec[i] = pencere[1] if pencere[1] is not None else np.inf
+        takvim = (erken, gec, ziyaret_dk) if np.isfinite(gec).any() or erken.any() else None
+
+        # 1) Tek büyük tur → 2) araçlara dilimle → 3) her dilimi iyileştir
+        tur = cls._en_yakin_komsu(W)
+        if takvim is not None:
+            tur = min((tur, np.argsort(gec[1:n + 1], kind='stable') + 1),
+                      key=lambda t: cls._maliyet(D, W, cls._yol(t, n), takvim))
+        dilimler = cls._bol(D, tur, max(1, min(int(arac_sayisi or 1), n)), ziyaret_dk)
+
+        rotalar, bacaklar, varislar, arac_km = [], [], [], []
+        ilk_km, hamle, gecikme = 0.0, 0, 0.0
+        bitis = time.perf_counter() + butce
+        for k, dilim in enumerate(dilimler):
+            yerel = np.concatenate(([0], dilim, [n + 1]))
+            d, w = D[np.ix_(yerel, yerel)], W[np.ix_(yerel, yerel)]
+            yerel_takvim = (erken[yerel], gec[yerel], ziyaret_dk) if takvim is not None else None
+            yol = np.arange(len(yerel))
+            ilk_km += float(d[yol[:-1], yol[1:]].sum())
+
+            # Kalan bütçe kalan araçlara eşit paylaştırılır
+            dilim_bitis = time.perf_counter() + max(0.0, bitis - time.perf_counter()) / (len(dilimler) - k)
+            yol, sayi = cls._iyilestir(d, w, yol, yerel_takvim, dilim_bitis)
+            hamle += sayi
+
+            bacak = d[yol[:-1], yol[1:]]
+            if not donus:
+                bacak = bacak[:-1]
+            varis, gecikme_k = cls._takvim(d, yol, (erken[yerel], gec[yerel], ziyaret_dk))
+            rotalar.append([int(yerel[i]) - 1 for i in yol[1:-1]])
+            bacaklar.append([round(float(x), 3) for x in bacak])
+            varislar.append([round(float(x), 1) for x in varis])
+            arac_km.append(round(float(bacak.sum()), 3))
+            gecikme += gecikme_k
+
+        toplam = float(sum(arac_km))
+        return {
+            'rotalar': rotalar,
+            'bacak_km': bacaklar,
+            'varis_dk': varislar,
+            'arac_km': arac_km,
+            'toplam_km': round(toplam, 3),
+            'gecikme_dk': round(gecikme, 1),
+            'ilk_tur_km': round(ilk_km, 3),
+            'iyilestirme_yuzde': round((ilk_km - toplam) / ilk_km * 100, 2) if ilk_km else 0.0,
+            'hamle': hamle,
+            'sure_ms': round((time.perf_counter() - bas) * 1000, 2),
+        }
+
+    # ========================================
+    # 🔧 YARDIMCILAR
+    # ========================================
+
+    @staticmethod
+    def _yol(tur, n):
+        return np.concatenate(([0], tur, [n + 1]))
+
+    @staticmethod
+    def _en_yakin_komsu(W):
+        """Başlangıçtan en yakın komşu turu (bitiş düğümü hariç durak sırası)"""
+        n = len(W) - 2
+        kalan = np.ones(n + 2, dtype=bool)
+        kalan[[0, n + 1]] = False
+        tur = np.empty(n, dtype=np.int64)
+        mevcut = 0
+        for k in range(n):
+            satir = np.where(kalan, W[mevcut], np.inf)
+            mevcut = int(np.argmin(satir))
+            tur[k] = mevcut
+            kalan[mevcut] = False
+        return tur
+
+    @classmethod
+    def _bol(cls, D, tur, arac_sayisi, ziyaret_dk):
+        """Büyük turu sürüş + ziyaret yüküne göre ardışık, boş olmayan dilimlere böler"""
+        if arac_sayisi == 1:
+            return [tur]
+        yol = np.concatenate(([0], tur))
+        yuk = D[yol[:-1], yol[1:]] + ziyaret_dk * cls.ORTALAMA_HIZ_KMS / 60
+        kumulatif = np.cumsum(yuk)
+        hedefler = kumulatif[-1] * np.arange(1, arac_sayisi) / arac_sayisi
+        kesim = np.searchsorted(kumulatif, hedefler) + 1
+        # Her araca en az bir durak: k. kesim [önceki + 1, kalan araçlara yetecek son konum]
+        onceki = 0
+        for k in range(len(kesim)):
+            kesim[k] = onceki = min(max(kesim[k], onceki + 1), len(tur) - (arac_sayisi - 1 - k))
+        return np.split(tur, kesim)
+
+    @classmethod
+    def _takvim(cls, D, yol, takvim):
+        """Durak varış dakikaları ve toplam gecikme (dk)"""
+        erken, gec, ziyaret_dk = takvim
+        dakika_km = 60.0 / cls.ORTALAMA_HIZ_KMS
+        t, gecikme, varis = 0.0, 0.0, []
+        for k in range(1, len(yol) - 1):
+            t = max(t + D[yol[k - 1], yol[k]] * dakika_km, erken[yol[k]])
+            varis.append(t)
+            gecikme += max(0.0, t - gec[yol[k]])
+            t += ziyaret_dk
+        return varis, gecikme
+
+    @classmethod
+    def _maliyet(cls, D, W, yol, takvim):
+        maliyet = float(W[yol[:-1], yol[1:]].sum())
+        if takvim is not None:
+            maliyet += cls.GECIKME_CEZASI_KM * cls._takvim(D, yol, takvim)[1]
+        return maliyet
+
+    @staticmethod
+    def _iki_opt_kazanclari(W, yol):
+        """
+        Tüm (i, j) 2-opt hamlelerinin (yol[i..j] ters çevir) maliyet farkı matrisi.
+        Asimetrik W için ters çevrilen iç kenarların farkı önek toplamlarıyla eklenir.
+        """
+        m = len(yol)
+        ileri = np.concatenate(([0.0], np.cumsum(W[yol[:-1], yol[1:]])))
+        geri = np.concatenate(([0.0], np.cumsum(W[yol[1:], yol[:-1]])))
+        i = np.arange(1, m - 2)[:, None]
+        j = np.arange(m - 1)[None, :]  # bitiş düğümü ters çevrilmez
+        onceki, bas, son, sonraki = yol[i - 1], yol[i], yol[j], yol[j + 1]
+        fark = (W[onceki, son] + W[bas, sonraki] - W[onceki, bas] - W[son, sonraki]
+                + (geri[j] - geri[i]) - (ileri[j] - ileri[i]))
+        return np.where(j > i, fark, np.inf)
+
+    @staticmethod
+    def _or_opt_kazanclari(W, yol, boy):
+        """Tüm (i, j) Or-opt hamlelerinin (yol[i:i+boy] dizisini yol[j]'den sonraya taşı) maliyet farkı"""
+        m = len(yol)
+        i = np.arange(1, m - boy)[:, None]  # dizi bitiş düğümünü içeremez
+        j = np.arange(m - 1)[None, :]
+        bas, son = yol[i], yol[i + boy - 1]
+        kazanc = W[yol[i - 1], bas] + W[son, yol[i + boy]] - W[yol[i - 1], yol[i + boy]]
+        ekleme = W[yol[j], bas] + W[son, yol[j + 1]] - W[yol[j], yol[j + 1]]
+        return np.where((j < i - 1) | (j > i + boy - 1), ekleme - kazanc, np.inf)
+
+    @staticmethod
+    def _uygula(yol, hamle):
+        tur, i, j, boy = hamle
+        yeni = yol.copy()
+        if tur == '2opt':
+            yeni[i:j + 1] = yeni[i:j + 1][::-1]
+            return yeni
+        dizi = yol[i:i + boy]
+        kalan = np.concatenate((yol[:i], yol[i + boy:]))
+        konum = j + 1 if j < i else j - boy + 1
+        return np.concatenate((kalan[:konum], dizi, kalan[konum:]))
+
+    @classmethod
+    def _adaylar(cls, W, yol, sayi):
+        """İyileştiren en iyi `sayi` hamle [(fark, hamle), ...] (küçükten büyüğe)"""
+        adaylar = []
+        kume = [('2opt', cls._iki_opt_kazanclari(W, yol), 0)]
+        kume += [('oropt', cls._or_opt_kazanclari(W, yol, boy), boy)
+                 for boy in cls.OR_OPT_BOYUTLARI if len(yol) - boy > 1]
+        for tur, fark, boy in kume:
+            if fark.size == 0:
+                continue
+            duz = fark.ravel()
+            en_iyi = np.argpartition(duz, min(sayi, duz.size) - 1)[:sayi] if duz.size > sayi else np.arange(duz.size)
+            for k in en_iyi:
+                if duz[k] < -1e-9:
+                    i, j = divmod(int(k), fark.shape[1])
+                    # Satır 0 ↔ yol[1] (başlangıç düğümü taşınmaz)
+                    adaylar.append((float(duz[k]), (tur, i + 1, j, boy)))
+        adaylar.sort(key=lambda a: a[0])
+        return adaylar[:sayi]
+
+    @classmethod
+    def _iyilestir(cls, D, W, yol, takvim, bitis):
+        """2-opt / Or-opt yerel arama; süre dolunca veya yerel optimumda durur"""
+        hamle = 0
+        if len(yol) < 4:
+            return yol, hamle
+        maliyet = cls._maliyet(D, W, yol, takvim) if takvim is not None else None
+        while time.perf_counter() < bitis:
+            adaylar = cls._adaylar(W, yol, cls.PENCERE_ADAY if takvim is not None else 1)
+            secilen = None
+            for _, aday in adaylar:
+                yeni = cls._uygula(yol, aday)
+                if takvim is None:
+                    secilen = yeni
+                    break
+                yeni_maliyet = cls._maliyet(D, W, yeni, takvim)
+                if yeni_maliyet < maliyet - 1e-9:
+                    secilen, maliyet = yeni, yeni_maliyet
+                    break
+            if secilen is None:
+                break
+            yol = secilen
+            hamle += 1
+        return yol, hamle
+
+    # ========================================
+    # 📊 BENCHMARK
+    # ========================================
+
+    @classmethod
+    def benchmark(cls, durak=300, arac=3, sure_butcesi=2.0, tohum=42):
+        """
+        Eski yol (saf Python haversine matrisi + en yakın komşu) ile vektörel matris,
+        önbellek isabeti ve 2-opt/Or-opt iyileştirmesini sentetik koordinatlarla karşılaştırır.
+        Ağ / veritabanı gerekmez.
+        """
+        from math import asin, cos, radians, sin, sqrt
+
+        rnd = np.random.default_rng(tohum)
+        baslangic = (41.0082, 28.9784)
+        konumlar = np.column_stack((rnd.uniform(40.85, 41.20, durak), rnd.uniform(28.60, 29.35, durak)))
+        liste = konumlar.tolist()
+
+        def _haversine(lat1, lon1, lat2, lon2):
+            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+            a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+            return DUNYA_YARICAPI_KM * 2 * asin(sqrt(a))
+
+        def _eski():
+            n = len(liste)
+            matris = [[0.0] * n for _ in range(n)]
+            for i in range(n):
+                for j in range(n):
+                    if i != j:
+                        matris[i][j] = _haversine(liste[i][0], liste[i][1], liste[j][0], liste[j][1])
+            kalan = set(range(n))
+            mevcut = min(kalan, key=lambda i: _haversine(*baslangic, *liste[i]))
+            toplam = _haversine(*baslangic, *liste[mevcut])
+            kalan.remove(mevcut)
+            while kalan:
+                sonraki = min(kalan, key=lambda i: matris[mevcut][i])
+                toplam += matris[mevcut][sonraki]
+                kalan.remove(sonraki)
+                mevcut = sonraki
+            return toplam
+
+        def _olc(f):
+            bas = time.perf_counter()
+            sonuc = f()
+            return sonuc, round((time.perf_counter() - bas) * 1000, 2)
+
+        eski_km, eski_ms = _olc(_eski)
+        cls.onbellek_temizle()
+        _, matris_ms = _olc(lambda: cls.matris(konumlar))
+        _, onbellek_ms = _olc(lambda: cls.matris(konumlar[::-1]))
+        tek = cls.coz(baslangic, liste, sure_butcesi=sure_butcesi)
+        cok = cls.coz(baslangic, liste, arac_sayisi=arac, sure_butcesi=sure_butcesi)
+        return {
+            'durak': durak,
+            'eski_matris_nn_ms': eski_ms,
+            'vektorel_matris_ms': matris_ms,
+            'onbellek_matris_ms': onbellek_ms,
+            'eski_tur_km': round(eski_km, 2),
+            'ilk_tur_km': tek['ilk_tur_km'],
+            'iyilestirilmis_km': tek['toplam_km'],
+            'iyilestirme_yuzde': tek['iyilestirme_yuzde'],
+            'hamle': tek['hamle'],
+            'cozum_ms': tek['sure_ms'],
+            f'{arac}_arac_km': cok['arac_km'],
+            'fark': f"{eski_ms / matris_ms:.1f}x" if matris_ms else '-',
+        }
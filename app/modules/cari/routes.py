@@ -11,12 +11,17 @@ from sqlalchemy import func, and_, or_, cast, String, text
 from sqlalchemy.dialects.mysql import CHAR
 
 from app.modules.cari.models import CariHesap, CariHareket, CRMHareket
+from app.modules.cari.ekstre import CariEkstreMotoru, tarih_coz
+from app.modules.cari.rota import RotaMotoru
+from app.modules.cari import risk_ozeti  # noqa: F401 (risk özeti event'leri kaydı)
 from app.modules.fatura.models import Fatura
 from app.modules.lokasyon.models import Sehir, Ilce  
 from app.enums import FaturaTuru
 from app.form_builder import DataGrid
+from app.form_builder.lookup import LookupRegistry
 from .forms import create_cari_form
 from app.extensions import db, get_tenant_db, cache, get_tenant_info
+from app.services.tenant_cache import TenantCache
 from app.decorators import audit_log, protected_route, permission_required, tenant_route
 from flask_babel import gettext as _, lazy_gettext
 
@@ -448,28 +453,27 @@ def ekstre(id):
             return f"Hata: Cari bulundu ({exists_without_firma.unvan}) ancak firma_id ({exists_without_firma.firma_id}) mevcut kullanıcı ({current_user.firma_id}) ile uyuşmuyor."
         return f"Hata: {id} ID'li cari veritabanında hiç bulunamadı.", 404
 
-    # 1. Hareketleri çek ve bakiyeyi hesapla
-    hareketler = tenant_db.query(CariHareket).filter_by(cari_id=id).order_by(CariHareket.tarih.asc()).all()
-    
-    yuruyen_bakiye = 0
-    for h in hareketler:
-        yuruyen_bakiye += (h.borc or 0) - (h.alacak or 0)
-        h.yuruyen_bakiye = yuruyen_bakiye
+    # 1. Pencere: varsayılan yıl başı → bugün (devir tek SUM sorgusuyla gelir)
+    bugun = datetime.now().date()
+    baslangic = tarih_coz(request.args.get('baslangic')) or bugun.replace(month=1, day=1)
+    bitis = tarih_coz(request.args.get('bitis')) or bugun
+    motor = CariEkstreMotoru(cari.id, baslangic, bitis, tenant_db=tenant_db)
 
-    # 2. Sayfalandırma yapısı
-    sayfalar = [{
-        'sayfa_no': 1,
-        'hareketler': hareketler,
-        'devreden_bakiye': 0,
-        'son_sayfa_mi': True
-    }]
-    
-    # ✨ TOPLAMLARI MANUEL HESAPLIYORUZ (HATA PAYINI SIFIRLAMAK İÇİN)
-    toplam_borc = sum(h.borc or 0 for h in hareketler)
-    toplam_alacak = sum(h.alacak or 0 for h in hareketler)
-    net_bakiye = toplam_borc - toplam_alacak
+    # Dışa aktarım: pencere satırları akıtılır (büyükse arka plan işi)
+    format_ = request.args.get('format')
+    if format_:
+        from app.modules.rapor.stream_export import export_or_enqueue, EXPORT_FORMATS
+        from app.modules.rapor import export_sources  # noqa: F401 (kaynak kayıtları)
+        if format_ not in EXPORT_FORMATS:
+            return jsonify({'error': 'Geçersiz format'}), 400
+        params = {'cari_id': str(cari.id), 'baslangic': baslangic.isoformat(), 'bitis': bitis.isoformat()}
+        return export_or_enqueue('cari_ekstre', params, format_, f"ekstre_{cari.kod}_{baslangic:%Y%m%d}_{bitis:%Y%m%d}")
+
+    # 2. Yazdırma sayfaları (yürüyen bakiye SQL'de, her sayfada devreden bakiye)
+    sayfalar = motor.baski_sayfalari()
+    toplamlar = motor.toplamlar()
 
-    # 3. Belge Üreticiye bu manuel hesapları gönderiyoruz
+    # 3. Belge Üreticiye pencere toplamlarını gönderiyoruz
     from app.modules.rapor.doc_engine import DocumentGenerator
     try:
         doc_gen = DocumentGenerator(current_user.firma_id)
@@ -478,13 +482,14 @@ def ekstre(id):
             veri_objesi=cari, 
             ekstra_context={
                 'sayfalar': sayfalar,
-                'filtre_baslangic': request.args.get('baslangic', '01.01.2024'),
-                'filtre_bitis': request.args.get('bitis', datetime.now().strftime('%d.%m.%Y')),
+                'filtre_baslangic': baslangic.strftime('%d.%m.%Y'),
+                'filtre_bitis': bitis.strftime('%d.%m.%Y'),
                 'su_an': datetime.now(),
+                'devir_bakiye': toplamlar['devir'],
                 # ✨ ŞABLONUN DOĞRU GÖRMESİ İÇİN BURAYA EKLEDİK:
-                'manuel_borc': toplam_borc,
-                'manuel_alacak': toplam_alacak,
-                'manuel_bakiye': net_bakiye
+                'manuel_borc': toplamlar['borc'],
+                'manuel_alacak': toplamlar['alacak'],
+                'manuel_bakiye': toplamlar['kapanis']
             }
         )
     except Exception as e:
@@ -496,14 +501,19 @@ def ekstre(id):
 # ========================================
 @cari_bp.route('/api/siradaki-kod')
 @login_required
-@cache.cached(timeout=60, key_prefix='cari_siradaki_kod')
 def api_siradaki_kod():
     """
-    Sıradaki cari kodunu üret (Cached - 60 saniye)
+    Sıradaki cari kodunu üret (Cached - 60 saniye, tenant + firma bazlı)
     
     Returns:
         JSON: {'code': 'C-0001'}
     """
+    return jsonify({'code': TenantCache.get_or_set(
+        'cari', f"siradaki_kod:{current_user.firma_id}", _siradaki_cari_kodu, timeout=60, stale=0
+    )})
+
+
+def _siradaki_cari_kodu():
     tenant_db = get_tenant_db()
     
     try:
@@ -523,11 +533,11 @@ def api_siradaki_kod():
             except:
                 pass
         
-        return jsonify({'code': yeni})
+        return yeni
     
     except Exception as e:
         logger.error(f"❌ Kod üretme hatası: {e}")
-        return jsonify({'code': 'C-0001'})
+        return 'C-0001'
 
 
 # ========================================
@@ -537,7 +547,7 @@ def api_siradaki_kod():
 @login_required
 def api_get_ilceler():
     """
-    Seçilen şehre göre ilçeleri getir (Cached)
+    Seçilen şehre göre ilçeleri getir (LookupRegistry cache)
     
     Query Params:
         parent_id: Şehir ID
@@ -553,26 +563,10 @@ def api_get_ilceler():
     if not sehir_id or not tenant_db:
         return jsonify([])
     
-    # Cache key
-    cache_key = f"ilceler:{sehir_id}"
-    
-    # Cache'ten kontrol et
-    cached_result = cache.get(cache_key)
-    if cached_result:
-        return jsonify(cached_result)
-    
     try:
-        # ✅ MySQL Query
-        ilceler = tenant_db.query(Ilce).filter_by(
-            sehir_id=sehir_id
-        ).order_by(Ilce.ad).all()
-        
-        result = [{'id': str(i.id), 'text': i.ad} for i in ilceler]
-        
-        # Cache'e kaydet (30 dakika)
-        cache.set(cache_key, result, timeout=CACHE_TIMEOUT_MEDIUM)
-        
-        return jsonify(result)
+        # LookupRegistry 'ilce' kaynağı (cari formu ile aynı tenant bazlı cache)
+        ilceler = LookupRegistry.satirlar('ilce', tenant_db=tenant_db, sehir_id=sehir_id)
+        return jsonify([{'id': str(i_id), 'text': ad} for i_id, ad in ilceler])
     
     except Exception as e:
         logger.error(f"❌ İlçe API hatası: {e}")
@@ -643,17 +637,18 @@ def api_risk_hesapla():
     try:
         # ✅ Tüm query'lere deleted_at kontrolü eklendi
         
-        # 1. YÜKSEK RİSKLİ MÜŞTERİLER
+        # 1. YÜKSEK RİSKLİ MÜŞTERİLER (hareket fan-out'u yok: cari başına tek özet satırı)
         high_risk_query = text("""
             SELECT 
                 ch.id, ch.kod, ch.unvan, ch.bakiye, ch.risk_skoru,
                 ch.risk_durumu, ch.churn_riski, ch.toplam_ciro,
                 ch.son_siparis_tarihi,
-                COUNT(DISTINCT h.id) as hareket_sayisi,
-                SUM(CASE WHEN h.vade_tarihi < CURDATE() AND h.durum = 'ONAYLANDI' 
-                    THEN h.borc - h.alacak ELSE 0 END) as vadesi_gecen_borc
+                COALESCE(ro.hareket_sayisi, 0) as hareket_sayisi,
+                COALESCE(ro.vadesi_gecen_toplam, 0) as vadesi_gecen_borc,
+                COALESCE(ro.vadesi_gecmis_cek_tutari, 0) as vadesi_gecmis_cek,
+                ro.ortalama_odeme_gunu, ro.son_odeme_tarihi
             FROM cari_hesaplar ch
-            LEFT JOIN cari_hareket h ON h.cari_id = ch.id
+            LEFT JOIN cari_risk_ozetleri ro ON ro.cari_id = ch.id
             WHERE ch.firma_id = :firma_id
             AND ch.deleted_at IS NULL
             AND (
@@ -662,8 +657,6 @@ def api_risk_hesapla():
                 OR ch.risk_durumu IN ('RİSKLİ', 'KARA_LİSTE')
                 OR ch.bakiye > ch.risk_limiti
             )
-            GROUP BY ch.id, ch.kod, ch.unvan, ch.bakiye, ch.risk_skoru, 
-                     ch.risk_durumu, ch.churn_riski, ch.toplam_ciro, ch.son_siparis_tarihi
             ORDER BY ch.risk_skoru DESC, ch.churn_riski DESC
             LIMIT 50
         """)
@@ -716,17 +709,21 @@ def api_risk_hesapla():
             {'firma_id': current_user.firma_id}
         ).fetchall()
         
-        # 4. ÖZET İSTATİSTİKLER
+        # 4. ÖZET İSTATİSTİKLER (cari 1:1 özet → COUNT DISTINCT gerekmez)
         stats_query = text("""
             SELECT 
-                COUNT(DISTINCT ch.id) as toplam_cari,
-                COUNT(DISTINCT CASE WHEN ch.risk_skoru >= 70 THEN ch.id END) as yuksek_risk,
-                COUNT(DISTINCT CASE WHEN ch.churn_riski >= 60 THEN ch.id END) as churn_risk,
+                COUNT(ch.id) as toplam_cari,
+                SUM(CASE WHEN ch.risk_skoru >= 70 THEN 1 ELSE 0 END) as yuksek_risk,
+                SUM(CASE WHEN ch.churn_riski >= 60 THEN 1 ELSE 0 END) as churn_risk,
                 SUM(CASE WHEN ch.bakiye > 0 THEN ch.bakiye ELSE 0 END) as toplam_alacak,
-                SUM(CASE WHEN h.vade_tarihi < CURDATE() AND h.durum = 'ONAYLANDI' 
-                    THEN h.borc - h.alacak ELSE 0 END) as vadesi_gecen_toplam
+                SUM(COALESCE(ro.vadesi_gecen_toplam, 0)) as vadesi_gecen_toplam,
+                SUM(COALESCE(ro.gecikme_0_30, 0)) as gecikme_0_30,
+                SUM(COALESCE(ro.gecikme_31_60, 0)) as gecikme_31_60,
+                SUM(COALESCE(ro.gecikme_61_90, 0)) as gecikme_61_90,
+                SUM(COALESCE(ro.gecikme_90_ustu, 0)) as gecikme_90_ustu,
+                SUM(COALESCE(ro.vadesi_gecmis_cek_tutari, 0)) as vadesi_gecmis_cek
             FROM cari_hesaplar ch
-            LEFT JOIN cari_hareket h ON h.cari_id = ch.id
+            LEFT JOIN cari_risk_ozetleri ro ON ro.cari_id = ch.id
             WHERE ch.firma_id = :firma_id
             AND ch.deleted_at IS NULL
         """)
@@ -750,7 +747,10 @@ def api_risk_hesapla():
                 'toplam_ciro': float(r[7] or 0),
                 'son_siparis': r[8].strftime('%d.%m.%Y') if r[8] else 'Yok',
                 'hareket_sayisi': r[9],
-                'vadesi_gecen': float(r[10] or 0)
+                'vadesi_gecen': float(r[10] or 0),
+                'vadesi_gecmis_cek': float(r[11] or 0),
+                'ortalama_odeme_gunu': r[12],
+                'son_odeme': r[13].strftime('%d.%m.%Y') if r[13] else 'Yok'
             })
         
         overdue_data = []
@@ -816,7 +816,14 @@ def api_risk_hesapla():
                     'yuksek_risk_sayisi': stats[1],
                     'churn_risk_sayisi': stats[2],
                     'toplam_alacak': float(stats[3] or 0),
-                    'vadesi_gecen_toplam': float(stats[4] or 0)
+                    'vadesi_gecen_toplam': float(stats[4] or 0),
+                    'yaslandirma': {
+                        'gecikme_0_30': float(stats[5] or 0),
+                        'gecikme_31_60': float(stats[6] or 0),
+                        'gecikme_61_90': float(stats[7] or 0),
+                        'gecikme_90_ustu': float(stats[8] or 0)
+                    },
+                    'vadesi_gecmis_cek': float(stats[9] or 0)
                 },
                 'oneriler': oneriler
             }
@@ -891,13 +898,13 @@ def api_rota_olustur():
     """
     AI Rota Optimizasyonu - Profesyonel Versiyon
     
-    Google OR-Tools veya basit heuristic kullanarak
-    Travelling Salesman Problem (TSP) çözümü
+    Travelling Salesman Problem (TSP) çözümü (bkz. RotaMotoru)
     
     Algoritma:
-    1. Nearest Neighbor (En yakın komşu)
-    2. 2-opt iyileştirme
-    3. Mesafe matrisi hesaplama (Haversine)
+    1. Mesafe matrisi hesaplama (vektörel Haversine, müşteri kümesi bazında önbellekli)
+    2. Nearest Neighbor (En yakın komşu)
+    3. 2-opt / Or-opt iyileştirme (süre bütçeli)
+    4. İsteğe bağlı: çok araç (arac_sayisi), zaman penceresi (zaman_pencereleri), dönüş (donus)
     """
     
     try:
@@ -906,6 +913,10 @@ def api_rota_olustur():
         baslangic_konumu = data.get('baslangic')  # "lat,lng"
         secili_cari_ids = data.get('cari_ids', [])
         optimizasyon_tipi = data.get('optimizasyon', 'mesafe')  # 'mesafe' veya 'oncelik'
+        arac_sayisi = int(data.get('arac_sayisi') or 1)
+        donus = bool(data.get('donus', False))
+        zaman_pencereleri = data.get('zaman_pencereleri') or {}  # {cari_id: [erken_dk, gec_dk]}
+        sure_butcesi = min(float(data.get('sure_butcesi') or RotaMotoru.SURE_BUTCESI), 5.0)
         
         if not baslangic_konumu:
             return jsonify({
@@ -996,152 +1007,61 @@ def api_rota_olustur():
             musteriler.append(musteri)
         
         # ========================================
-        # 4. HAVERSINE MESAFE HESAPLAMA
-        # ========================================
-        from math import radians, cos, sin, asin, sqrt
-        
-        def haversine(lat1, lon1, lat2, lon2):
-            """İki GPS noktası arası mesafe (km)"""
-            # Dünya yarıçapı (km)
-            R = 6371
-            
-            # Radyan dönüşümü
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            
-            # Haversine formülü
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * asin(sqrt(a))
-            
-            return R * c
-        
-        # ========================================
-        # 5. MESAFE MATRİSİ OLUŞTUR
-        # ========================================
-        n = len(musteriler)
-        mesafe_matrisi = [[0.0] * n for _ in range(n)]
-        
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    mesafe_matrisi[i][j] = haversine(
-                        musteriler[i]['konum']['lat'],
-                        musteriler[i]['konum']['lng'],
-                        musteriler[j]['konum']['lat'],
-                        musteriler[j]['konum']['lng']
-                    )
-        
-        # ========================================
-        # 6. NEAREST NEIGHBOR ALGORİTMASI
+        # 4. ROTA MOTORU (vektörel matris + 2-opt / Or-opt)
         # ========================================
-        def nearest_neighbor(start_lat, start_lng, musteriler, mesafe_matrisi):
-            """En yakın komşu algoritması ile rota oluştur"""
-            
-            n = len(musteriler)
-            ziyaret_edilmedi = set(range(n))
-            rota = []
-            toplam_mesafe = 0
-            
-            # Başlangıç noktasına en yakın müşteriyi bul
-            en_yakin_idx = None
-            en_kisa_mesafe = float('inf')
-            
-            for i in ziyaret_edilmedi:
-                mesafe = haversine(
-                    start_lat, start_lng,
-                    musteriler[i]['konum']['lat'],
-                    musteriler[i]['konum']['lng']
-                )
-                if mesafe < en_kisa_mesafe:
-                    en_kisa_mesafe = mesafe
-                    en_yakin_idx = i
-            
-            # İlk müşteriyi ekle
-            if en_yakin_idx is not None:
-                rota.append(en_yakin_idx)
-                ziyaret_edilmedi.remove(en_yakin_idx)
-                toplam_mesafe += en_kisa_mesafe
-                mevcut_idx = en_yakin_idx
-            
-            # Diğer müşterileri sırayla ekle
-            while ziyaret_edilmedi:
-                en_yakin_idx = None
-                en_kisa_mesafe = float('inf')
-                
-                for i in ziyaret_edilmedi:
-                    mesafe = mesafe_matrisi[mevcut_idx][i]
-                    
-                    # Öncelik bazlı optimizasyon
-                    if optimizasyon_tipi == 'oncelik':
-                        # Öncelik yüksekse mesafeyi azalt (yapay ağırlık)
-                        oncelik_carpan = 1 - (musteriler[i]['oncelik'] / 100)
-                        mesafe *= max(0.5, oncelik_carpan)
-                    
-                    if mesafe < en_kisa_mesafe:
-                        en_kisa_mesafe = mesafe
-                        en_yakin_idx = i
-                
-                if en_yakin_idx is not None:
-                    rota.append(en_yakin_idx)
-                    ziyaret_edilmedi.remove(en_yakin_idx)
-                    toplam_mesafe += mesafe_matrisi[mevcut_idx][en_yakin_idx]
-                    mevcut_idx = en_yakin_idx
-            
-            return rota, toplam_mesafe
-        
-        # ========================================
-        # 7. ROTAYI OLUŞTUR
-        # ========================================
-        rota_indeksler, toplam_mesafe = nearest_neighbor(
-            baslangic_lat,
-            baslangic_lng,
-            musteriler,
-            mesafe_matrisi
+        pencereler = None
+        if zaman_pencereleri:
+            pencereler = [zaman_pencereleri.get(m['id']) for m in musteriler]
+
+        cozum = RotaMotoru.coz(
+            (baslangic_lat, baslangic_lng),
+            [(m['konum']['lat'], m['konum']['lng']) for m in musteriler],
+            arac_sayisi=arac_sayisi,
+            pencereler=pencereler,
+            oncelikler=[m['oncelik'] for m in musteriler] if optimizasyon_tipi == 'oncelik' else None,
+            donus=donus,
+            sure_butcesi=sure_butcesi
         )
+        toplam_mesafe = cozum['toplam_km']
         
         # ========================================
-        # 8. ROTA VERİSİNİ FORMATLA
+        # 5. ROTA VERİSİNİ FORMATLA
         # ========================================
         rota_siralanmis = []
         
-        for sira, idx in enumerate(rota_indeksler, 1):
-            musteri = musteriler[idx]
-            
-            # Bir önceki noktadan mesafe
-            if sira == 1:
-                mesafe = haversine(
-                    baslangic_lat, baslangic_lng,
-                    musteri['konum']['lat'],
-                    musteri['konum']['lng']
-                )
-            else:
-                onceki_idx = rota_indeksler[sira - 2]
-                mesafe = mesafe_matrisi[onceki_idx][idx]
-            
-            rota_siralanmis.append({
-                'sira': sira,
-                'id': musteri['id'],
-                'unvan': musteri['unvan'],
-                'adres': musteri['adres'],
-                'konum': musteri['konum'],
-                'mesafe_km': round(mesafe, 2),
-                'bakiye': musteri['bakiye'],
-                'notlar': []
-            })
-            
-            # AI önerileri ekle
-            if musteri['bakiye'] > 10000:
-                rota_siralanmis[-1]['notlar'].append('💰 Yüksek borç: Tahsilat yapılmalı')
-            
-            if musteri['risk_skoru'] >= 70:
-                rota_siralanmis[-1]['notlar'].append('⚠️ Riskli müşteri: Teminat kontrolü')
-            
-            if musteri['ciro'] > 50000:
-                rota_siralanmis[-1]['notlar'].append('⭐ VIP müşteri: Özel ilgi göster')
+        for arac, (duraklar, bacaklar, varislar) in enumerate(
+                zip(cozum['rotalar'], cozum['bacak_km'], cozum['varis_dk']), 1):
+            for sira, (idx, mesafe, varis) in enumerate(zip(duraklar, bacaklar, varislar), 1):
+                musteri = musteriler[idx]
+                
+                rota_siralanmis.append({
+                    'sira': sira,
+                    'arac': arac,
+                    'id': musteri['id'],
+                    'unvan': musteri['unvan'],
+                    'adres': musteri['adres'],
+                    'konum': musteri['konum'],
+                    'mesafe_km': round(mesafe, 2),
+                    'varis_dk': round(varis),
+                    'bakiye': musteri['bakiye'],
+                    'notlar': []
+                })
+                
+                # AI önerileri ekle
+                if musteri['bakiye'] > 10000:
+                    rota_siralanmis[-1]['notlar'].append('💰 Yüksek borç: Tahsilat yapılmalı')
+                
+                if musteri['risk_skoru'] >= 70:
+                    rota_siralanmis[-1]['notlar'].append('⚠️ Riskli müşteri: Teminat kontrolü')
+                
+                if musteri['ciro'] > 50000:
+                    rota_siralanmis[-1]['notlar'].append('⭐ VIP müşteri: Özel ilgi göster')
+                
+                if pencereler and pencereler[idx] and pencereler[idx][1] is not None and varis > pencereler[idx][1]:
+                    rota_siralanmis[-1]['notlar'].append('⏰ Ziyaret penceresi kaçıyor')
         
         # ========================================
-        # 9. ÖZET BİLGİLER
+        # 6. ÖZET BİLGİLER
         # ========================================
         tahmini_sure = toplam_mesafe / 40 * 60  # 40 km/s ortalama, dakika
         tahmini_sure += len(musteriler) * 30  # Her müşteri için 30 dk
@@ -1154,11 +1074,16 @@ def api_rota_olustur():
                 'lat': baslangic_lat,
                 'lng': baslangic_lng
             },
-            'optimizasyon_tipi': optimizasyon_tipi
+            'optimizasyon_tipi': optimizasyon_tipi,
+            'arac_sayisi': len(cozum['rotalar']),
+            'arac_km': cozum['arac_km'],
+            'ilk_tur_km': cozum['ilk_tur_km'],
+            'iyilestirme_yuzde': cozum['iyilestirme_yuzde'],
+            'gecikme_dk': cozum['gecikme_dk']
         }
         
         # ========================================
-        # 10. RESPONSE
+        # 7. RESPONSE
         # ========================================
         logger.info(f"✅ Rota oluşturuldu: {len(musteriler)} müşteri, {toplam_mesafe:.2f} km")
         
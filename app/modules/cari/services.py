@@ -17,6 +17,7 @@ from flask_login import current_user
 from flask_babel import gettext as _
 
 from app.extensions import cache, get_tenant_db
+from app.services.tenant_cache import TenantCache
 from app.modules.cari.models import CariHesap, CariHareket
 
 logger = logging.getLogger(__name__)
@@ -92,7 +93,8 @@ class CariService:
         try:
             cache.delete_memoized(CariService.get_by_id, cari_id, firma_id)
             cache.delete(f"cari_bakiye:{cari_id}")
-            cache.delete(f"cari_risk_analiz:{firma_id}")
+            CariAIService.risk_analizi.delete(firma_id)
+            TenantCache.delete('cari', f"siradaki_kod:{firma_id}")
         except Exception:
             pass
 
@@ -192,36 +194,50 @@ class CariService:
 
 class CariAIService:
     @staticmethod
-    @cache.cached(timeout=CACHE_TIMEOUT_LONG, key_prefix='cari_risk_analiz')
+    @TenantCache.cached('cari', timeout=CACHE_TIMEOUT_SHORT, key_prefix='cari_risk_analiz')
     def risk_analizi(firma_id: str, tenant_db=None) -> Dict[str, Any]:
-        """Tüm cariler için AI tabanlı risk (Batık Kredi) analizi"""
+        """
+        Tüm cariler için AI tabanlı risk (Batık Kredi) analizi.
+        Bakiye / vadesi geçen / çek riski cari_risk_ozetleri snapshot'ından okunur.
+        """
         if tenant_db is None: tenant_db = get_tenant_db()
         try:
             results = tenant_db.execute(text("""
-                SELECT id, kod, unvan, borc_bakiye, alacak_bakiye,
-                       (borc_bakiye - alacak_bakiye) as net_bakiye,
-                       risk_skoru, risk_durumu
-                FROM cari_hesaplar
-                WHERE firma_id = :firma_id AND deleted_at IS NULL AND aktif = 1 AND risk_skoru > 40
-                ORDER BY risk_skoru DESC, (borc_bakiye - alacak_bakiye) DESC LIMIT 50
+                SELECT ch.id, ch.kod, ch.unvan, ch.risk_skoru, ch.risk_durumu,
+                       COALESCE(ro.bakiye, ch.borc_bakiye - ch.alacak_bakiye) as net_bakiye,
+                       COALESCE(ro.vadesi_gecen_toplam, 0) as vadesi_gecen,
+                       COALESCE(ro.gecikme_90_ustu, 0) as gecikme_90_ustu,
+                       COALESCE(ro.acik_cek_tutari, 0) as acik_cek,
+                       COALESCE(ro.vadesi_gecmis_cek_tutari, 0) as vadesi_gecmis_cek,
+                       ro.ortalama_odeme_gunu
+                FROM cari_hesaplar ch
+                LEFT JOIN cari_risk_ozetleri ro ON ro.cari_id = ch.id
+                WHERE ch.firma_id = :firma_id AND ch.deleted_at IS NULL AND ch.aktif = 1 AND ch.risk_skoru > 40
+                ORDER BY ch.risk_skoru DESC, net_bakiye DESC LIMIT 50
             """), {'firma_id': firma_id}).fetchall()
             
             yuksek_riskli, dikkat = [], []
             toplam_risk_tutari = Decimal('0.00')
+            toplam_vadesi_gecen = Decimal('0.00')
             
             for row in results:
-                net_bakiye = Decimal(str(row.net_bakiye))
+                net_bakiye = Decimal(str(row.net_bakiye or 0))
                 if net_bakiye > 0: toplam_risk_tutari += net_bakiye
+                toplam_vadesi_gecen += Decimal(str(row.vadesi_gecen or 0))
                 
                 cari_data = {
                     'id': str(row.id), 'kod': row.kod, 'unvan': row.unvan,
-                    'net_bakiye': float(net_bakiye), 'risk_skoru': row.risk_skoru, 'risk_durumu': row.risk_durumu
+                    'net_bakiye': float(net_bakiye), 'risk_skoru': row.risk_skoru, 'risk_durumu': row.risk_durumu,
+                    'vadesi_gecen': float(row.vadesi_gecen or 0), 'gecikme_90_ustu': float(row.gecikme_90_ustu or 0),
+                    'acik_cek': float(row.acik_cek or 0), 'vadesi_gecmis_cek': float(row.vadesi_gecmis_cek or 0),
+                    'ortalama_odeme_gunu': row.ortalama_odeme_gunu
                 }
                 
                 if row.risk_skoru > 70: yuksek_riskli.append(cari_data)
                 else: dikkat.append(cari_data)
             
-            return {'yuksek_riskli': yuksek_riskli, 'dikkat': dikkat, 'toplam_risk_tutari': float(toplam_risk_tutari)}
+            return {'yuksek_riskli': yuksek_riskli, 'dikkat': dikkat, 'toplam_risk_tutari': float(toplam_risk_tutari),
+                    'toplam_vadesi_gecen': float(toplam_vadesi_gecen)}
         except Exception as e:
             logger.error(f"❌ Risk analizi hatası: {e}")
-            return {'yuksek_riskli': [], 'dikkat': [], 'toplam_risk_tutari': 0.0}
\ No newline at end of file
+            return {'yuksek_riskli': [], 'dikkat': [], 'toplam_risk_tutari': 0.0, 'toplam_vadesi_gecen': 0.0}
\ No newline at end of file
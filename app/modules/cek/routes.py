@@ -6,6 +6,9 @@ import os
 import json
 from datetime import datetime
 from decimal import Decimal
+
+import pandas as pd
+from sqlalchemy import func, select
 from werkzeug.utils import secure_filename
 
 # Multi-Tenant & Ortak Eklentiler
@@ -550,11 +553,26 @@ def yazdir(id):
 @tenant_route
 def analiz():
     tenant_db = get_tenant_db()
-    cekler = tenant_db.query(CekSenet).filter_by(firma_id=current_user.firma_id).all()
-    data = cek_to_dict(cekler)
-    
-    pivot_banka = PivotEngine(data=data, rows="banka_adi", values="tutar", aggregator="sum", title="Banka Bazlı Risk Dağılımı", chart_type="doughnut")
-    pivot_vade = PivotEngine(data=data, rows="vade_ayi", values="tutar", aggregator="sum", title="Aylık Tahsilat/Ödeme Planı", chart_type="bar")
+    firma_filtre = CekSenet.firma_id == current_user.firma_id
+
+    # Gruplama veritabanında (GROUP BY) yapılır; çek nesneleri belleğe alınmaz
+    banka_sorgu = select(
+        func.coalesce(func.nullif(CekSenet.banka_adi, ''), '-').label('banka_adi'),
+        CekSenet.tutar,
+    ).where(firma_filtre)
+
+    vade_df = pd.DataFrame(
+        tenant_db.execute(
+            select(CekSenet.vade_tarihi, func.sum(CekSenet.tutar).label('tutar'))
+            .where(firma_filtre)
+            .group_by(CekSenet.vade_tarihi)
+        ).fetchall(),
+        columns=['vade_tarihi', 'tutar'],
+    )
+    vade_df['vade_ayi'] = pd.to_datetime(vade_df['vade_tarihi']).dt.strftime('%Y-%m').fillna('Bilinmiyor')
+
+    pivot_banka = PivotEngine(data=banka_sorgu, rows="banka_adi", values="tutar", aggregator="sum", title="Banka Bazlı Risk Dağılımı", chart_type="doughnut", session=tenant_db)
+    pivot_vade = PivotEngine(data=vade_df, rows="vade_ayi", values="tutar", aggregator="sum", title="Aylık Tahsilat/Ödeme Planı", chart_type="bar")
     html_content = pivot_banka.render() + "<br>" + pivot_vade.render()
     
     return render_template('cek/rapor.html', title="Finansal Analiz Raporları", content=html_content)
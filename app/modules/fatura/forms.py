@@ -10,6 +10,7 @@ from app.modules.cari.models import CariHesap
 from app.modules.siparis.models import OdemePlani
 from app.modules.sube.models import Sube
 from app.modules.fiyat.models import FiyatListesi
+from app.form_builder.lookup import LookupRegistry
 from app.enums import ParaBirimi, StokBirimleri, FaturaTuru
 from app.araclar import para_cevir
 from datetime import datetime
@@ -54,16 +55,18 @@ def create_fatura_form(fatura=None, tenant_db=None):
     aktif_sube_id = session.get('aktif_sube_id')
     aktif_bolge_id = session.get('aktif_bolge_id')
 
-    # 1. Şube Listesi (Yeni Eklendi)
+    tam_yetkili = current_user.rol in ['admin', 'patron', 'muhasebe_muduru']
+
+    # 1. Şube Listesi (LookupRegistry: tenant bazlı cache, yetki filtresi bellekte)
     try:
-        sube_query = tenant_db.query(Sube).filter_by(aktif=True)
+        subeler = LookupRegistry.satirlar('sube', tenant_db=tenant_db)
         
         # Eğer kullanıcı admin/patron değilse, sadece kendi şubesini/bölgesini görebilsin
-        if current_user.rol not in ['admin', 'patron', 'muhasebe_muduru']:
-             if aktif_bolge_id: sube_query = sube_query.filter_by(bolge_id=aktif_bolge_id)
-             elif aktif_sube_id: sube_query = sube_query.filter_by(id=aktif_sube_id)
+        if not tam_yetkili:
+             if aktif_bolge_id: subeler = [s for s in subeler if s[2] == aktif_bolge_id]
+             elif aktif_sube_id: subeler = [s for s in subeler if s[0] == aktif_sube_id]
              
-        sube_opts = [(str(s.id), s.ad) for s in sube_query.order_by(Sube.ad).all()]
+        sube_opts = [(str(s_id), ad) for s_id, ad, _bolge in subeler]
     except Exception as e:
         logger.error(f"❌ Şube listesi hatası: {e}")
         sube_opts = []
@@ -78,25 +81,28 @@ def create_fatura_form(fatura=None, tenant_db=None):
         # DURUM 1: DÜZENLEME MODU (Mevcut fatura açılıyorsa)
         # Sadece o faturaya ait depoyu listeye koyalım ki seçili gelsin
         if is_edit and getattr(fatura, 'depo_id', None):
-            secili_depo = tenant_db.query(Depo).get(fatura.depo_id)
+            secili_depo = next((d for d in LookupRegistry.satirlar('depo', tenant_db=tenant_db) if d[0] == fatura.depo_id), None)
+            if secili_depo is None:
+                # Pasife alınmış depo cache listesinde yoktur
+                depo = tenant_db.query(Depo).get(fatura.depo_id)
+                secili_depo = (depo.id, depo.ad) if depo else None
             if secili_depo:
-                depo_opts = [(str(secili_depo.id), secili_depo.ad)]
-                auto_depo_id = str(secili_depo.id)
+                depo_opts = [(str(secili_depo[0]), secili_depo[1])]
+                auto_depo_id = str(secili_depo[0])
 
         # DURUM 2: YENİ FATURA + ŞUBE KİLİTLİ 
         # Sağ üstten "MENEMEN" seçilmişse, yetki kurgundan geçirerek sadece oranın depolarını yükle
         elif aktif_sube_id:
-            depo_query = tenant_db.query(Depo).filter_by(firma_id=current_user.firma_id, aktif=True, sube_id=aktif_sube_id)
+            depos = [d for d in LookupRegistry.satirlar('depo', tenant_db=tenant_db) if d[2] == aktif_sube_id]
             
             # Senin Yetki Kurgun: Normal personelse bölge kontrolü de yap!
-            if current_user.rol not in ['admin', 'patron', 'muhasebe_muduru'] and aktif_bolge_id:
-                depo_query = depo_query.join(Sube).filter(Sube.bolge_id == aktif_bolge_id)
+            if not tam_yetkili and aktif_bolge_id:
+                depos = [d for d in depos if d[3] == aktif_bolge_id]
                 
-            depos = depo_query.order_by(Depo.ad).all()
-            depo_opts = [(str(d.id), d.ad) for d in depos]
+            depo_opts = [(str(d[0]), d[1]) for d in depos]
             
             if depos:
-                auto_depo_id = str(depos[0].id) # O şubenin ilk deposunu otomatik seç
+                auto_depo_id = str(depos[0][0]) # O şubenin ilk deposunu otomatik seç
 
         # DURUM 3: YENİ FATURA + "TÜM ŞUBELER" MODU (Şube boş)
         # Kullanıcı "Tüm Şubeler" modunda yeni fatura kesiyor. 
@@ -130,8 +136,8 @@ def create_fatura_form(fatura=None, tenant_db=None):
 
     # 5. Fiyat Listeleri
     try:
-        listeler = tenant_db.query(FiyatListesi).filter_by(aktif=True).all()
-        liste_opts = [(0, _("Varsayılan (Stok Kartı)"))] + [(str(l.id), l.ad) for l in listeler]
+        listeler = LookupRegistry.satirlar('fiyat_listesi', tenant_db=tenant_db)
+        liste_opts = [(0, _("Varsayılan (Stok Kartı)"))] + [(str(l_id), ad) for l_id, ad in listeler]
     except Exception:
         liste_opts = [(0, _("Varsayılan (Stok Kartı)"))]
 
@@ -158,7 +164,7 @@ def create_fatura_form(fatura=None, tenant_db=None):
     
     # 8. Ödeme Planları
     try:
-        odeme_opts = [(str(op.id), op.ad) for op in tenant_db.query(OdemePlani).all()]
+        odeme_opts = [(str(op_id), ad) for op_id, ad in LookupRegistry.satirlar('odeme_plani', tenant_db=tenant_db)]
     except Exception:
         odeme_opts = []
 
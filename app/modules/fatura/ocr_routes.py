@@ -11,7 +11,7 @@ from flask_login import login_required, current_user
 from flask_babel import gettext as _
 from werkzeug.utils import secure_filename
 
-from app.modules.ai_destek.ocr_service import ocr_service
+from app.modules.ai_destek.ocr_service import get_ocr_service
 from app.decorators import tenant_route, permission_required
 from app.extensions import db
 
@@ -43,7 +43,7 @@ def upload_page():
     """
     return render_template('fatura/upload_ocr.html',
                          title=_('Fatura OCR - Görsel Yükleme'),
-                         ocr_active=ocr_service.is_active)
+                         ocr_active=get_ocr_service().is_active)
 
 
 # ========================================
@@ -75,7 +75,7 @@ def parse_fatura():
     
     if not validation['valid']:
         return jsonify({'success': False, 'error': validation['error']}), 400
-    if not ocr_service.is_active:
+    if not get_ocr_service().is_active:
         return jsonify({
             'success': False,
             'error': 'OCR servisi aktif değil. GEMINI_API_KEY kontrol edin.'
@@ -114,7 +114,7 @@ def parse_fatura():
         logger.info(f"📸 OCR Parse başlatıldı: {file.filename} (Tür: {fatura_turu})")
         
         # OCR işlemi
-        result = ocr_service.fatura_gorselden_oku(file, fatura_turu)
+        result = get_ocr_service().fatura_gorselden_oku(file, fatura_turu)
         
         if result['success']:
             return jsonify({
@@ -163,7 +163,7 @@ def save_ocr_fatura():
             return jsonify({'success': False, 'error': 'Veri gönderilmedi'}), 400
         
         # Faturayı kaydet
-        result = ocr_service.fatura_onayla_ve_kaydet(
+        result = get_ocr_service().fatura_onayla_ve_kaydet(
             ocr_data=ocr_data,
             firma_id=current_user.firma_id,
             kullanici_id=current_user.id
@@ -200,6 +200,7 @@ def ocr_status():
     """
     OCR servisinin durumunu kontrol eder
     """
+    ocr_service = get_ocr_service()
     return jsonify({
         'active': ocr_service.is_active,
         'model': ocr_service.vision_model._model_name if ocr_service.is_active else None,
@@ -25,6 +25,7 @@ from app.extensions import db, get_tenant_db, cache, get_tenant_info
 from app.modules.fatura.models import Fatura, FaturaKalemi
 from app.modules.stok.models import StokKart
 from app.modules.cari.models import CariHesap
+from app.modules.cari.risk_ozeti import CariRiskMotoru
 from app.modules.sube.models import Sube
 from app.modules.depo.models import Depo
 from app.form_builder import DataGrid
@@ -113,7 +114,7 @@ def index():
         #return redirect('/')
 
     
-    grid = DataGrid("fatura_list", Fatura, _("Faturalar"))
+    grid = DataGrid("fatura_list", Fatura, _("Faturalar"), count_mode='estimated')
     
     # Kolonlar
     grid.add_column('tarih', _('Tarih'), type='date', width='100px')
@@ -998,9 +999,10 @@ def api_get_cari_detay(cari_id):
             risk_mesaj = _('Düşük Riskli Müşteri')
             risk_renk = 'success'
         
-        # Limit kontrolü
-        limit = float(getattr(cari, 'risk_limiti', 0) or 0)
-        if limit > 0 and bakiye > limit:
+        # Limit kontrolü (risk özeti: bakiye + açık müşteri çekleri, tek satır)
+        risk = CariRiskMotoru.limit_kontrol(cari.id, tenant_db=tenant_db)
+        limit = float(risk['limit'])
+        if risk['asim']:
             limit_durumu = 'asim'
             limit_mesaj = _('⚠️ Limit Aşıldı!')
             limit_renk = 'danger'
@@ -1012,13 +1014,20 @@ def api_get_cari_detay(cari_id):
         # AI Önerileri
         ai_oneriler = []
         
-        if bakiye > limit:
+        if risk['asim']:
             ai_oneriler.append({
                 'tip': 'UYARI',
                 'mesaj': f'Limit {limit:.2f} TL aşıldı. Tahsilat yapılmalı.',
                 'ikon': 'bi-exclamation-triangle'
             })
         
+        if risk['vadesi_gecen'] > 0:
+            ai_oneriler.append({
+                'tip': 'DİKKAT',
+                'mesaj': f"{float(risk['vadesi_gecen']):.2f} TL vadesi geçmiş borç var.",
+                'ikon': 'bi-clock-history'
+            })
+        
         if risk_skoru > 60:
             ai_oneriler.append({
                 'tip': 'DİKKAT',
@@ -1045,6 +1054,9 @@ def api_get_cari_detay(cari_id):
             'limit_mesaj': limit_mesaj,
             'limit_renk': limit_renk,
             'limit': limit,
+            'toplam_risk': float(risk['toplam_risk']),
+            'vadesi_gecen': float(risk['vadesi_gecen']),
+            'vadesi_gecmis_cek': float(risk['vadesi_gecmis_cek']),
             'ai_oneriler': ai_oneriler
         })
     
@@ -1267,6 +1279,11 @@ def api_karlilik_analizi(fatura_id):
         toplam_maliyet = Decimal('0.0')
         kalem_detaylari = []
 
+        # Tüm kalemlerin maliyeti tek sorguda (maliyet defterinden)
+        maliyetler = MaliyetMotoru.ortalama_maliyetler(
+            [kalem.stok_id for kalem in fatura.kalemler], fatura.tarih, fatura.firma_id
+        )
+
         for kalem in fatura.kalemler:
             miktar = Decimal(str(kalem.miktar or 0))
             satis_fiyati = Decimal(str(kalem.birim_fiyat or 0))
@@ -1277,7 +1294,7 @@ def api_karlilik_analizi(fatura_id):
             kalem_satis_geliri = miktar * net_satis_fiyati
             
             # Motorumuzdan bu ürünün ortalama maliyetini çekiyoruz
-            birim_maliyet = MaliyetMotoru.ortalama_maliyet_hesapla(kalem.stok_id, fatura.tarih, fatura.firma_id)
+            birim_maliyet = maliyetler.get(str(kalem.stok_id), Decimal('0.0'))
             kalem_toplam_maliyet = miktar * birim_maliyet
 
             toplam_satis_geliri += kalem_satis_geliri
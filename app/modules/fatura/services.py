@@ -96,7 +96,6 @@ class FiyatHesaplamaService:
     """
     
     @staticmethod
-    @cache.memoize(timeout=CACHE_TIMEOUT_SHORT)
     def hesapla(
         stok_id: str,
         fatura_turu: str,
@@ -107,21 +106,13 @@ class FiyatHesaplamaService:
         firma_id: Optional[str] = None,
         tenant_db=None
     ) -> Dict[str, Any]:
-        
-        if tenant_db is None:
-            from app.extensions import get_tenant_db
-            tenant_db = get_tenant_db()
-
-        # 1. STOK KARTINI ÇEK (Eager Loading)
-        stok = tenant_db.query(StokKart).options(
-            joinedload(StokKart.kdv_grubu)
-        ).filter(
-            StokKart.id == stok_id,
-            StokKart.aktif == True
-        ).first()
+        """
+        Kalem fiyatı (derlenmiş fiyat kitabı üzerinden).
 
-        if not stok:
-            raise ValueError(f"Stok bulunamadı: ID {stok_id}")
+        Stok/liste/barem çözümlemesi FiyatKitabi'nin bellek indeksinden yapılır;
+        sorgu sadece AI istatistiği için (ayrı cache'li) atılır.
+        """
+        from app.modules.fiyat.pricebook import FiyatKitabi
 
         # Kur validasyonu
         if not isinstance(fatura_kuru, Decimal):
@@ -130,183 +121,83 @@ class FiyatHesaplamaService:
         if fatura_kuru <= 0:
             raise ValueError(f"Geçersiz kur değeri: {fatura_kuru}")
 
-        # 2. BAZ FİYAT VE DÖVİZ TESPİTİ
-        stok_doviz = getattr(stok, 'doviz_turu', 'TL') or 'TL'
-
-        if fatura_turu in ['ALIS', 'ALIS_IADE']:
-            baz_fiyat = Decimal(str(getattr(stok, 'alis_fiyati', 0) or 0))
-        else:
-            baz_fiyat = Decimal(str(getattr(stok, 'satis_fiyati', 0) or 0))
-
-        iskonto_orani = Decimal('0.00')
-        kaynak = f"Stok Kartı ({stok_doviz})"
-
-        # 3. FİYAT LİSTESİ KONTROLÜ
-        if liste_id and liste_id != '0':
-            liste_detay = FiyatHesaplamaService._fiyat_listesinden_getir(
-                liste_id, stok_id, miktar, firma_id, tenant_db
-            )
-
-            if liste_detay:
-                baz_fiyat = Decimal(str(liste_detay['fiyat']))
-                iskonto_orani = Decimal(str(liste_detay['iskonto_orani']))
-                stok_doviz = liste_detay['doviz_turu']
-                kaynak = f"Fiyat Listesi: {liste_detay['liste_adi']}"
-
-        # 4. ÇAPRAZ KUR HESAPLAMA (TL üzerinden)
-        tl_karsiligi = baz_fiyat
-
-        if stok_doviz != 'TL':
-            cache_key = f"doviz_kuru:{stok_doviz}"
-            sistem_kuru = cache.get(cache_key)
-
-            if sistem_kuru is None:
-                sistem_kuru = Decimal(str(get_doviz_kuru(stok_doviz)))
-                cache.set(cache_key, sistem_kuru, timeout=3600)
-            else:
-                sistem_kuru = Decimal(str(sistem_kuru))
-
-            if sistem_kuru <= 0:
-                logger.warning(f"⚠️ Sistem kuru alınamadı ({stok_doviz}), 1.0 kullanılıyor")
-                sistem_kuru = Decimal('1.0')
-
-            tl_karsiligi = baz_fiyat * sistem_kuru
-
-        # Fatura dövizine çevir
-        nihai_fiyat = (tl_karsiligi / fatura_kuru).quantize(
-            Decimal('0.0001'), rounding=ROUND_HALF_UP
+        sonuc = FiyatKitabi.fiyatla(
+            stok_id,
+            miktar=miktar,
+            liste_id=liste_id,
+            fatura_turu=fatura_turu,
+            para_birimi=fatura_para_birimi,
+            kur=fatura_kuru,
         )
 
-        # 5. KDV ORANI
-        kdv_orani = FiyatHesaplamaService._kdv_orani_hesapla(stok, fatura_turu)
-
-        # 6. BİRİM
-        birim = FiyatHesaplamaService._birim_getir(stok)
+        if not sonuc or not sonuc['aktif']:
+            raise ValueError(f"Stok bulunamadı: ID {stok_id}")
 
-        # 7. AI FİYAT ANALİZİ
         ai_metadata = FiyatHesaplamaService._ai_fiyat_analizi(
-            stok, nihai_fiyat, fatura_turu, tenant_db
+            stok_id, sonuc['fiyat'], fatura_turu, tenant_db
         )
 
         return {
-            'fiyat': nihai_fiyat,
-            'iskonto_orani': iskonto_orani,
-            'kdv_orani': kdv_orani,
-            'birim': birim,
-            'kaynak': kaynak,
+            'fiyat': sonuc['fiyat'],
+            'iskonto_orani': sonuc['iskonto_orani'],
+            'kdv_orani': sonuc['kdv_orani'],
+            'birim': sonuc['birim'],
+            'kaynak': sonuc['kaynak'],
             'ai_metadata': ai_metadata,
             'debug': {
-                'baz_fiyat': float(baz_fiyat),
-                'stok_doviz': stok_doviz,
-                'tl_karsiligi': float(tl_karsiligi),
+                'baz_fiyat': float(sonuc['baz_fiyat']),
+                'stok_doviz': sonuc['doviz'],
+                'tl_karsiligi': float(sonuc['tl_karsiligi']),
                 'fatura_kuru': float(fatura_kuru)
             }
         }
 
     @staticmethod
-    def _fiyat_listesinden_getir(
-        liste_id: str,
-        stok_id: str,
-        miktar: Optional[Decimal],
-        firma_id: Optional[str],
-        tenant_db
-    ) -> Optional[Dict[str, Any]]:
-
-        bugun = date.today()
-
-        liste = tenant_db.query(FiyatListesi).filter(
-            FiyatListesi.id == liste_id,
-            FiyatListesi.aktif == True,
-            or_(
-                FiyatListesi.baslangic_tarihi == None,
-                FiyatListesi.baslangic_tarihi <= bugun
-            ),
-            or_(
-                FiyatListesi.bitis_tarihi == None,
-                FiyatListesi.bitis_tarihi >= bugun
-            )
-        ).first()
+    def _fiyat_istatistikleri(stok_id: str, fatura_turu: str, tenant_db):
+        """Son 30 günün onaylı fatura fiyat istatistikleri (5 dk cache)"""
+        cache_key = f"fiyat_ai:{session.get('tenant_id')}:{stok_id}:{fatura_turu}"
+        stats = cache.get(cache_key)
+        if stats is not None:
+            return stats
 
-        if not liste:
-            return None
-
-        detay_query = tenant_db.query(FiyatListesiDetay).filter(
-            FiyatListesiDetay.fiyat_listesi_id == liste.id,
-            FiyatListesiDetay.stok_id == stok_id
-        )
-
-        if miktar is not None and miktar > 0:
-            detay_query = detay_query.filter(
-                FiyatListesiDetay.min_miktar <= miktar
-            ).order_by(FiyatListesiDetay.min_miktar.desc())
-        else:
-            detay_query = detay_query.filter(
-                FiyatListesiDetay.min_miktar == 0
-            )
-
-        detay = detay_query.first()
-
-        if not detay:
-            return None
-
-        return {
-            'fiyat': detay.fiyat,
-            'iskonto_orani': detay.iskonto_orani or 0,
-            'doviz_turu': getattr(liste, 'doviz_turu', 'TL'),
-            'liste_adi': liste.ad
-        }
-
-    @staticmethod
-    def _kdv_orani_hesapla(stok: StokKart, fatura_turu: str) -> int:
-        varsayilan = int(VARSAYILAN_KDV_ORANI)
-        if not stok.kdv_grubu:
-            return varsayilan
-
-        try:
-            if fatura_turu in ['ALIS', 'ALIS_IADE']:
-                return int(getattr(stok.kdv_grubu, 'alis_kdv_orani', varsayilan) or varsayilan)
-            else:
-                return int(getattr(stok.kdv_grubu, 'satis_kdv_orani', varsayilan) or varsayilan)
-        except (AttributeError, ValueError, TypeError):
-            return varsayilan
+        if tenant_db is None:
+            from app.extensions import get_tenant_db
+            tenant_db = get_tenant_db()
 
-    @staticmethod
-    def _birim_getir(stok: StokKart) -> str:
-        try:
-            if hasattr(stok, 'birim') and stok.birim:
-                return getattr(stok.birim, 'value', 'ADET')
-            return 'ADET'
-        except:
-            return 'ADET'
+        son_30_gun = date.today() - timedelta(days=30)
+        row = tenant_db.execute(text("""
+            SELECT 
+                AVG(fk.birim_fiyat) as ort_fiyat,
+                MIN(fk.birim_fiyat) as min_fiyat,
+                MAX(fk.birim_fiyat) as max_fiyat,
+                COUNT(fk.id) as islem_sayisi
+            FROM fatura_kalemleri fk
+            INNER JOIN faturalar f ON f.id = fk.fatura_id
+            WHERE fk.stok_id = :stok_id
+            AND f.fatura_turu = :fatura_turu
+            AND f.durum = 'ONAYLANDI'
+            AND f.tarih >= :baslangic_tarih
+            AND f.deleted_at IS NULL
+        """), {
+            'stok_id': stok_id,
+            'fatura_turu': fatura_turu,
+            'baslangic_tarih': son_30_gun
+        }).fetchone()
+
+        stats = tuple(row) if row else (None, None, None, 0)
+        cache.set(cache_key, stats, timeout=CACHE_TIMEOUT_SHORT)
+        return stats
 
     @staticmethod
     def _ai_fiyat_analizi(
-        stok: StokKart,
+        stok_id: str,
         hesaplanan_fiyat: Decimal,
         fatura_turu: str,
         tenant_db
     ) -> Dict[str, Any]:
 
         try:
-            son_30_gun = date.today() - timedelta(days=30)
-            stats = tenant_db.execute(text("""
-                SELECT 
-                    AVG(fk.birim_fiyat) as ort_fiyat,
-                    MIN(fk.birim_fiyat) as min_fiyat,
-                    MAX(fk.birim_fiyat) as max_fiyat,
-                    COUNT(fk.id) as islem_sayisi
-                FROM fatura_kalemleri fk
-                INNER JOIN faturalar f ON f.id = fk.fatura_id
-                WHERE fk.stok_id = :stok_id
-                AND f.fatura_turu = :fatura_turu
-                AND f.durum = 'ONAYLANDI'
-                AND f.tarih >= :baslangic_tarih
-                AND f.deleted_at IS NULL
-            """), {
-                'stok_id': stok.id,
-                'fatura_turu': fatura_turu,
-                'baslangic_tarih': son_30_gun
-            }).fetchone()
+            stats = FiyatHesaplamaService._fiyat_istatistikleri(stok_id, fatura_turu, tenant_db)
 
             if stats and stats[0] and stats[3] > 0:
                 ort_fiyat = Decimal(str(stats[0]))
@@ -167,10 +167,10 @@ class FirmaService:
             from app.modules.depo.models import Depo, DepoLokasyon, StokLokasyonBakiye
             from app.modules.kasa.models import Kasa
             from app.modules.kullanici.models import Kullanici
-            from app.modules.cari.models import CariHesap, CariHareket, CRMHareket
+            from app.modules.cari.models import CariHesap, CariHareket, CRMHareket, CariRiskOzeti
             from app.modules.stok.models import (
                 StokMuhasebeGrubu, StokKDVGrubu, StokKart, 
-                StokPaketIcerigi, StokHareketi, StokDepoDurumu
+                StokPaketIcerigi, StokHareketi, StokDepoDurumu, StokMaliyetDefteri
             )
             from app.modules.banka.models import BankaHesap
             from app.modules.banka_hareket.models import BankaHareket
@@ -182,7 +182,7 @@ class FirmaService:
             from app.modules.irsaliye.models import Irsaliye, IrsaliyeKalemi
             from app.modules.fatura.models import Fatura, FaturaKalemi
             from app.modules.stok_fisi.models import StokFisi, StokFisiDetay
-            from app.modules.muhasebe.models import HesapPlani, MuhasebeFisi, MuhasebeFisiDetay
+            from app.modules.muhasebe.models import HesapPlani, MuhasebeFisi, MuhasebeFisiDetay, BakiyeOzeti
             from app.modules.finans.models import FinansIslem
             from app.modules.efatura.models import EntegratorAyarlari
             from app.modules.rapor.models import YazdirmaSablonu, SavedReport
@@ -0,0 +1,393 @@
+# app/modules/fiyat/pricebook.py
+"""
+Fiyat Kitabı (Compiled Price Book)
+
+Fatura, B2B katalog/sepet ve mobil satış ekranlarının ortak fiyat motoru.
+
+Tenant'ın tüm stok baz fiyatları, fiyat listeleri ve liste detayları tek seferde
+derlenip (3 sorgu) bellekte indekslenir:
+    stoklar   : {stok_id: StokFiyat}
+    listeler  : {liste_id: ListeBilgisi}
+    detaylar  : {liste_id: {stok_id: [(min_miktar, fiyat, iskonto, doviz), ...]}}  (min_miktar azalan)
+    gruplar   : {MUSTERI_GRUBU: [liste_id, ...]}  (öncelik sırasında)
+    varsayilan: [liste_id, ...]                    (öncelik sırasında)
+
+Katmanlar:
+    - Process içi kopya (sürüm: TenantCache 'fiyat' alanı, LOCAL_TTL saniyede bir kontrol)
+    - Paylaşılan cache (Redis) → diğer worker'lar derlemeyi tekrarlamaz
+
+Geçersiz kılma:
+    FiyatListesi / FiyatListesiDetay / StokKart (fiyat alanları) / StokKDVGrubu
+    değiştiğinde commit sonrası tenant'ın 'fiyat' alanı sürümü artırılır.
+
+Müşteri grubu listesi:
+    Kodu cari `musteri_grubu` değeriyle aynı olan aktif liste (örn. kod='TOPTANCI')
+    o gruptaki müşteriler için varsayılan listenin önüne geçer.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from flask import has_request_context, session
+from sqlalchemy import event, select, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import cache
+from app.services.tenant_cache import TenantCache
+from app.modules.fiyat.models import FiyatListesi, FiyatListesiDetay
+from app.modules.stok.models import StokKart, StokKDVGrubu
+
+logger = logging.getLogger(__name__)
+
+
+StokFiyat = namedtuple('StokFiyat', 'satis alis doviz kdv_alis kdv_satis birim aktif')
+ListeBilgisi = namedtuple('ListeBilgisi', 'id kod ad baslangic bitis aktif varsayilan oncelik')
+
+VARSAYILAN_KDV_ORANI = 20
+ALIS_TURLERI = ('ALIS', 'ALIS_IADE')
+
+
+class FiyatKitabi:
+    """
+    ✅ COMPILED PRICE BOOK
+
+    Kullanım:
+        sonuc = FiyatKitabi.fiyatla(stok_id, miktar=Decimal('5'), musteri_grubu='TOPTANCI')
+        sepet = FiyatKitabi.toplu_fiyatla([(stok_id, miktar), ...], varsayilan_liste=True)
+
+    Dönen kalem:
+        {
+            'stok_id', 'fiyat' (liste/baz fiyat, hedef dövizde),
+            'iskonto_orani', 'net_fiyat' (iskonto uygulanmış),
+            'kdv_orani', 'birim', 'doviz' (kaynak döviz), 'kaynak', 'liste_id'
+        }
+    """
+
+    SHARED_TTL = 24 * 3600
+
+    _local = {}       # {tenant_id: (gen, index)}
+    _kurlar = {}      # {doviz: (monotonic, Decimal)}
+    _lock = threading.Lock()
+
+    # ========================================
+    # 💰 FİYATLAMA
+    # ========================================
+
+    @classmethod
+    def fiyatla(cls, stok_id, miktar=None, **kwargs):
+        """Tek ürün fiyatı (bkz. toplu_fiyatla parametreleri). Ürün yoksa None"""
+        return cls.toplu_fiyatla([(stok_id, miktar)], **kwargs).get(str(stok_id))
+
+    @classmethod
+    def toplu_fiyatla(cls, kalemler, liste_id=None, musteri_grubu=None, varsayilan_liste=False,
+                      fatura_turu='SATIS', para_birimi='TL', kur=None, tarih=None,
+                      sadece_aktif=False, tenant_id=None):
+        """
+        Bir sepet / faturanın tüm kalemlerini tek çağrıda fiyatlar.
+
+        Args:
+            kalemler: [(stok_id, miktar), ...]  miktar None ise baremsiz (min_miktar=0) fiyat
+            liste_id: Açıkça seçilmiş fiyat listesi (en yüksek öncelik)
+            musteri_grubu: Cari müşteri grubu (grup listesi)
+            varsayilan_liste: Uygun liste yoksa varsayılan listeye düşülsün mü
+            fatura_turu: ALIS/ALIS_IADE → alış fiyatı ve alış KDV'si
+            para_birimi, kur: Hedef döviz ve kuru (TL üzerinden çapraz kur)
+            tarih: Liste geçerlilik tarihi (varsayılan bugün)
+            sadece_aktif: Pasif stokları sonuçtan çıkar
+
+        Returns:
+            dict: {stok_id: kalem_sonucu}
+        """
+        index = cls._index(tenant_id)
+        tarih = tarih or date.today()
+        alis = fatura_turu in ALIS_TURLERI
+        hedef_kur = Decimal(str(kur)) if kur else cls._kur(para_birimi)
+        if hedef_kur <= 0:
+            hedef_kur = Decimal('1')
+
+        adaylar = cls._aday_listeler(index, liste_id, musteri_grubu, varsayilan_liste, tarih)
+
+        sonuc = {}
+        for stok_id, miktar in kalemler:
+            stok_id = str(stok_id)
+            stok = index['stoklar'].get(stok_id)
+            if stok is None or (sadece_aktif and not stok.aktif):
+                continue
+
+            fiyat = stok.alis if alis else stok.satis
+            doviz = stok.doviz
+            iskonto = Decimal('0')
+            kaynak = f"Stok Kartı ({doviz})"
+            secilen_liste = None
+
+            for aday in adaylar:
+                satir = cls._barem_bul(index['detaylar'].get(aday.id, {}).get(stok_id), miktar)
+                if satir is None:
+                    continue
+                _, liste_fiyati, iskonto, liste_doviz = satir
+                if liste_fiyati > 0:
+                    fiyat, doviz = liste_fiyati, liste_doviz
+                kaynak = f"Fiyat Listesi: {aday.ad}"
+                secilen_liste = aday.id
+                break
+
+            # Çapraz kur (TL üzerinden) → hedef döviz
+            tl_karsiligi = fiyat * cls._kur(doviz) if doviz != 'TL' else fiyat
+            nihai = (tl_karsiligi / hedef_kur).quantize(Decimal('0.0001'), rounding=ROUND_HALF_UP)
+            net = (nihai * (1 - iskonto / 100)).quantize(Decimal('0.0001'), rounding=ROUND_HALF_UP)
+
+            sonuc[stok_id] = {
+                'stok_id': stok_id,
+                'fiyat': nihai,
+                'iskonto_orani': iskonto,
+                'net_fiyat': net,
+                'kdv_orani': stok.kdv_alis if alis else stok.kdv_satis,
+                'birim': stok.birim,
+                'doviz': doviz,
+                'baz_fiyat': fiyat,
+                'tl_karsiligi': tl_karsiligi,
+                'kaynak': kaynak,
+                'liste_id': secilen_liste,
+                'aktif': stok.aktif,
+            }
+        return sonuc
+
+    @staticmethod
+    def _barem_bul(satirlar, miktar):
+        """Miktar baremi: min_miktar <= miktar olan en yüksek barem; miktar yoksa min_miktar=0"""
+        if not satirlar:
+            return None
+        if miktar is None or Decimal(str(miktar)) <= 0:
+            for satir in satirlar:
+                if satir[0] == 0:
+                    return satir
+            return None
+        miktar = Decimal(str(miktar))
+        for satir in satirlar:  # min_miktar azalan sırada
+            if satir[0] <= miktar:
+                return satir
+        return None
+
+    @staticmethod
+    def _gecerli(liste, tarih):
+        return (
+            liste.aktif
+            and (liste.baslangic is None or liste.baslangic <= tarih)
+            and (liste.bitis is None or liste.bitis >= tarih)
+        )
+
+    @classmethod
+    def _aday_listeler(cls, index, liste_id, musteri_grubu, varsayilan_liste, tarih):
+        """Öncelik sırası: seçilen liste → müşteri grubu listeleri → varsayılan listeler"""
+        idler = []
+        if liste_id and str(liste_id) != '0':
+            idler.append(str(liste_id))
+        if musteri_grubu:
+            idler.extend(index['gruplar'].get(str(musteri_grubu).strip().upper(), []))
+        if varsayilan_liste:
+            idler.extend(index['varsayilan'])
+
+        adaylar, gorulen = [], set()
+        for liste_id in idler:
+            liste = index['listeler'].get(liste_id)
+            if liste and liste_id not in gorulen and cls._gecerli(liste, tarih):
+                adaylar.append(liste)
+                gorulen.add(liste_id)
+        return adaylar
+
+    @classmethod
+    def _kur(cls, doviz):
+        """Sistem kuru (Decimal). fatura servisiyle aynı 'doviz_kuru:<kod>' cache anahtarı"""
+        if not doviz or doviz == 'TL':
+            return Decimal('1')
+
+        now = time.monotonic()
+        yerel = cls._kurlar.get(doviz)
+        if yerel and yerel[0] > now:
+            return yerel[1]
+
+        cache_key = f"doviz_kuru:{doviz}"
+        kur = cache.get(cache_key)
+        if kur is None:
+            from app.araclar import get_doviz_kuru
+            kur = Decimal(str(get_doviz_kuru(doviz)))
+            cache.set(cache_key, kur, timeout=3600)
+        kur = Decimal(str(kur))
+
+        if kur <= 0:
+            logger.warning(f"⚠️ Sistem kuru alınamadı ({doviz}), 1.0 kullanılıyor")
+            kur = Decimal('1')
+
+        cls._kurlar[doviz] = (now + 60, kur)
+        return kur
+
+    # ========================================
+    # 🧱 DERLEME
+    # ========================================
+
+    @classmethod
+    def _index(cls, tenant_id=None):
+        tenant_id = tenant_id or cls._tenant_id()
+        gen = cls._generation(tenant_id)
+
+        yerel = cls._local.get(tenant_id)
+        if yerel and yerel[0] == gen:
+            return yerel[1]
+
+        key = f"fiyat_kitabi:{tenant_id}:{gen}"
+        index = None
+        try:
+            index = cache.get(key)
+        except Exception as e:
+            logger.debug(f"Fiyat kitabı cache okunamadı: {e}")
+
+        if index is None:
+            basla = time.perf_counter()
+            index = cls.derle()
+            logger.info(
+                f"📘 Fiyat kitabı derlendi: tenant={tenant_id} gen={gen} "
+                f"stok={len(index['stoklar'])} liste={len(index['listeler'])} "
+                f"({(time.perf_counter() - basla) * 1000:.0f} ms)"
+            )
+            try:
+                cache.set(key, index, timeout=cls.SHARED_TTL)
+            except Exception as e:
+                logger.debug(f"Fiyat kitabı cache'e yazılamadı: {e}")
+
+        with cls._lock:
+            cls._local[tenant_id] = (gen, index)
+        return index
+
+    @staticmethod
+    def derle(tenant_db=None):
+        """Tenant'ın fiyat verisini indekse derler (3 sorgu, ORM nesnesi yüklemeden)"""
+        if tenant_db is None:
+            from app.extensions import get_tenant_db
+            tenant_db = get_tenant_db()
+
+        s, k = StokKart.__table__, StokKDVGrubu.__table__
+        stoklar = {}
+        for row in tenant_db.execute(
+            select(s.c.id, s.c.satis_fiyati, s.c.alis_fiyati, s.c.doviz_turu, s.c.birim, s.c.aktif,
+                   k.c.alis_kdv_orani, k.c.satis_kdv_orani)
+            .select_from(s.outerjoin(k, k.c.id == s.c.kdv_kod_id))
+            .where(s.c.deleted_at.is_(None))
+        ):
+            stoklar[str(row.id)] = StokFiyat(
+                satis=Decimal(str(row.satis_fiyati or 0)),
+                alis=Decimal(str(row.alis_fiyati or 0)),
+                doviz=row.doviz_turu or 'TL',
+                kdv_alis=int(row.alis_kdv_orani or VARSAYILAN_KDV_ORANI),
+                kdv_satis=int(row.satis_kdv_orani or VARSAYILAN_KDV_ORANI),
+                birim=getattr(row.birim, 'value', row.birim) or 'ADET',
+                aktif=bool(row.aktif),
+            )
+
+        fl = FiyatListesi.__table__
+        listeler, gruplar, varsayilan = {}, {}, []
+        for row in tenant_db.execute(
+            select(fl.c.id, fl.c.kod, fl.c.ad, fl.c.baslangic_tarihi, fl.c.bitis_tarihi,
+                   fl.c.aktif, fl.c.varsayilan, fl.c.oncelik)
+            .where(fl.c.deleted_at.is_(None))
+            .order_by(fl.c.oncelik.desc())
+        ):
+            liste = ListeBilgisi(
+                id=str(row.id), kod=row.kod, ad=row.ad, baslangic=row.baslangic_tarihi,
+                bitis=row.bitis_tarihi, aktif=bool(row.aktif), varsayilan=bool(row.varsayilan),
+                oncelik=row.oncelik or 0,
+            )
+            listeler[liste.id] = liste
+            if liste.varsayilan:
+                varsayilan.append(liste.id)
+            if liste.kod:
+                gruplar.setdefault(liste.kod.strip().upper(), []).append(liste.id)
+
+        fd = FiyatListesiDetay.__table__
+        detaylar = {}
+        for row in tenant_db.execute(
+            select(fd.c.fiyat_listesi_id, fd.c.stok_id, fd.c.min_miktar, fd.c.fiyat,
+                   fd.c.iskonto_orani, fd.c.doviz)
+            .order_by(fd.c.min_miktar.desc())
+        ):
+            detaylar.setdefault(str(row.fiyat_listesi_id), {}).setdefault(str(row.stok_id), []).append((
+                Decimal(str(row.min_miktar or 0)),
+                Decimal(str(row.fiyat or 0)),
+                Decimal(str(row.iskonto_orani or 0)),
+                row.doviz or 'TL',
+            ))
+
+        return {
+            'stoklar': stoklar,
+            'listeler': listeler,
+            'detaylar': detaylar,
+            'gruplar': gruplar,
+            'varsayilan': varsayilan,
+        }
+
+    # ========================================
+    # ♻️ SÜRÜM / INVALIDATION
+    # ========================================
+
+    @staticmethod
+    def _tenant_id():
+        if has_request_context():
+            return session.get('tenant_id')
+        return None
+
+    @staticmethod
+    def _generation(tenant_id):
+        return TenantCache.generation('fiyat', tenant_id)
+
+    @classmethod
+    def invalidate(cls, tenant_id=None):
+        """Tenant'ın fiyat kitabını geçersiz kıl (bir sonraki çağrıda yeniden derlenir)"""
+        tenant_id = tenant_id or cls._tenant_id()
+        TenantCache.invalidate('fiyat', tenant_id)
+        with cls._lock:
+            cls._local.pop(tenant_id, None)
+        logger.debug(f"🗑️ Fiyat kitabı geçersiz kılındı: {tenant_id}")
+
+
+# ========================================
+# 🔔 ORM EVENT HOOK'LARI
+# ========================================
+# Stok kartında sadece fiyatı etkileyen alanlar değişince sürüm artar
+_STOK_FIYAT_ALANLARI = ('satis_fiyati', 'alis_fiyati', 'doviz_turu', 'birim', 'aktif', 'kdv_kod_id', 'deleted_at')
+_DIRTY_KEY = '_fiyat_kitabi_dirty'
+
+
+def _isaretle(connection, target):
+    from sqlalchemy.orm import object_session
+    session = object_session(target)
+    if session is not None:
+        session.info[_DIRTY_KEY] = True
+
+
+for _model in (FiyatListesi, FiyatListesiDetay, StokKDVGrubu):
+    for _evt in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _evt, lambda mapper, connection, target: _isaretle(connection, target))
+
+for _evt in ('after_insert', 'after_delete'):
+    event.listen(StokKart, _evt, lambda mapper, connection, target: _isaretle(connection, target))
+
+
+@event.listens_for(StokKart, 'after_update')
+def _stok_fiyat_degisti(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[alan].history.has_changes() for alan in _STOK_FIYAT_ALANLARI):
+        _isaretle(connection, target)
+
+
+@event.listens_for(Session, 'after_commit')
+def _fiyat_kitabi_commit(session):
+    if session.info.pop(_DIRTY_KEY, None):
+        FiyatKitabi.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _fiyat_kitabi_rollback(session):
+    session.info.pop(_DIRTY_KEY, None)
@@ -7,6 +7,7 @@ from app.extensions import get_tenant_db # ✨ YENİ: Tenant DB Importu
 from app.modules.fiyat.models import FiyatListesi, FiyatListesiDetay
 from app.form_builder import DataGrid, FieldType
 from .forms import create_fiyat_listesi_form
+from . import pricebook  # noqa: F401  (fiyat kitabı invalidation hook'ları)
 from datetime import datetime
 
 fiyat_bp = Blueprint('fiyat', __name__)
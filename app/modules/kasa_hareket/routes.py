@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from flask import Blueprint, render_template, request, jsonify, g, session
 from flask_login import login_required, current_user
 from app.form_builder import DataGrid, FieldType
+from app.modules.rapor.stream_export import export_source
 from .forms import create_kasa_hareket_form
 from .services import KasaService 
 from app.extensions import db, get_tenant_db # ✨ YENİ: Tenant DB
@@ -25,13 +26,11 @@ def parse_date_safe(date_str):
         except ValueError: continue
     return datetime.now().date()
 
-@kasa_hareket_bp.route('/')
-@login_required
-def index():
-    tenant_db = get_tenant_db()
-    
-    grid = DataGrid("kasa_hareket_list", KasaHareket, "Kasa Hareketleri")
-    
+def _kasa_hareket_grid():
+    """Liste ve export ekranlarının ortak grid tanımı"""
+    grid = DataGrid("kasa_hareket_list", KasaHareket, "Kasa Hareketleri",
+                    pagination_mode='keyset', count_mode='estimated')
+
     grid.add_column('tarih', 'Tarih', type='date', width='100px')
     grid.add_column('belge_no', 'Makbuz No')
     grid.add_column('cari.unvan', 'Cari / Açıklama', render_func=lambda r: r.cari.unvan if r.cari else (r.aciklama or '-'))
@@ -54,14 +53,36 @@ def index():
     for col in hidden_cols:
         grid.hide_column(col)
 
+    grid.add_export_action()
+    return grid
+
+
+@kasa_hareket_bp.route('/')
+@login_required
+def index():
+    tenant_db = get_tenant_db()
+    grid = _kasa_hareket_grid()
 
-    
     query = tenant_db.query(KasaHareket).filter_by(firma_id=str(current_user.firma_id)).order_by(KasaHareket.tarih.desc())
-    grid.process_query(query)
+    grid.process_query(query, default_sort=('tarih', 'desc'))
     
     return render_template('kasa_hareket/index.html', grid=grid)
 
 
+@kasa_hareket_bp.route('/export')
+@login_required
+def index_export():
+    """Grid filtreleriyle streaming CSV/XLSX export (büyük export'lar arka plan işine düşer)"""
+    return _kasa_hareket_grid().export(kaynak='kasa_hareket_grid')
+
+
+@export_source('kasa_hareket_grid')
+def _kasa_hareket_grid_export(tenant_db, params):
+    """Grid export kaynağı: Celery işi de aynı filtre/sıralamayla sorguyu yeniden kurar"""
+    query = tenant_db.query(KasaHareket).filter_by(firma_id=params['firma_id'])
+    return _kasa_hareket_grid().export_sorgusu(query, default_sort=('tarih', 'desc'))
+
+
 @kasa_hareket_bp.route('/ekle', methods=['GET', 'POST'])
 @login_required
 def ekle():
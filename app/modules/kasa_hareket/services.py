@@ -10,7 +10,9 @@ from app.extensions import get_tenant_db # 🔥 SAAS MİMARİSİ İÇİN ŞART
 from app.modules.kasa_hareket.models import KasaHareket
 from app.modules.kasa.models import Kasa
 from app.enums import BankaIslemTuru, CariIslemTuru
-from app.araclar import para_cevir, numara_uret
+from app.araclar import para_cevir
+from app.services.numara_servisi import NumaraServisi
+from app.modules.muhasebe.bakiye import BakiyeMotoru, KASA
 
 # Diğer servisleri fonksiyon içlerinde çağırarak Circular Import (Döngüsel İçe Aktarma) hatalarını önleyeceğiz
 from app.signals import kasa_hareket_olusturuldu
@@ -26,33 +28,20 @@ class KasaService:
 
     @staticmethod
     def bakiye_guncelle(kasa_id: str):
-        """Kasa bakiyesini tüm hareketleri tarayarak kuruşu kuruşuna yeniden hesaplar"""
+        """
+        Kasa bakiyesi (Giriş - Çıkış).
+
+        Hareketler kaydedilirken aylık bakiye özetine delta olarak işlenir
+        (bkz. app.modules.muhasebe.bakiye); burada tüm hareketler taranmaz,
+        sadece ay özetleri toplanır.
+        """
         if not kasa_id: return
         tenant_db = get_tenant_db()
-        
-        giris_turleri = ['TAHSILAT', 'VIRMAN_GIRIS', 'POS_TAHSILAT', 'GIRIS', 'tahsilat', 'virman_giris']
-        if hasattr(BankaIslemTuru, 'TAHSILAT'):
-            giris_turleri.extend([BankaIslemTuru.TAHSILAT, BankaIslemTuru.VIRMAN_GIRIS])
-
-        cikis_turleri = ['TEDIYE', 'VIRMAN_CIKIS', 'CIKIS', 'tediye', 'virman_cikis']
-        if hasattr(BankaIslemTuru, 'TEDIYE'):
-            cikis_turleri.extend([BankaIslemTuru.TEDIYE, BankaIslemTuru.VIRMAN_CIKIS])
-
-        girisler = tenant_db.query(func.coalesce(func.sum(KasaHareket.tutar), 0)).filter(
-            KasaHareket.kasa_id == str(kasa_id),
-            KasaHareket.onaylandi == True,
-            KasaHareket.islem_turu.in_(giris_turleri)
-        ).scalar() or Decimal('0.00')
-
-        cikislar = tenant_db.query(func.coalesce(func.sum(KasaHareket.tutar), 0)).filter(
-            KasaHareket.kasa_id == str(kasa_id),
-            KasaHareket.onaylandi == True,
-            KasaHareket.islem_turu.in_(cikis_turleri)
-        ).scalar() or Decimal('0.00')
 
         kasa = tenant_db.get(Kasa, str(kasa_id))
         if kasa:
-            kasa.bakiye = Decimal(str(girisler)) - Decimal(str(cikislar))
+            girisler, cikislar = BakiyeMotoru.bakiye(KASA, str(kasa_id), tenant_db=tenant_db)
+            kasa.bakiye = girisler - cikislar
             tenant_db.commit()
 
     @staticmethod
@@ -86,7 +75,8 @@ class KasaService:
                 if not hareket: return False, "Hareket bulunamadı."
             else:
                 hareket = KasaHareket()
-                hareket.belge_no = numara_uret(data['firma_id'], 'KASA', datetime.now().year, 'MAK-', 6)
+                # Makbuz no boşluksuz: commit anında atanır (cari / muhasebe kopyaları dahil)
+                NumaraServisi.ertele(hareket, 'belge_no', data['firma_id'], 'KASA', datetime.now().year, 'MAK-', 6, tenant_db=tenant_db)
 
             # 3. VERİ ATAMA
             hareket.firma_id = data['firma_id']
@@ -211,7 +201,8 @@ class KasaService:
                     if fis.resmi_defter_basildi:
                         return False, "Bu işlemin muhasebe fişi resmileştiği için silinemez!"
                     
-                    # Detayları ve fişi sil
+                    # Detayları ve fişi sil (önce hesap bakiyelerinden geri al)
+                    BakiyeMotoru.fis_uygula(tenant_db, fis, isaret=-1)
                     tenant_db.query(MuhasebeFisiDetay).filter_by(fis_id=fis.id).delete()
                     tenant_db.delete(fis)
                     logger.debug("   -> Muhasebe Fişi Silindi.")
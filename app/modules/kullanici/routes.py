@@ -12,6 +12,7 @@ from datetime import datetime
 # Modeller
 from app.modules.kullanici.models import Kullanici # Tenant
 from app.models.master import User, UserTenantRole # Master
+from app.services.tenant_context import TenantContextResolver
 from app.modules.sube.models import Sube # Tenant
 
 kullanici_bp = Blueprint('kullanici', __name__)
@@ -242,6 +243,8 @@ def sil(id):
         current_tenant_id = str(current_user.firma_id)
         UserTenantRole.query.filter_by(user_id=str(id), tenant_id=current_tenant_id).delete()
         db.session.commit()
+        # Toplu delete ORM event'lerini tetiklemez: rol cache'i elle düşürülür
+        TenantContextResolver.invalidate(current_tenant_id)
         
         # Sadece bu firmadaki yetkisini kapat ve Tenant tarafında soft delete yap
         sync_user_to_tenant(id, current_tenant_id, "Silinmiş Kullanıcı", "silindi@silindi.com", None, False)
@@ -19,6 +19,7 @@ from app.modules.sube.models import Sube
 from app.modules.firmalar.models import Donem
 from app.form_builder.ai_generator import generate_form_from_text
 from app.form_builder.form import Form
+from app.form_builder.lookup import LookupRegistry
 import logging
 
 logger = logging.getLogger(__name__)
@@ -98,6 +99,18 @@ def change_context():
     return redirect(request.referrer or url_for('main.index'))
 
 
+@main_bp.route('/api/lookup/<ad>')
+@login_required
+def api_lookup(ad):
+    """Büyük seçenek listeleri için Select2 uzaktan arama (LookupRegistry)"""
+    try:
+        parametreler = {p: request.args.get(p) for p in LookupRegistry.parametre_adlari(ad) if request.args.get(p)}
+    except ValueError:
+        return jsonify({'results': [], 'pagination': {'more': False}}), 404
+
+    terim = (request.args.get('term') or request.args.get('q', '')).strip()
+    return jsonify(LookupRegistry.ara(ad, terim, sayfa=request.args.get('page', 1, type=int), **parametreler))
+
 @main_bp.route('/')
 @login_required
 def index():
@@ -16,6 +16,7 @@ from app.modules.depo.models import Depo
 from app.modules.sube.models import Sube
 from app.modules.kasa.models import Kasa
 from app.modules.firmalar.models import Donem
+from app.modules.fiyat.pricebook import FiyatKitabi
 from app.enums import BankaIslemTuru, FaturaTuru, HareketTuru, CariIslemTuru
 import traceback
 
@@ -88,23 +89,28 @@ def sicak_satis():
             toplam_tutar = Decimal('0.00')
             
             # 2. Kalemler ve Stok Hareketleri
-            for i in range(len(stok_ids)):
-                if not stok_ids[i] or not miktarlar[i]: continue
-                
-                stok = tenant_db.query(StokKart).get(str(stok_ids[i]))
-                if not stok: continue
+            # Tüm satırlar tek çağrıda fiyatlanır (baz fiyat + carinin grup listesi)
+            satirlar = [
+                (str(stok_ids[i]), Decimal(str(miktarlar[i])))
+                for i in range(len(stok_ids)) if stok_ids[i] and miktarlar[i]
+            ]
+            musteri_grubu = tenant_db.query(CariHesap.musteri_grubu).filter(CariHesap.id == str(cari_id)).scalar()
+            fiyatlar = FiyatKitabi.toplu_fiyatla(satirlar, musteri_grubu=musteri_grubu)
+
+            for stok_id, miktar in satirlar:
+                fiyat = fiyatlar.get(stok_id)
+                if not fiyat: continue
                 
-                miktar = Decimal(str(miktarlar[i]))
-                tutar = miktar * Decimal(str(stok.satis_fiyati or 0))
+                tutar = miktar * fiyat['net_fiyat']
                 
                 kalem = FaturaKalemi(
                     fatura_id=str(fatura.id),
-                    stok_id=str(stok.id),
+                    stok_id=stok_id,
                     miktar=miktar,
-                    birim_fiyat=stok.satis_fiyati,
+                    birim_fiyat=fiyat['net_fiyat'],
                     satir_toplami=tutar,
                     net_tutar=tutar, # KDV'siz basitleştirilmiş senaryo (istersen geliştirebilirsin)
-                    kdv_orani=Decimal('20.00')
+                    kdv_orani=Decimal(fiyat['kdv_orani'])
                 )
                 tenant_db.add(kalem)
                 toplam_tutar += tutar
@@ -116,7 +122,7 @@ def sicak_satis():
                     firma_id=str(current_user.firma_id),
                     donem_id=donem_id,
                     sube_id=str(depo.sube_id),
-                    stok_id=str(stok.id),
+                    stok_id=stok_id,
                     hareket_turu=HareketTuru.SATIS.value,
                     miktar=miktar,
                     cikis_depo_id=str(depo.id),
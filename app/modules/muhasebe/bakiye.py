@@ -0,0 +1,534 @@
+# app/modules/muhasebe/bakiye.py
+"""
+Bakiye Delta Motoru (Muhasebe Hesapları / Kasa / Banka)
+
+Fiş kesildiğinde hesap bakiyeleri tüm defter yeniden taranarak değil, fişin
+kendi satırlarından üretilen işaretli borç/alacak deltalarıyla güncellenir:
+    - hesap_plani.borc_bakiye / alacak_bakiye  → hesap + tüm üst hesapları (tek UPDATE)
+    - bakiye_ozetleri (aylık dönem özeti)        → tek çok satırlı upsert
+
+Kasa ve banka hareketleri ORM event'leriyle aynı özet tablosuna işlenir
+(banka_hesaplari.bakiye de delta ile güncellenir). Geçmiş tarihli bakiye:
+    önceki ayların özeti + içinde bulunulan ayın kısmi hareketleri
+
+Doğrulama / onarım:
+    BakiyeMotoru.dogrula(firma_id)          → ham kayıtlarla karşılaştırma
+    BakiyeMotoru.yeniden_olustur(firma_id)  → özetleri ve bakiyeleri sıfırdan kurma
+    (CLI: flask muhasebe-bakiye-dogrula <tenant_id> [--onar])
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import select, update, delete, insert, func, case, bindparam, event, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import get_tenant_db
+from app.modules.muhasebe.models import HesapPlani, MuhasebeFisi, MuhasebeFisiDetay, BakiyeOzeti, generate_uuid
+from app.modules.kasa_hareket.models import KasaHareket
+from app.modules.banka_hareket.models import BankaHareket
+from app.modules.banka.models import BankaHesap
+
+logger = logging.getLogger(__name__)
+
+MUHASEBE = 'muhasebe'
+KASA = 'kasa'
+BANKA = 'banka'
+HESAP_TURLERI = (MUHASEBE, KASA, BANKA)
+
+# Kasa / banka hareket yönleri (enum adı veya değeri, büyük harfe çevrilerek)
+GIRIS_TURLERI = {'TAHSILAT', 'VIRMAN_GIRIS', 'POS_TAHSILAT', 'GIRIS'}
+CIKIS_TURLERI = {'TEDIYE', 'VIRMAN_CIKIS', 'CIKIS'}
+
+_SIFIR = Decimal('0.00')
+_DELTA_KEY = '_bakiye_ozeti_deltalari'
+_BANKA_KEY = '_banka_bakiye_deltalari'
+
+
+def donem_kodu(tarih):
+    """date → 'YYYYMM'"""
+    return tarih.strftime('%Y%m')
+
+
+class BakiyeMotoru:
+    """
+    ✅ BAKİYE DELTA MOTORU
+
+    Kullanım (fiş kaydında):
+        BakiyeMotoru.fis_uygula(tenant_db, eski_fis, isaret=-1)  # satırlar silinmeden önce
+        ...
+        BakiyeMotoru.fis_uygula(tenant_db, fis)                  # yeni satırlar flush edildikten sonra
+    """
+
+    # ========================================
+    # 📌 FİŞ DELTALARI
+    # ========================================
+
+    @staticmethod
+    def fis_uygula(tenant_db, fis, isaret=1):
+        """
+        Fişin veritabanındaki satırlarını hesap bazında toplayıp bakiyelere
+        işaretli olarak uygular (isaret=-1: geri alma).
+
+        Maliyet fişin satır sayısıyla orantılıdır, defter büyüklüğünden bağımsızdır.
+        """
+        if fis is None or fis.id is None:
+            return
+
+        d = MuhasebeFisiDetay.__table__
+        satirlar = tenant_db.execute(
+            select(d.c.hesap_id, func.sum(d.c.borc), func.sum(d.c.alacak))
+            .where(d.c.fis_id == str(fis.id))
+            .group_by(d.c.hesap_id)
+        ).all()
+
+        deltalar = {
+            str(hesap_id): (Decimal(str(borc or 0)) * isaret, Decimal(str(alacak or 0)) * isaret)
+            for hesap_id, borc, alacak in satirlar if hesap_id
+        }
+        if deltalar:
+            BakiyeMotoru.hesap_deltalari_uygula(
+                tenant_db.connection(), str(fis.firma_id), fis.tarih, deltalar
+            )
+
+    @staticmethod
+    def hesap_deltalari_uygula(connection, firma_id, tarih, deltalar):
+        """
+        {hesap_id: (borc, alacak)} deltalarını hesap + üst hesaplarına yayarak uygular.
+        """
+        zincirler = BakiyeMotoru._ust_hesap_zincirleri(connection, deltalar.keys())
+
+        toplam = defaultdict(lambda: [_SIFIR, _SIFIR])
+        for hesap_id, (borc, alacak) in deltalar.items():
+            for h_id in zincirler.get(hesap_id, [hesap_id]):
+                toplam[h_id][0] += borc
+                toplam[h_id][1] += alacak
+
+        toplam = {h: v for h, v in toplam.items() if v[0] or v[1]}
+        if not toplam:
+            return
+
+        h = HesapPlani.__table__
+        connection.execute(
+            update(h)
+            .where(h.c.id == bindparam('_hesap_id'))
+            .values(
+                borc_bakiye=func.coalesce(h.c.borc_bakiye, 0) + bindparam('_borc'),
+                alacak_bakiye=func.coalesce(h.c.alacak_bakiye, 0) + bindparam('_alacak'),
+            ),
+            [{'_hesap_id': h_id, '_borc': b, '_alacak': a} for h_id, (b, a) in toplam.items()]
+        )
+
+        donem = donem_kodu(tarih)
+        BakiyeMotoru.ozet_uygula(connection, [
+            (firma_id, MUHASEBE, h_id, donem, b, a) for h_id, (b, a) in toplam.items()
+        ])
+
+    @staticmethod
+    def _ust_hesap_zincirleri(connection, hesap_idler):
+        """{hesap_id: [hesap_id, ust, ust_ust, ...]} (seviye sayısı kadar küçük sorgu)"""
+        h = HesapPlani.__table__
+        ust = {}
+        bekleyen = {str(x) for x in hesap_idler}
+        while bekleyen:
+            satirlar = connection.execute(
+                select(h.c.id, h.c.ust_hesap_id).where(h.c.id.in_(bekleyen))
+            ).all()
+            bekleyen = set()
+            for h_id, ust_id in satirlar:
+                ust[str(h_id)] = str(ust_id) if ust_id else None
+                if ust_id and str(ust_id) not in ust:
+                    bekleyen.add(str(ust_id))
+
+        zincirler = {}
+        for hesap_id in hesap_idler:
+            zincir, gorulen = [], set()
+            h_id = str(hesap_id)
+            while h_id and h_id not in gorulen:  # hatalı döngüsel planlara karşı
+                zincir.append(h_id)
+                gorulen.add(h_id)
+                h_id = ust.get(h_id)
+            zincirler[str(hesap_id)] = zincir
+        return zincirler
+
+    # ========================================
+    # 🗓️ AYLIK ÖZET (SNAPSHOT)
+    # ========================================
+
+    @staticmethod
+    def ozet_uygula(connection, satirlar):
+        """
+        [(firma_id, hesap_turu, hesap_id, donem, borc, alacak), ...] deltalarını
+        aylık özet tablosuna tek çok satırlı upsert ile uygular.
+        """
+        if not satirlar:
+            return
+        table = BakiyeOzeti.__table__
+        degerler = [
+            dict(id=generate_uuid(), firma_id=f, hesap_turu=t, hesap_id=h, donem=d, borc=b, alacak=a)
+            for f, t, h, d, b, a in satirlar
+        ]
+
+        if connection.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as upsert
+            stmt = upsert(table).values(degerler)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['hesap_turu', 'hesap_id', 'donem'],
+                set_={'borc': table.c.borc + stmt.excluded.borc, 'alacak': table.c.alacak + stmt.excluded.alacak}
+            )
+        else:
+            from sqlalchemy.dialects.mysql import insert as upsert
+            stmt = upsert(table).values(degerler)
+            stmt = stmt.on_duplicate_key_update(
+                borc=table.c.borc + stmt.inserted.borc,
+                alacak=table.c.alacak + stmt.inserted.alacak,
+            )
+        connection.execute(stmt)
+
+    @staticmethod
+    def bakiye(hesap_turu, hesap_id, tarih=None, tenant_db=None):
+        """
+        Tarih itibarıyla (dahil) bakiye: önceki ayların özeti + ayın kısmi hareketleri.
+
+        Returns:
+            tuple: (borc, alacak)
+        """
+        tenant_db = tenant_db or get_tenant_db()
+        tarih = tarih or date.today()
+        o = BakiyeOzeti.__table__
+
+        ozet = tenant_db.execute(
+            select(func.coalesce(func.sum(o.c.borc), 0), func.coalesce(func.sum(o.c.alacak), 0))
+            .where(o.c.hesap_turu == hesap_turu, o.c.hesap_id == str(hesap_id), o.c.donem < donem_kodu(tarih))
+        ).one()
+        borc, alacak = Decimal(str(ozet[0])), Decimal(str(ozet[1]))
+
+        hesap_idler = [str(hesap_id)]
+        if hesap_turu == MUHASEBE:
+            hesap_idler = BakiyeMotoru._alt_hesaplar(tenant_db, str(hesap_id))
+
+        kismi = _ham_hareketler(hesap_turu, hesap_idler=hesap_idler,
+                                baslangic=tarih.replace(day=1), bitis=tarih)
+        for _, _, b, a in tenant_db.execute(kismi):
+            borc += Decimal(str(b or 0))
+            alacak += Decimal(str(a or 0))
+        return borc, alacak
+
+    @staticmethod
+    def _alt_hesaplar(tenant_db, hesap_id):
+        """Hesap + tüm alt hesapları"""
+        h = HesapPlani.__table__
+        sonuc, bekleyen = {hesap_id}, {hesap_id}
+        while bekleyen:
+            alt = {str(x) for x in tenant_db.execute(
+                select(h.c.id).where(h.c.ust_hesap_id.in_(bekleyen))
+            ).scalars()}
+            bekleyen = alt - sonuc
+            sonuc |= bekleyen
+        return list(sonuc)
+
+    # ========================================
+    # 🔍 DOĞRULAMA / YENİDEN OLUŞTURMA
+    # ========================================
+
+    @staticmethod
+    def _beklenen(connection, firma_id, hesap_turu):
+        """
+        Ham kayıtlardan beklenen aylık özetler ve güncel bakiyeler.
+
+        Returns:
+            tuple: ({(hesap_id, donem): [borc, alacak]}, {hesap_id: [borc, alacak]})
+        """
+        ozetler = defaultdict(lambda: [_SIFIR, _SIFIR])
+        for hesap_id, tarih, borc, alacak in connection.execute(_ham_hareketler(hesap_turu, firma_id=firma_id)):
+            if not hesap_id or tarih is None:
+                continue
+            kayit = ozetler[(str(hesap_id), donem_kodu(tarih))]
+            kayit[0] += Decimal(str(borc or 0))
+            kayit[1] += Decimal(str(alacak or 0))
+
+        if hesap_turu == MUHASEBE:
+            # Muavin toplamlarını üst hesaplara yay
+            h = HesapPlani.__table__
+            ust = {str(i): (str(u) if u else None) for i, u in connection.execute(
+                select(h.c.id, h.c.ust_hesap_id).where(h.c.firma_id == firma_id)
+            )}
+            yayilmis = defaultdict(lambda: [_SIFIR, _SIFIR])
+            for (hesap_id, donem), (borc, alacak) in ozetler.items():
+                h_id, gorulen = hesap_id, set()
+                while h_id and h_id not in gorulen:
+                    gorulen.add(h_id)
+                    yayilmis[(h_id, donem)][0] += borc
+                    yayilmis[(h_id, donem)][1] += alacak
+                    h_id = ust.get(h_id)
+            ozetler = yayilmis
+
+        toplamlar = defaultdict(lambda: [_SIFIR, _SIFIR])
+        for (hesap_id, _), (borc, alacak) in ozetler.items():
+            toplamlar[hesap_id][0] += borc
+            toplamlar[hesap_id][1] += alacak
+        return dict(ozetler), dict(toplamlar)
+
+    @staticmethod
+    def _mevcut_bakiyeler(connection, firma_id, hesap_turu, ozetler):
+        """Tablodaki güncel bakiyeler ({hesap_id: (borc, alacak)}); kasa için özetlerin toplamı"""
+        if hesap_turu == MUHASEBE:
+            h = HesapPlani.__table__
+            return {str(i): (Decimal(str(b or 0)), Decimal(str(a or 0))) for i, b, a in connection.execute(
+                select(h.c.id, h.c.borc_bakiye, h.c.alacak_bakiye).where(h.c.firma_id == firma_id)
+            )}
+        if hesap_turu == BANKA:
+            b = BankaHesap.__table__
+            return {str(i): (Decimal(str(bakiye or 0)), _SIFIR) for i, bakiye in connection.execute(
+                select(b.c.id, b.c.bakiye).where(b.c.firma_id == firma_id)
+            )}
+        toplam = defaultdict(lambda: [_SIFIR, _SIFIR])
+        for (hesap_id, _), (borc, alacak) in ozetler.items():
+            toplam[hesap_id][0] += borc
+            toplam[hesap_id][1] += alacak
+        return {k: tuple(v) for k, v in toplam.items()}
+
+    @staticmethod
+    def dogrula(firma_id, hesap_turleri=HESAP_TURLERI, tenant_db=None):
+        """
+        Özet tablosunu ve güncel bakiyeleri ham kayıtlarla karşılaştırır.
+
+        Returns:
+            list[dict]: Farklar [{hesap_turu, hesap_id, donem ('*' = güncel bakiye), beklenen, mevcut}]
+        """
+        tenant_db = tenant_db or get_tenant_db()
+        connection = tenant_db.connection()
+        o = BakiyeOzeti.__table__
+        farklar = []
+
+        for hesap_turu in hesap_turleri:
+            beklenen_ozet, beklenen_toplam = BakiyeMotoru._beklenen(connection, firma_id, hesap_turu)
+
+            mevcut_ozet = {
+                (str(h_id), donem): (Decimal(str(b or 0)), Decimal(str(a or 0)))
+                for h_id, donem, b, a in connection.execute(
+                    select(o.c.hesap_id, o.c.donem, o.c.borc, o.c.alacak)
+                    .where(o.c.firma_id == firma_id, o.c.hesap_turu == hesap_turu)
+                )
+            }
+            for anahtar in set(beklenen_ozet) | set(mevcut_ozet):
+                beklenen = tuple(beklenen_ozet.get(anahtar, (_SIFIR, _SIFIR)))
+                mevcut = mevcut_ozet.get(anahtar, (_SIFIR, _SIFIR))
+                if beklenen != mevcut:
+                    farklar.append(dict(hesap_turu=hesap_turu, hesap_id=anahtar[0], donem=anahtar[1],
+                                        beklenen=beklenen, mevcut=mevcut))
+
+            mevcut_toplam = BakiyeMotoru._mevcut_bakiyeler(connection, firma_id, hesap_turu, mevcut_ozet)
+            for hesap_id in set(beklenen_toplam) | set(mevcut_toplam):
+                borc, alacak = beklenen_toplam.get(hesap_id, (_SIFIR, _SIFIR))
+                beklenen = (borc - alacak, _SIFIR) if hesap_turu == BANKA else (borc, alacak)
+                mevcut = mevcut_toplam.get(hesap_id, (_SIFIR, _SIFIR))
+                if beklenen != mevcut:
+                    farklar.append(dict(hesap_turu=hesap_turu, hesap_id=hesap_id, donem='*',
+                                        beklenen=beklenen, mevcut=mevcut))
+        return farklar
+
+    @staticmethod
+    def yeniden_olustur(firma_id, hesap_turleri=HESAP_TURLERI, tenant_db=None):
+        """
+        Özetleri ve güncel bakiyeleri ham kayıtlardan sıfırdan kurar (set-based).
+
+        Returns:
+            int: Yazılan özet satırı sayısı
+        """
+        tenant_db = tenant_db or get_tenant_db()
+        connection = tenant_db.connection()
+        o = BakiyeOzeti.__table__
+        yazilan = 0
+
+        for hesap_turu in hesap_turleri:
+            ozetler, toplamlar = BakiyeMotoru._beklenen(connection, firma_id, hesap_turu)
+
+            connection.execute(delete(o).where(o.c.firma_id == firma_id, o.c.hesap_turu == hesap_turu))
+            if ozetler:
+                connection.execute(insert(o), [
+                    dict(id=generate_uuid(), firma_id=firma_id, hesap_turu=hesap_turu,
+                         hesap_id=h_id, donem=donem, borc=b, alacak=a)
+                    for (h_id, donem), (b, a) in ozetler.items()
+                ])
+                yazilan += len(ozetler)
+
+            if hesap_turu == MUHASEBE:
+                h = HesapPlani.__table__
+                connection.execute(
+                    update(h).where(h.c.firma_id == firma_id).values(borc_bakiye=0, alacak_bakiye=0)
+                )
+                if toplamlar:
+                    connection.execute(
+                        update(h).where(h.c.id == bindparam('_hesap_id'))
+                        .values(borc_bakiye=bindparam('_borc'), alacak_bakiye=bindparam('_alacak')),
+                        [{'_hesap_id': k, '_borc': b, '_alacak': a} for k, (b, a) in toplamlar.items()]
+                    )
+            elif hesap_turu == BANKA:
+                b_tab = BankaHesap.__table__
+                connection.execute(update(b_tab).where(b_tab.c.firma_id == firma_id).values(bakiye=0))
+                if toplamlar:
+                    connection.execute(
+                        update(b_tab).where(b_tab.c.id == bindparam('_hesap_id')).values(bakiye=bindparam('_bakiye')),
+                        [{'_hesap_id': k, '_bakiye': b - a} for k, (b, a) in toplamlar.items()]
+                    )
+
+        logger.info(f"♻️ Bakiye özetleri yeniden oluşturuldu: firma={firma_id} satır={yazilan}")
+        return yazilan
+
+
+# ========================================
+# 📚 HAM KAYIT KAYNAKLARI
+# ========================================
+
+def _yon_kosullari(kolon):
+    """(giriş koşulu, çıkış koşulu) - enum kolonları üye adıyla saklanır"""
+    from app.enums import BankaIslemTuru
+    giris = [uye for uye in BankaIslemTuru if uye.name in GIRIS_TURLERI]
+    cikis = [uye for uye in BankaIslemTuru if uye.name in CIKIS_TURLERI]
+    return kolon.in_(giris), kolon.in_(cikis)
+
+
+def _ham_hareketler(hesap_turu, firma_id=None, hesap_idler=None, baslangic=None, bitis=None):
+    """
+    Ham kayıtlardan (hesap_id, tarih, borc, alacak) günlük toplamlar.
+    Kasa/banka için borç = giriş, alacak = çıkış.
+    """
+    if hesap_turu == MUHASEBE:
+        d, f = MuhasebeFisiDetay.__table__, MuhasebeFisi.__table__
+        hesap_kol, tarih_kol = d.c.hesap_id, f.c.tarih
+        stmt = select(hesap_kol, tarih_kol, func.sum(d.c.borc), func.sum(d.c.alacak)).select_from(
+            d.join(f, f.c.id == d.c.fis_id)
+        )
+        firma_kol = f.c.firma_id
+    else:
+        t = (KasaHareket if hesap_turu == KASA else BankaHareket).__table__
+        hesap_kol = t.c.kasa_id if hesap_turu == KASA else t.c.banka_id
+        tarih_kol = t.c.tarih
+        giris, cikis = _yon_kosullari(t.c.islem_turu)
+        stmt = select(
+            hesap_kol, tarih_kol,
+            func.sum(case((giris, t.c.tutar), else_=0)),
+            func.sum(case((cikis, t.c.tutar), else_=0)),
+        )
+        if hesap_turu == KASA:
+            stmt = stmt.where(t.c.onaylandi.is_(True))
+        firma_kol = t.c.firma_id
+
+    if firma_id is not None:
+        stmt = stmt.where(firma_kol == firma_id)
+    if hesap_idler is not None:
+        stmt = stmt.where(hesap_kol.in_(hesap_idler))
+    if baslangic is not None:
+        stmt = stmt.where(tarih_kol >= baslangic)
+    if bitis is not None:
+        stmt = stmt.where(tarih_kol <= bitis)
+    return stmt.group_by(hesap_kol, tarih_kol)
+
+
+# ========================================
+# 🔔 KASA / BANKA HAREKET EVENT'LERİ
+# ========================================
+# Bakiyeye etki eden alanlar (güncellemede eski katkı geri alınır, yenisi eklenir)
+_KASA_ALANLARI = ('kasa_id', 'islem_turu', 'tutar', 'tarih', 'onaylandi', 'firma_id')
+_BANKA_ALANLARI = ('banka_id', 'islem_turu', 'tutar', 'tarih', 'firma_id')
+
+
+def _yon(islem_turu):
+    ad = str(getattr(islem_turu, 'name', None) or islem_turu or '').upper()
+    if ad in GIRIS_TURLERI:
+        return 1
+    if ad in CIKIS_TURLERI:
+        return -1
+    return 0
+
+
+def _katki(hesap_turu, degerler):
+    """Hareketin bakiyeye katkısı: (firma_id, hesap_id, donem, borc, alacak) veya None"""
+    hesap_id = degerler['kasa_id'] if hesap_turu == KASA else degerler['banka_id']
+    yon = _yon(degerler['islem_turu'])
+    if not hesap_id or not yon or degerler['tarih'] is None:
+        return None
+    if hesap_turu == KASA and not degerler['onaylandi']:
+        return None
+    tutar = Decimal(str(degerler['tutar'] or 0))
+    borc, alacak = (tutar, _SIFIR) if yon > 0 else (_SIFIR, tutar)
+    tarih = degerler['tarih']
+    if hasattr(tarih, 'date'):
+        tarih = tarih.date()
+    return str(degerler['firma_id']), str(hesap_id), donem_kodu(tarih), borc, alacak
+
+
+def _biriktir(target, hesap_turu, alanlar, mod):
+    """mod: 'ekle' | 'sil' | 'guncelle'"""
+    session = inspect(target).session
+    if session is None:
+        return
+
+    state = inspect(target)
+    yeni = {a: getattr(target, a) for a in alanlar}
+    katkilar = []
+
+    if mod == 'guncelle':
+        if not any(state.attrs[a].history.has_changes() for a in alanlar):
+            return
+        eski = {}
+        for a in alanlar:
+            gecmis = state.attrs[a].history
+            eski[a] = gecmis.deleted[0] if gecmis.deleted else yeni[a]
+        katkilar.append((_katki(hesap_turu, eski), -1))
+        katkilar.append((_katki(hesap_turu, yeni), 1))
+    else:
+        katkilar.append((_katki(hesap_turu, yeni), 1 if mod == 'ekle' else -1))
+
+    deltalar = session.info.setdefault(_DELTA_KEY, {})
+    banka = session.info.setdefault(_BANKA_KEY, {})
+    for katki, isaret in katkilar:
+        if katki is None:
+            continue
+        firma_id, hesap_id, donem, borc, alacak = katki
+        kayit = deltalar.setdefault((firma_id, hesap_turu, hesap_id, donem), [_SIFIR, _SIFIR])
+        kayit[0] += borc * isaret
+        kayit[1] += alacak * isaret
+        if hesap_turu == BANKA:
+            banka[hesap_id] = banka.get(hesap_id, _SIFIR) + (borc - alacak) * isaret
+
+
+for _model, _tur, _alanlar in ((KasaHareket, KASA, _KASA_ALANLARI), (BankaHareket, BANKA, _BANKA_ALANLARI)):
+    event.listen(_model, 'after_insert',
+                 lambda m, c, t, _tur=_tur, _alanlar=_alanlar: _biriktir(t, _tur, _alanlar, 'ekle'))
+    event.listen(_model, 'after_delete',
+                 lambda m, c, t, _tur=_tur, _alanlar=_alanlar: _biriktir(t, _tur, _alanlar, 'sil'))
+    event.listen(_model, 'after_update',
+                 lambda m, c, t, _tur=_tur, _alanlar=_alanlar: _biriktir(t, _tur, _alanlar, 'guncelle'))
+
+
+@event.listens_for(Session, 'after_flush')
+def kasa_banka_bakiyelerini_uygula(session, flush_context):
+    """Flush'ta biriken kasa/banka deltalarını özet tablosuna ve banka bakiyesine uygular"""
+    deltalar = session.info.pop(_DELTA_KEY, None)
+    banka = session.info.pop(_BANKA_KEY, None)
+    if not deltalar and not banka:
+        return
+
+    connection = session.connection()
+    BakiyeMotoru.ozet_uygula(connection, [
+        (f, t, h, d, b, a) for (f, t, h, d), (b, a) in deltalar.items() if b or a
+    ])
+
+    banka = {k: v for k, v in (banka or {}).items() if v}
+    if banka:
+        b_tab = BankaHesap.__table__
+        connection.execute(
+            update(b_tab).where(b_tab.c.id == bindparam('_banka_id'))
+            .values(bakiye=func.coalesce(b_tab.c.bakiye, 0) + bindparam('_delta')),
+            [{'_banka_id': k, '_delta': v} for k, v in banka.items()]
+        )
+
+
+@event.listens_for(Session, 'after_rollback')
+def kasa_banka_deltalarini_at(session):
+    session.info.pop(_DELTA_KEY, None)
+    session.info.pop(_BANKA_KEY, None)
@@ -161,3 +161,33 @@ class MuhasebeFisiDetay(db.Model, TimestampMixin, SoftDeleteMixin):
 
     hesap = db.relationship('HesapPlani')
 
+
+
+class BakiyeOzeti(db.Model):
+    """
+    Aylık Bakiye Özeti (Dönem Snapshot'ı)
+
+    Muhasebe hesabı / kasa / banka bazında her ayın borç-alacak hareket toplamı.
+    Fiş ve hareket kayıtlarında delta olarak güncellenir; geçmiş tarihli bakiye
+    "önceki ayların özeti + içinde bulunulan ayın kısmi hareketleri" ile hesaplanır.
+    Muhasebe hesaplarında özetler üst hesaplara da yansıtılır (100 ← 100.01 ← 100.01.001).
+    """
+    __tablename__ = 'bakiye_ozetleri'
+
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    firma_id = db.Column(db.String(36), nullable=False, index=True)
+
+    # 'muhasebe' | 'kasa' | 'banka'
+    hesap_turu = db.Column(db.String(20), nullable=False)
+    hesap_id = db.Column(db.String(36), nullable=False)
+    donem = db.Column(db.String(6), nullable=False)  # '202501'
+
+    borc = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+    alacak = db.Column(Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('hesap_turu', 'hesap_id', 'donem', name='uq_bakiye_ozeti_donem'),
+    )
+
+    def __repr__(self):
+        return f"<BakiyeOzeti {self.hesap_turu}:{self.hesap_id} {self.donem}>"
@@ -13,7 +13,9 @@ from app.form_builder import DataGrid, FieldType
 from .forms import create_muhasebe_fis_form, create_hesap_form
 from datetime import datetime
 from sqlalchemy import func, case, literal
-from app.modules.muhasebe.services import numara_uret, fis_kaydet, resmi_defteri_kesinlestir
+from app.modules.muhasebe.services import fis_kaydet, resmi_defteri_kesinlestir
+from app.services.numara_servisi import NumaraServisi
+from app.modules.muhasebe.bakiye import BakiyeMotoru
 from app.modules.rapor.text_engine import TextReportEngine
 from flask import Response
 from flask_babel import gettext as _
@@ -33,30 +35,6 @@ def get_aktif_firma_id():
         return str(val)
     return None
 
-def bakiye_guncelle(firma_id, etkilenen_hesap_ids=None):
-    """PROFESYONEL BAKİYE MOTORU (Tenant DB)"""
-    tenant_db = get_tenant_db()
-    hesaplar = tenant_db.query(HesapPlani).filter_by(firma_id=firma_id).all()
-    
-    for h in hesaplar:
-        ozet = tenant_db.query(
-            func.sum(MuhasebeFisiDetay.borc),
-            func.sum(MuhasebeFisiDetay.alacak)
-        ).join(MuhasebeFisi).filter(
-            MuhasebeFisiDetay.hesap_id == h.id,
-            MuhasebeFisi.firma_id == firma_id
-        ).first()
-        
-        yeni_borc = ozet[0] or 0
-        yeni_alacak = ozet[1] or 0
-        
-        if h.borc_bakiye != yeni_borc or h.alacak_bakiye != yeni_alacak:
-            h.borc_bakiye = yeni_borc
-            h.alacak_bakiye = yeni_alacak
-            tenant_db.add(h)
-            
-    tenant_db.commit()
-
 def islem_kaydet(form, fis=None):
     """Muhasebe Fişini Kaydeder (Tenant DB)"""
     tenant_db = get_tenant_db()
@@ -109,10 +87,13 @@ def islem_kaydet(form, fis=None):
         prefix_map = {'MAHSUP': 'M-', 'TAHSIL': 'T-', 'TEDIYE': 'TD-', 'ACILIS': 'A-', 'KAPANIS': 'K-'}
         on_ek = prefix_map.get(tur_kod, 'FIS-')
         
-        fis.fis_no = numara_uret(firma_id, tur_kod, aktif_donem.baslangic.year, on_ek)
+        # Yevmiye no boşluksuz olmalı: numara commit anında atanır
+        NumaraServisi.ertele(fis, 'fis_no', firma_id, tur_kod, aktif_donem.baslangic.year, on_ek, tenant_db=tenant_db)
         tenant_db.add(fis)
     else:
         if fis.resmi_defter_basildi: raise Exception("Resmi deftere basılan fiş değiştirilemez!")
+        # Eski satırların bakiye etkisini (eski tarihiyle) geri al
+        BakiyeMotoru.fis_uygula(tenant_db, fis, isaret=-1)
         
     fis.fis_turu = data['fis_turu']
     fis.tarih = girilen_tarih
@@ -182,9 +163,11 @@ def islem_kaydet(form, fis=None):
     
     fis.toplam_borc = toplam_borc
     fis.toplam_alacak = toplam_alacak
+    tenant_db.flush()
     
+    # Sadece bu fişin satırları kadar bakiye deltası (hesap + üst hesaplar + aylık özet)
+    BakiyeMotoru.fis_uygula(tenant_db, fis)
     tenant_db.commit()
-    bakiye_guncelle(firma_id)
     
 @muhasebe_bp.route('/')
 @login_required
@@ -273,6 +256,7 @@ def sil(id):
     fis = tenant_db.get(MuhasebeFisi, id)
     if not fis: return jsonify({'success': False, 'message': 'Bulunamadı'}), 404
     try:
+        BakiyeMotoru.fis_uygula(tenant_db, fis, isaret=-1)
         tenant_db.delete(fis)
         tenant_db.commit()
         return jsonify({'success': True, 'message': 'Fiş silindi.'})
@@ -7,12 +7,13 @@ from sqlalchemy import func, case, cast, Integer, literal
 from flask_login import current_user
 from flask import session # ✨ EKLENDİ: Hayati import eksiği giderildi
 
-from app.araclar import numara_uret
+from app.services.numara_servisi import NumaraServisi
 from app.extensions import get_tenant_db # GOLDEN RULE
 
 # Modeller
 from app.modules.banka.models import BankaHesap
 from app.modules.muhasebe.models import MuhasebeFisi, MuhasebeFisiDetay, HesapPlani
+from app.modules.muhasebe.bakiye import BakiyeMotoru, MUHASEBE
 from app.modules.fatura.models import Fatura
 from app.modules.firmalar.models import Firma, Donem
 from app.modules.sube.models import Sube
@@ -86,35 +87,18 @@ class MuhasebeHesapService:
     @staticmethod
     def hedefli_bakiye_guncelle(firma_id: str, hesap_ids: list):
         """
-        ✨ YENİ: Performans canavarı! 
-        Bütün hesap planını değil, sadece işlem gören hesapların bakiyesini anında günceller.
+        (Geriye Dönük Uyumluluk) Bakiyeler artık fiş bazında delta ile güncelleniyor
+        (bkz. BakiyeMotoru.fis_uygula). Bu çağrı tutarsızlık şüphesinde firmanın
+        muhasebe bakiyelerini ham fişlerden yeniden kurar.
         """
         if not hesap_ids: return
-        
-        tenant_db = get_tenant_db()
-        benzersiz_hesaplar = set([h for h in hesap_ids if h])
-        
-        for h_id in benzersiz_hesaplar:
-            ozet = tenant_db.query(
-                func.sum(MuhasebeFisiDetay.borc),
-                func.sum(MuhasebeFisiDetay.alacak)
-            ).join(MuhasebeFisi).filter(
-                MuhasebeFisiDetay.hesap_id == str(h_id),
-                MuhasebeFisi.firma_id == firma_id
-            ).first()
-            
-            hesap = tenant_db.get(HesapPlani, str(h_id))
-            if hesap:
-                hesap.borc_bakiye = ozet[0] or Decimal('0.00')
-                hesap.alacak_bakiye = ozet[1] or Decimal('0.00')
-                
-        tenant_db.flush()
+        BakiyeMotoru.yeniden_olustur(firma_id, hesap_turleri=(MUHASEBE,))
+        get_tenant_db().flush()
 
 def bakiye_guncelle(firma_id):
     """(Geriye Dönük Uyumluluk İçin) Tüm bakiyeleri yeniden hesaplar"""
     tenant_db = get_tenant_db()
-    hesaplar = tenant_db.query(HesapPlani).filter_by(firma_id=firma_id).all()
-    MuhasebeHesapService.hedefli_bakiye_guncelle(firma_id, [h.id for h in hesaplar])
+    BakiyeMotoru.yeniden_olustur(firma_id, hesap_turleri=(MUHASEBE,), tenant_db=tenant_db)
     tenant_db.commit()
 
 def fis_kaydet(data, kullanici_id, sube_id, donem_id, firma_id, fis_id=None):
@@ -136,6 +120,8 @@ def fis_kaydet(data, kullanici_id, sube_id, donem_id, firma_id, fis_id=None):
             fis = tenant_db.get(MuhasebeFisi, fis_id)
             if not fis: return False, "Fiş bulunamadı."
             if fis.resmi_defter_basildi: return False, "Resmi deftere basılan fiş değiştirilemez!"
+            # Eski satırların bakiye etkisini (eski tarih/dönemiyle) geri al
+            BakiyeMotoru.fis_uygula(tenant_db, fis, isaret=-1)
             fis.duzenleyen_id = kullanici_id
             fis.son_duzenleme_tarihi = datetime.now()
         else:
@@ -146,7 +132,8 @@ def fis_kaydet(data, kullanici_id, sube_id, donem_id, firma_id, fis_id=None):
             tur_kod = data['fis_turu'].upper() if isinstance(data['fis_turu'], str) else 'GENEL'
             prefix_map = {'MAHSUP': 'M-', 'TAHSIL': 'T-', 'TEDIYE': 'TD-', 'ACILIS': 'A-', 'KAPANIS': 'K-'}
             on_ek = prefix_map.get(tur_kod, 'FIS-')
-            fis.fis_no = numara_uret(firma_id, tur_kod, girilen_tarih.year, on_ek)
+            # Yevmiye no boşluksuz olmalı: numara commit anında atanır
+            NumaraServisi.ertele(fis, 'fis_no', firma_id, tur_kod, girilen_tarih.year, on_ek, tenant_db=tenant_db)
             tenant_db.add(fis)
 
         # Enum Safety
@@ -158,10 +145,7 @@ def fis_kaydet(data, kullanici_id, sube_id, donem_id, firma_id, fis_id=None):
         fis.e_defter_donemi = girilen_tarih.strftime('%Y%m')
         tenant_db.flush()
 
-        eski_hesap_ids = []
         if fis_id:
-            eski_detaylar = tenant_db.query(MuhasebeFisiDetay).filter_by(fis_id=fis.id).all()
-            eski_hesap_ids = [d.hesap_id for d in eski_detaylar]
             tenant_db.query(MuhasebeFisiDetay).filter_by(fis_id=fis.id).delete()
 
         hesap_ids = data.get('detaylar_hesap_id', [])
@@ -177,7 +161,6 @@ def fis_kaydet(data, kullanici_id, sube_id, donem_id, firma_id, fis_id=None):
 
         toplam_borc = Decimal('0.00')
         toplam_alacak = Decimal('0.00')
-        aktif_hesap_ids = []
 
         for i in range(len(hesap_ids)):
             if not hesap_ids[i]: continue
@@ -187,7 +170,6 @@ def fis_kaydet(data, kullanici_id, sube_id, donem_id, firma_id, fis_id=None):
 
             toplam_borc += b
             toplam_alacak += a
-            aktif_hesap_ids.append(hesap_ids[i])
             
             b_tarih = None
             if i < len(belge_tarihleri) and belge_tarihleri[i]:
@@ -214,8 +196,8 @@ def fis_kaydet(data, kullanici_id, sube_id, donem_id, firma_id, fis_id=None):
         fis.toplam_alacak = toplam_alacak
         tenant_db.flush()
         
-        # ✨ Yalnızca etkilenen hesapların bakiyesini güncelle
-        MuhasebeHesapService.hedefli_bakiye_guncelle(firma_id, eski_hesap_ids + aktif_hesap_ids)
+        # ✨ Fişin satırları kadar delta (hesap + üst hesaplar + aylık özet)
+        BakiyeMotoru.fis_uygula(tenant_db, fis)
         
         tenant_db.commit()
         return True, "Fiş başarıyla kaydedildi."
@@ -320,7 +302,6 @@ class MuhasebeEntegrasyonService:
 
         toplam_borc = Decimal('0.00')
         toplam_alacak = Decimal('0.00')
-        kullanilan_hesap_ids = []
 
         for s in satirlar:
             if not s.get('hesap_id'): continue
@@ -337,14 +318,13 @@ class MuhasebeEntegrasyonService:
             tenant_db.add(detay)
             toplam_borc += borc
             toplam_alacak += alacak
-            kullanilan_hesap_ids.append(s['hesap_id'])
 
         fis.toplam_borc = toplam_borc
         fis.toplam_alacak = toplam_alacak
         tenant_db.flush()
         
         # ✨ Otomatik fişlerde de hesap bakiyelerini güncelliyoruz
-        MuhasebeHesapService.hedefli_bakiye_guncelle(firma_id, kullanilan_hesap_ids)
+        BakiyeMotoru.fis_uygula(tenant_db, fis)
         
         return fis
 
@@ -367,11 +347,10 @@ class MuhasebeEntegrasyonService:
                 fatura.muhasebe_fis_id = None
                 tenant_db.flush()
                 
-                eski_hesap_ids = [d.hesap_id for d in tenant_db.query(MuhasebeFisiDetay).filter_by(fis_id=old.id).all()]
+                BakiyeMotoru.fis_uygula(tenant_db, old, isaret=-1)
                 tenant_db.query(MuhasebeFisiDetay).filter_by(fis_id=old.id).delete()
                 tenant_db.delete(old)
                 tenant_db.flush()
-                MuhasebeHesapService.hedefli_bakiye_guncelle(fatura.firma_id, eski_hesap_ids)
 
         satirlar = []
         
@@ -448,11 +427,10 @@ class MuhasebeEntegrasyonService:
                     return False, "Resmi defter basılmış!"
                 hareket.muhasebe_fisi_id = None
                 tenant_db.flush()
-                eski_hesap_ids = [d.hesap_id for d in tenant_db.query(MuhasebeFisiDetay).filter_by(fis_id=old.id).all()]
+                BakiyeMotoru.fis_uygula(tenant_db, old, isaret=-1)
                 tenant_db.query(MuhasebeFisiDetay).filter_by(fis_id=str(old.id)).delete()
                 tenant_db.delete(old)
                 tenant_db.flush()
-                MuhasebeHesapService.hedefli_bakiye_guncelle(hareket.firma_id, eski_hesap_ids)
 
         ana_hesap = MuhasebeEntegrasyonService._hesap_bul(hareket.firma_id, kasa_id=hareket.kasa_id)
         if not ana_hesap: return False, "Kasa muhasebe hesabı tanımlı değil."
@@ -503,11 +481,10 @@ class MuhasebeEntegrasyonService:
                     return False, "Resmi defter basılmış!"
                 hareket.muhasebe_fisi_id = None
                 tenant_db.flush()
-                eski_hesap_ids = [d.hesap_id for d in tenant_db.query(MuhasebeFisiDetay).filter_by(fis_id=old.id).all()]
+                BakiyeMotoru.fis_uygula(tenant_db, old, isaret=-1)
                 tenant_db.query(MuhasebeFisiDetay).filter_by(fis_id=str(old.id)).delete()
                 tenant_db.delete(old)
                 tenant_db.flush()
-                MuhasebeHesapService.hedefli_bakiye_guncelle(hareket.firma_id, eski_hesap_ids)
 
         ana_hesap = MuhasebeEntegrasyonService._hesap_bul(hareket.firma_id, banka_id=hareket.banka_id)
         if not ana_hesap: return False, "Banka muhase hesabı tanımlı değil."
@@ -1,65 +1,36 @@
 # app/modules/raporlar/export_engine.py
 
+import os
 from io import BytesIO
-from flask import send_file, make_response
-import pandas as pd
+from flask import send_file
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
 
 class ExportEngine:
-    """Raporları farklı formatlara export et"""
+    """
+    Raporları farklı formatlara export et
+
+    rows: Satır iterable'ı (ORM Query, RaporBuilder.iter_rows() ...)
+    columns: [(alan_adi, başlık), ...]
+
+    Excel/CSV StreamingExporter üzerinden parça parça yazılır (DataFrame/BytesIO kurulmaz).
+    """
     
     @staticmethod
-    def to_excel(df, filename="rapor.xlsx"):
-        """Excel export (çoklu sheet destekli)"""
-        
-        output = BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Ana veri
-            df.to_excel(writer, sheet_name='Rapor', index=False)
-            
-            # Özet sayfa (otomatik)
-            summary = pd.DataFrame({
-                'Metrik': ['Toplam Kayıt', 'İlk Tarih', 'Son Tarih'],
-                'Değer': [
-                    len(df),
-                    df['tarih'].min() if 'tarih' in df.columns else 'N/A',
-                    df['tarih'].max() if 'tarih' in df.columns else 'N/A'
-                ]
-            })
-            summary.to_excel(writer, sheet_name='Özet', index=False)
-            
-            # Formatting
-            workbook = writer.book
-            worksheet = writer.sheets['Rapor']
-            
-            # Başlık stili
-            header_format = workbook.add_format({
-                'bold': True,
-                'bg_color': '#4F81BD',
-                'font_color': 'white',
-                'border': 1
-            })
-            
-            for col_num, value in enumerate(df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-                worksheet.set_column(col_num, col_num, 15)  # Genişlik
-        
-        output.seek(0)
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+    def to_excel(rows, columns, filename="rapor.xlsx"):
+        """Excel export (openpyxl write-only, geçici dosyadan stream)"""
+        from .stream_export import StreamingExporter
+        return StreamingExporter(rows, columns).response('xlsx', os.path.splitext(filename)[0])
     
     @staticmethod
-    def to_pdf(df, title="Rapor", filename="rapor.pdf"):
-        """PDF export (Türkçe karakter destekli)"""
+    def to_pdf(rows, columns, title="Rapor", filename="rapor.pdf"):
+        """
+        PDF export (Türkçe karakter destekli)
+        Not: reportlab tabloyu tek seferde çizer; satırlar burada listeye alınır.
+        """
+        from .stream_export import StreamingExporter
         
         output = BytesIO()
         
@@ -74,7 +45,8 @@ class ExportEngine:
         elements.append(Paragraph("<br/><br/>", styles['Normal']))
         
         # Tablo verisi hazırla
-        data = [df.columns.tolist()] + df.values.tolist()
+        exporter = StreamingExporter(rows, columns)
+        data = [exporter.headers] + list(exporter.iter_rows())
         
         # Tablo oluştur
         table = Table(data)
@@ -102,16 +74,7 @@ class ExportEngine:
         )
     
     @staticmethod
-    def to_csv(df, filename="rapor.csv"):
-        """CSV export (Excel uyumlu, Türkçe karakter)"""
-        
-        output = BytesIO()
-        df.to_csv(output, index=False, encoding='utf-8-sig', sep=';')
-        output.seek(0)
-        
-        return send_file(
-            output,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
-        )
\ No newline at end of file
+    def to_csv(rows, columns, filename="rapor.csv"):
+        """CSV export (Excel uyumlu, Türkçe karakter; chunk chunk stream)"""
+        from .stream_export import StreamingExporter
+        return StreamingExporter(rows, columns).response('csv', os.path.splitext(filename)[0])
@@ -0,0 +1,149 @@
+# app/modules/rapor/export_sources.py
+"""
+Streaming export kaynakları
+
+Her kaynak (tenant_db, params) alıp (query, columns) döner. Aynı fonksiyon hem
+istek içinde (doğrudan stream) hem Celery worker'ında (arka plan dosyası)
+sorguyu yeniden kurmak için kullanılır; bu yüzden sadece JSON'a çevrilebilir
+parametrelerle (string tarih, id) çalışır.
+
+params['firma_id'] export_or_enqueue tarafından oturumdaki kullanıcıdan yazılır
+(query string'den gelen değer ezilir); her kaynak bu firmaya göre süzülür.
+"""
+
+from datetime import datetime
+
+from .stream_export import export_source
+
+
+def _tarih(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _firma(query, model, params):
+    # firma_id yoksa hiçbir satır dönmez (firma_id NOT NULL)
+    return query.filter(model.firma_id == params.get('firma_id'))
+
+
+def _tarih_araligi(query, kolon, params):
+    baslangic = _tarih(params.get('baslangic'))
+    bitis = _tarih(params.get('bitis'))
+    if baslangic:
+        query = query.filter(kolon >= baslangic)
+    if bitis:
+        query = query.filter(kolon <= bitis)
+    return query
+
+
+@export_source('cari_hareket')
+def cari_hareket_export(tenant_db, params):
+    from app.modules.cari.models import CariHareket
+
+    query = _firma(tenant_db.query(CariHareket), CariHareket, params)
+    if params.get('cari_id'):
+        query = query.filter(CariHareket.cari_id == params['cari_id'])
+    query = _tarih_araligi(query, CariHareket.tarih, params)
+    query = query.order_by(CariHareket.tarih, CariHareket.id)
+
+    return query, [
+        ('tarih', 'Tarih'),
+        ('cari.kod', 'Cari Kodu'),
+        ('cari.unvan', 'Cari Ünvan'),
+        ('islem_turu', 'İşlem Türü'),
+        ('belge_no', 'Belge No'),
+        ('aciklama', 'Açıklama'),
+        ('vade_tarihi', 'Vade'),
+        ('borc', 'Borç'),
+        ('alacak', 'Alacak'),
+        ('doviz_kodu', 'Döviz'),
+    ]
+
+
+@export_source('cari_ekstre')
+def cari_ekstre_export(tenant_db, params):
+    from flask import abort
+    from app.modules.cari.ekstre import CariEkstreMotoru
+    from app.modules.cari.models import CariHesap
+
+    # Cari başka firmanınsa (veya yoksa) ekstre verilmez
+    cari_var = tenant_db.query(CariHesap.id).filter(
+        CariHesap.id == params.get('cari_id'), CariHesap.firma_id == params.get('firma_id')
+    ).first()
+    if cari_var is None:
+        abort(404)
+
+    motor = CariEkstreMotoru(params.get('cari_id'), params.get('baslangic'), params.get('bitis'), tenant_db=tenant_db)
+    return motor.export_kaynagi()
+
+
+@export_source('stok_hareketi')
+def stok_hareketi_export(tenant_db, params):
+    from app.modules.stok.models import StokHareketi
+
+    query = _firma(tenant_db.query(StokHareketi), StokHareketi, params)
+    if params.get('stok_id'):
+        query = query.filter(StokHareketi.stok_id == params['stok_id'])
+    query = _tarih_araligi(query, StokHareketi.tarih, params)
+    query = query.order_by(StokHareketi.tarih, StokHareketi.id)
+
+    return query, [
+        ('tarih', 'Tarih'),
+        ('stok_rel.kod', 'Stok Kodu'),
+        ('stok_rel.ad', 'Stok Adı'),
+        ('hareket_turu', 'Hareket Türü'),
+        ('belge_no', 'Belge No'),
+        ('giris_depo.ad', 'Giriş Depo'),
+        ('cikis_depo.ad', 'Çıkış Depo'),
+        ('miktar', 'Miktar'),
+        ('birim_fiyat', 'Birim Fiyat'),
+        ('net_tutar', 'Net Tutar'),
+        ('toplam_tutar', 'Toplam'),
+    ]
+
+
+@export_source('kasa_hareket')
+def kasa_hareket_export(tenant_db, params):
+    from app.modules.kasa_hareket.models import KasaHareket
+
+    query = _firma(tenant_db.query(KasaHareket), KasaHareket, params)
+    if params.get('kasa_id'):
+        query = query.filter(KasaHareket.kasa_id == params['kasa_id'])
+    query = _tarih_araligi(query, KasaHareket.tarih, params)
+    query = query.order_by(KasaHareket.tarih, KasaHareket.id)
+
+    return query, [
+        ('tarih', 'Tarih'),
+        ('belge_no', 'Belge No'),
+        ('kasa.ad', 'Kasa'),
+        ('islem_turu', 'İşlem Türü'),
+        ('cari.unvan', 'Cari'),
+        ('aciklama', 'Açıklama'),
+        ('tutar', 'Tutar'),
+    ]
+
+
+@export_source('banka_hareket')
+def banka_hareket_export(tenant_db, params):
+    from app.modules.banka_hareket.models import BankaHareket
+
+    query = _firma(tenant_db.query(BankaHareket), BankaHareket, params)
+    if params.get('banka_id'):
+        query = query.filter(BankaHareket.banka_id == params['banka_id'])
+    query = _tarih_araligi(query, BankaHareket.tarih, params)
+    query = query.order_by(BankaHareket.tarih, BankaHareket.id)
+
+    return query, [
+        ('tarih', 'Tarih'),
+        ('belge_no', 'Belge No'),
+        ('banka.ad', 'Banka Hesabı'),
+        ('islem_turu', 'İşlem Türü'),
+        ('cari.unvan', 'Cari'),
+        ('aciklama', 'Açıklama'),
+        ('tutar', 'Tutar'),
+        ('komisyon_tutari', 'Komisyon'),
+    ]
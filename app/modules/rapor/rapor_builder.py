@@ -135,13 +135,36 @@ class RaporBuilder:
         
         return pd.DataFrame()
 
+    def iter_rows(self, base_table, chunk_size=2000):
+        """
+        Raporu DataFrame kurmadan satır satır üret (dict benzeri RowMapping).
+        yield_per ile MySQL'de server-side cursor açılır; export'ta bellek sabit kalır.
+        """
+        sql, params = self.build_query(base_table)
+        result = self.db.execute(sql.execution_options(yield_per=chunk_size), params)
+        yield from result.mappings()
+
 
 # ===================================
 # KULLANIM ÖRNEKLERİ
 # ===================================
 
+AYLIK_SATIS_KOLONLARI = [
+    ('ay', 'Ay'),
+    ('yil', 'Yıl'),
+    ('fatura_sayisi', 'Fatura Sayısı'),
+    ('toplam_tutar', 'Toplam Tutar'),
+    ('ortalama_tutar', 'Ortalama Tutar'),
+]
+
+
 def rapor_aylik_satis_ozeti(tenant_db, baslangic, bitis):
     """Aylık satış özeti raporu"""
+    return aylik_satis_ozeti_builder(tenant_db, baslangic, bitis).execute('faturalar')
+
+
+def aylik_satis_ozeti_builder(tenant_db, baslangic, bitis):
+    """Aylık satış özeti sorgusu (export için iter_rows ile akıtılır)"""
     
     builder = RaporBuilder(tenant_db)
     
@@ -162,7 +185,7 @@ def rapor_aylik_satis_ozeti(tenant_db, baslangic, bitis):
     builder.add_order('yil', 'DESC')
     builder.add_order('ay', 'DESC')
     
-    return builder.execute('faturalar')
+    return builder
 
 
 def rapor_cari_bakiye_analizi(tenant_db, min_bakiye=1000):
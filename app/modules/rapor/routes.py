@@ -2,7 +2,10 @@
 
 import logging
 import datetime
-from flask import Blueprint, render_template, request, jsonify, Response, g, flash, send_file, make_response, session, url_for, redirect
+import os
+import shutil
+import tempfile
+from flask import Blueprint, render_template, request, jsonify, Response, g, flash, send_file, make_response, session, url_for, redirect, abort
 from flask_login import login_required, current_user
 
 from app.extensions import db, get_tenant_db, csrf
@@ -12,7 +15,7 @@ from app.modules.cari.models import CariHesap
 from app.modules.rapor.models import YazdirmaSablonu, SavedReport
 from app.modules.fatura.models import Fatura, FaturaKalemi
 from app.modules.firmalar.models import Firma
-from .rapor_builder import RaporBuilder, rapor_aylik_satis_ozeti
+from .rapor_builder import RaporBuilder, rapor_aylik_satis_ozeti, aylik_satis_ozeti_builder, AYLIK_SATIS_KOLONLARI
 from .export_engine import ExportEngine
  
 #from models import (, , , CariHesap, Fatura, KasaHareket, BankaHareket, CekSenet, Kullanici, FaturaTuru,
@@ -31,7 +34,7 @@ from app.enums import (
 )
 from .services import YevmiyeRaporuMotoru
 from io import BytesIO
-from .xml_builder import EDefterBuilder 
+from .xml_builder import EDefterBuilder, parcalari_paketle
 from .forms import create_sablon_form
 from .doc_engine import DocumentGenerator
 from app.form_builder import DataGrid
@@ -78,22 +81,82 @@ def export_rapor(format):
     if rapor_tipi == 'aylik_satis':
         bitis = datetime.now()
         baslangic = bitis - timedelta(days=365)
-        df = rapor_aylik_satis_ozeti(tenant_db, baslangic, bitis)
+        rows = aylik_satis_ozeti_builder(tenant_db, baslangic, bitis).iter_rows('faturalar')
+        columns = AYLIK_SATIS_KOLONLARI
         title = "Aylık Satış Raporu"
     else:
         return jsonify({'error': 'Geçersiz rapor tipi'}), 400
     
     # Export
     if format == 'excel':
-        return ExportEngine.to_excel(df, f"{rapor_tipi}.xlsx")
+        return ExportEngine.to_excel(rows, columns, f"{rapor_tipi}.xlsx")
     elif format == 'pdf':
-        return ExportEngine.to_pdf(df, title, f"{rapor_tipi}.pdf")
+        return ExportEngine.to_pdf(rows, columns, title, f"{rapor_tipi}.pdf")
     elif format == 'csv':
-        return ExportEngine.to_csv(df, f"{rapor_tipi}.csv")
+        return ExportEngine.to_csv(rows, columns, f"{rapor_tipi}.csv")
     else:
         return jsonify({'error': 'Geçersiz format'}), 400
-        
-        
+
+
+@rapor_bp.route('/export/hareket/<kaynak>/<format>')
+@login_required
+@permission_required('rapor.export')
+def export_hareket(kaynak, format):
+    """
+    Hareket dökümü (cari/stok/kasa/banka) streaming export.
+    Büyük sonuçlar arka plan işine çevrilir (202 + job_id).
+    """
+    from .stream_export import export_or_enqueue, get_export_source, EXPORT_FORMATS
+    from . import export_sources  # noqa: F401 (kaynak kayıtları)
+
+    if format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Geçersiz format'}), 400
+    if get_export_source(kaynak) is None:
+        return jsonify({'error': 'Geçersiz export kaynağı'}), 404
+
+    params = {k: v for k, v in request.args.items() if v}
+    params['firma_id'] = str(current_user.firma_id)
+    dosya_adi = f"{kaynak}_{datetime.now().strftime('%Y%m%d_%H%M')}"
+    return export_or_enqueue(kaynak, params, format, dosya_adi)
+
+
+@rapor_bp.route('/export/durum/<job_id>')
+@login_required
+def export_durum(job_id):
+    """Arka plan export işinin durumu"""
+    from .stream_export import ExportJobStore
+
+    job = ExportJobStore.get(job_id)
+    if not job or job.get('user_id') != str(current_user.id):
+        return jsonify({'success': False, 'message': 'İş bulunamadı'}), 404
+
+    return jsonify({
+        'success': True,
+        'status': job['status'],
+        'rows': job.get('rows'),
+        'error': job.get('error'),
+        'download_url': url_for('rapor.export_indir', job_id=job_id) if job['status'] == 'hazir' else None,
+    })
+
+
+@rapor_bp.route('/export/indir/<job_id>')
+@login_required
+def export_indir(job_id):
+    """Hazırlanan export dosyasını indir"""
+    import os
+    from .stream_export import ExportJobStore, send_job_file
+
+    job = ExportJobStore.get(job_id)
+    if not job or job.get('user_id') != str(current_user.id):
+        flash('Export dosyası bulunamadı.', 'danger')
+        return redirect(url_for('rapor.index'))
+    if job['status'] != 'hazir' or not job.get('path') or not os.path.exists(job['path']):
+        flash('Export dosyası henüz hazır değil.', 'warning')
+        return redirect(url_for('rapor.index'))
+
+    return send_job_file(job)
+
+
 @rapor_bp.route('/aylik-satis')
 @login_required
 def aylik_satis():
@@ -165,113 +228,52 @@ def stok_durum():
 @rapor_bp.route('/cari-ekstre', methods=['GET'])
 @login_required
 def cari_ekstre():
+    from app.modules.cari.ekstre import CariEkstreMotoru, tarih_coz
+
     form = create_cari_ekstre_form()
     
-    cari_id = request.args.get('cari_id', type=int)
-    baslangic = request.args.get('baslangic')
-    bitis = request.args.get('bitis')
+    cari_id = request.args.get('cari_id')
+    bas_tarih = tarih_coz(request.args.get('baslangic'))
+    bit_tarih = tarih_coz(request.args.get('bitis'))
     
     ekstre = []
     cari = None
-    devir_bakiye = 0
-    toplam_borc = 0
-    toplam_alacak = 0
-    
-    if cari_id and baslangic and bitis:
-        cari = CariHesap.query.get_or_404(cari_id)
-        bas_tarih = datetime.strptime(baslangic, '%Y-%m-%d').date()
-        bit_tarih = datetime.strptime(bitis, '%Y-%m-%d').date()
-        
-        # --- 1.DEVİR HESABI (Başlangıç tarihinden önceki bakiye) ---
-        # Bu kısım performans için ileride optimize edilebilir (SQL SUM ile)
-        # Şimdilik basitçe tüm hareketleri çekip python'da işleyeceğiz.
-        
-        # Tüm Hareketleri Çek
-        hareketler = []
-        
-        # Faturalar
-        faturalar = Fatura.query.filter_by(firma_id=current_user.firma_id, cari_id=cari_id).all()
-        for f in faturalar:
-            if f.fatura_turu == 'satis':
-                hareketler.append({'tarih': f.tarih, 'tur': 'Fatura', 'aciklama': f"Satış Faturası ({f.belge_no})", 'borc': f.genel_toplam, 'alacak': 0, 'belge_no': f.belge_no})
-            elif f.fatura_turu == 'alis':
-                hareketler.append({'tarih': f.tarih, 'tur': 'Fatura', 'aciklama': f"Alış Faturası ({f.belge_no})", 'borc': 0, 'alacak': f.genel_toplam, 'belge_no': f.belge_no})
-        
-        # Kasa
-        kasalar = KasaHareket.query.filter_by(firma_id=current_user.firma_id, cari_id=cari_id, onaylandi=True).all()
-        for k in kasalar:
-            if k.islem_turu == 'tahsilat': # Biz para aldık -> Cari Alacaklanır
-                hareketler.append({'tarih': k.tarih, 'tur': 'Kasa', 'aciklama': f"Tahsilat Makbuzu ({k.belge_no})", 'borc': 0, 'alacak': k.tutar, 'belge_no': k.belge_no})
-            elif k.islem_turu == 'tediye': # Biz para verdik -> Cari Borçlanır
-                hareketler.append({'tarih': k.tarih, 'tur': 'Kasa', 'aciklama': f"Ödeme Makbuzu ({k.belge_no})", 'borc': k.tutar, 'alacak': 0, 'belge_no': k.belge_no})
-
-        # Banka
-        bankalar = BankaHareket.query.filter_by(firma_id=current_user.firma_id, cari_id=cari_id).all()
-        for b in bankalar:
-            if b.islem_turu == 'tahsilat': # Gelen Havale -> Cari Alacak
-                hareketler.append({'tarih': b.tarih, 'tur': 'Banka', 'aciklama': f"Gelen Havale ({b.belge_no})", 'borc': 0, 'alacak': b.tutar, 'belge_no': b.belge_no})
-            elif b.islem_turu == 'tediye': # Giden Havale -> Cari Borç
-                hareketler.append({'tarih': b.tarih, 'tur': 'Banka', 'aciklama': f"Gönderilen Havale ({b.belge_no})", 'borc': b.tutar, 'alacak': 0, 'belge_no': b.belge_no})
-
-        cekler = CekSenet.query.filter_by(firma_id=current_user.firma_id, cari_id=cari_id).all()
-        for c in cekler:
-            # Modeldeki gerçek alan isimlerini kullanıyoruz
-            tarih_degeri = c.duzenleme_tarihi if c.duzenleme_tarihi else c.vade_tarihi
-            
-            if c.portfoy_tipi == PortfoyTipi.ALINAN.value: # 'alinan'
-                hareketler.append({
-                    'tarih': tarih_degeri, 
-                    'tur': 'Çek', 
-                    'aciklama': f"Alınan Çek ({c.belge_no})", 
-                    'borc': 0, 
-                    'alacak': c.tutar, 
-                    'belge_no': c.cek_no or c.belge_no
-                })
-            elif c.portfoy_tipi == PortfoyTipi.VERILEN.value: # 'verilen'
-                hareketler.append({
-                    'tarih': tarih_degeri, 
-                    'tur': 'Çek', 
-                    'aciklama': f"Verilen Çek ({c.belge_no})", 
-                    'borc': c.tutar, 
-                    'alacak': 0, 
-                    'belge_no': c.cek_no or c.belge_no
-                })
-
-        # Tarihe Göre Sırala
-        hareketler.sort(key=lambda x: x['tarih'])
-
-        # İşleme
-        bakiye = 0
-        ekstre = []
-        
-        # 1.Devir Hesapla
-        for h in hareketler:
-            if h['tarih'] < bas_tarih:
-                bakiye += (h['borc'] - h['alacak'])
-        
-        devir_bakiye = bakiye
-        
-        # 2.Aralıktaki Hareketleri Listele
-        # Başlangıç satırı olarak deviri ekle
+    sayfa = None
+    toplamlar = {'devir': 0, 'borc': 0, 'alacak': 0, 'kapanis': 0}
+    
+    if cari_id and bas_tarih and bit_tarih:
+        tenant_db = get_tenant_db()
+        cari = tenant_db.query(CariHesap).filter(
+            CariHesap.id == cari_id, CariHesap.firma_id == current_user.firma_id
+        ).first()
+        if not cari:
+            abort(404)
+
+        # Devir + pencere toplamları tek aggregate; satırlar keyset sayfalarıyla gelir
+        motor = CariEkstreMotoru(cari.id, bas_tarih, bit_tarih, tenant_db=tenant_db)
+        toplamlar = motor.toplamlar()
+        sayfa = motor.sayfa(after=request.args.get('after'), before=request.args.get('before'))
+
+        # Sayfanın başında devreden bakiye satırı (ilk sayfada önceki dönem devri)
+        ilk_sayfa = not sayfa['has_prev']
+        devreden = sayfa['acilis_bakiyesi']
         ekstre.append({
-            'tarih': bas_tarih, 'tur': 'DEVİR', 'aciklama': 'Önceki Dönem Devri', 
-            'borc': devir_bakiye if devir_bakiye > 0 else 0, 
-            'alacak': abs(devir_bakiye) if devir_bakiye < 0 else 0, 
-            'bakiye': devir_bakiye,
+            'tarih': bas_tarih if ilk_sayfa else (sayfa['items'][0]['tarih'] if sayfa['items'] else bas_tarih),
+            'tur': 'DEVİR', 'aciklama': 'Önceki Dönem Devri' if ilk_sayfa else 'Önceki Sayfadan Devreden',
+            'borc': devreden if devreden > 0 else 0,
+            'alacak': abs(devreden) if devreden < 0 else 0,
+            'bakiye': devreden,
             'belge_no': '-'
         })
+        for h in sayfa['items']:
+            ekstre.append({
+                'tarih': h['tarih'], 'tur': h['islem_turu'], 'aciklama': h['aciklama'] or '',
+                'borc': h['borc'], 'alacak': h['alacak'], 'bakiye': h['bakiye'], 'belge_no': h['belge_no'] or '-'
+            })
 
-        for h in hareketler:
-            if bas_tarih <= h['tarih'] <= bit_tarih:
-                bakiye += (h['borc'] - h['alacak'])
-                h['bakiye'] = bakiye
-                ekstre.append(h)
-                
-                toplam_borc += h['borc']
-                toplam_alacak += h['alacak']
-
-    return render_template('rapor/cari_ekstre.html', form=form, ekstre=ekstre, cari=cari, 
-                           devir_bakiye=devir_bakiye, toplam_borc=toplam_borc, toplam_alacak=toplam_alacak)  
+    return render_template('rapor/cari_ekstre.html', form=form, ekstre=ekstre, cari=cari, sayfa=sayfa,
+                           devir_bakiye=toplamlar['devir'], toplam_borc=toplamlar['borc'],
+                           toplam_alacak=toplamlar['alacak'], kapanis_bakiye=toplamlar['kapanis'])  
 
 @rapor_bp.route('/plasiyer-performans')
 @login_required
@@ -606,21 +608,41 @@ def e_defter_indir():
             bitis=dt_bit
         )
         
-        # XML'i Üret
-        xml_content = builder.yevmiye_xml_olustur()
-        
-        # Dosya İndirme Yanıtı Hazırla
-        buffer = BytesIO(xml_content)
-        buffer.seek(0)
-        
-        dosya_adi = f"yevmiye_{baslangic}_{bitis}.xml"
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=dosya_adi,
-            mimetype='application/xml'
-        )
+        # XML'i parça dosyalarına yaz (bellek sabit; sınır aşılırsa otomatik parçalanır)
+        hedef_dizin = tempfile.mkdtemp(prefix='edefter_')
+        try:
+            parcalar = builder.yevmiye_dosyalari_yaz(hedef_dizin)
+            if len(parcalar) == 1:
+                yol = parcalar[0]['yol']
+                dosya_adi = parcalar[0]['dosya_adi']
+                mimetype = 'application/xml'
+            else:
+                dosya_adi = f"yevmiye_{baslangic}_{bitis}.zip"
+                yol = parcalari_paketle(parcalar, os.path.join(hedef_dizin, dosya_adi))
+                mimetype = 'application/zip'
+        except Exception:
+            shutil.rmtree(hedef_dizin, ignore_errors=True)
+            raise
+
+        def _akis():
+            try:
+                with open(yol, 'rb') as f:
+                    while True:
+                        blok = f.read(64 * 1024)
+                        if not blok:
+                            break
+                        yield blok
+            finally:
+                shutil.rmtree(hedef_dizin, ignore_errors=True)
+
+        headers = {
+            'Content-Disposition': f'attachment; filename="{dosya_adi}"',
+            'Content-Length': str(os.path.getsize(yol)),
+            'X-EDefter-Parca-Sayisi': str(len(parcalar)),
+        }
+        if len(parcalar) == 1:
+            headers['X-Content-SHA256'] = parcalar[0]['sha256']
+        return Response(_akis(), mimetype=mimetype, headers=headers)
         
     except Exception as e:
         flash(f"e-Defter Hatası: {str(e)}", "danger")
@@ -0,0 +1,379 @@
+# app/modules/rapor/stream_export.py
+"""
+Streaming Export Pipeline (CSV / XLSX)
+
+Tüm sonucu DataFrame + BytesIO içinde kurmak, tam yıllık cari/stok hareketi
+dökümünde worker RSS'ini GB'lara çıkarır (ExportEngine.to_excel/to_csv de bu
+modül üzerinden yazar).
+
+Bu modül:
+    - Satırları yield_per ile (MySQL'de server-side cursor) parça parça çeker
+    - CSV'yi chunk chunk yazıp Flask streaming response ile gönderir
+    - XLSX'i openpyxl write-only modunda geçici dosyaya yazar, dosyadan stream eder
+    - Satır sayısı eşiği aşan export'ları Celery arka plan işine çevirir
+      (sonuç dosyası + indirme linki)
+
+Kullanım (route içinde):
+    exporter = StreamingExporter(query, [('tarih', 'Tarih'), ('cari.unvan', 'Cari'), ...])
+    return exporter.response('csv', 'kasa_hareketleri')
+
+Arka plan işi gerektirecek kaynaklar `@export_source('ad')` ile kaydedilir;
+Celery worker sorguyu aynı fonksiyonla yeniden kurar.
+"""
+
+import csv
+import io
+import logging
+import os
+import tempfile
+import uuid
+from collections.abc import Mapping
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response, current_app, session, stream_with_context, url_for
+from sqlalchemy.orm import joinedload
+
+logger = logging.getLogger(__name__)
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
+# ========================================
+# 📚 EXPORT KAYNAK KAYDI (arka plan işleri için)
+# ========================================
+_EXPORT_SOURCES = {}
+
+
+def export_source(name):
+    """
+    Arka planda yeniden kurulabilen export kaynağı tanımlar.
+
+    Fonksiyon imzası: fn(tenant_db, params: dict) -> (query, columns)
+
+    Kullanım:
+        @export_source('kasa_hareket')
+        def kasa_hareket_export(tenant_db, params):
+            return tenant_db.query(KasaHareket)..., [('tarih', 'Tarih'), ...]
+    """
+    def decorator(fn):
+        _EXPORT_SOURCES[name] = fn
+        return fn
+    return decorator
+
+
+def get_export_source(name):
+    return _EXPORT_SOURCES.get(name)
+
+
+# ========================================
+# 🚰 STREAMING EXPORTER
+# ========================================
+
+class StreamingExporter:
+    """
+    Bellek kullanımı satır sayısından bağımsız export.
+
+    Args:
+        query: SQLAlchemy ORM Query ya da satır iterable'ı (ör. Result.mappings())
+        columns: [(alan_yolu, başlık), ...]  alan_yolu 'cari.unvan' gibi noktalı olabilir
+        chunk_size: yield_per / CSV flush boyutu
+    """
+
+    def __init__(self, query, columns, chunk_size=None):
+        self.query = query
+        self.columns = list(columns)
+        self.chunk_size = chunk_size or current_app.config.get('EXPORT_CHUNK_SIZE', 2000)
+        self.rows_written = 0
+
+    # ---------- Satır kaynağı ----------
+
+    def _prepared_query(self):
+        """
+        Noktalı alanlar için ilişkileri joinedload ile aynı sorguda getir.
+        Server-side cursor açıkken lazy-load yapılırsa (pymysql SSCursor)
+        aynı bağlantıda ikinci sorgu açılamaz; bu yüzden ilişkiler önceden yüklenir.
+        """
+        query = self.query
+        try:
+            model = query.column_descriptions[0]['entity']
+        except (IndexError, KeyError, AttributeError):
+            return query
+
+        seen = set()
+        for path, _ in self.columns:
+            parts = path.split('.')[:-1]
+            if not parts or tuple(parts) in seen:
+                continue
+            seen.add(tuple(parts))
+            try:
+                current_model, loader = model, None
+                for rel_name in parts:
+                    attr = getattr(current_model, rel_name)
+                    loader = joinedload(attr) if loader is None else loader.joinedload(attr)
+                    current_model = attr.property.mapper.class_
+                query = query.options(loader)
+            except AttributeError:
+                # İlişki değil (property vb.) - lazy erişime bırak
+                continue
+        return query
+
+    def iter_rows(self):
+        """Formatlanmış satırları (list) parça parça üretir"""
+        self.rows_written = 0
+        query = self._prepared_query()
+        if hasattr(query, 'yield_per'):
+            query = query.yield_per(self.chunk_size)
+        for obj in query:
+            self.rows_written += 1
+            yield [self._format(self._get_value(obj, path)) for path, _ in self.columns]
+
+    @property
+    def headers(self):
+        return [title for _, title in self.columns]
+
+    @staticmethod
+    def _get_value(obj, path):
+        for attr in path.split('.'):
+            if obj is None:
+                return None
+            obj = obj.get(attr) if isinstance(obj, Mapping) else getattr(obj, attr, None)
+        return obj
+
+    @staticmethod
+    def _format(value):
+        if value is None:
+            return ''
+        if hasattr(value, 'value'):  # Enum
+            return value.value
+        if isinstance(value, datetime):
+            return value.strftime('%d.%m.%Y %H:%M')
+        if isinstance(value, date):
+            return value.strftime('%d.%m.%Y')
+        return value
+
+    # ---------- CSV ----------
+
+    def iter_csv(self):
+        """
+        CSV byte parçaları üretir (Excel uyumlu: UTF-8 BOM, ';' ayraç).
+        Her chunk_size satırda bir buffer boşaltılır.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';')
+
+        yield '\ufeff'.encode('utf-8')
+        writer.writerow(self.headers)
+
+        for i, row in enumerate(self.iter_rows(), start=1):
+            writer.writerow([str(v).replace('.', ',') if isinstance(v, Decimal) else v for v in row])
+            if i % self.chunk_size == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        yield buffer.getvalue().encode('utf-8')
+
+    # ---------- XLSX ----------
+
+    def write_xlsx(self, path, sheet_title='Rapor'):
+        """
+        openpyxl write-only modunda dosyaya yazar (satırlar bellekte tutulmaz).
+
+        Returns:
+            int: Yazılan satır sayısı
+        """
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=sheet_title)
+
+        header_cells = []
+        for title in self.headers:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.font = Font(bold=True, color='FFFFFF')
+            cell.fill = PatternFill('solid', fgColor='4F81BD')
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        for row in self.iter_rows():
+            ws.append(row)
+
+        wb.save(path)
+        return self.rows_written
+
+    def write_file(self, fmt, path):
+        """Formatına göre dosyaya yaz (arka plan işleri için)"""
+        if fmt == 'xlsx':
+            return self.write_xlsx(path)
+
+        with open(path, 'wb') as f:
+            for chunk in self.iter_csv():
+                f.write(chunk)
+        return self.rows_written
+
+    # ---------- Flask response ----------
+
+    def response(self, fmt, filename):
+        """
+        Streaming HTTP response döner.
+
+        CSV doğrudan soketten akar; XLSX (zip formatı) önce geçici dosyaya
+        yazılır, sonra dosyadan parça parça gönderilir ve silinir.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Desteklenmeyen export formatı: {fmt}")
+
+        mimetype, ext = EXPORT_FORMATS[fmt]
+        headers = {'Content-Disposition': f'attachment; filename="{filename}.{ext}"'}
+
+        if fmt == 'csv':
+            return Response(stream_with_context(self.iter_csv()), mimetype=mimetype, headers=headers)
+
+        fd, path = tempfile.mkstemp(suffix='.xlsx', dir=_export_dir())
+        os.close(fd)
+        try:
+            self.write_xlsx(path)
+        except Exception:
+            os.remove(path)
+            raise
+        return Response(_iter_file(path, remove=True), mimetype=mimetype, headers=headers)
+
+
+def _iter_file(path, remove=False, block_size=64 * 1024):
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                yield block
+    finally:
+        if remove:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _export_dir():
+    path = current_app.config.get('EXPORT_DIR') or os.path.join(tempfile.gettempdir(), 'erp_exports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# ========================================
+# ⏳ EŞİK KONTROLÜ + ARKA PLAN İŞİ
+# ========================================
+
+def export_or_enqueue(source_name, params, fmt, filename):
+    """
+    Kayıtlı kaynağı export eder.
+
+    Satır sayısı EXPORT_ASYNC_ROW_THRESHOLD'u aşıyorsa Celery işine çevirir ve
+    JSON ({job_id, status_url}) döner; aksi halde doğrudan streaming response döner.
+    """
+    from flask import jsonify
+    from flask_login import current_user
+    from app.extensions import get_tenant_db
+    from app.form_builder.keyset import capped_count
+
+    source = get_export_source(source_name)
+    if source is None:
+        raise ValueError(f"Export kaynağı bulunamadı: {source_name}")
+
+    # Kaynaklar firmaya göre süzer; firma her zaman oturumdaki kullanıcıdan gelir
+    # (arka plan işine de aynı params gider)
+    params = dict(params, firma_id=str(current_user.firma_id))
+
+    tenant_db = get_tenant_db()
+    query, columns = source(tenant_db, params)
+
+    threshold = current_app.config.get('EXPORT_ASYNC_ROW_THRESHOLD', 50000)
+    _, too_big = capped_count(query, cap=threshold)
+
+    if not too_big:
+        return StreamingExporter(query, columns).response(fmt, filename)
+
+    job_id = ExportJobStore.create(
+        user_id=str(current_user.id), source=source_name, fmt=fmt, filename=filename
+    )
+    from .tasks import run_export_job
+    run_export_job.delay(job_id, source_name, params, fmt, session.get('tenant_id'))
+
+    logger.info(f"📦 Büyük export arka plana alındı: {source_name} ({fmt}) job={job_id}")
+    return jsonify({
+        'success': True,
+        'async': True,
+        'job_id': job_id,
+        'message': 'Kayıt sayısı fazla olduğu için dosya arka planda hazırlanıyor.',
+        'status_url': url_for('rapor.export_durum', job_id=job_id),
+    }), 202
+
+
+class ExportJobStore:
+    """Arka plan export işlerinin durumu (paylaşılan cache üzerinde)"""
+
+    TTL = 24 * 3600
+
+    @staticmethod
+    def _key(job_id):
+        return f"export_job:{job_id}"
+
+    @classmethod
+    def create(cls, user_id, source, fmt, filename):
+        from app.extensions import cache
+        job_id = uuid.uuid4().hex
+        cache.set(cls._key(job_id), {
+            'job_id': job_id, 'user_id': user_id, 'source': source, 'format': fmt,
+            'filename': filename, 'status': 'kuyrukta', 'rows': None, 'path': None,
+            'error': None, 'created_at': datetime.now().isoformat(),
+        }, timeout=cls.TTL)
+        return job_id
+
+    @classmethod
+    def get(cls, job_id):
+        from app.extensions import cache
+        return cache.get(cls._key(job_id))
+
+    @classmethod
+    def update(cls, job_id, **fields):
+        from app.extensions import cache
+        job = cls.get(job_id) or {'job_id': job_id}
+        job.update(fields)
+        cache.set(cls._key(job_id), job, timeout=cls.TTL)
+        return job
+
+
+def build_job_file(job_id, source_name, params, fmt):
+    """Celery task gövdesi: kaynağı yeniden kurup dosyaya yazar"""
+    from app.extensions import get_tenant_db
+
+    source = get_export_source(source_name)
+    if source is None:
+        ExportJobStore.update(job_id, status='hata', error=f'Kaynak yok: {source_name}')
+        return None
+
+    ExportJobStore.update(job_id, status='hazirlaniyor')
+    query, columns = source(get_tenant_db(), params)
+
+    ext = EXPORT_FORMATS[fmt][1]
+    path = os.path.join(_export_dir(), f"{job_id}.{ext}")
+    exporter = StreamingExporter(query, columns)
+    rows = exporter.write_file(fmt, path)
+
+    ExportJobStore.update(job_id, status='hazir', path=path, rows=rows)
+    return path
+
+
+def send_job_file(job):
+    """Hazır iş dosyasını stream ederek gönder"""
+    mimetype, ext = EXPORT_FORMATS[job['format']]
+    headers = {'Content-Disposition': f'attachment; filename="{job["filename"]}.{ext}"'}
+    return Response(_iter_file(job['path']), mimetype=mimetype, headers=headers)
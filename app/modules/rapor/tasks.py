@@ -0,0 +1,31 @@
+# app/modules/rapor/tasks.py
+
+import logging
+from flask import session
+
+from app.extensions import celery
+
+logger = logging.getLogger(__name__)
+
+
+@celery.task(bind=True, max_retries=1)
+def run_export_job(self, job_id, source_name, params, fmt, tenant_id):
+    """
+    Büyük export'ları arka planda dosyaya yazar.
+    Sonuç dosyası EXPORT_DIR altına kaydedilir; durum ExportJobStore'dan izlenir.
+    """
+    from run import app
+    from app.modules.rapor.stream_export import ExportJobStore, build_job_file
+    # Kaynak fonksiyonlarının kaydı için modülü yükle
+    from app.modules.rapor import export_sources  # noqa: F401
+
+    try:
+        # Grid kaynakları filtreleri request argümanlarından okur
+        with app.test_request_context('/', query_string=params):
+            # get_tenant_db()'nin veritabanını bulması için Session'ı dolduruyoruz
+            session['tenant_id'] = str(tenant_id)
+            return build_job_file(job_id, source_name, params, fmt)
+    except Exception as e:
+        logger.error(f"Celery Task Export Hatası (Job: {job_id}): {str(e)}")
+        ExportJobStore.update(job_id, status='hata', error=str(e))
+        raise
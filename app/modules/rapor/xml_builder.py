@@ -1,16 +1,92 @@
+# app/modules/rapor/xml_builder.py
+"""
+e-Defter (Yevmiye) XBRL Yazıcısı
+
+Eski sürüm tüm ayı tek bir lxml ağacında kurup pretty_print ile string'e
+çeviriyordu; büyük firmalarda tek ayın defteri GB'larca RAM tüketiyordu.
+
+Bu sürüm:
+    - Fiş + detay satırlarını tek Core sorgusuyla, yield_per ile
+      (MySQL'de server-side cursor) parça parça çeker
+    - Her fişi küçük bir alt ağaç olarak serialize edip doğrudan dosyaya yazar
+    - Yazılan her byte'ı çalışan SHA-256 özetinden geçirir
+    - Parça boyutu sınırı aşılacaksa fiş sınırında yeni parça (dosya) açar
+      (GİB parça kuralı: fiş bölünmez, her parça kendi başına geçerli XBRL)
+
+Bellek kullanımı fiş sayısından bağımsız olarak sabit kalır.
+
+Kullanım:
+    builder = EDefterBuilder(firma_id, donem_id, baslangic, bitis)
+    parcalar = builder.yevmiye_dosyalari_yaz()   # [{'yol', 'boyut', 'sha256', ...}]
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+from itertools import groupby
+
+from flask import current_app, has_app_context
 from lxml import etree
-from datetime import datetime
-from app.extensions import db
+from sqlalchemy import select
+
+from app.extensions import get_tenant_db
 from app.modules.firmalar.models import Firma, Donem
-from app.modules.muhasebe.models import MuhasebeFisi, MuhasebeFisiDetay
+from app.modules.muhasebe.models import MuhasebeFisi, MuhasebeFisiDetay, HesapPlani
+
+logger = logging.getLogger(__name__)
+
+# GİB yüklemelerinde tek parça için üst sınır (sıkıştırılmamış XML)
+VARSAYILAN_PARCA_BOYUTU = 100 * 1024 * 1024
+VARSAYILAN_CHUNK = 2000
+
+_PARCA_ISARETI = 'EDEFTER_GIRISLER'
+
+
+def _ayar(anahtar, varsayilan):
+    if has_app_context():
+        return current_app.config.get(anahtar, varsayilan)
+    return varsayilan
+
+
+class _OzetliDosya:
+    """Yazılan byte'ları sayan ve SHA-256 özetini güncelleyen dosya sarmalayıcı"""
+
+    def __init__(self, yol):
+        self.yol = yol
+        self.boyut = 0
+        self._hash = hashlib.sha256()
+        self._f = open(yol, 'wb')
+
+    def write(self, data):
+        self._hash.update(data)
+        self.boyut += len(data)
+        self._f.write(data)
+
+    def close(self):
+        self._f.close()
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
 
 class EDefterBuilder:
-    def __init__(self, firma_id, donem_id, baslangic, bitis):
-        self.firma = Firma.query.get(firma_id)
-        self.donem = Donem.query.get(donem_id)
+    def __init__(self, firma_id, donem_id, baslangic, bitis, tenant_db=None,
+                 chunk_size=None, max_parca_boyutu=None):
+        self.tenant_db = tenant_db or get_tenant_db()
+        self.firma = self.tenant_db.get(Firma, firma_id)
+        self.donem = self.tenant_db.get(Donem, donem_id) if donem_id else None
         self.baslangic = baslangic
         self.bitis = bitis
-        
+        self.chunk_size = chunk_size or _ayar('EDEFTER_CHUNK_SIZE', VARSAYILAN_CHUNK)
+        self.max_parca_boyutu = max_parca_boyutu or _ayar('EDEFTER_MAX_PARCA_BOYUTU', VARSAYILAN_PARCA_BOYUTU)
+
+        if not self.firma:
+            raise Exception("e-Defter için firma bilgisi bulunamadı!")
+
         # GİB Standart Namespace Tanımları (Ezberlemeye gerek yok, standarttır)
         self.nsmap = {
             "xbrli": "http://www.xbrl.org/2003/instance",
@@ -20,45 +96,176 @@ class EDefterBuilder:
             "nde": "http://www.gib.gov.tr/vedop/e-defter",
             None: "http://www.xbrl.org/2003/instance" # Default namespace
         }
+        self._onek, self._sonek = self._iskelet()
+
+    # ========================================
+    # 📤 DIŞ API
+    # ========================================
+
+    def yevmiye_dosyalari_yaz(self, hedef_dizin=None):
+        """
+        Yevmiye defterini parça dosyalarına yazar.
+
+        Returns:
+            list[dict]: Her parça için yol, dosya_adi, boyut, sha256,
+                        ilk_madde, son_madde, fis_sayisi
+        """
+        hedef_dizin = hedef_dizin or tempfile.mkdtemp(prefix='edefter_')
+        os.makedirs(hedef_dizin, exist_ok=True)
+
+        parcalar = []
+        dosya = None
+        bilgi = None
+        try:
+            for fis, detaylar in self._fisleri_grupla(self._satirlari_getir()):
+                veri = self._fis_bytes(fis, detaylar)
+
+                # Fiş bölünmez: sınır aşılacaksa mevcut parçayı kapat (boş parça hariç)
+                if dosya is not None and bilgi['fis_sayisi'] and \
+                        dosya.boyut + len(veri) + len(self._sonek) > self.max_parca_boyutu:
+                    parcalar.append(self._parca_kapat(dosya, bilgi))
+                    dosya = None
+
+                if dosya is None:
+                    dosya, bilgi = self._parca_ac(hedef_dizin, len(parcalar) + 1)
+
+                dosya.write(veri)
+                bilgi['fis_sayisi'] += 1
+                bilgi['ilk_madde'] = bilgi['ilk_madde'] or fis.yevmiye_madde_no
+                bilgi['son_madde'] = fis.yevmiye_madde_no
+
+            if dosya is None:
+                raise Exception("Bu tarih aralığında kesinleşmiş (numara verilmiş) fiş bulunamadı!")
+
+            parcalar.append(self._parca_kapat(dosya, bilgi))
+        except Exception:
+            if dosya is not None:
+                dosya.close()
+            for p in parcalar:
+                _sessiz_sil(p['yol'])
+            if dosya is not None:
+                _sessiz_sil(dosya.yol)
+            raise
+
+        logger.info(
+            f"📒 e-Defter yazıldı: {len(parcalar)} parça, "
+            f"{sum(p['fis_sayisi'] for p in parcalar)} fiş, {sum(p['boyut'] for p in parcalar)} byte"
+        )
+        return parcalar
 
     def yevmiye_xml_olustur(self):
-        """Yevmiye Defteri (xbrl) XML'ini oluşturur."""
-        
-        # 1.Kök Element (xbrli:xbrl)
-        root = etree.Element(f"{{{self.nsmap['xbrli']}}}xbrl", nsmap=self.nsmap)
-        
-        # 2.Firma Bilgileri (Header)
-        self._header_ekle(root)
-        
-        # 3.Fişleri Çek (Sadece KESİNLEŞMİŞ olanlar!)
-        fisler = MuhasebeFisi.query.filter(
-            MuhasebeFisi.firma_id == self.firma.id,
+        """
+        Geriye dönük uyumluluk: tek parça XML'i bytes olarak döndürür.
+        Büyük dönemlerde yevmiye_dosyalari_yaz() kullanılmalıdır.
+        """
+        self.max_parca_boyutu = float('inf')
+        hedef = tempfile.mkdtemp(prefix='edefter_')
+        try:
+            parca = self.yevmiye_dosyalari_yaz(hedef)[0]
+            with open(parca['yol'], 'rb') as f:
+                return f.read()
+        finally:
+            shutil.rmtree(hedef, ignore_errors=True)
+
+    # ========================================
+    # 🗄️ VERİ KAYNAĞI
+    # ========================================
+
+    def _satirlari_getir(self):
+        """Fiş başlığı + detay + hesap kolonlarını tek sorguda, parça parça getirir"""
+        stmt = select(
+            MuhasebeFisi.id.label('fis_id'),
+            MuhasebeFisi.tarih,
+            MuhasebeFisi.yevmiye_madde_no,
+            MuhasebeFisi.aciklama.label('fis_aciklama'),
+            MuhasebeFisiDetay.id.label('detay_id'),
+            MuhasebeFisiDetay.borc,
+            MuhasebeFisiDetay.alacak,
+            MuhasebeFisiDetay.belge_turu,
+            MuhasebeFisiDetay.belge_no,
+            MuhasebeFisiDetay.belge_tarihi,
+            HesapPlani.kod.label('hesap_kod'),
+            HesapPlani.ad.label('hesap_ad'),
+        ).join(
+            MuhasebeFisiDetay, MuhasebeFisiDetay.fis_id == MuhasebeFisi.id
+        ).join(
+            HesapPlani, HesapPlani.id == MuhasebeFisiDetay.hesap_id
+        ).where(
+            MuhasebeFisi.firma_id == str(self.firma.id),
             MuhasebeFisi.tarih >= self.baslangic,
             MuhasebeFisi.tarih <= self.bitis,
-            MuhasebeFisi.resmi_defter_basildi == True # Sadece kilitli fişler
-        ).order_by(MuhasebeFisi.yevmiye_madde_no).all()
+            MuhasebeFisi.resmi_defter_basildi == True,  # Sadece kilitli fişler
+            MuhasebeFisi.deleted_at.is_(None),
+            MuhasebeFisiDetay.deleted_at.is_(None),
+        ).order_by(
+            MuhasebeFisi.yevmiye_madde_no, MuhasebeFisi.id, MuhasebeFisiDetay.id
+        ).execution_options(yield_per=self.chunk_size)
+
+        yield from self.tenant_db.execute(stmt)
 
-        if not fisler:
-            raise Exception("Bu tarih aralığında kesinleşmiş (numara verilmiş) fiş bulunamadı!")
+    @staticmethod
+    def _fisleri_grupla(satirlar):
+        """Sıralı satır akışını (fiş, [detaylar]) gruplarına çevirir"""
+        for _, grup in groupby(satirlar, key=lambda r: r.fis_id):
+            detaylar = list(grup)
+            yield detaylar[0], detaylar
 
-        # 4.Hareketleri Dön (AccountingEntries)
+    # ========================================
+    # 📄 PARÇA YÖNETİMİ
+    # ========================================
+
+    def _iskelet(self):
+        """Parça dosyasının değişmeyen başlangıç/bitiş byte'ları (header dahil)"""
+        root = etree.Element(f"{{{self.nsmap['xbrli']}}}xbrl", nsmap=self.nsmap)
+        self._header_ekle(root)
         entries_root = etree.SubElement(root, f"{{{self.nsmap['gl-cor']}}}accountingEntries")
-        
-        for fis in fisler:
-            self._fis_ekle(entries_root, fis)
+        entries_root.append(etree.Comment(_PARCA_ISARETI))
+
+        xml = etree.tostring(root, xml_declaration=True, encoding="UTF-8")
+        onek, sonek = xml.split(f"<!--{_PARCA_ISARETI}-->".encode(), 1)
+        return onek, sonek
 
-        # XML'i String Olarak Döndür
-        return etree.tostring(root, pretty_print=True, xml_declaration=True, encoding="UTF-8")
+    def _parca_dosya_adi(self, parca_no):
+        # GİB adlandırma: VKN-YYYYAA-Y-000001.xml
+        vkn = self.firma.vergi_no or self.firma.kod
+        return f"{vkn}-{self.baslangic.strftime('%Y%m')}-Y-{parca_no:06d}.xml"
+
+    def _parca_ac(self, hedef_dizin, parca_no):
+        dosya_adi = self._parca_dosya_adi(parca_no)
+        dosya = _OzetliDosya(os.path.join(hedef_dizin, dosya_adi))
+        dosya.write(self._onek)
+        bilgi = {'parca_no': parca_no, 'dosya_adi': dosya_adi, 'fis_sayisi': 0,
+                 'ilk_madde': None, 'son_madde': None}
+        return dosya, bilgi
+
+    def _parca_kapat(self, dosya, bilgi):
+        dosya.write(self._sonek)
+        dosya.close()
+        return dict(bilgi, yol=dosya.yol, boyut=dosya.boyut, sha256=dosya.sha256)
+
+    def _fis_bytes(self, fis, detaylar):
+        """
+        Tek fişi serialize eder. Namespace tanımları kapsayıcı elemanda kalsın diye
+        fiş geçici bir accountingEntries altında kurulup kapsayıcı etiketler kesilir.
+        """
+        kap = etree.Element(f"{{{self.nsmap['gl-cor']}}}accountingEntries", nsmap=self.nsmap)
+        self._fis_ekle(kap, fis, detaylar)
+        xml = etree.tostring(kap, encoding="UTF-8")
+        return xml[xml.index(b'>') + 1:xml.rindex(b'</')]
+
+    # ========================================
+    # 🧱 XBRL ELEMANLARI
+    # ========================================
 
     def _header_ekle(self, root):
         """Firma ve Müşavir bilgilerini ekler."""
         # GİB Entity Bilgileri
         entity_info = etree.SubElement(root, f"{{{self.nsmap['gl-bus']}}}entityInformation")
-        
+
         # Firma Kimliği
         identifier = etree.SubElement(entity_info, f"{{{self.nsmap['gl-bus']}}}organizationIdentifier")
-        identifier.text = self.firma.vergi_no or self.firma.tc_kimlik_no
-        
+        identifier.text = self.firma.vergi_no
+
         # Unvan
         org_desc = etree.SubElement(entity_info, f"{{{self.nsmap['gl-bus']}}}organizationDescription")
         org_desc.text = self.firma.unvan
@@ -69,70 +276,89 @@ class EDefterBuilder:
             contact_name = etree.SubElement(contact, f"{{{self.nsmap['gl-bus']}}}contactName")
             contact_name.text = self.firma.sm_unvan
 
-    def _fis_ekle(self, parent, fis):
+    def _fis_ekle(self, parent, fis, detaylar):
         """Bir fişi (EntryHeader) ve detaylarını XML'e ekler."""
         entry = etree.SubElement(parent, f"{{{self.nsmap['gl-cor']}}}entryHeader")
-        
+
         # Yevmiye Tarihi
         posted_date = etree.SubElement(entry, f"{{{self.nsmap['gl-cor']}}}postedDate")
         posted_date.text = fis.tarih.strftime('%Y-%m-%d')
-        
+
         # Yevmiye Numarası
         entry_num = etree.SubElement(entry, f"{{{self.nsmap['gl-cor']}}}entryNumber")
         entry_num.text = str(fis.yevmiye_madde_no)
-        
+
         # Fiş Açıklaması
         desc = etree.SubElement(entry, f"{{{self.nsmap['gl-cor']}}}entryComment")
-        desc.text = fis.aciklama or ""
-        
+        desc.text = fis.fis_aciklama or ""
+
         # Detaylar (Borç/Alacak Satırları)
-        for detay in fis.detaylar:
-            self._detay_ekle(entry, detay, fis)
+        for detay in detaylar:
+            self._detay_ekle(entry, detay)
 
-    def _detay_ekle(self, entry_header, detay, fis):
+    def _detay_ekle(self, entry_header, detay):
         """Yevmiye satırını (EntryDetail) ekler."""
         item = etree.SubElement(entry_header, f"{{{self.nsmap['gl-cor']}}}entryDetail")
-        
+
         # Satır Numarası
         line_num = etree.SubElement(item, f"{{{self.nsmap['gl-cor']}}}lineNumber")
-        line_num.text = str(detay.id) # Veya sıralı bir sayaç
-        
+        line_num.text = str(detay.detay_id) # Veya sıralı bir sayaç
+
         # Hesap Bilgileri (Account)
         account = etree.SubElement(item, f"{{{self.nsmap['gl-cor']}}}account")
         main_id = etree.SubElement(account, f"{{{self.nsmap['gl-cor']}}}accountMainID")
-        main_id.text = detay.hesap.kod
-        
+        main_id.text = detay.hesap_kod
+
         ac_desc = etree.SubElement(account, f"{{{self.nsmap['gl-cor']}}}accountMainDescription")
-        ac_desc.text = detay.hesap.ad
-        
+        ac_desc.text = detay.hesap_ad
+
         # Tutar (Amount)
         amount = etree.SubElement(item, f"{{{self.nsmap['gl-cor']}}}amount")
         amount.set("decimals", "2")
         amount.set("unitRef", "TRY")
-        
+
         # Borç mu Alacak mı?
-        if detay.borc > 0:
+        if (detay.borc or 0) > 0:
             amount.text = f"{detay.borc:.2f}"
             dc = etree.SubElement(item, f"{{{self.nsmap['gl-cor']}}}debitCreditCode")
             dc.text = "D" # Debit (Borç)
         else:
-            amount.text = f"{detay.alacak:.2f}"
+            amount.text = f"{(detay.alacak or 0):.2f}"
             dc = etree.SubElement(item, f"{{{self.nsmap['gl-cor']}}}debitCreditCode")
             dc.text = "C" # Credit (Alacak)
-            
+
         # Belge Detayları (DocumentInfo) - GİB İçin En Önemli Kısım!
         if detay.belge_no:
             doc_info = etree.SubElement(item, f"{{{self.nsmap['gl-cor']}}}documentInfo")
-            
+
             # Belge Tipi (invoice, receipt, check vs.)
             doc_type = etree.SubElement(doc_info, f"{{{self.nsmap['gl-cor']}}}documentType")
             doc_type.text = detay.belge_turu or "other"
-            
+
             # Belge Numarası
             doc_num = etree.SubElement(doc_info, f"{{{self.nsmap['gl-cor']}}}documentNumber")
             doc_num.text = detay.belge_no
-            
+
             # Belge Tarihi
             if detay.belge_tarihi:
                 doc_date = etree.SubElement(doc_info, f"{{{self.nsmap['gl-cor']}}}documentDate")
-                doc_date.text = detay.belge_tarihi.strftime('%Y-%m-%d')
\ No newline at end of file
+                doc_date.text = detay.belge_tarihi.strftime('%Y-%m-%d')
+
+
+def parcalari_paketle(parcalar, hedef_yol):
+    """
+    Birden fazla parçayı tek ZIP'e koyar (dosyadan dosyaya kopyalanır, RAM'e alınmaz).
+    Özet listesi (SHA-256) pakete ayrıca eklenir.
+    """
+    with zipfile.ZipFile(hedef_yol, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for p in parcalar:
+            zf.write(p['yol'], arcname=p['dosya_adi'])
+        zf.writestr('SHA256SUMS', ''.join(f"{p['sha256']}  {p['dosya_adi']}\n" for p in parcalar))
+    return hedef_yol
+
+
+def _sessiz_sil(yol):
+    try:
+        os.remove(yol)
+    except OSError:
+        pass
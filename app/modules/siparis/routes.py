@@ -9,6 +9,7 @@ from app.modules.siparis.models import Siparis
 from app.modules.doviz.models import DovizKuru
 from app.modules.stok.models import StokKart
 from app.modules.cari.models import CariHesap
+from app.modules.cari.risk_ozeti import CariRiskMotoru
 from app.modules.kullanici.models import Kullanici
 from app.modules.fiyat.models import FiyatListesi, FiyatListesiDetay
 from app.form_builder import DataGrid
@@ -224,6 +225,16 @@ def onayla(id):
     if siparis.durum.lower() != SiparisDurumu.BEKLIYOR.value.lower():
         return jsonify({'success': False, 'message': f'Sadece BEKLIYOR durumundakiler onaylanabilir.'}), 400
 
+    # Risk limiti (cari risk özetinden tek satır): ?zorla=1 ile bilerek geçilebilir
+    risk = CariRiskMotoru.limit_kontrol(siparis.cari_id, ek_tutar=siparis.genel_toplam or 0, tenant_db=tenant_db)
+    if risk['asim'] and request.values.get('zorla') != '1':
+        return jsonify({
+            'success': False,
+            'limit_asimi': True,
+            'message': f"Risk limiti aşılıyor: limit {float(risk['limit']):,.2f} TL, "
+                       f"sipariş sonrası risk {float(risk['yeni_risk']):,.2f} TL."
+        }), 409
+
     try:
         siparis.durum = SiparisDurumu.ONAYLANDI.value
         siparis.onay_tarihi = datetime.now()
@@ -8,6 +8,7 @@ from app.modules.kullanici.models import Kullanici
 from app.modules.sube.models import Sube
 from app.extensions import db, get_tenant_db  # <-- get_tenant_db EKLENDİ
 from app.form_builder import DataGrid
+from app.decorators import superadmin_required
 from .forms import create_menu_form
 
 sistem_bp = Blueprint('sistem', __name__)
@@ -217,3 +218,33 @@ def set_context():
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@sistem_bp.route('/api/tenant-engines')
+@login_required
+@superadmin_required
+def tenant_engine_istatistikleri():
+    """Bu worker'daki tenant engine havuzlarının istatistikleri (monitoring)"""
+    from app.extensions import get_tenant_engine_stats
+    return jsonify(get_tenant_engine_stats())
+
+
+@sistem_bp.route('/api/istek-metrikleri')
+@login_required
+@superadmin_required
+def istek_metrikleri():
+    """Bu worker'daki endpoint bazlı süre / SQL histogramı (?dakika=5&limit=20)"""
+    from app.services.request_metrics import IstekMetrikleri
+    return jsonify(IstekMetrikleri.ozet(
+        dakika=request.args.get('dakika', type=int),
+        limit=request.args.get('limit', 50, type=int)
+    ))
+
+
+@sistem_bp.route('/api/numara-metrikleri')
+@login_required
+@superadmin_required
+def numara_metrikleri():
+    """Bu worker'daki belge numarası serilerinin sayaç bekleme süreleri (blok / kesintisiz)"""
+    from app.services.numara_servisi import NumaraServisi
+    return jsonify(NumaraServisi.metrikler())
@@ -1,49 +1,360 @@
 # app/modules/stok/costing.py
 
 import logging
+from collections import defaultdict
 from decimal import Decimal
+
+from sqlalchemy import select, update, delete, insert, func, and_
+
 from app.extensions import get_tenant_db
-from app.modules.stok.models import StokHareketi
+from app.modules.stok.models import StokHareketi, StokMaliyetDefteri, generate_uuid
 from app.enums import HareketTuru
 
 logger = logging.getLogger(__name__)
 
+# Maliyeti oluşturan giriş hareketleri (Alış ve Devir). Yazanlar farklı biçim
+# kullanıyor: fatura servisi enum değerini ('alis'), stok servisi / fişler enum
+# adını ('ALIS') yazar. SQLite gibi büyük/küçük harf duyarlı veritabanlarında da
+# eşleşmesi (ve hareket_turu indeksinin kullanılması) için tüm biçimler listelenir.
+_MALIYET_TURLERI = (HareketTuru.ALIS, HareketTuru.DEVIR)
+MALIYET_HAREKET_TURLERI = tuple(sorted({
+    bicim for tur in _MALIYET_TURLERI
+    for ad in (tur.name, tur.value) for bicim in (ad.upper(), ad.lower())
+}))
+_MALIYET_TURLERI_UPPER = frozenset(t.upper() for t in MALIYET_HAREKET_TURLERI)
+
+_DEFTER_KEY = '_maliyet_defteri_deltalari'
+_ONARIM_KEY = '_maliyet_defteri_onarim'
+
+
 class MaliyetMotoru:
+    """
+    Hareketli Ağırlıklı Ortalama Maliyet
+
+    Maliyet, `stok_maliyet_defteri` tablosundaki günlük kümülatif snapshot'tan
+    okunur: tarih <= X olan son satırın kümülatif tutar / kümülatif miktarı.
+    Defter, stok hareketleri flush edilirken artımlı güncellenir:
+        - Yeni/silinen giriş hareketi → o günün satırı + sonraki günlerin kümülatifi (delta)
+        - Güncellenen hareket → etkilenen tarihten itibaren yeniden oluşturma (onarım)
+    Defteri henüz oluşmamış ürünlerde set-based SUM sorgusuna düşer.
+    """
+
+    # ========================================
+    # 🔍 MALİYET SORGULAMA
+    # ========================================
+
     @staticmethod
-    def ortalama_maliyet_hesapla(stok_id, tarih, firma_id):
+    def ortalama_maliyet_hesapla(stok_id, tarih, firma_id, depo_id=None):
         """
-        Belirtilen tarihe kadar olan Alış ve Devir hareketlerini tarayarak
-        'Hareketli Ağırlıklı Ortalama' (Moving Average) maliyetini hesaplar.
+        Belirtilen tarihteki 'Hareketli Ağırlıklı Ortalama' (Moving Average) maliyeti döner.
+
+        Args:
+            depo_id: Verilirse o deponun girişleri, yoksa tüm depolar
+        """
+        sonuc = MaliyetMotoru.ortalama_maliyetler([stok_id], tarih, firma_id, depo_id)
+        return sonuc.get(str(stok_id), Decimal('0.0'))
+
+    @staticmethod
+    def ortalama_maliyetler(stok_idler, tarih, firma_id, depo_id=None):
+        """
+        Birden çok ürün için tek sorguda tarih itibarıyla ortalama maliyet.
+
+        Returns:
+            dict: {stok_id: Decimal}
         """
         tenant_db = get_tenant_db()
-        
+        stok_idler = list({str(s) for s in stok_idler if s})
+        if not stok_idler:
+            return {}
+
         try:
-            # Sadece maliyeti oluşturan giriş hareketlerini (Alış Faturası ve Devir) buluyoruz
-            giriş_hareketleri = tenant_db.query(StokHareketi).filter(
-                StokHareketi.firma_id == str(firma_id),
-                StokHareketi.stok_id == str(stok_id),
-                StokHareketi.tarih <= tarih,
-                StokHareketi.hareket_turu.in_(['ALIS_FATURASI', 'DEVIR_GIRISI'])
-            ).all()
-
-            toplam_miktar = Decimal('0.0')
-            toplam_maliyet_tutari = Decimal('0.0')
-
-            for hareket in giriş_hareketleri:
-                miktar = Decimal(str(hareket.miktar or 0))
-                birim_fiyat = Decimal(str(hareket.birim_fiyat or 0))
-                
-                if miktar > 0 and birim_fiyat > 0:
-                    toplam_miktar += miktar
-                    toplam_maliyet_tutari += (miktar * birim_fiyat)
-
-            # Sıfıra bölünme hatasını engelliyoruz
-            if toplam_miktar > 0:
-                ortalama_maliyet = toplam_maliyet_tutari / toplam_miktar
-                return round(ortalama_maliyet, 4)
-                
-            return Decimal('0.0')
-            
+            snapshot = MaliyetMotoru._defter_snapshot(
+                tenant_db, stok_idler, tarih, str(firma_id),
+                str(depo_id) if depo_id else StokMaliyetDefteri.TUM_DEPOLAR
+            )
+
+            # Defteri olmayan ürünler (henüz oluşturulmamış) → set-based toplama
+            eksik = [s for s in stok_idler if s not in snapshot]
+            if eksik:
+                snapshot.update(MaliyetMotoru._hareket_toplamlari(tenant_db, eksik, tarih, str(firma_id), depo_id))
+
+            return {
+                stok_id: MaliyetMotoru._ortalama(*snapshot.get(stok_id, (0, 0)))
+                for stok_id in stok_idler
+            }
+
         except Exception as e:
-            logger.error(f"Maliyet Hesaplama Hatası (Stok ID: {stok_id}): {e}")
-            return Decimal('0.0')
\ No newline at end of file
+            logger.error(f"Maliyet Hesaplama Hatası (Stok ID: {stok_idler}): {e}")
+            return {stok_id: Decimal('0.0') for stok_id in stok_idler}
+
+    @staticmethod
+    def _ortalama(miktar, tutar):
+        miktar, tutar = Decimal(str(miktar or 0)), Decimal(str(tutar or 0))
+        # Sıfıra bölünme hatasını engelliyoruz
+        if miktar > 0:
+            return round(tutar / miktar, 4)
+        return Decimal('0.0')
+
+    @staticmethod
+    def _defter_snapshot(tenant_db, stok_idler, tarih, firma_id, depo_key):
+        """{stok_id: (kümülatif_miktar, kümülatif_tutar)} - tarih <= X olan son satırlar"""
+        t = StokMaliyetDefteri.__table__
+        son_tarih = (
+            select(t.c.stok_id, func.max(t.c.tarih).label('tarih'))
+            .where(t.c.firma_id == firma_id, t.c.depo_id == depo_key,
+                   t.c.stok_id.in_(stok_idler), t.c.tarih <= tarih)
+            .group_by(t.c.stok_id)
+            .subquery()
+        )
+        stmt = (
+            select(t.c.stok_id, t.c.kumulatif_miktar, t.c.kumulatif_tutar)
+            .join(son_tarih, and_(t.c.stok_id == son_tarih.c.stok_id, t.c.tarih == son_tarih.c.tarih))
+            .where(t.c.firma_id == firma_id, t.c.depo_id == depo_key)
+        )
+        return {row.stok_id: (row.kumulatif_miktar, row.kumulatif_tutar) for row in tenant_db.execute(stmt)}
+
+    @staticmethod
+    def _hareket_toplamlari(tenant_db, stok_idler, tarih, firma_id, depo_id=None):
+        """Defter yoksa: giriş hareketlerinden tek GROUP BY sorgusu (ORM nesnesi yüklemeden)"""
+        h = StokHareketi.__table__
+        stmt = (
+            select(h.c.stok_id, func.sum(h.c.miktar), func.sum(h.c.miktar * h.c.birim_fiyat))
+            .where(h.c.firma_id == firma_id, h.c.stok_id.in_(stok_idler), h.c.tarih <= tarih,
+                   h.c.hareket_turu.in_(MALIYET_HAREKET_TURLERI),
+                   h.c.miktar > 0, h.c.birim_fiyat > 0)
+            .group_by(h.c.stok_id)
+        )
+        if depo_id:
+            stmt = stmt.where(h.c.giris_depo_id == str(depo_id))
+        return {row[0]: (row[1], row[2]) for row in tenant_db.execute(stmt)}
+
+    # ========================================
+    # 📝 ARTIMLI DEFTER GÜNCELLEME (listeners üzerinden)
+    # ========================================
+
+    @staticmethod
+    def maliyet_turu_mu(tur):
+        tur = getattr(tur, 'value', tur)
+        return tur is not None and str(tur).upper() in _MALIYET_TURLERI_UPPER
+
+    @staticmethod
+    def maliyet_hareketi_mi(target):
+        return MaliyetMotoru.maliyet_turu_mu(target.hareket_turu)
+
+    @staticmethod
+    def hareket_biriktir(session, target, isaret):
+        """
+        Giriş hareketinin maliyet etkisini session'da biriktirir (after_insert / after_delete).
+        Flush sonunda defter_uygula ile tek seferde yazılır.
+        """
+        if not MaliyetMotoru.maliyet_hareketi_mi(target):
+            return
+        miktar = Decimal(str(target.miktar or 0))
+        birim_fiyat = Decimal(str(target.birim_fiyat or 0))
+        if miktar <= 0 or birim_fiyat <= 0:
+            return
+
+        deltalar = session.info.setdefault(_DEFTER_KEY, {})
+        firma_id, stok_id = str(target.firma_id), str(target.stok_id)
+        depolar = [StokMaliyetDefteri.TUM_DEPOLAR]
+        if target.giris_depo_id:
+            depolar.append(str(target.giris_depo_id))
+
+        for depo_key in depolar:
+            anahtar = (firma_id, stok_id, depo_key, target.tarih)
+            eski_miktar, eski_tutar = deltalar.get(anahtar, (Decimal('0'), Decimal('0')))
+            deltalar[anahtar] = (eski_miktar + miktar * isaret, eski_tutar + miktar * birim_fiyat * isaret)
+
+    @staticmethod
+    def onarim_isaretle(session, firma_id, stok_id, baslangic):
+        """Güncellenen hareket: ürün defteri `baslangic` tarihinden itibaren yeniden oluşturulacak"""
+        onarim = session.info.setdefault(_ONARIM_KEY, {})
+        anahtar = (str(firma_id), str(stok_id))
+        if anahtar not in onarim:
+            onarim[anahtar] = baslangic
+        elif onarim[anahtar] is not None:
+            # None = tamamen yeniden oluştur (en geniş kapsam)
+            onarim[anahtar] = None if baslangic is None else min(baslangic, onarim[anahtar])
+
+    @staticmethod
+    def bekleyenleri_uygula(session, connection):
+        """after_flush: biriken delta ve onarımları deftere yazar"""
+        deltalar = session.info.pop(_DEFTER_KEY, None) or {}
+        onarim = session.info.pop(_ONARIM_KEY, None) or {}
+
+        # Onarılacak ürünlerin deltaları yeniden oluşturmaya dahil edilir: onarım,
+        # ürünün en eski delta tarihinden başlar (geriye tarihli giriş kaybolmaz)
+        for (firma_id, stok_id, _, tarih) in deltalar:
+            anahtar = (firma_id, stok_id)
+            if anahtar in onarim and onarim[anahtar] is not None:
+                onarim[anahtar] = min(onarim[anahtar], tarih)
+        deltalar = {k: v for k, v in deltalar.items() if (k[0], k[1]) not in onarim}
+
+        # Defteri hiç olmayan ürünler: ilk kez tam oluştur (eski geçmiş dahil)
+        for firma_id, stok_id in {(k[0], k[1]) for k in deltalar}:
+            if not MaliyetMotoru._defter_var_mi(connection, firma_id, stok_id):
+                onarim[(firma_id, stok_id)] = None
+        deltalar = {k: v for k, v in deltalar.items() if (k[0], k[1]) not in onarim}
+
+        for anahtar, (miktar, tutar) in deltalar.items():
+            if miktar or tutar:
+                MaliyetMotoru._delta_uygula(connection, *anahtar, miktar, tutar)
+
+        for (firma_id, stok_id), baslangic in onarim.items():
+            MaliyetMotoru.defteri_yeniden_olustur(connection, stok_id, firma_id, baslangic)
+
+    @staticmethod
+    def bekleyenleri_at(session):
+        session.info.pop(_DEFTER_KEY, None)
+        session.info.pop(_ONARIM_KEY, None)
+
+    @staticmethod
+    def _defter_var_mi(connection, firma_id, stok_id):
+        t = StokMaliyetDefteri.__table__
+        return connection.execute(
+            select(t.c.id).where(t.c.firma_id == firma_id, t.c.stok_id == stok_id).limit(1)
+        ).first() is not None
+
+    @staticmethod
+    def _delta_uygula(connection, firma_id, stok_id, depo_key, tarih, miktar, tutar):
+        """
+        Tek (ürün, depo, gün) deltası:
+            1. O günün satırı (yoksa önceki günün kümülatifi üzerine oluşturulur)
+            2. Geriye tarihli kayıtsa sonraki günlerin kümülatifi aynı delta kadar kaydırılır
+        """
+        t = StokMaliyetDefteri.__table__
+        ayni_kalem = and_(t.c.firma_id == firma_id, t.c.stok_id == stok_id, t.c.depo_id == depo_key)
+
+        guncellenen = connection.execute(
+            update(t).where(ayni_kalem, t.c.tarih == tarih).values(
+                giris_miktar=t.c.giris_miktar + miktar,
+                giris_tutar=t.c.giris_tutar + tutar,
+                kumulatif_miktar=t.c.kumulatif_miktar + miktar,
+                kumulatif_tutar=t.c.kumulatif_tutar + tutar,
+            )
+        ).rowcount
+
+        if not guncellenen:
+            onceki = connection.execute(
+                select(t.c.kumulatif_miktar, t.c.kumulatif_tutar)
+                .where(ayni_kalem, t.c.tarih < tarih)
+                .order_by(t.c.tarih.desc()).limit(1)
+            ).first()
+            onceki_miktar, onceki_tutar = onceki if onceki else (Decimal('0'), Decimal('0'))
+            connection.execute(insert(t).values(
+                id=generate_uuid(),
+                firma_id=firma_id, stok_id=stok_id, depo_id=depo_key, tarih=tarih,
+                giris_miktar=miktar, giris_tutar=tutar,
+                kumulatif_miktar=onceki_miktar + miktar,
+                kumulatif_tutar=onceki_tutar + tutar,
+            ))
+
+        # Geriye tarihli kayıt: sadece etkilenen tarihten sonrası kaydırılır
+        connection.execute(
+            update(t).where(ayni_kalem, t.c.tarih > tarih).values(
+                kumulatif_miktar=t.c.kumulatif_miktar + miktar,
+                kumulatif_tutar=t.c.kumulatif_tutar + tutar,
+            )
+        )
+
+    # ========================================
+    # 🔧 ONARIM / YENİDEN OLUŞTURMA
+    # ========================================
+
+    @staticmethod
+    def defteri_yeniden_olustur(connection, stok_id, firma_id, baslangic=None):
+        """
+        Ürünün defterini `baslangic` tarihinden itibaren (None ise tamamen)
+        hareketlerden yeniden oluşturur. Öncesindeki satırlar korunur ve
+        kümülatif başlangıç değeri olarak kullanılır.
+
+        Returns:
+            int: Yazılan defter satırı sayısı
+        """
+        t = StokMaliyetDefteri.__table__
+        h = StokHareketi.__table__
+        firma_id, stok_id = str(firma_id), str(stok_id)
+        kalem = and_(t.c.firma_id == firma_id, t.c.stok_id == stok_id)
+
+        # 1. Etkilenen aralığı sil
+        silme = delete(t).where(kalem)
+        if baslangic is not None:
+            silme = silme.where(t.c.tarih >= baslangic)
+        connection.execute(silme)
+
+        # 2. Başlangıç öncesi kümülatifler (depo bazında)
+        baz = defaultdict(lambda: (Decimal('0'), Decimal('0')))
+        if baslangic is not None:
+            son = (
+                select(t.c.depo_id, func.max(t.c.tarih).label('tarih'))
+                .where(kalem).group_by(t.c.depo_id).subquery()
+            )
+            for row in connection.execute(
+                select(t.c.depo_id, t.c.kumulatif_miktar, t.c.kumulatif_tutar)
+                .join(son, and_(t.c.depo_id == son.c.depo_id, t.c.tarih == son.c.tarih))
+                .where(kalem)
+            ):
+                baz[row.depo_id] = (Decimal(str(row.kumulatif_miktar)), Decimal(str(row.kumulatif_tutar)))
+
+        # 3. Günlük giriş toplamları (tek GROUP BY)
+        stmt = (
+            select(h.c.tarih, h.c.giris_depo_id,
+                   func.sum(h.c.miktar), func.sum(h.c.miktar * h.c.birim_fiyat))
+            .where(h.c.firma_id == firma_id, h.c.stok_id == stok_id,
+                   h.c.hareket_turu.in_(MALIYET_HAREKET_TURLERI),
+                   h.c.miktar > 0, h.c.birim_fiyat > 0)
+            .group_by(h.c.tarih, h.c.giris_depo_id)
+            .order_by(h.c.tarih)
+        )
+        if baslangic is not None:
+            stmt = stmt.where(h.c.tarih >= baslangic)
+
+        gunluk = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+        for tarih, depo_id, miktar, tutar in connection.execute(stmt):
+            miktar, tutar = Decimal(str(miktar or 0)), Decimal(str(tutar or 0))
+            depo_keys = [StokMaliyetDefteri.TUM_DEPOLAR] + ([str(depo_id)] if depo_id else [])
+            for depo_key in depo_keys:
+                gunluk[(depo_key, tarih)][0] += miktar
+                gunluk[(depo_key, tarih)][1] += tutar
+
+        # 4. Kümülatifleri yürüt ve toplu ekle
+        satirlar = []
+        for (depo_key, tarih), (miktar, tutar) in sorted(gunluk.items(), key=lambda x: (x[0][0], x[0][1])):
+            kum_miktar, kum_tutar = baz[depo_key]
+            kum_miktar, kum_tutar = kum_miktar + miktar, kum_tutar + tutar
+            baz[depo_key] = (kum_miktar, kum_tutar)
+            satirlar.append({
+                'id': generate_uuid(),
+                'firma_id': firma_id, 'stok_id': stok_id, 'depo_id': depo_key, 'tarih': tarih,
+                'giris_miktar': miktar, 'giris_tutar': tutar,
+                'kumulatif_miktar': kum_miktar, 'kumulatif_tutar': kum_tutar,
+            })
+
+        if satirlar:
+            connection.execute(insert(t), satirlar)
+        return len(satirlar)
+
+    @staticmethod
+    def tum_defteri_olustur(firma_id=None):
+        """
+        Tenant'taki tüm ürünlerin defterini sıfırdan oluşturur (ilk kurulum / CLI).
+
+        Returns:
+            int: İşlenen ürün sayısı
+        """
+        tenant_db = get_tenant_db()
+        h = StokHareketi.__table__
+        stmt = select(h.c.firma_id, h.c.stok_id).where(
+            h.c.hareket_turu.in_(MALIYET_HAREKET_TURLERI)
+        ).distinct()
+        if firma_id:
+            stmt = stmt.where(h.c.firma_id == str(firma_id))
+
+        urunler = tenant_db.execute(stmt).all()
+        connection = tenant_db.connection()
+        for f_id, stok_id in urunler:
+            MaliyetMotoru.defteri_yeniden_olustur(connection, stok_id, f_id)
+        tenant_db.commit()
+
+        logger.info(f"📒 Maliyet defteri oluşturuldu: {len(urunler)} ürün")
+        return len(urunler)
@@ -17,6 +17,7 @@ from app.modules.stok.models import (
 from app.modules.kategori.models import StokKategori
 from app.modules.cari.models import CariHesap
 from app.modules.muhasebe.models import HesapPlani
+from app.form_builder.lookup import LookupRegistry
 from app.models import AIRaporAyarlari
 from markupsafe import Markup
 
@@ -70,42 +71,13 @@ def create_stok_form(stok=None):
     # SELECT OPTIONS (CACHED)
     # ========================================
     
-    # 1. Kategoriler (Cached)
-    cache_key_kategori = f"stok_form_kategoriler:{current_user.firma_id}"
-    kategori_opts = cache.get(cache_key_kategori)
-    
-    if kategori_opts is None:
-        kategoriler = tenant_db.query(StokKategori).filter_by(
-            firma_id=current_user.firma_id
-        ).order_by(StokKategori.ad).all()
-        kategori_opts = [(str(k.id), k.ad) for k in kategoriler]
-        cache.set(cache_key_kategori, kategori_opts, timeout=CACHE_TIMEOUT)
-    
-    # 2. Muhasebe Grupları (Cached)
-    cache_key_muhasebe = f"stok_form_muhasebe:{current_user.firma_id}"
-    muhasebe_opts = cache.get(cache_key_muhasebe)
-    
-    if muhasebe_opts is None:
-        muh_gruplar = tenant_db.query(StokMuhasebeGrubu).filter_by(
-            firma_id=current_user.firma_id,
-            aktif=True
-        ).order_by(StokMuhasebeGrubu.kod).all()
-        muhasebe_opts = [(str(g.id), f"{g.kod} - {g.ad}") for g in muh_gruplar]
-        cache.set(cache_key_muhasebe, muhasebe_opts, timeout=CACHE_TIMEOUT)
-    
-    # 3. KDV Grupları (Cached)
-    cache_key_kdv = f"stok_form_kdv:{current_user.firma_id}"
-    kdv_opts = cache.get(cache_key_kdv)
-    
-    if kdv_opts is None:
-        kdv_gruplar = tenant_db.query(StokKDVGrubu).filter_by(
-            firma_id=current_user.firma_id
-        ).order_by(StokKDVGrubu.kod).all()
-        kdv_opts = [
-            (str(k.id), f"{k.ad} ({_('Alış')}:%{k.alis_kdv_orani}, {_('Satış')}:%{k.satis_kdv_orani})")
-            for k in kdv_gruplar
-        ]
-        cache.set(cache_key_kdv, kdv_opts, timeout=CACHE_TIMEOUT)
+    # 1-3. Kategori / Muhasebe / KDV grupları (LookupRegistry - tenant bazlı cache)
+    kategori_opts = LookupRegistry.satirlar('stok_kategori', tenant_db=tenant_db)
+    muhasebe_opts = LookupRegistry.satirlar('stok_muhasebe_grubu', tenant_db=tenant_db)
+    kdv_opts = [
+        (k_id, f"{ad} ({_('Alış')}:%{alis}, {_('Satış')}:%{satis})")
+        for k_id, ad, alis, satis in LookupRegistry.satirlar('stok_kdv_grubu', tenant_db=tenant_db)
+    ]
     
     # 4. Tedarikçiler (Cached - İlk 100)
     cache_key_tedarikci = f"stok_form_tedarikci:{current_user.firma_id}"
@@ -576,23 +548,13 @@ def get_muhasebe_grup_form(target_url, edit_mode=False, instance=None):
     title = _("Muhasebe Grubu Düzenle") if edit_mode else _("Yeni Muhasebe Grubu")
     form = Form(name="muhasebe_grup_form", title=title, action=target_url, ajax=True)
     
-    # Hesap Planı (Cached - V2 ile önbelleği sıfırlıyoruz)
-    cache_key = f"muhasebe_hesaplar_v2:{current_user.firma_id}"
-    hesap_opts = cache.get(cache_key)
-    
-    if hesap_opts is None:
-        # ✨ DÜZELTME: hesap_tip='muavin' filtresi kaldırıldı, tüm aktif hesaplar geliyor
-        hesaplar = tenant_db.query(HesapPlani).filter_by(
-            firma_id=current_user.firma_id,
-            aktif=True
-        ).order_by(HesapPlani.kod).all()
-        
-        hesap_opts = [("", _("Seçiniz..."))] + [
-            (str(h.id), f"{h.kod} - {h.ad}") for h in hesaplar
-        ]
-        cache.set(cache_key, hesap_opts, timeout=CACHE_TIMEOUT)    
+    # Hesap Planı (LookupRegistry - büyük planlarda AJAX arama)
+    hesaplar = LookupRegistry.satirlar('hesap_plani', tenant_db=tenant_db)
     
     val = lambda k: getattr(instance, k) if instance else ''
+    hesap_ayarlari = lambda k: LookupRegistry.alan_ayarlari(
+        'hesap_plani', satirlar=hesaplar, secili=val(k), bos_secenek=_("Seçiniz...")
+    )
     
     layout = FormLayout()
     
@@ -616,8 +578,8 @@ def get_muhasebe_grup_form(target_url, edit_mode=False, instance=None):
         "alis_hesap_id",
         FieldType.SELECT,
         _("Alış Hesabı (153)"),
-        options=hesap_opts,
         value=str(val('alis_hesap_id')) if val('alis_hesap_id') else '',
+        **hesap_ayarlari('alis_hesap_id'),
         select2_config={'allowClear': True}
     ).in_row("col-md-6")
     
@@ -625,8 +587,8 @@ def get_muhasebe_grup_form(target_url, edit_mode=False, instance=None):
         "satis_hesap_id",
         FieldType.SELECT,
         _("Satış Hesabı (600)"),
-        options=hesap_opts,
         value=str(val('satis_hesap_id')) if val('satis_hesap_id') else '',
+        **hesap_ayarlari('satis_hesap_id'),
         select2_config={'allowClear': True}
     ).in_row("col-md-6")
     
@@ -634,8 +596,8 @@ def get_muhasebe_grup_form(target_url, edit_mode=False, instance=None):
         "alis_iade_hesap_id",
         FieldType.SELECT,
         _("Alış İade Hesabı"),
-        options=hesap_opts,
         value=str(val('alis_iade_hesap_id')) if val('alis_iade_hesap_id') else '',
+        **hesap_ayarlari('alis_iade_hesap_id'),
         select2_config={'allowClear': True}
     ).in_row("col-md-6")
     
@@ -643,8 +605,8 @@ def get_muhasebe_grup_form(target_url, edit_mode=False, instance=None):
         "satis_iade_hesap_id",
         FieldType.SELECT,
         _("Satış İade Hesabı (610)"),
-        options=hesap_opts,
         value=str(val('satis_iade_hesap_id')) if val('satis_iade_hesap_id') else '',
+        **hesap_ayarlari('satis_iade_hesap_id'),
         select2_config={'allowClear': True}
     ).in_row("col-md-6")
     
@@ -652,8 +614,8 @@ def get_muhasebe_grup_form(target_url, edit_mode=False, instance=None):
         "satilan_mal_maliyeti_hesap_id",
         FieldType.SELECT,
         _("Satılan Malın Maliyeti (621)"),
-        options=hesap_opts,
         value=str(val('satilan_mal_maliyeti_hesap_id')) if val('satilan_mal_maliyeti_hesap_id') else '',
+        **hesap_ayarlari('satilan_mal_maliyeti_hesap_id'),
         select2_config={'allowClear': True}
     ).in_row("col-md-12")
     
@@ -709,23 +671,13 @@ def get_kdv_grup_form(target_url, edit_mode=False, instance=None):
     title = _("KDV Grubu Düzenle") if edit_mode else _("Yeni KDV Grubu")
     form = Form(name="kdv_grup_form", title=title, action=target_url, ajax=True)
     
-    # Hesap Planı (Cached - V2 ile önbelleği sıfırlıyoruz)
-    cache_key = f"muhasebe_hesaplar_v2:{current_user.firma_id}"
-    hesap_opts = cache.get(cache_key)
-    
-    if hesap_opts is None:
-        # ✨ DÜZELTME: hesap_tip='muavin' filtresi kaldırıldı, tüm aktif hesaplar geliyor
-        hesaplar = tenant_db.query(HesapPlani).filter_by(
-            firma_id=current_user.firma_id,
-            aktif=True
-        ).order_by(HesapPlani.kod).all()
-        
-        hesap_opts = [("", _("Seçiniz..."))] + [
-            (str(h.id), f"{h.kod} - {h.ad}") for h in hesaplar
-        ]
-        cache.set(cache_key, hesap_opts, timeout=CACHE_TIMEOUT)    
+    # Hesap Planı (LookupRegistry - büyük planlarda AJAX arama)
+    hesaplar = LookupRegistry.satirlar('hesap_plani', tenant_db=tenant_db)
     
     val = lambda k: getattr(instance, k) if instance else ''
+    hesap_ayarlari = lambda k: LookupRegistry.alan_ayarlari(
+        'hesap_plani', satirlar=hesaplar, secili=val(k), bos_secenek=_("Seçiniz...")
+    )
     
     layout = FormLayout()
     
@@ -767,8 +719,8 @@ def get_kdv_grup_form(target_url, edit_mode=False, instance=None):
         "alis_kdv_hesap_id",
         FieldType.SELECT,
         _("Alış KDV Hesabı (191)"),
-        options=hesap_opts,
         value=str(val('alis_kdv_hesap_id')) if val('alis_kdv_hesap_id') else '',
+        **hesap_ayarlari('alis_kdv_hesap_id'),
         select2_config={'allowClear': True, 'placeholder': _('Hesap Seç...')}
     ).in_row("col-md-6")
     
@@ -776,8 +728,8 @@ def get_kdv_grup_form(target_url, edit_mode=False, instance=None):
         "satis_kdv_hesap_id",
         FieldType.SELECT,
         _("Satış KDV Hesabı (391)"),
-        options=hesap_opts,
         value=str(val('satis_kdv_hesap_id')) if val('satis_kdv_hesap_id') else '',
+        **hesap_ayarlari('satis_kdv_hesap_id'),
         select2_config={'allowClear': True, 'placeholder': _('Hesap Seç...')}
     ).in_row("col-md-6")
     
@@ -10,12 +10,14 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import event
+from sqlalchemy import event, func, select, inspect
+from sqlalchemy.orm import Session, object_session
 from blinker import signal
 from flask_login import current_user
 
 from app.extensions import get_tenant_db
 from app.modules.stok.models import StokHareketi, StokDepoDurumu, StokKart
+from app.modules.stok.costing import MaliyetMotoru
 from app.modules.siparis.models import SiparisDetay
 
 logger = logging.getLogger(__name__)
@@ -29,93 +31,204 @@ stok_kritik_seviye_alti = signal('stok-kritik-seviye-alti')
 # ========================================
 # SQLALCHEMY EVENT LISTENERS
 # ========================================
+# Hareket başına upsert yerine flush başına toplu güncelleme:
+#   1. after_insert / after_delete → (firma, depo, stok) bazında Decimal delta biriktirilir
+#      (session.info['_stok_bakiye_deltalari'])
+#   2. after_flush → tüm deltalar tek bir çok satırlı upsert ile yazılır,
+#      kritik seviye kontrolü etkilenen her (stok, depo) için bir kez yapılır
+# 300 kalemli bir fatura artık 300 yerine (farklı ürün sayısı kadar satırlı) 1 upsert + 1 select üretir.
+
+_DELTA_KEY = '_stok_bakiye_deltalari'
+
+
+def _hareket_yonu(target):
+    """Hareketin stok yönü: +1 giriş, -1 çıkış, 0 etkisiz"""
+    yon = getattr(target, 'yon', 0)
+
+    # Eğer modelde 'yon' property yoksa manuel hesapla
+    if yon == 0 and target.hareket_turu:
+        tur = str(target.hareket_turu).upper()
+        if 'GIRIS' in tur or 'ALIS' in tur: yon = 1
+        elif 'CIKIS' in tur or 'SATIS' in tur or 'FIRE' in tur: yon = -1
+        if 'IADE' in tur: yon *= -1
+    return yon
+
+
+def _delta_biriktir(target, isaret):
+    """Hareketin depo etkisini session'daki biriktiriciye ekler"""
+    yon = _hareket_yonu(target)
+    if yon == 0:
+        return
+
+    miktar_degisimi = Decimal(str(target.miktar or 0)) * yon * isaret
+    if not miktar_degisimi:
+        return
+
+    session = object_session(target)
+    if session is None:
+        return
+    deltalar = session.info.setdefault(_DELTA_KEY, {})
+
+    firma_id, stok_id = str(target.firma_id), str(target.stok_id)
+    if target.giris_depo_id:
+        anahtar = (firma_id, str(target.giris_depo_id), stok_id)
+        deltalar[anahtar] = deltalar.get(anahtar, Decimal('0')) + miktar_degisimi
+    if target.cikis_depo_id:
+        anahtar = (firma_id, str(target.cikis_depo_id), stok_id)
+        deltalar[anahtar] = deltalar.get(anahtar, Decimal('0')) - miktar_degisimi
+
+
+def _maliyet_biriktir(target, isaret):
+    session = object_session(target)
+    if session is not None:
+        MaliyetMotoru.hareket_biriktir(session, target, isaret)
+
 
 @event.listens_for(StokHareketi, 'after_insert')
 def stok_hareket_after_insert(mapper, connection, target):
-    """Stok hareketi eklendikten sonra depo durumunu anında günceller"""
+    """Stok hareketi eklendiğinde depo ve maliyet etkisini biriktirir (flush sonunda yazılır)"""
     try:
-        yon = getattr(target, 'yon', 0)
-        
-        # Eğer modelde 'yon' property yoksa manuel hesapla
-        if yon == 0 and target.hareket_turu:
-            tur = str(target.hareket_turu).upper()
-            if 'GIRIS' in tur or 'ALIS' in tur: yon = 1
-            elif 'CIKIS' in tur or 'SATIS' in tur or 'FIRE' in tur: yon = -1
-            if 'IADE' in tur: yon *= -1
-            
-        if yon == 0: return
-
-        miktar_degisimi = target.miktar * yon
-        
-        if target.giris_depo_id:
-            _depo_durumu_guncelle(connection, str(target.giris_depo_id), str(target.stok_id), miktar_degisimi, str(target.firma_id))
-        
-        if target.cikis_depo_id:
-            _depo_durumu_guncelle(connection, str(target.cikis_depo_id), str(target.stok_id), -miktar_degisimi, str(target.firma_id))
-            
+        _delta_biriktir(target, 1)
+        _maliyet_biriktir(target, 1)
     except Exception as e:
         logger.error(f"❌ Stok hareket after_insert hatası: {e}")
 
 @event.listens_for(StokHareketi, 'after_delete')
 def stok_hareket_after_delete(mapper, connection, target):
-    """Stok hareketi silinirse deponun dengesini geri yükler"""
+    """Stok hareketi silinirse depo ve maliyet etkisinin tersini biriktirir"""
     try:
-        yon = getattr(target, 'yon', 0)
-        
-        if yon == 0 and target.hareket_turu:
-            tur = str(target.hareket_turu).upper()
-            if 'GIRIS' in tur or 'ALIS' in tur: yon = 1
-            elif 'CIKIS' in tur or 'SATIS' in tur or 'FIRE' in tur: yon = -1
-            if 'IADE' in tur: yon *= -1
-
-        if yon == 0: return
-        
-        # Hareketin tam tersini (negatifini) uyguluyoruz
-        miktar_degisimi = -(target.miktar * yon)
-        
-        if target.giris_depo_id:
-            _depo_durumu_guncelle(connection, str(target.giris_depo_id), str(target.stok_id), miktar_degisimi, str(target.firma_id))
-        
-        if target.cikis_depo_id:
-            _depo_durumu_guncelle(connection, str(target.cikis_depo_id), str(target.stok_id), -miktar_degisimi, str(target.firma_id))
-            
+        _delta_biriktir(target, -1)
+        _maliyet_biriktir(target, -1)
     except Exception as e:
         logger.error(f"❌ Stok hareket after_delete hatası: {e}")
 
-def _depo_durumu_guncelle(connection, depo_id: str, stok_id: str, miktar_degisimi: Decimal, firma_id: str):
+@event.listens_for(StokHareketi, 'after_update')
+def stok_hareket_after_update(mapper, connection, target):
+    """Maliyeti etkileyen alan değiştiyse ürünün maliyet defterini eski/yeni tarihten itibaren onar"""
+    try:
+        session = object_session(target)
+        if session is None:
+            return
+
+        degisenler = {
+            alan: inspect(target).attrs[alan].history
+            for alan in ('tarih', 'miktar', 'birim_fiyat', 'hareket_turu', 'giris_depo_id', 'stok_id')
+        }
+        if not any(h.has_changes() for h in degisenler.values()):
+            return
+
+        eski_turler = [str(t) for t in degisenler['hareket_turu'].deleted]
+        if not MaliyetMotoru.maliyet_hareketi_mi(target) and not any(MaliyetMotoru.maliyet_turu_mu(t) for t in eski_turler):
+            return
+
+        tarihler = [t for t in [target.tarih, *degisenler['tarih'].deleted] if t]
+        baslangic = min(tarihler) if tarihler else None
+
+        for stok_id in [target.stok_id, *degisenler['stok_id'].deleted]:
+            if stok_id:
+                MaliyetMotoru.onarim_isaretle(session, target.firma_id, stok_id, baslangic)
+    except Exception as e:
+        logger.error(f"❌ Stok hareket after_update hatası: {e}")
+
+
+@event.listens_for(Session, 'after_flush')
+def stok_bakiyelerini_uygula(session, flush_context):
+    """Flush boyunca biriken depo deltalarını tek seferde uygular"""
+    try:
+        MaliyetMotoru.bekleyenleri_uygula(session, session.connection())
+    except Exception as e:
+        logger.error(f"❌ Maliyet defteri güncelleme hatası: {e}")
+
+    deltalar = session.info.pop(_DELTA_KEY, None)
+    if not deltalar:
+        return
+
+    satirlar = [
+        {'firma_id': f, 'depo_id': d, 'stok_id': s, 'miktar': m}
+        for (f, d, s), m in deltalar.items() if m
+    ]
+    if not satirlar:
+        return
+
+    try:
+        connection = session.connection()
+        _depo_durumlarini_guncelle(connection, satirlar)
+        _kritik_seviye_kontrol(connection, {(r['stok_id'], r['depo_id']) for r in satirlar})
+    except Exception as e:
+        logger.error(f"❌ Stok bakiye toplu güncelleme hatası: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def stok_bakiyelerini_at(session):
+    session.info.pop(_DELTA_KEY, None)
+    MaliyetMotoru.bekleyenleri_at(session)
+
+
+def _upsert_statement(dialect_name, table, satirlar):
     """
-    ✨ GÜVENLİ UPSERT: Depo durumu satırı yoksa oluşturur, varsa sadece miktarını günceller.
-    Python UUID kullanılarak her veritabanı motoruyla (MySQL/MariaDB) %100 uyumlu hale getirildi.
+    Çok satırlı upsert: satır yoksa oluşturur, varsa miktarı delta kadar değiştirir.
+    MySQL'de INSERT ... ON DUPLICATE KEY UPDATE, SQLite'ta (testler) ON CONFLICT.
+
+    Satırlar (depo_id, stok_id) sırasıyla yazılır: eşzamanlı flush'lar aynı
+    satırları hep aynı sırada kilitler, çapraz kilit (deadlock) oluşmaz.
     """
-    from sqlalchemy import text
-    
-    connection.execute(text("""
-        INSERT INTO stok_depo_durumu (id, firma_id, depo_id, stok_id, miktar, son_hareket_tarihi)
-        VALUES (:id, :firma_id, :depo_id, :stok_id, :miktar, CURDATE())
-        ON DUPLICATE KEY UPDATE
-            miktar = miktar + :miktar,
-            son_hareket_tarihi = CURDATE()
-    """), {
-        'id': str(uuid.uuid4()),
-        'firma_id': firma_id,
-        'depo_id': depo_id,
-        'stok_id': stok_id,
-        'miktar': float(miktar_degisimi)
-    })
+    bugun = func.current_date()
+    degerler = [
+        dict(r, id=str(uuid.uuid4()), son_hareket_tarihi=bugun)
+        for r in sorted(satirlar, key=lambda r: (r['depo_id'], r['stok_id']))
+    ]
+
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(degerler)
+        return stmt.on_conflict_do_update(
+            index_elements=['depo_id', 'stok_id'],
+            set_={'miktar': table.c.miktar + stmt.excluded.miktar, 'son_hareket_tarihi': bugun}
+        )
+
+    from sqlalchemy.dialects.mysql import insert
+    stmt = insert(table).values(degerler)
+    return stmt.on_duplicate_key_update(
+        miktar=table.c.miktar + stmt.inserted.miktar,
+        son_hareket_tarihi=bugun
+    )
+
+
+def _depo_durumlarini_guncelle(connection, satirlar):
+    """
+    ✨ GÜVENLİ TOPLU UPSERT: Tüm (depo, stok) deltaları tek ifadede, Decimal hassasiyetinde.
+    Python UUID kullanılarak her veritabanı motoruyla (MySQL/MariaDB) uyumlu.
+    """
+    table = StokDepoDurumu.__table__
+    connection.execute(_upsert_statement(connection.dialect.name, table, satirlar))
+
+
+def _kritik_seviye_kontrol(connection, anahtarlar):
+    """Etkilenen (stok, depo) çiftlerinden kritik seviyenin altına düşenler için sinyal gönderir"""
+    durum, kart = StokDepoDurumu.__table__, StokKart.__table__
+    stok_idler = {stok_id for stok_id, _ in anahtarlar}
+
+    stmt = (
+        select(durum.c.stok_id, durum.c.depo_id, durum.c.miktar, kart.c.kritik_seviye)
+        .join(kart, kart.c.id == durum.c.stok_id)
+        .where(durum.c.stok_id.in_(stok_idler))
+        .where(kart.c.kritik_seviye > 0)
+        .where(durum.c.miktar <= kart.c.kritik_seviye)
+    )
+    for row in connection.execute(stmt):
+        if (row.stok_id, row.depo_id) not in anahtarlar:
+            continue
+        stok_kritik_seviye_alti.send(
+            None, stok_id=row.stok_id, depo_id=row.depo_id,
+            miktar=row.miktar, kritik_seviye=row.kritik_seviye
+        )
+
 
 @event.listens_for(StokDepoDurumu, 'after_update')
 def stok_depo_durumu_after_update(mapper, connection, target):
+    """ORM üzerinden yapılan bakiye düzeltmelerinde (ör. bakiyeleri_duzelt) kritik seviye kontrolü"""
     try:
-        from sqlalchemy import select
-        stmt = select(StokKart).where(StokKart.id == target.stok_id)
-        stok = connection.execute(stmt).fetchone()
-        
-        if stok and float(stok.kritik_seviye or 0) > 0:
-            if float(target.miktar) <= float(stok.kritik_seviye):
-                stok_kritik_seviye_alti.send(
-                    target, stok_id=target.stok_id, depo_id=target.depo_id,
-                    miktar=target.miktar, kritik_seviye=stok.kritik_seviye
-                )
+        _kritik_seviye_kontrol(connection, {(str(target.stok_id), str(target.depo_id))})
     except Exception as e:
         logger.error(f"❌ Kritik seviye kontrolü hatası: {e}")
 
@@ -1178,3 +1178,54 @@ class StokHareketi(db.Model, TimestampMixin):
         return f"<StokHareketi {self.belge_no} Stok:{self.stok_id} Miktar:{self.miktar}>"
 
 
+
+
+# ========================================
+# STOK MALİYET DEFTERİ (Hareketli Ortalama Snapshot)
+# ========================================
+class StokMaliyetDefteri(db.Model):
+    """
+    Stok Maliyet Defteri - Günlük Kümülatif Snapshot
+
+    Amaç:
+    - Maliyet hesabında tüm alış geçmişini yeniden taramamak
+    - (stok, depo, gün) başına o güne kadarki kümülatif giriş miktarı ve tutarı
+    - Belirli bir tarihteki ortalama maliyet = tarih <= X olan son satır (index seek)
+
+    depo_id = TUM_DEPOLAR satırları ürünün tüm depolar toplamıdır.
+    Hareketler işlendikçe listeners üzerinden artımlı güncellenir
+    (bkz. app/modules/stok/costing.py).
+    """
+    __tablename__ = 'stok_maliyet_defteri'
+
+    TUM_DEPOLAR = '*'
+
+    id = db.Column(CHAR(36), primary_key=True, default=generate_uuid)
+
+    firma_id = db.Column(CHAR(36), nullable=False)
+    stok_id = db.Column(CHAR(36), nullable=False)
+    # FK yok: '*' (tüm depolar) satırlarını da taşır
+    depo_id = db.Column(String(36), nullable=False, default=TUM_DEPOLAR)
+    tarih = db.Column(Date, nullable=False)
+
+    # O günün girişleri
+    giris_miktar = db.Column(DECIMAL(18, 6), default=Decimal('0'), nullable=False)
+    giris_tutar = db.Column(DECIMAL(18, 4), default=Decimal('0'), nullable=False)
+
+    # Gün sonu itibarıyla kümülatif
+    kumulatif_miktar = db.Column(DECIMAL(18, 6), default=Decimal('0'), nullable=False)
+    kumulatif_tutar = db.Column(DECIMAL(18, 4), default=Decimal('0'), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('firma_id', 'stok_id', 'depo_id', 'tarih', name='uq_maliyet_defteri_gun'),
+        {'comment': 'Hareketli ortalama maliyet defteri - günlük kümülatif snapshot'}
+    )
+
+    @property
+    def ortalama_maliyet(self):
+        if not self.kumulatif_miktar:
+            return Decimal('0')
+        return Decimal(self.kumulatif_tutar) / Decimal(self.kumulatif_miktar)
+
+    def __repr__(self):
+        return f"<StokMaliyetDefteri Stok:{self.stok_id} Depo:{self.depo_id} {self.tarih}>"
@@ -21,6 +21,7 @@ from sqlalchemy import func, extract, literal, text, or_
 from sqlalchemy.orm import joinedload
 
 from app.extensions import db, cache, get_tenant_db, get_tenant_info
+from app.services.tenant_cache import TenantCache
 from app.modules.stok.models import (
     StokKart, StokPaketIcerigi, StokDepoDurumu,
     StokMuhasebeGrubu, StokKDVGrubu, StokHareketi
@@ -41,6 +42,7 @@ from .services import (
     StokKartService, StokHareketService,
     StokAIService, PaketUrunService
 )
+from . import listeners  # noqa: F401 (depo bakiye event'leri kaydı)
 
 from datetime import datetime, timedelta
 from app.enums import StokKartTipi, FaturaTuru
@@ -514,14 +516,19 @@ def detay(id):
 # ========================================
 @stok_bp.route('/api/siradaki-kod')
 @login_required
-@cache.cached(timeout=60, key_prefix='stok_siradaki_kod')
 def api_siradaki_kod():
     """
-    Sıradaki stok kodunu üret (Cached - 60 saniye)
+    Sıradaki stok kodunu üret (Cached - 60 saniye, tenant + firma bazlı)
     
     Returns:
         JSON: {'code': 'STK-0001'}
     """
+    return jsonify({'code': TenantCache.get_or_set(
+        'stok', f"siradaki_kod:{current_user.firma_id}", _siradaki_stok_kodu, timeout=60, stale=0
+    )})
+
+
+def _siradaki_stok_kodu():
     tenant_db = get_tenant_db()
     
     try:
@@ -549,11 +556,11 @@ def api_siradaki_kod():
             except:
                 pass
         
-        return jsonify({'code': yeni_kod})
+        return yeni_kod
     
     except Exception as e:
         logger.error(f"❌ Kod üretme hatası: {e}")
-        return jsonify({'code': 'STK-0001'})
+        return 'STK-0001'
 
 
 # ========================================
@@ -1026,8 +1033,8 @@ def bakiyeleri_duzelt():
         
         tenant_db.commit()
         
-        # Cache'leri temizle
-        cache.clear()
+        # Sadece bu tenant'ın stok cache'lerini geçersiz kıl (diğer tenant'lar etkilenmez)
+        TenantCache.invalidate('stok')
         
         logger.info(
             f"✅ Stok bakiyeleri düzeltildi: "
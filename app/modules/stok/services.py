@@ -12,6 +12,7 @@ from flask_login import current_user
 from flask_babel import gettext as _
 
 from app.extensions import cache, get_tenant_db
+from app.services.tenant_cache import TenantCache
 from app.modules.stok.models import (
     StokKart, StokHareketi, StokDepoDurumu,
     StokMuhasebeGrubu, StokKDVGrubu, StokPaketIcerigi
@@ -50,7 +51,7 @@ class StokKartService:
             return None
     
     @staticmethod
-    @cache.memoize(timeout=CACHE_TIMEOUT_SHORT)
+    @TenantCache.cached('stok', timeout=CACHE_TIMEOUT_SHORT)
     def get_toplam_stok(stok_id: str, firma_id: str, tenant_db=None) -> Decimal:
         if tenant_db is None: tenant_db = get_tenant_db()
         try:
@@ -107,7 +108,9 @@ class StokKartService:
             
             try:
                 cache.delete_memoized(StokKartService.get_by_id, stok.id, stok.firma_id)
-                cache.delete_memoized(StokKartService.get_toplam_stok, stok.id, stok.firma_id)
+                StokKartService.get_toplam_stok.delete(stok.id, stok.firma_id)
+                if is_new:
+                    TenantCache.delete('stok', f"siradaki_kod:{stok.firma_id}")
             except: pass
             
             mesaj = _("Yeni stok kartı oluşturuldu") if is_new else _("Stok kartı güncellendi")
@@ -209,7 +212,7 @@ class StokHareketService:
 
 class StokAIService:
     @staticmethod
-    @cache.cached(timeout=CACHE_TIMEOUT_LONG, key_prefix='olu_stok_analiz')
+    @TenantCache.cached('stok', timeout=CACHE_TIMEOUT_LONG, key_prefix='olu_stok_analiz')
     def olu_stok_analizi(firma_id: str, tenant_db=None) -> Dict[str, Any]:
         if tenant_db is None: tenant_db = get_tenant_db()
         try:
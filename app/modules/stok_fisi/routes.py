@@ -149,7 +149,8 @@ def fis_kaydet(form, fis_id=None):
 def index():
     tenant_db = get_tenant_db()
     
-    grid = DataGrid("stok_fisi_list", StokFisi, "Depo Hareketleri")
+    grid = DataGrid("stok_fisi_list", StokFisi, "Depo Hareketleri",
+                    pagination_mode='keyset', count_mode='estimated')
     
     grid.add_column('tarih', 'Tarih', type='date', width='100px')
     grid.add_column('belge_no', 'Fiş No', width='150px')
@@ -179,7 +180,7 @@ def index():
     
     # ✨ DATA SCOPING DEVREDE: DataGrid arka planda şubeye göre filtrelemeyi kendi yapacak!
     query = tenant_db.query(StokFisi).filter_by(firma_id=str(current_user.firma_id)).order_by(StokFisi.tarih.desc())
-    grid.process_query(query)
+    grid.process_query(query, default_sort=('tarih', 'desc'))
     
     return render_template('stok_fisi/index.html', grid=grid)
 
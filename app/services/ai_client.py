@@ -0,0 +1,185 @@
+# app/services/ai_client.py
+"""
+Gemini İstemcisi (Tembel Başlatma + Önbellekli Model Seçimi)
+
+- google.generativeai import'u ve genai.configure() ilk gerçek kullanımda yapılır
+  (modül import'u uygulama açılışını yavaşlatmaz).
+- Model keşfi (list_models) ağ çağrısıdır: ilk ihtiyaçta, zaman aşımıyla yapılır;
+  sonuç process içinde ve paylaşımlı cache'te KESIF_TTL boyunca saklanır.
+- Ağ yoksa / hata olursa VARSAYILAN_MODEL ile devam edilir (HATA_TTL sonra tekrar denenir).
+- GEMINI_MODEL ortam değişkeni verilirse keşif hiç yapılmaz.
+"""
+
+import importlib
+import importlib.util
+import logging
+import os
+import threading
+import time
+
+from app.extensions import cache
+
+logger = logging.getLogger(__name__)
+
+
+class AIIstemcisi:
+    """google.generativeai için tembel yükleyici ve model seçici"""
+
+    VARSAYILAN_MODEL = 'models/gemini-1.5-flash'
+    # Tercih sırası (en yeni ve hızlıdan eskiye)
+    TERCIH_SIRASI = (
+        'models/gemini-1.5-flash',
+        'models/gemini-1.5-pro',
+        'models/gemini-1.0-pro',
+        'models/gemini-pro',
+    )
+    # Başarılı keşfin geçerlilik süresi (sn)
+    KESIF_TTL = 24 * 3600
+    # Başarısız keşiften sonra varsayılan modelle devam süresi (sn)
+    HATA_TTL = 600
+    # list_models zaman aşımı (sn)
+    KESIF_ZAMAN_ASIMI = 5
+    CACHE_KEY = 'ai:gemini_model'
+
+    _genai = None
+    _model = None  # (gecerlilik_monotonic, model_adi)
+    _lock = threading.Lock()
+
+    # ========================================
+    # 🔌 KÜTÜPHANE
+    # ========================================
+
+    @staticmethod
+    def api_key():
+        return os.environ.get('GEMINI_API_KEY')
+
+    @staticmethod
+    def kutuphane_var():
+        """Paket kurulu mu? (import etmeden kontrol eder)"""
+        try:
+            return importlib.util.find_spec('google.generativeai') is not None
+        except (ImportError, ValueError):
+            return False
+
+    @classmethod
+    def aktif_mi(cls):
+        return bool(cls.api_key()) and cls.kutuphane_var()
+
+    @classmethod
+    def genai(cls):
+        """google.generativeai modülü (ilk çağrıda import + configure)"""
+        if cls._genai is not None:
+            return cls._genai
+        with cls._lock:
+            if cls._genai is None:
+                baslangic = time.perf_counter()
+                modul = importlib.import_module('google.generativeai')
+                if cls.api_key():
+                    modul.configure(api_key=cls.api_key())
+                cls._genai = modul
+                logger.info(f"🤖 Gemini kütüphanesi yüklendi ({(time.perf_counter() - baslangic) * 1000:.0f}ms)")
+        return cls._genai
+
+    # ========================================
+    # 🧠 MODEL SEÇİMİ
+    # ========================================
+
+    @classmethod
+    def aktif_model(cls):
+        """
+        Kullanılacak model adı. Sıra:
+        GEMINI_MODEL ortam değişkeni → process içi kayıt → paylaşımlı cache → keşif → VARSAYILAN_MODEL
+        """
+        sabit = os.environ.get('GEMINI_MODEL')
+        if sabit:
+            return sabit
+        if not cls.aktif_mi():
+            return None
+
+        kayit = cls._model
+        if kayit and kayit[0] > time.monotonic():
+            return kayit[1]
+
+        with cls._lock:
+            kayit = cls._model
+            if kayit and kayit[0] > time.monotonic():
+                return kayit[1]
+
+            model = cls._cache_oku()
+            ttl = cls.KESIF_TTL
+            if model is None:
+                model = cls.model_kesfet()
+                if model:
+                    cls._cache_yaz(model)
+                else:
+                    model, ttl = cls.VARSAYILAN_MODEL, cls.HATA_TTL
+            cls._model = (time.monotonic() + ttl, model)
+            return model
+
+    @classmethod
+    def model_kesfet(cls):
+        """Sunucudaki modelleri tarar, en uygununu döner (hata/ağ yoksa None)"""
+        try:
+            genai = cls.genai()
+            logger.info("📡 AI modelleri taranıyor...")
+            try:
+                modeller = list(genai.list_models(request_options={'timeout': cls.KESIF_ZAMAN_ASIMI}))
+            except TypeError:
+                # Eski kütüphane sürümü request_options desteklemiyor
+                modeller = list(genai.list_models())
+        except Exception as e:
+            logger.warning(f"⚠️ Model keşfi yapılamadı, varsayılan kullanılacak ({cls.VARSAYILAN_MODEL}): {e}")
+            return None
+
+        uygunlar = [m.name for m in modeller if 'generateContent' in getattr(m, 'supported_generation_methods', ())]
+        if not uygunlar:
+            logger.warning("⚠️ İçerik üretebilen model bulunamadı!")
+            return None
+
+        for tercih in cls.TERCIH_SIRASI:
+            if tercih in uygunlar:
+                logger.info(f"✅ Seçilen model: {tercih}")
+                return tercih
+        logger.info(f"✅ Otomatik seçilen model: {uygunlar[0]}")
+        return uygunlar[0]
+
+    @classmethod
+    def sifirla(cls):
+        """Process içi model kaydını ve paylaşımlı cache'i temizler"""
+        cls._model = None
+        try:
+            cache.delete(cls.CACHE_KEY)
+        except Exception:
+            pass
+
+    # ========================================
+    # 🔧 YARDIMCILAR
+    # ========================================
+
+    @classmethod
+    def _cache_oku(cls):
+        try:
+            return cache.get(cls.CACHE_KEY)
+        except Exception:
+            # Uygulama context'i dışında (script / import anı)
+            return None
+
+    @classmethod
+    def _cache_yaz(cls, model):
+        try:
+            cache.set(cls.CACHE_KEY, model, timeout=cls.KESIF_TTL)
+        except Exception:
+            pass
+
+
+class TembelGenai:
+    """
+    `genai` modül nesnesinin yerine geçer; ilk öznitelik erişiminde gerçek modülü yükler.
+
+    Kullanım:
+        genai = TembelGenai()
+        model = genai.GenerativeModel(...)
+    """
+
+    def __getattr__(self, ad):
+        return getattr(AIIstemcisi.genai(), ad)
@@ -1,6 +1,4 @@
 import requests
-import threading
-import json
 import logging
 from flask import current_app
 
@@ -9,52 +7,23 @@ logger = logging.getLogger(__name__)
 class N8NClient:
     """
     ERP sistemi ile n8n Otomasyon sunucusu arasındaki köprü.
-    İşlemleri asenkron (arka planda) yaparak ana uygulamayı yavaşlatmaz.
+    Asenkron tetiklemeler Outbox'a yazılır ve WebhookDispatcher tarafından
+    sınırlı worker havuzuyla gönderilir (çağrı başına thread açılmaz, restart'ta kaybolmaz).
     """
 
     @staticmethod
-    def _send_request_worker(url, method, payload, headers):
+    def hedef(webhook_path):
         """
-        Arka planda çalışacak işçi fonksiyon.
-        """
-        try:
-            if method == 'GET':
-                response = requests.get(url, params=payload, headers=headers, timeout=5)
-            else:
-                response = requests.post(url, json=payload, headers=headers, timeout=5)
-            
-            # Başarılı ise logla (Opsiyonel, çok log kirliliği yapmasın diye kapalı tutulabilir)
-            if response.status_code < 300:
-                logger.info(f"✅ n8n Tetiklendi: {url} | Status: {response.status_code}")
-            else:
-                logger.warning(f"⚠️ n8n Hatası: {url} | Status: {response.status_code} | Body: {response.text}")
-                
-        except requests.exceptions.ConnectionError:
-            logger.error(f"❌ n8n Bağlantı Hatası: Sunucuya erişilemiyor ({url})")
-        except Exception as e:
-            logger.error(f"❌ n8n Beklenmeyen Hata: {str(e)}")
+        Webhook tam URL'i ve header'ları.
 
-    @classmethod
-    def trigger(cls, webhook_path, payload={}, method='POST', sync=False):
-        """
-        n8n Webhook'unu tetikler.
-
-        Args:
-            webhook_path (str): n8n tarafındaki URL sonu (örn: 'fatura-onay')
-            payload (dict): Gönderilecek veri
-            method (str): 'POST' veya 'GET'
-            sync (bool): True ise cevabı bekler (bloklar), False ise arka planda atar.
+        Returns:
+            tuple: (full_url, headers)
         """
         # Config'den Base URL'i al
         base_url = current_app.config.get('N8N_WEBHOOK_URL', 'http://localhost:5678/webhook')
         
         # URL birleştirme (slash hatasını önle)
-        if base_url.endswith('/'):
-            base_url = base_url[:-1]
-        if webhook_path.startswith('/'):
-            webhook_path = webhook_path[1:]
-            
-        full_url = f"{base_url}/{webhook_path}"
+        full_url = f"{base_url.rstrip('/')}/{webhook_path.lstrip('/')}"
         
         # Güvenlik Header'ı (Opsiyonel: n8n tarafında Basic Auth varsa)
         api_key = current_app.config.get('N8N_API_KEY')
@@ -64,9 +33,22 @@ class N8NClient:
         }
         if api_key:
             headers['X-N8N-API-KEY'] = api_key
+        return full_url, headers
+
+    @classmethod
+    def trigger(cls, webhook_path, payload={}, method='POST', sync=False):
+        """
+        n8n Webhook'unu tetikler.
 
+        Args:
+            webhook_path (str): n8n tarafındaki URL sonu (örn: 'fatura-onay')
+            payload (dict): Gönderilecek veri
+            method (str): 'POST' veya 'GET'
+            sync (bool): True ise cevabı bekler (bloklar), False ise Outbox'a yazar.
+        """
         # Senkron mu Asenkron mu?
         if sync:
+            full_url, headers = cls.hedef(webhook_path)
             # Cevap bekleyen kritik işlemler için (örn: n8n'den veri alıp ekrana basacaksan)
             try:
                 if method == 'GET':
@@ -78,10 +60,10 @@ class N8NClient:
                 return None
         else:
             # Fire-and-Forget (Varsayılan): Bildirimler, Loglama vb.
-            thread = threading.Thread(
-                target=cls._send_request_worker,
-                args=(full_url, method, payload, headers)
-            )
-            thread.daemon = True # Ana program kapanırsa bu da kapansın
-            thread.start()
-            return True
\ No newline at end of file
+            from app.services.webhook_dispatcher import WebhookDispatcher
+            try:
+                WebhookDispatcher.enqueue(webhook_path, payload, method=method)
+                return True
+            except Exception as e:
+                logger.error(f"❌ n8n olayı kuyruğa alınamadı ({webhook_path}): {e}")
+                return False
@@ -0,0 +1,360 @@
+# app/services/numara_servisi.py
+"""
+Belge Numara Servisi (Sayaç / Seri)
+
+Eski numara_uret(), Sayac satırını belge transaction'ının başında kilitleyip
+commit'e kadar tutuyordu; aynı serideki tüm eşzamanlı kayıtlar en yavaş
+transaction'ın arkasında sıraya giriyordu. İki mod:
+
+    - BLOK (hi-lo, boşluk toleranslı): her işçi süreç BLOK_BOYUTU numaralık aralığı
+      AYRI ve kısa bir transaction'da ayırır, numaraları bellekten dağıtır.
+      Süreç ölürse / belge geri alınırsa aralıkta boşluk kalabilir; seri
+      süreçler arasında kesin artan değildir. İç referanslar (dekont vb.) için.
+    - KESINTISIZ (yasal belgeler): belgeye önce geçici numara (TASLAK-…) yazılır,
+      gerçek numara commit'ten hemen önce (before_commit) tek UPDATE ile alınır.
+      Sayaç kilidi sadece son flush + commit süresince tutulur; geri alınan
+      transaction sayacı da geri alır → boşluk oluşmaz.
+
+Sayaç artırımı her iki modda da atomik "UPDATE son_no = son_no + n" + okuma ile
+yapılır (SELECT ... FOR UPDATE gerekmez). Seri bazında bekleme süreleri
+metrikler() ile raporlanır.
+
+Kullanım:
+    belge_no = NumaraServisi.sonraki(firma_id, 'BANKA', 2026, 'DEC-')
+    NumaraServisi.ertele(fis, 'fis_no', firma_id, 'MAHSUP', 2026, 'M-', tenant_db=tenant_db)
+"""
+
+import logging
+import threading
+import time
+import uuid
+
+from sqlalchemy import event, func, inspect as sa_inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.extensions import get_tenant_db
+from app.models import Sayac, generate_uuid
+
+logger = logging.getLogger(__name__)
+
+_SAYAC = Sayac.__table__
+
+BLOK = 'blok'
+KESINTISIZ = 'kesintisiz'
+
+# Geçici numara öneki (before_commit'te gerçek numarayla değiştirilir)
+TASLAK_ONEK = 'TASLAK-'
+
+
+class _SeriMetrik:
+    __slots__ = ('mod', 'numara', 'rezervasyon', 'bekleme_ms', 'max_bekleme_ms')
+
+    def __init__(self, mod):
+        self.mod = mod
+        self.numara = 0
+        self.rezervasyon = 0
+        self.bekleme_ms = 0.0
+        self.max_bekleme_ms = 0.0
+
+    def ekle(self, numara, ms, rezervasyon=0):
+        self.numara += numara
+        self.rezervasyon += rezervasyon
+        self.bekleme_ms += ms
+        self.max_bekleme_ms = max(self.max_bekleme_ms, ms)
+
+    def ozet(self):
+        return {
+            'mod': self.mod,
+            'numara': self.numara,
+            'rezervasyon': self.rezervasyon,
+            'toplam_bekleme_ms': round(self.bekleme_ms, 2),
+            'ortalama_bekleme_ms': round(self.bekleme_ms / self.numara, 3) if self.numara else 0.0,
+            'max_bekleme_ms': round(self.max_bekleme_ms, 2),
+        }
+
+
+class NumaraServisi:
+    """Seri bazlı belge numarası dağıtıcı (blok / kesintisiz)"""
+
+    # Blok modda bir rezervasyonda ayrılan numara sayısı
+    BLOK_BOYUTU = 50
+    # Sayaç satırı ilk kez eklenirken yarış (unique ihlali) tekrar sayısı
+    EKLEME_DENEME = 3
+
+    _bloklar = {}          # {(veritabani, firma_id, donem_yili, kod): [sonraki, son]}
+    _seri_kilitleri = {}   # {anahtar: threading.Lock}
+    _metrikler = {}        # {"firma_id:kod:yil": _SeriMetrik}
+    _lock = threading.Lock()
+
+    # ========================================
+    # 🔢 SAYAÇ ARTIRIMI (ATOMİK)
+    # ========================================
+
+    @classmethod
+    def _arttir(cls, conn, firma_id, kod, donem_yili, adet, on_ek='', hane_sayisi=6):
+        """
+        Sayacı `adet` kadar artırır, yeni son_no'yu döner (aynı transaction içinde).
+        UPDATE satır kilidini alır; kilit çağıranın transaction'ı bitince bırakılır.
+        """
+        kosul = ((_SAYAC.c.firma_id == str(firma_id)) & (_SAYAC.c.kod == kod)
+                 & (_SAYAC.c.donem_yili == donem_yili))
+        for _ in range(cls.EKLEME_DENEME):
+            guncellenen = conn.execute(
+                _SAYAC.update().where(kosul).values(son_no=func.coalesce(_SAYAC.c.son_no, 0) + adet)
+            ).rowcount
+            if guncellenen:
+                return conn.execute(select(_SAYAC.c.son_no).where(kosul)).scalar_one()
+            try:
+                with conn.begin_nested():
+                    conn.execute(_SAYAC.insert().values(
+                        id=generate_uuid(), firma_id=str(firma_id), donem_yili=donem_yili, kod=kod,
+                        on_ek=on_ek, son_no=adet, hane_sayisi=hane_sayisi
+                    ))
+                return adet
+            except IntegrityError:
+                # Başka bir kayıt aynı seriyi az önce açtı → UPDATE ile tekrar dene
+                continue
+        raise RuntimeError(f"Sayaç oluşturulamadı: {kod}/{donem_yili}")
+
+    @staticmethod
+    def _bicimle(no, on_ek, hane_sayisi):
+        return f"{on_ek}{str(no).zfill(hane_sayisi)}"
+
+    @classmethod
+    def _metrik(cls, firma_id, kod, donem_yili, mod):
+        anahtar = f"{firma_id}:{kod}:{donem_yili}"
+        metrik = cls._metrikler.get(anahtar)
+        if metrik is None:
+            with cls._lock:
+                metrik = cls._metrikler.setdefault(anahtar, _SeriMetrik(mod))
+        return metrik
+
+    # ========================================
+    # 📦 BLOK (HI-LO) MOD
+    # ========================================
+
+    @classmethod
+    def sonraki(cls, firma_id, kod, donem_yili, on_ek='', hane_sayisi=6, tenant_db=None):
+        """
+        Boşluk toleranslı numara: süreç içi bloktan verilir, blok bitince
+        ayrı bağlantıda kısa bir transaction ile yeni aralık ayrılır.
+        Çağıranın (belge) transaction'ı sayaç satırını hiç kilitlemez.
+        """
+        if tenant_db is None:
+            tenant_db = get_tenant_db()
+        engine = tenant_db.get_bind()
+        anahtar = (str(engine.url), str(firma_id), donem_yili, kod)
+
+        with cls._lock:
+            kilit = cls._seri_kilitleri.setdefault(anahtar, threading.Lock())
+
+        bas = time.perf_counter()
+        rezervasyon = 0
+        with kilit:
+            blok = cls._bloklar.get(anahtar)
+            if blok is None or blok[0] > blok[1]:
+                with engine.begin() as conn:
+                    son = cls._arttir(conn, firma_id, kod, donem_yili, cls.BLOK_BOYUTU, on_ek, hane_sayisi)
+                blok = cls._bloklar[anahtar] = [son - cls.BLOK_BOYUTU + 1, son]
+                rezervasyon = 1
+            no = blok[0]
+            blok[0] += 1
+        cls._metrik(firma_id, kod, donem_yili, BLOK).ekle(1, (time.perf_counter() - bas) * 1000, rezervasyon)
+        return cls._bicimle(no, on_ek, hane_sayisi)
+
+    @classmethod
+    def bloklari_birak(cls):
+        """Süreç içi ayrılmış blokları unutur (kalan numaralar boşluk olarak kalır)"""
+        with cls._lock:
+            cls._bloklar.clear()
+
+    # ========================================
+    # 🔒 KESİNTİSİZ MOD (YASAL BELGELER)
+    # ========================================
+
+    @classmethod
+    def ertele(cls, nesne, alan, firma_id, kod, donem_yili, on_ek='', hane_sayisi=6, tenant_db=None):
+        """
+        Nesnenin `alan`ına geçici numara yazar; gerçek (boşluksuz) numara commit'ten
+        hemen önce atanır. Geçici numaranın session'daki kopyaları (ör. cari hareketin
+        belge_no'su, açıklama metni) da aynı anda gerçek numarayla değiştirilir.
+
+        Returns:
+            str: geçici numara
+        """
+        if tenant_db is None:
+            tenant_db = get_tenant_db()
+        taslak = f"{TASLAK_ONEK}{uuid.uuid4().hex[:12]}"
+        setattr(nesne, alan, taslak)
+        tenant_db.info.setdefault('_numara_bekleyen', []).append(
+            (taslak, str(firma_id), kod, donem_yili, on_ek, hane_sayisi)
+        )
+        return taslak
+
+    @classmethod
+    def aninda(cls, firma_id, kod, donem_yili, on_ek='', hane_sayisi=6, tenant_db=None):
+        """
+        Boşluksuz numarayı hemen (çağıranın transaction'ında) verir; sayaç kilidi
+        commit'e kadar tutulur. Numara commit'ten önce gerekiyorsa kullanılır.
+        """
+        if tenant_db is None:
+            tenant_db = get_tenant_db()
+        bas = time.perf_counter()
+        no = cls._arttir(tenant_db.connection(), firma_id, kod, donem_yili, 1, on_ek, hane_sayisi)
+        cls._metrik(firma_id, kod, donem_yili, KESINTISIZ).ekle(1, (time.perf_counter() - bas) * 1000, 1)
+        return cls._bicimle(no, on_ek, hane_sayisi)
+
+    @classmethod
+    def bekleyenleri_ata(cls, session):
+        """before_commit: belge yazılır, sonra seriler sırayla tek UPDATE ile numaralanır"""
+        bekleyen = session.info.pop('_numara_bekleyen', None)
+        if not bekleyen:
+            return
+
+        # Belgenin tüm satırları önce yazılır; sayaç kilidi transaction'da en son alınır
+        session.flush()
+        conn = session.connection()
+
+        seriler = {}
+        for kayit in bekleyen:
+            seriler.setdefault(kayit[1:4], []).append(kayit)
+
+        esleme = {}
+        for (firma_id, kod, donem_yili), kayitlar in sorted(seriler.items()):
+            bas = time.perf_counter()
+            son = cls._arttir(conn, firma_id, kod, donem_yili, len(kayitlar), kayitlar[0][4], kayitlar[0][5])
+            cls._metrik(firma_id, kod, donem_yili, KESINTISIZ).ekle(len(kayitlar), (time.perf_counter() - bas) * 1000, 1)
+            for no, (taslak, *_, on_ek, hane_sayisi) in enumerate(kayitlar, son - len(kayitlar) + 1):
+                esleme[taslak] = cls._bicimle(no, on_ek, hane_sayisi)
+
+        cls._taslaklari_degistir(session, esleme)
+
+    @staticmethod
+    def _taslaklari_degistir(session, esleme):
+        """Session'daki nesnelerin metin kolonlarında geçici numaraları gerçek numarayla değiştirir"""
+        for nesne in list(session.new) + list(session.identity_map.values()):
+            durum = sa_inspect(nesne)
+            for ozellik in durum.mapper.column_attrs:
+                deger = durum.dict.get(ozellik.key)
+                if not isinstance(deger, str) or TASLAK_ONEK not in deger:
+                    continue
+                for taslak, numara in esleme.items():
+                    if taslak in deger:
+                        deger = deger.replace(taslak, numara)
+                setattr(nesne, ozellik.key, deger)
+
+    # ========================================
+    # 📊 METRİKLER
+    # ========================================
+
+    @classmethod
+    def metrikler(cls):
+        """{seri: {mod, numara, rezervasyon, toplam/ortalama/max bekleme ms}}"""
+        with cls._lock:
+            return {seri: metrik.ozet() for seri, metrik in sorted(cls._metrikler.items())}
+
+    @classmethod
+    def metrikleri_sifirla(cls):
+        with cls._lock:
+            cls._metrikler.clear()
+
+    # ========================================
+    # 🏁 BENCHMARK
+    # ========================================
+
+    @classmethod
+    def benchmark(cls, kaydedici=50, belge=500, is_ms=10):
+        """
+        `kaydedici` paralel thread'in aynı seriye `belge` kayıt yaptığı senaryoda
+        saniyedeki belge sayısını ölçer: eski (sayaç kilidi belge boyunca tutulur),
+        blok ve kesintisiz mod. Belgenin geri kalan işi `is_ms` uyku ile temsil edilir.
+
+        Geçici dosya SQLite kullanır: satır kilidi yoktur ama yazma kilidi de commit'e
+        kadar tutulduğundan kilit tutma süresinin etkisi aynı şekilde görünür.
+        """
+        import os
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+
+        from sqlalchemy import Column, Integer, String, Table, create_engine
+        from sqlalchemy.orm import registry
+
+        reg = registry()
+        tablo = Table('numara_bench_belge', reg.metadata, Column('id', Integer, primary_key=True),
+                      Column('belge_no', String(50)), Column('aciklama', String(100)))
+
+        class _Belge:
+            pass
+
+        reg.map_imperatively(_Belge, tablo)
+
+        klasor = tempfile.mkdtemp()
+        engine = create_engine(f"sqlite:///{os.path.join(klasor, 'numara.db')}",
+                               connect_args={'timeout': 60, 'check_same_thread': False},
+                               pool_size=kaydedici, max_overflow=0)
+        _SAYAC.create(engine)
+        tablo.create(engine)
+
+        def _eski(session):
+            # Eski davranış: numara belge başında, sayaç kilidi commit'e kadar
+            return cls.aninda('F1', 'ESKI', 2026, 'E-', tenant_db=session)
+
+        def _kaydet(mod):
+            with Session(engine) as session:
+                belge = _Belge()
+                if mod == 'eski':
+                    belge.belge_no = _eski(session)
+                elif mod == BLOK:
+                    belge.belge_no = cls.sonraki('F1', 'BLOK', 2026, 'B-', tenant_db=session)
+                else:
+                    cls.ertele(belge, 'belge_no', 'F1', 'KES', 2026, 'K-', tenant_db=session)
+                time.sleep(is_ms / 1000)
+                belge.aciklama = f"Belge {belge.belge_no}"
+                session.add(belge)
+                session.commit()
+
+        def _olc(mod):
+            bas = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=kaydedici) as havuz:
+                list(havuz.map(lambda _: _kaydet(mod), range(belge)))
+            return belge / (time.perf_counter() - bas)
+
+        cls.metrikleri_sifirla()
+        cls.bloklari_birak()
+        try:
+            eski = _olc('eski')
+            blok = _olc(BLOK)
+            kesintisiz = _olc(KESINTISIZ)
+            with engine.connect() as conn:
+                numaralar = conn.execute(select(tablo.c.belge_no).where(tablo.c.belge_no.like('K-%'))).scalars().all()
+                aciklama_taslak = conn.execute(
+                    select(func.count()).where(tablo.c.aciklama.like(f'%{TASLAK_ONEK}%'))).scalar_one()
+            metrikler = cls.metrikler()
+        finally:
+            cls.bloklari_birak()
+            engine.dispose()
+
+        kesintisiz_tam = sorted(int(n[2:]) for n in numaralar) == list(range(1, belge + 1)) and not aciklama_taslak
+        return {
+            'kaydedici': kaydedici,
+            'belge': belge,
+            'eski_belge_sn': round(eski, 1),
+            'blok_belge_sn': round(blok, 1),
+            'kesintisiz_belge_sn': round(kesintisiz, 1),
+            'kesintisiz_bosluksuz': kesintisiz_tam,
+            'eski_max_bekleme_ms': metrikler['F1:ESKI:2026']['max_bekleme_ms'],
+            'blok_max_bekleme_ms': metrikler['F1:BLOK:2026']['max_bekleme_ms'],
+            'kesintisiz_max_bekleme_ms': metrikler['F1:KES:2026']['max_bekleme_ms'],
+            'fark': f"{kesintisiz / eski:.1f}x" if eski else '-',
+        }
+
+
+@event.listens_for(Session, 'before_commit')
+def _numaralari_ata(session):
+    NumaraServisi.bekleyenleri_ata(session)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _bekleyenleri_unut(session):
+    session.info.pop('_numara_bekleyen', None)
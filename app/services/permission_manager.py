@@ -1,5 +1,14 @@
 # app/services/permission_manager.py
 
+import logging
+import threading
+import time
+
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+
 class PermissionManager:
     """
     Rol ve Yetki Tanımları (Kural Kitabı)
@@ -158,6 +167,10 @@ class PermissionManager:
         ]       
     }
 
+    # Derlenmiş rol matcher'ları: {rol | (rol, ek_yetkiler): DerlenmisYetki}
+    _derlenmis = {}
+    _lock = threading.Lock()
+
     @staticmethod
     def check(user_role, permission_needed):
         """
@@ -175,41 +188,187 @@ class PermissionManager:
             - 'bolge_*' → bolge_olustur, bolge_guncelle, bolge_sil, bolge_gor
             - 'fatura.*' → fatura.create, fatura.view, fatura.delete
             - '*.view' → bolge_gor, stok_gor gibi tüm görüntüleme yetkileri
+
+        Rol tanımı ilk kullanımda derlenir (bkz. DerlenmisYetki); sonraki
+        kontroller set/tuple aramasıdır ve sonuçlar rol bazında hatırlanır.
         """
         if not user_role:
             return False
-        
+        return PermissionManager.derle(user_role).izin_var(permission_needed)
+
+    @staticmethod
+    def check_many(user_role, permissions):
+        """
+        Toplu yetki kontrolü (template'lerde tek seferde birden çok buton/menü için)
+
+        Returns:
+            dict: {yetki_kodu: bool}
+        """
+        if not user_role:
+            return {p: False for p in permissions}
+        derlenmis = PermissionManager.derle(user_role)
+        return {p: derlenmis.izin_var(p) for p in permissions}
+
+    @classmethod
+    def derle(cls, user_role, ek_yetkiler=()):
+        """
+        Rolün (ve varsa kullanıcıya özel ek yetkilerin) derlenmiş matcher'ı.
+        Aynı (rol, ek yetkiler) için process boyunca tek derleme yapılır.
+        """
+        anahtar = (user_role, tuple(sorted(ek_yetkiler))) if ek_yetkiler else user_role
+        derlenmis = cls._derlenmis.get(anahtar)
+        if derlenmis is None:
+            yetkiler = list(cls.ROLE_DEFINITIONS.get(user_role, [])) + list(ek_yetkiler)
+            derlenmis = DerlenmisYetki(yetkiler)
+            with cls._lock:
+                derlenmis = cls._derlenmis.setdefault(anahtar, derlenmis)
+        return derlenmis
+
+    @classmethod
+    def derleme_temizle(cls):
+        """ROLE_DEFINITIONS çalışma anında değiştirilirse derlenmiş matcher'ları at"""
+        with cls._lock:
+            cls._derlenmis.clear()
+
+    @staticmethod
+    def istek_icin_kontrol(user_role, permission_needed):
+        """
+        İstek (request) içinde hatırlanan kontrol.
+
+        Returns:
+            tuple: (bool sonuç, bool ilk_kez) → ilk_kez False ise sonuç bu istekte
+                   daha önce hesaplanmıştır (loglama tekrarlanmasın diye)
+        """
+        if not has_request_context():
+            return PermissionManager.check(user_role, permission_needed), True
+
+        memo = g.setdefault('_yetki_sonuclari', {})
+        anahtar = (user_role, permission_needed)
+        sonuc = memo.get(anahtar)
+        if sonuc is not None:
+            return sonuc, False
+        sonuc = memo[anahtar] = PermissionManager.check(user_role, permission_needed)
+        return sonuc, True
+
+    # ========================================
+    # 📏 MİKRO BENCHMARK
+    # ========================================
+
+    @staticmethod
+    def _check_eski(user_role, permission_needed):
+        """Derlenmemiş (eski) kontrol: her çağrıda rol listesini tarar. Benchmark / test referansı."""
+        if not user_role:
+            return False
+
         allowed = PermissionManager.ROLE_DEFINITIONS.get(user_role, [])
-        
-        # 1. ✅ Tam yetki (*)
+
         if '*' in allowed:
             return True
-        
-        # 2. ✅ Tam eşleşme
+
         if permission_needed in allowed:
             return True
-        
-        # 3. ✅ Prefix wildcard (bolge_*, stok_*)
-        #    Sadece underscore ile ayrılmış wildcard'lar (nokta YOK)
+
         for perm in allowed:
-            if '*' in perm and '.' not in perm:  # ← ÖNEMLİ: Nokta kontrolü
+            if '*' in perm and '.' not in perm:
                 prefix = perm.replace('*', '')
                 if permission_needed.startswith(prefix):
                     return True
-        
-        # 4. ✅ Grup yetkisi (fatura.*, cari.*)
-        #    Nokta ile ayrılmış wildcard'lar
+
         parts = permission_needed.split('.')
         if len(parts) > 1:
             if f"{parts[0]}.*" in allowed:
                 return True
-        
-        # 5. ✅ Suffix wildcard (*.view, *.gor)
-        #    Tüm görüntüleme yetkileri
+
         if permission_needed.endswith('.view') and '*.view' in allowed:
             return True
-        
+
         if permission_needed.endswith('_gor') and '*_gor' in allowed:
             return True
-        
+
+        return False
+
+    @classmethod
+    def benchmark(cls, tekrar=20000):
+        """
+        Kontrol başına maliyet (ns): eski tarama / derlenmiş (soğuk) / derlenmiş (memo)
+        Tüm roller × tipik yetki kodları üzerinde ölçülür; sonuç farkı 0 olmalıdır.
+        """
+        moduller = ['fatura', 'cari', 'stok', 'kasa', 'banka', 'rapor', 'bolge', 'sube', 'siparis', 'yok']
+        yetkiler = []
+        for m in moduller:
+            yetkiler += [f'{m}.view', f'{m}.create', f'{m}.delete', f'{m}_gor', f'{m}_guncelle']
+        roller = list(cls.ROLE_DEFINITIONS) + ['tanimsiz_rol']
+        ciftler = [(r, y) for r in roller for y in yetkiler]
+
+        fark = sum(cls._check_eski(r, y) != cls.check(r, y) for r, y in ciftler)
+        tur = max(1, tekrar // len(ciftler))
+        toplam = tur * len(ciftler)
+
+        def _olc(fn):
+            basla = time.perf_counter()
+            for _ in range(tur):
+                for r, y in ciftler:
+                    fn(r, y)
+            return round((time.perf_counter() - basla) * 1e9 / toplam, 1)
+
+        def _soguk(r, y):
+            return cls.derle(r)._hesapla(y)
+
+        sonuc = {
+            'kontrol_sayisi': toplam,
+            'eski_ns': _olc(cls._check_eski),
+            'derlenmis_soguk_ns': _olc(_soguk),
+            'derlenmis_memo_ns': _olc(cls.check),
+            'fark': fark,
+        }
+        logger.info(f"🔐 Yetki benchmark: {sonuc}")
+        return sonuc
+
+
+class DerlenmisYetki:
+    """
+    Bir rolün yetki listesinin derlenmiş hali
+
+        tam      : tam eşleşme seti
+        onekler  : 'bolge_*' gibi noktasız wildcard'ların önek tablosu (str.startswith(tuple))
+        gruplar  : 'fatura.*' → {'fatura'}
+        view/gor : '*.view' / '*_gor' sonek bayrakları
+
+    Kurallar PermissionManager.check() dokümanındaki sırayla birebir aynıdır.
+    """
+
+    __slots__ = ('tam_yetki', 'tam', 'onekler', 'gruplar', 'view', 'gor', '_sonuclar')
+
+    # Rol başına hatırlanan farklı yetki kodu sınırı
+    MEMO_LIMIT = 4096
+
+    def __init__(self, yetkiler):
+        self.tam = frozenset(yetkiler)
+        self.tam_yetki = '*' in self.tam
+        self.onekler = tuple(sorted({p.replace('*', '') for p in self.tam if '*' in p and '.' not in p}))
+        self.gruplar = frozenset(p[:-2] for p in self.tam if p.endswith('.*'))
+        self.view = '*.view' in self.tam
+        self.gor = '*_gor' in self.tam
+        self._sonuclar = {}
+
+    def izin_var(self, yetki):
+        sonuc = self._sonuclar.get(yetki)
+        if sonuc is None:
+            sonuc = self._hesapla(yetki)
+            if len(self._sonuclar) < self.MEMO_LIMIT:
+                self._sonuclar[yetki] = sonuc
+        return sonuc
+
+    def _hesapla(self, yetki):
+        if self.tam_yetki or yetki in self.tam:
+            return True
+        if self.onekler and yetki.startswith(self.onekler):
+            return True
+        nokta = yetki.find('.')
+        if nokta >= 0 and yetki[:nokta] in self.gruplar:
+            return True
+        if self.view and yetki.endswith('.view'):
+            return True
+        if self.gor and yetki.endswith('_gor'):
+            return True
         return False
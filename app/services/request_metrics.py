@@ -0,0 +1,305 @@
+# app/services/request_metrics.py
+"""
+İstek Metrikleri (Production'da da açık, düşük maliyetli enstrümantasyon)
+
+İstek başına toplanan:
+    - Toplam süre (wall time)
+    - SQL sorgu sayısı ve süresi (master / tenant engine ayrı) → SQLAlchemy engine event'leri
+    - Cache hit / miss (cache.get çağrıları)
+    - Template render süresi (before_render_template / template_rendered sinyalleri)
+
+Çıktılar:
+    - Endpoint bazlı kayan pencereli histogram (son PENCERE_SAYISI dakika, process içi)
+    - SLOW_REQUEST_MS üzerindeki istekler en yavaş sorgularıyla loglanır
+    - Server-Timing header'ı (SERVER_TIMING=True veya debug modda)
+    - /sistem/api/istek-metrikleri (superadmin JSON)
+"""
+
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.extensions import cache, db
+
+logger = logging.getLogger(__name__)
+
+# Histogram kova üst sınırları (ms); son kova = sınırsız
+KOVALAR = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class _IstekOlcumu:
+    """Tek bir isteğin ölçümleri (g._istek_metrik)"""
+
+    __slots__ = ('basla', 'sql', 'sql_ms', 'cache_hit', 'cache_miss', 'sablon_ms', '_sablon_basla', 'en_yavas')
+
+    EN_YAVAS_LIMIT = 5
+
+    def __init__(self):
+        self.basla = time.perf_counter()
+        self.sql = {'master': 0, 'tenant': 0}
+        self.sql_ms = {'master': 0.0, 'tenant': 0.0}
+        self.cache_hit = 0
+        self.cache_miss = 0
+        self.sablon_ms = 0.0
+        self._sablon_basla = []
+        self.en_yavas = []  # min-heap: (ms, sira, engine, sql)
+
+    def sorgu_ekle(self, tur, ms, sql):
+        self.sql[tur] += 1
+        self.sql_ms[tur] += ms
+        oge = (ms, self.sql['master'] + self.sql['tenant'], tur, sql)
+        if len(self.en_yavas) < self.EN_YAVAS_LIMIT:
+            heapq.heappush(self.en_yavas, oge)
+        elif ms > self.en_yavas[0][0]:
+            heapq.heapreplace(self.en_yavas, oge)
+
+
+class _EndpointIstatistigi:
+    __slots__ = ('sayi', 'toplam_ms', 'max_ms', 'sql', 'sql_ms', 'hata', 'kovalar')
+
+    def __init__(self):
+        self.sayi = 0
+        self.toplam_ms = 0.0
+        self.max_ms = 0.0
+        self.sql = 0
+        self.sql_ms = 0.0
+        self.hata = 0
+        self.kovalar = [0] * (len(KOVALAR) + 1)
+
+    def ekle(self, ms, sql, sql_ms, hata):
+        self.sayi += 1
+        self.toplam_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.sql += sql
+        self.sql_ms += sql_ms
+        self.hata += hata
+        for i, sinir in enumerate(KOVALAR):
+            if ms <= sinir:
+                self.kovalar[i] += 1
+                break
+        else:
+            self.kovalar[-1] += 1
+
+    def birlestir(self, diger):
+        self.sayi += diger.sayi
+        self.toplam_ms += diger.toplam_ms
+        self.max_ms = max(self.max_ms, diger.max_ms)
+        self.sql += diger.sql
+        self.sql_ms += diger.sql_ms
+        self.hata += diger.hata
+        self.kovalar = [a + b for a, b in zip(self.kovalar, diger.kovalar)]
+
+    def yuzdelik(self, oran):
+        """Kova üst sınırından yaklaşık yüzdelik (ms)"""
+        hedef = self.sayi * oran
+        birikimli = 0
+        for i, adet in enumerate(self.kovalar):
+            birikimli += adet
+            if birikimli >= hedef and adet:
+                return KOVALAR[i] if i < len(KOVALAR) else round(self.max_ms, 1)
+        return None
+
+    def ozet(self):
+        return {
+            'sayi': self.sayi,
+            'ort_ms': round(self.toplam_ms / self.sayi, 1) if self.sayi else 0,
+            'p50_ms': self.yuzdelik(0.5),
+            'p95_ms': self.yuzdelik(0.95),
+            'p99_ms': self.yuzdelik(0.99),
+            'max_ms': round(self.max_ms, 1),
+            'ort_sql': round(self.sql / self.sayi, 1) if self.sayi else 0,
+            'ort_sql_ms': round(self.sql_ms / self.sayi, 1) if self.sayi else 0,
+            'hata': self.hata,
+            'histogram': dict(zip([f"<={k}" for k in KOVALAR] + [f">{KOVALAR[-1]}"], self.kovalar)),
+        }
+
+
+class IstekMetrikleri:
+    """Flask uygulamasına istek enstrümantasyonu ekler (init_app)"""
+
+    # Dakikalık pencere sayısı (kayan histogram genişliği)
+    PENCERE_SAYISI = 15
+    # Eşik varsayılanı (ms) → config SLOW_REQUEST_MS
+    VARSAYILAN_YAVAS_MS = 1000
+
+    _pencereler = deque(maxlen=PENCERE_SAYISI)  # [(dakika, {endpoint: _EndpointIstatistigi})]
+    _lock = threading.Lock()
+    _master_engineler = frozenset()
+    _kuruldu = False
+    _yavas_ms = VARSAYILAN_YAVAS_MS
+    _server_timing = False
+
+    @classmethod
+    def init_app(cls, app):
+        cls._yavas_ms = app.config.get('SLOW_REQUEST_MS', cls.VARSAYILAN_YAVAS_MS)
+        cls._server_timing = app.config.get('SERVER_TIMING', False) or app.debug
+
+        app.before_request(cls._istek_basladi)
+        app.after_request(cls._istek_bitti)
+        before_render_template.connect(cls._sablon_basladi, app)
+        template_rendered.connect(cls._sablon_bitti, app)
+
+        with app.app_context():
+            try:
+                cls._master_engineler = frozenset(id(e) for e in db.engines.values())
+            except Exception as e:
+                logger.debug(f"Master engine listesi alınamadı: {e}")
+
+        # Engine event'leri ve cache sayacı process başına bir kez
+        if not cls._kuruldu:
+            event.listen(Engine, 'before_cursor_execute', cls._sorgu_basladi)
+            event.listen(Engine, 'after_cursor_execute', cls._sorgu_bitti)
+            cls._cache_say(cache)
+            cls._kuruldu = True
+
+    # ========================================
+    # ⏱️ İSTEK
+    # ========================================
+
+    @staticmethod
+    def _istek_basladi():
+        if request.endpoint != 'static':
+            g._istek_metrik = _IstekOlcumu()
+
+    @classmethod
+    def _istek_bitti(cls, response):
+        olcum = g.pop('_istek_metrik', None)
+        if olcum is None:
+            return response
+
+        ms = (time.perf_counter() - olcum.basla) * 1000
+        endpoint = request.endpoint or 'bilinmeyen'
+        sql = olcum.sql['master'] + olcum.sql['tenant']
+        sql_ms = olcum.sql_ms['master'] + olcum.sql_ms['tenant']
+        cls._kaydet(endpoint, ms, sql, sql_ms, response.status_code >= 500)
+
+        if cls._server_timing:
+            response.headers['Server-Timing'] = ', '.join([
+                f'app;dur={ms:.1f}',
+                f'db-master;desc="{olcum.sql["master"]} sorgu";dur={olcum.sql_ms["master"]:.1f}',
+                f'db-tenant;desc="{olcum.sql["tenant"]} sorgu";dur={olcum.sql_ms["tenant"]:.1f}',
+                f'tpl;dur={olcum.sablon_ms:.1f}',
+                f'cache;desc="hit={olcum.cache_hit} miss={olcum.cache_miss}"',
+            ])
+            response.headers['X-Request-Duration'] = f"{ms / 1000:.3f}s"
+
+        if ms >= cls._yavas_ms:
+            en_yavas = ' | '.join(
+                f"{s_ms:.0f}ms [{tur}] {' '.join(s.split())[:200]}"
+                for s_ms, _, tur, s in sorted(olcum.en_yavas, reverse=True)
+            )
+            logger.warning(
+                f"🐢 Yavaş istek: {request.method} {request.path} ({endpoint}) {ms:.0f}ms | "
+                f"sql={sql} ({sql_ms:.0f}ms, master={olcum.sql['master']}, tenant={olcum.sql['tenant']}) | "
+                f"tpl={olcum.sablon_ms:.0f}ms | cache hit={olcum.cache_hit} miss={olcum.cache_miss} | "
+                f"en yavaş: {en_yavas or '-'}"
+            )
+        return response
+
+    @classmethod
+    def _kaydet(cls, endpoint, ms, sql, sql_ms, hata):
+        dakika = int(time.time() // 60)
+        with cls._lock:
+            if not cls._pencereler or cls._pencereler[-1][0] != dakika:
+                cls._pencereler.append((dakika, {}))
+            pencere = cls._pencereler[-1][1]
+            ist = pencere.get(endpoint)
+            if ist is None:
+                ist = pencere[endpoint] = _EndpointIstatistigi()
+            ist.ekle(ms, sql, sql_ms, hata)
+
+    # ========================================
+    # 🗄️ SQL
+    # ========================================
+
+    @staticmethod
+    def _sorgu_basladi(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            conn.info.setdefault('_metrik_basla', []).append(time.perf_counter())
+
+    @classmethod
+    def _sorgu_bitti(cls, conn, cursor, statement, parameters, context, executemany):
+        if not has_request_context():
+            return
+        baslangiclar = conn.info.get('_metrik_basla')
+        olcum = g.get('_istek_metrik')
+        if not baslangiclar or olcum is None:
+            return
+        ms = (time.perf_counter() - baslangiclar.pop()) * 1000
+        tur = 'master' if id(conn.engine) in cls._master_engineler else 'tenant'
+        olcum.sorgu_ekle(tur, ms, statement)
+
+    # ========================================
+    # 🧩 TEMPLATE / CACHE
+    # ========================================
+
+    @staticmethod
+    def _sablon_basladi(sender, template, context, **extra):
+        olcum = g.get('_istek_metrik')
+        if olcum is not None:
+            olcum._sablon_basla.append(time.perf_counter())
+
+    @staticmethod
+    def _sablon_bitti(sender, template, context, **extra):
+        olcum = g.get('_istek_metrik')
+        if olcum is not None and olcum._sablon_basla:
+            olcum.sablon_ms += (time.perf_counter() - olcum._sablon_basla.pop()) * 1000
+
+    @staticmethod
+    def _cache_say(cache_nesnesi):
+        """cache.get'i hit/miss sayacak şekilde sarar (sadece istek içindeyken sayar)"""
+        asil_get = cache_nesnesi.get
+
+        def get(*args, **kwargs):
+            deger = asil_get(*args, **kwargs)
+            if has_request_context():
+                olcum = g.get('_istek_metrik')
+                if olcum is not None:
+                    if deger is None:
+                        olcum.cache_miss += 1
+                    else:
+                        olcum.cache_hit += 1
+            return deger
+
+        cache_nesnesi.get = get
+
+    # ========================================
+    # 📊 RAPOR
+    # ========================================
+
+    @classmethod
+    def ozet(cls, dakika=None, limit=50):
+        """
+        Son `dakika` (varsayılan: tüm pencere) için endpoint bazlı özet,
+        toplam süreye göre azalan sırada.
+        """
+        simdi = int(time.time() // 60)
+        alt_sinir = simdi - (dakika or cls.PENCERE_SAYISI) + 1
+        toplam = {}
+        with cls._lock:
+            for pencere_dakika, pencere in cls._pencereler:
+                if pencere_dakika < alt_sinir:
+                    continue
+                for endpoint, ist in pencere.items():
+                    hedef = toplam.get(endpoint)
+                    if hedef is None:
+                        hedef = toplam[endpoint] = _EndpointIstatistigi()
+                    hedef.birlestir(ist)
+
+        sirali = sorted(toplam.items(), key=lambda x: x[1].toplam_ms, reverse=True)[:limit]
+        return {
+            'pencere_dakika': dakika or cls.PENCERE_SAYISI,
+            'yavas_esik_ms': cls._yavas_ms,
+            'endpointler': {endpoint: ist.ozet() for endpoint, ist in sirali},
+        }
+
+    @classmethod
+    def sifirla(cls):
+        with cls._lock:
+            cls._pencereler.clear()
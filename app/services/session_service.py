@@ -1,52 +1,121 @@
 # app/services/session_service.py
 
+import logging
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta
+
 from flask import request, session, current_app
+from sqlalchemy import bindparam, update
 from app.extensions import db
 from app.models.master import MasterActiveSession, User
 
+logger = logging.getLogger(__name__)
+
+
 class SessionService:
     """
     Oturum Yönetimi ve Lisans Kontrolü
+
+    Nabız (heartbeat) akışı write-behind çalışır:
+        - Her sayfa görüntülemede son görülme zamanı nabız deposuna yazılır
+          (REDIS_URL varsa Redis sorted set, yoksa process belleği)
+        - Eşzamanlı oturum sayımı ve zombi temizliği depodan yapılır
+        - Biriken nabızlar FLUSH_INTERVAL'de bir toplu UPDATE ile master DB'ye
+          aynalanır; DB sadece kalıcı kopyadır (restart sonrası depo DB'den doldurulur)
     """
-    
+
     # Oturumun boşta kalma süresi (Dakika)
     # Bu süreden fazla işlem yapmayan otomatik düşer.
-    TIMEOUT_MINUTES = 30 
+    TIMEOUT_MINUTES = 30
+
+    # Nabızların DB'ye toplu yazılma aralığı (saniye)
+    FLUSH_INTERVAL = 60
+
+    _nabiz_deposu = None
+    _depo_lock = threading.Lock()
+
+    # ========================================
+    # 💓 NABIZ DEPOSU
+    # ========================================
+
+    @classmethod
+    def _depo(cls):
+        if cls._nabiz_deposu is None:
+            with cls._depo_lock:
+                if cls._nabiz_deposu is None:
+                    cls._nabiz_deposu = cls._depo_olustur()
+        return cls._nabiz_deposu
+
+    @staticmethod
+    def _depo_olustur():
+        redis_url = current_app.config.get('REDIS_URL')
+        if redis_url:
+            try:
+                import redis
+                client = redis.from_url(redis_url)
+                client.ping()
+                logger.info("💓 Oturum nabız deposu: Redis")
+                return RedisNabizDeposu(client)
+            except Exception as e:
+                logger.warning(f"⚠️ Redis nabız deposu kullanılamıyor, bellek kullanılacak: {e}")
+        return BellekNabizDeposu()
+
+    @classmethod
+    def _esik(cls):
+        """Bu zamandan (epoch) önce görülen oturumlar zombi sayılır"""
+        return time.time() - cls.TIMEOUT_MINUTES * 60
+
+    @classmethod
+    def _tenant_yukle(cls, tenant_id):
+        """Depo bu tenant'ı ilk kez görüyorsa aktif oturumları DB'den doldur"""
+        depo = cls._depo()
+        if depo.yuklendi_mi(tenant_id):
+            return
+        try:
+            expiration_time = datetime.now() - timedelta(minutes=cls.TIMEOUT_MINUTES)
+            t = MasterActiveSession.__table__
+            kayitlar = db.session.execute(
+                t.select().with_only_columns(t.c.session_token, t.c.last_activity).where(
+                    t.c.tenant_id == tenant_id, t.c.last_activity >= expiration_time
+                )
+            ).all()
+        except Exception as e:
+            logger.error(f"❌ Oturumlar DB'den yüklenemedi: {e}")
+            return
+        depo.yukle(tenant_id, {r.session_token: r.last_activity.timestamp() for r in kayitlar})
+
+    # ========================================
+    # 🔐 LOGIN / LOGOUT
+    # ========================================
 
     @staticmethod
     def cleanup_stale_sessions():
         """
         Süresi dolmuş (zombi) oturumları temizler.
-        Login işleminden hemen önce çalışmalıdır.
+        Depodan anında düşer; DB'deki karşılıkları bir sonraki flush'ta silinir.
         """
         try:
-            expiration_time = datetime.now() - timedelta(minutes=SessionService.TIMEOUT_MINUTES)
-            
-            # Süresi geçenleri sil
-            deleted_count = MasterActiveSession.query.filter(
-                MasterActiveSession.last_activity < expiration_time
-            ).delete()
-            
-            if deleted_count > 0:
-                db.session.commit()
-                # print(f"🧹 Temizlik: {deleted_count} adet zombi oturum silindi.")
+            silinen = SessionService._depo().temizle(SessionService._esik())
+            if silinen:
+                logger.debug(f"🧹 Temizlik: {silinen} adet zombi oturum düştü")
+            return silinen
         except Exception as e:
-            db.session.rollback()
-            print(f"⚠️ Session temizlik hatası: {e}")
+            logger.warning(f"⚠️ Session temizlik hatası: {e}")
+            return 0
 
     @staticmethod
     def can_login(tenant_id, max_users):
         """
         Kullanıcı içeri girebilir mi? (Limit Kontrolü)
         """
-        # 1. Önce ortalığı temizle (Ölü oturumları saymayalım)
-        SessionService.cleanup_stale_sessions()
+        SessionService._tenant_yukle(tenant_id)
 
-        # 2. Şu anki aktif oturum sayısını çek
-        current_active_count = MasterActiveSession.query.filter_by(tenant_id=tenant_id).count()
+        # Zombi oturumlar sayım sırasında düşülür (DB'ye gitmeden)
+        current_active_count = SessionService._depo().say(tenant_id, SessionService._esik())
 
-        # 3. Limit Kontrolü
+        # Limit Kontrolü
         # Eğer (Aktif Sayısı) >= (Lisans Hakkı) ise DUR.
         if current_active_count >= max_users:
             return False, f"Lisans limiti dolu! ({current_active_count}/{max_users} Kullanıcı Aktif). Lütfen açık oturumları kapatın."
@@ -61,16 +130,15 @@ class SessionService:
         try:
             ip = request.remote_addr
             agent = request.headers.get('User-Agent')
-            
+
             # Token oluştur (Session Fixation koruması için)
-            import uuid
             session_token = str(uuid.uuid4())
             session['_session_token'] = session_token # Flask session'a yaz
 
             # Eski oturum varsa sil (Aynı tarayıcıdan tekrar giriyorsa)
             # Not: Farklı cihazdan giriyorsa silmiyoruz, yeni kayıt açıyoruz (Concurrent Session)
             # Ancak aynı user_id temizliği istenirse burası açılabilir.
-            
+
             new_session = MasterActiveSession(
                 session_token=session_token,
                 user_id=user.id,
@@ -79,41 +147,46 @@ class SessionService:
                 user_agent=agent,
                 last_activity=datetime.now()
             )
-            
+
             db.session.add(new_session)
             db.session.commit()
+
+            SessionService._tenant_yukle(tenant_id)
+            SessionService._depo().kaydet(tenant_id, session_token, time.time(), ip, kirli=False)
             return True
-            
+
         except Exception as e:
             db.session.rollback()
-            print(f"⚠️ Session kayıt hatası: {e}")
+            logger.warning(f"⚠️ Session kayıt hatası: {e}")
             return False
 
     @staticmethod
     def heartbeat():
         """
         Kullanıcı her sayfa değiştirdiğinde 'Ben buradayım' der.
-        Süreyi uzatır.
+        Süreyi uzatır (sadece nabız deposuna yazar; DB'ye toplu flush ile gider).
         """
         token = session.get('_session_token')
-        if not token:
+        tenant_id = session.get('tenant_id')
+        if not token or not tenant_id:
             return False
-            
+
         try:
-            # Token ile oturumu bul
-            active_session = MasterActiveSession.query.filter_by(session_token=token).first()
-            
-            if active_session:
-                # Süreyi güncelle
-                active_session.last_activity = datetime.now()
-                # IP değiştiyse güncelle (Mobil veri vs.)
-                active_session.ip_address = request.remote_addr
-                db.session.commit()
-                return True
-            else:
-                # DB'de yoksa (Admin atmış olabilir veya timeout yemiş)
+            depo = SessionService._depo()
+            SessionService._tenant_yukle(tenant_id)
+
+            # Depoda yoksa (çıkış yapılmış veya timeout yemiş)
+            if not depo.var_mi(tenant_id, token, SessionService._esik()):
                 return False
-        except:
+
+            depo.kaydet(tenant_id, token, time.time(), request.remote_addr)
+
+            # Flush sırası gelen (ve kilidi alan) tek worker DB'ye yazar
+            if depo.flush_zamani_mi(SessionService.FLUSH_INTERVAL):
+                SessionService.flush()
+            return True
+        except Exception as e:
+            logger.debug(f"Heartbeat hatası: {e}")
             return False
 
     @staticmethod
@@ -124,7 +197,209 @@ class SessionService:
         token = session.get('_session_token')
         if token:
             try:
+                SessionService._depo().sil(session.get('tenant_id'), token)
                 MasterActiveSession.query.filter_by(session_token=token).delete()
                 db.session.commit()
             except Exception as e:
-                db.session.rollback()
\ No newline at end of file
+                db.session.rollback()
+
+    # ========================================
+    # 💾 DB AYNASI (WRITE-BEHIND)
+    # ========================================
+
+    @staticmethod
+    def flush():
+        """
+        Biriken nabızları tek executemany UPDATE ile DB'ye yazar ve
+        süresi dolmuş oturumları DB'den siler.
+
+        Returns:
+            int: Güncellenen oturum sayısı
+        """
+        depo = SessionService._depo()
+        nabizlar = depo.kirlileri_al()
+        t = MasterActiveSession.__table__
+        try:
+            if nabizlar:
+                db.session.execute(
+                    update(t).where(t.c.session_token == bindparam('b_token')).values(
+                        last_activity=bindparam('b_zaman'), ip_address=bindparam('b_ip')
+                    ),
+                    [
+                        {'b_token': token, 'b_zaman': datetime.fromtimestamp(ts), 'b_ip': ip}
+                        for token, (ts, ip) in nabizlar.items()
+                    ],
+                )
+
+            expiration_time = datetime.now() - timedelta(minutes=SessionService.TIMEOUT_MINUTES)
+            db.session.execute(t.delete().where(t.c.last_activity < expiration_time))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # Yazılamayan nabızlar kaybolmasın, bir sonraki flush'ta tekrar denenir
+            depo.geri_koy(nabizlar)
+            logger.error(f"❌ Oturum nabız flush hatası: {e}")
+            return 0
+
+        if nabizlar:
+            logger.debug(f"💾 {len(nabizlar)} oturum nabzı DB'ye yazıldı")
+        return len(nabizlar)
+
+
+class BellekNabizDeposu:
+    """
+    Process içi nabız deposu (REDIS_URL yokken; tek worker'lı geliştirme ortamı).
+    Birden çok worker'da sayımlar process bazlı olacağından production'da Redis kullanın.
+    """
+
+    def __init__(self):
+        self._aktif = {}      # {tenant_id: {token: ts}}
+        self._kirli = {}      # {token: (ts, ip)}
+        self._yuklenen = set()
+        self._son_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def yuklendi_mi(self, tenant_id):
+        return tenant_id in self._yuklenen
+
+    def yukle(self, tenant_id, kayitlar):
+        with self._lock:
+            aktif = self._aktif.setdefault(tenant_id, {})
+            for token, ts in kayitlar.items():
+                aktif.setdefault(token, ts)
+            self._yuklenen.add(tenant_id)
+
+    def kaydet(self, tenant_id, token, ts, ip, kirli=True):
+        with self._lock:
+            self._aktif.setdefault(tenant_id, {})[token] = ts
+            if kirli:
+                self._kirli[token] = (ts, ip)
+
+    def var_mi(self, tenant_id, token, esik):
+        ts = self._aktif.get(tenant_id, {}).get(token)
+        return ts is not None and ts >= esik
+
+    def say(self, tenant_id, esik):
+        self._temizle_tenant(tenant_id, esik)
+        return len(self._aktif.get(tenant_id, {}))
+
+    def temizle(self, esik):
+        return sum(self._temizle_tenant(tenant_id, esik) for tenant_id in list(self._aktif))
+
+    def _temizle_tenant(self, tenant_id, esik):
+        with self._lock:
+            aktif = self._aktif.get(tenant_id, {})
+            zombiler = [t for t, ts in aktif.items() if ts < esik]
+            for token in zombiler:
+                del aktif[token]
+            return len(zombiler)
+
+    def sil(self, tenant_id, token):
+        with self._lock:
+            self._aktif.get(tenant_id, {}).pop(token, None)
+            self._kirli.pop(token, None)
+
+    def kirlileri_al(self):
+        with self._lock:
+            kirli, self._kirli = self._kirli, {}
+        return kirli
+
+    def geri_koy(self, nabizlar):
+        with self._lock:
+            for token, deger in nabizlar.items():
+                self._kirli.setdefault(token, deger)
+
+    def flush_zamani_mi(self, aralik):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._son_flush < aralik:
+                return False
+            self._son_flush = now
+            return True
+
+
+class RedisNabizDeposu:
+    """
+    Redis nabız deposu (tüm worker'lar ortak görür)
+
+        <onek>:aktif:<tenant>  → sorted set (token → son görülme epoch)
+        <onek>:kirli           → hash (token → "ts|ip"), DB'ye yazılmayı bekleyenler
+        <onek>:tenantlar       → set (temizlik için)
+        <onek>:yuklendi:<t>    → tenant DB'den dolduruldu işareti
+        <onek>:flush_kilit     → aralık başına tek flush yapan worker
+    """
+
+    def __init__(self, client, onek='erp:oturum'):
+        self.r = client
+        self.onek = onek
+
+    def _z(self, tenant_id):
+        return f"{self.onek}:aktif:{tenant_id}"
+
+    def yuklendi_mi(self, tenant_id):
+        return bool(self.r.exists(f"{self.onek}:yuklendi:{tenant_id}"))
+
+    def yukle(self, tenant_id, kayitlar):
+        p = self.r.pipeline()
+        if kayitlar:
+            # nx: worker'lar arası yarışta daha yeni nabzın üzerine yazma
+            p.zadd(self._z(tenant_id), kayitlar, nx=True)
+        p.sadd(f"{self.onek}:tenantlar", tenant_id)
+        p.set(f"{self.onek}:yuklendi:{tenant_id}", 1)
+        p.execute()
+
+    def kaydet(self, tenant_id, token, ts, ip, kirli=True):
+        p = self.r.pipeline(transaction=False)
+        p.zadd(self._z(tenant_id), {token: ts})
+        if kirli:
+            p.hset(f"{self.onek}:kirli", token, f"{ts}|{ip or ''}")
+        p.sadd(f"{self.onek}:tenantlar", tenant_id)
+        p.execute()
+
+    def var_mi(self, tenant_id, token, esik):
+        ts = self.r.zscore(self._z(tenant_id), token)
+        return ts is not None and ts >= esik
+
+    def say(self, tenant_id, esik):
+        p = self.r.pipeline()
+        p.zremrangebyscore(self._z(tenant_id), '-inf', f"({esik}")
+        p.zcard(self._z(tenant_id))
+        return p.execute()[1]
+
+    def temizle(self, esik):
+        tenantlar = self.r.smembers(f"{self.onek}:tenantlar")
+        if not tenantlar:
+            return 0
+        p = self.r.pipeline(transaction=False)
+        for tenant_id in tenantlar:
+            p.zremrangebyscore(self._z(tenant_id.decode()), '-inf', f"({esik}")
+        return sum(p.execute())
+
+    def sil(self, tenant_id, token):
+        p = self.r.pipeline(transaction=False)
+        if tenant_id:
+            p.zrem(self._z(tenant_id), token)
+        p.hdel(f"{self.onek}:kirli", token)
+        p.execute()
+
+    def kirlileri_al(self):
+        p = self.r.pipeline()
+        p.hgetall(f"{self.onek}:kirli")
+        p.delete(f"{self.onek}:kirli")
+        ham = p.execute()[0]
+        sonuc = {}
+        for token, deger in ham.items():
+            ts, _, ip = deger.decode().partition('|')
+            sonuc[token.decode()] = (float(ts), ip or None)
+        return sonuc
+
+    def geri_koy(self, nabizlar):
+        if not nabizlar:
+            return
+        p = self.r.pipeline(transaction=False)
+        for token, (ts, ip) in nabizlar.items():
+            p.hsetnx(f"{self.onek}:kirli", token, f"{ts}|{ip or ''}")
+        p.execute()
+
+    def flush_zamani_mi(self, aralik):
+        return bool(self.r.set(f"{self.onek}:flush_kilit", 1, nx=True, ex=aralik))
@@ -0,0 +1,99 @@
+# app/services/startup_profiler.py
+"""
+Uygulama Açılış Profili
+
+İki seviye:
+    1. BaslangicProfili   → create_app içinde aşama / blueprint başına süre ve
+                            yüklenen yeni modül sayısı (STARTUP_PROFILE=true)
+    2. import_zamanlari() → ayrı bir Python process'inde `-X importtime` ile
+                            modül bazında import süreleri (flask baslangic-profili)
+"""
+
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_IMPORTTIME_SATIRI = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+class BaslangicProfili:
+    """create_app aşamalarının süre ölçümü (aktif değilse maliyetsiz)"""
+
+    def __init__(self, aktif=False):
+        self.aktif = aktif
+        self.olcumler = []  # [(grup, ad, ms, yeni_modul)]
+
+    @contextmanager
+    def olc(self, ad, grup='asama'):
+        if not self.aktif:
+            yield
+            return
+        modul_sayisi = len(sys.modules)
+        baslangic = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.olcumler.append((grup, ad, (time.perf_counter() - baslangic) * 1000,
+                                  len(sys.modules) - modul_sayisi))
+
+    def ozet(self, grup=None):
+        """Süreye göre azalan [{'ad', 'ms', 'yeni_modul'}]"""
+        satirlar = [
+            {'ad': ad, 'ms': round(ms, 1), 'yeni_modul': yeni}
+            for g, ad, ms, yeni in self.olcumler if grup is None or g == grup
+        ]
+        return sorted(satirlar, key=lambda x: x['ms'], reverse=True)
+
+    def raporla(self, limit=15):
+        if not self.aktif or not self.olcumler:
+            return
+        for grup in ('asama', 'blueprint'):
+            satirlar = self.ozet(grup)
+            if not satirlar:
+                continue
+            toplam = sum(s['ms'] for s in satirlar)
+            logger.info(f"⏱️ Açılış profili [{grup}] toplam {toplam:.0f}ms")
+            for s in satirlar[:limit]:
+                logger.info(f"   {s['ms']:>8.1f}ms  +{s['yeni_modul']:<4} {s['ad']}")
+
+
+def import_zamanlari(hedef='run', limit=25, python=None):
+    """
+    Ayrı bir process'te `python -X importtime -c "import <hedef>"` çalıştırır.
+
+    Returns:
+        dict: {'toplam_ms', 'en_yavas_kumulatif': [...], 'en_yavas_kendi': [...]}
+              Her satır: {'modul', 'kendi_ms', 'kumulatif_ms'}
+    """
+    ortam = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    sonuc = subprocess.run(
+        [python or sys.executable, '-X', 'importtime', '-c', f'import {hedef}'],
+        capture_output=True, text=True, env=ortam,
+    )
+
+    satirlar = []
+    toplam_us = 0
+    for satir in sonuc.stderr.splitlines():
+        eslesme = _IMPORTTIME_SATIRI.match(satir)
+        if not eslesme:
+            continue
+        kendi, kumulatif, girinti, modul = eslesme.groups()
+        satirlar.append({'modul': modul, 'kendi_ms': int(kendi) / 1000, 'kumulatif_ms': int(kumulatif) / 1000})
+        # En üst seviye import'lar (tek boşluk girinti) toplam süreyi verir
+        if len(girinti) == 1:
+            toplam_us += int(kumulatif)
+
+    if sonuc.returncode != 0 and not satirlar:
+        raise RuntimeError(sonuc.stderr.strip().splitlines()[-1] if sonuc.stderr.strip() else 'import başarısız')
+
+    return {
+        'toplam_ms': round(toplam_us / 1000, 1),
+        'en_yavas_kumulatif': sorted(satirlar, key=lambda x: x['kumulatif_ms'], reverse=True)[:limit],
+        'en_yavas_kendi': sorted(satirlar, key=lambda x: x['kendi_ms'], reverse=True)[:limit],
+    }
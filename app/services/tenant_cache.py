@@ -0,0 +1,283 @@
+# app/services/tenant_cache.py
+"""
+Tenant + Veri Alanı (namespace) Bazlı Cache Katmanı
+
+Anahtar biçimi:
+    tc:<tenant>:<alan>:<sürüm>:<anahtar>
+
+    - tenant : session['tenant_id'] (yoksa 'global')
+    - alan   : 'stok', 'fiyat', 'cari', 'menu' ...
+    - sürüm  : alan başına sayaç; invalidate() ile artar → eski anahtarlar
+               okunmaz ve TTL ile kendiliğinden düşer (cache.clear() YOK)
+
+Stampede koruması:
+    Değer "taze" süresi + "bayat" (stale) pencere kadar saklanır.
+    - Taze     → doğrudan döner
+    - Bayat    → kilidi alan TEK istek yeniden hesaplar, diğerleri bayat değeri döner
+    - Hiç yok  → kilidi alan hesaplar, diğerleri kısa süre bekleyip onun sonucunu okur
+
+Metrikler process içinde alan bazında tutulur (istatistikler()).
+"""
+
+import functools
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import session, has_request_context
+
+from app.extensions import cache
+
+logger = logging.getLogger(__name__)
+
+# Bilinen veri alanları (yeni alan eklemek için buraya yazın)
+ALANLAR = frozenset(['stok', 'fiyat', 'cari', 'menu', 'fatura', 'rapor', 'lookup', 'genel'])
+
+# Fonksiyon argümanlarından anahtara girebilecek tipler (tenant_db, nesneler vb. atlanır)
+_ANAHTAR_TIPLERI = (str, int, float, bool, Decimal, date, datetime, type(None))
+
+
+class TenantCache:
+    """Tenant ve veri alanına göre isimlendirilmiş cache facade'ı"""
+
+    # Sürüm sayacının process içinde tekrar okunma aralığı
+    LOCAL_TTL = 2
+    # Taze süre dolduktan sonra bayat değerin sunulabileceği ek süre
+    STALE_TTL = 300
+    # Yeniden hesaplama kilidi (hesaplayan process ölürse kendiliğinden açılır)
+    KILIT_TTL = 30
+    # Değer yokken başka bir isteğin hesaplamasını bekleme süresi
+    BEKLEME_SURESI = 2.0
+    BEKLEME_ARALIGI = 0.05
+
+    _gen_checked = {}  # {(tenant_id, alan): (monotonic, gen)}
+    _metrikler = defaultdict(lambda: defaultdict(int))
+    _lock = threading.Lock()
+
+    # ========================================
+    # 🔑 ANAHTAR / SÜRÜM
+    # ========================================
+
+    @staticmethod
+    def _tenant_id(tenant_id=None):
+        if tenant_id:
+            return tenant_id
+        if has_request_context():
+            return session.get('tenant_id') or 'global'
+        return 'global'
+
+    @staticmethod
+    def _alan_kontrol(alan):
+        if alan not in ALANLAR:
+            raise ValueError(f"Tanımsız cache alanı: {alan}")
+
+    @classmethod
+    def generation(cls, alan, tenant_id=None):
+        """Alanın güncel sürümü (LOCAL_TTL boyunca process içinde hatırlanır)"""
+        tenant_id = cls._tenant_id(tenant_id)
+        now = time.monotonic()
+        kontrol = cls._gen_checked.get((tenant_id, alan))
+        if kontrol and kontrol[0] > now:
+            return kontrol[1]
+        try:
+            gen = cache.get(f"tc_gen:{tenant_id}:{alan}") or 0
+        except Exception as e:
+            logger.debug(f"Cache sürümü okunamadı ({alan}): {e}")
+            gen = 0
+        cls._gen_checked[(tenant_id, alan)] = (now + cls.LOCAL_TTL, gen)
+        return gen
+
+    @classmethod
+    def key(cls, alan, anahtar, tenant_id=None):
+        cls._alan_kontrol(alan)
+        tenant_id = cls._tenant_id(tenant_id)
+        return f"tc:{tenant_id}:{alan}:{cls.generation(alan, tenant_id)}:{anahtar}"
+
+    @classmethod
+    def invalidate(cls, alan, tenant_id=None):
+        """
+        Tenant'ın bir veri alanındaki TÜM anahtarlarını geçersiz kılar.
+        Diğer tenant'lar ve diğer alanlar etkilenmez.
+        """
+        cls._alan_kontrol(alan)
+        tenant_id = cls._tenant_id(tenant_id)
+        key = f"tc_gen:{tenant_id}:{alan}"
+        try:
+            cache.set(key, (cache.get(key) or 0) + 1, timeout=0)
+        except Exception as e:
+            logger.error(f"❌ Cache invalidation hatası ({alan}): {e}")
+        with cls._lock:
+            cls._gen_checked.pop((tenant_id, alan), None)
+        cls._say(alan, 'invalidate')
+        logger.debug(f"🗑️ Cache alanı geçersiz kılındı: {tenant_id}/{alan}")
+
+    # ========================================
+    # 📦 OKUMA / YAZMA
+    # ========================================
+
+    @classmethod
+    def get(cls, alan, anahtar, tenant_id=None):
+        """Taze değer (yoksa veya bayatsa None)"""
+        zarf = cls._oku(cls.key(alan, anahtar, tenant_id))
+        if zarf is not None and zarf[0] > time.time():
+            cls._say(alan, 'hit')
+            return zarf[1]
+        cls._say(alan, 'miss')
+        return None
+
+    @classmethod
+    def set(cls, alan, anahtar, deger, timeout=300, stale=None, tenant_id=None):
+        cls._yaz(cls.key(alan, anahtar, tenant_id), deger, timeout, stale)
+
+    @classmethod
+    def delete(cls, alan, anahtar, tenant_id=None):
+        try:
+            cache.delete(cls.key(alan, anahtar, tenant_id))
+        except Exception as e:
+            logger.debug(f"Cache silinemedi ({alan}): {e}")
+
+    @classmethod
+    def get_or_set(cls, alan, anahtar, uretici, timeout=300, stale=None, tenant_id=None):
+        """
+        Değeri cache'ten getirir; yoksa / bayatsa tek bir istek uretici()'yi çalıştırır.
+
+        Args:
+            alan (str): Veri alanı ('stok', 'cari' ...)
+            anahtar (str): Alan içindeki anahtar
+            uretici (callable): Değeri hesaplayan fonksiyon
+            timeout (int): Taze kalma süresi (sn)
+            stale (int): Bayat değerin sunulabileceği ek süre (sn), None → STALE_TTL
+        """
+        key = cls.key(alan, anahtar, tenant_id)
+        zarf = cls._oku(key)
+
+        if zarf is not None and zarf[0] > time.time():
+            cls._say(alan, 'hit')
+            return zarf[1]
+
+        if zarf is not None:
+            # Bayat: yenilemeyi tek bir istek yapar, diğerleri beklemeden bayat değeri alır
+            if not cls._kilit_al(key):
+                cls._say(alan, 'stale')
+                return zarf[1]
+            cls._say(alan, 'yenileme')
+            return cls._hesapla(key, uretici, timeout, stale)
+
+        cls._say(alan, 'miss')
+        if cls._kilit_al(key):
+            return cls._hesapla(key, uretici, timeout, stale)
+
+        # Başka bir istek hesaplıyor → sonucunu bekle
+        bitis = time.monotonic() + cls.BEKLEME_SURESI
+        while time.monotonic() < bitis:
+            time.sleep(cls.BEKLEME_ARALIGI)
+            zarf = cls._oku(key)
+            if zarf is not None:
+                cls._say(alan, 'bekleme')
+                return zarf[1]
+
+        cls._say(alan, 'bekleme_zaman_asimi')
+        return cls._hesapla(key, uretici, timeout, stale, kilitli=False)
+
+    @classmethod
+    def cached(cls, alan, timeout=300, stale=None, key_prefix=None):
+        """
+        Fonksiyon sonucu için dekoratör (cache.cached / cache.memoize yerine).
+
+        Anahtar: key_prefix (yoksa modül.fonksiyon) + basit tipteki argümanların özeti.
+        tenant_db gibi nesne argümanları anahtara girmez.
+
+        Kullanım:
+            @staticmethod
+            @TenantCache.cached('stok', timeout=3600)
+            def olu_stok_analizi(firma_id, tenant_db=None): ...
+        """
+        cls._alan_kontrol(alan)
+
+        def decorator(f):
+            onek = key_prefix or f"{f.__module__}.{f.__qualname__}"
+
+            def _anahtar(args, kwargs):
+                parcalar = [repr(a) for a in args if isinstance(a, _ANAHTAR_TIPLERI)]
+                parcalar += [f"{k}={v!r}" for k, v in sorted(kwargs.items()) if isinstance(v, _ANAHTAR_TIPLERI)]
+                return f"{onek}:{hashlib.md5('|'.join(parcalar).encode()).hexdigest()[:16]}"
+
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                return cls.get_or_set(alan, _anahtar(args, kwargs), lambda: f(*args, **kwargs),
+                                      timeout=timeout, stale=stale)
+
+            # cache.delete_memoized karşılığı: fonksiyon.delete(aynı argümanlar)
+            wrapper.delete = lambda *args, **kwargs: cls.delete(alan, _anahtar(args, kwargs))
+            return wrapper
+        return decorator
+
+    # ========================================
+    # 📊 METRİKLER
+    # ========================================
+
+    @classmethod
+    def istatistikler(cls):
+        """Process içi alan bazlı hit/miss sayaçları ve hit oranı"""
+        sonuc = {}
+        for alan, sayaclar in list(cls._metrikler.items()):
+            sayaclar = dict(sayaclar)
+            okuma = sayaclar.get('hit', 0) + sayaclar.get('stale', 0) + sayaclar.get('miss', 0) + sayaclar.get('yenileme', 0)
+            sayaclar['hit_orani'] = round((sayaclar.get('hit', 0) + sayaclar.get('stale', 0)) / okuma, 4) if okuma else None
+            sonuc[alan] = sayaclar
+        return sonuc
+
+    @classmethod
+    def istatistik_sifirla(cls):
+        cls._metrikler.clear()
+
+    # ========================================
+    # 🔧 YARDIMCILAR
+    # ========================================
+
+    @classmethod
+    def _say(cls, alan, olay):
+        cls._metrikler[alan][olay] += 1
+
+    @staticmethod
+    def _oku(key):
+        """(taze_bitis_epoch, deger) zarfı veya None"""
+        try:
+            zarf = cache.get(key)
+        except Exception as e:
+            logger.debug(f"Cache okunamadı: {e}")
+            return None
+        return zarf if isinstance(zarf, tuple) and len(zarf) == 2 else None
+
+    @classmethod
+    def _yaz(cls, key, deger, timeout, stale):
+        stale = cls.STALE_TTL if stale is None else stale
+        try:
+            cache.set(key, (time.time() + timeout, deger), timeout=timeout + stale)
+        except Exception as e:
+            logger.debug(f"Cache'e yazılamadı: {e}")
+
+    @classmethod
+    def _kilit_al(cls, key):
+        try:
+            return bool(cache.add(f"{key}:kilit", 1, timeout=cls.KILIT_TTL))
+        except Exception:
+            # Backend kilidi desteklemiyorsa herkes kendi hesaplar
+            return True
+
+    @classmethod
+    def _hesapla(cls, key, uretici, timeout, stale, kilitli=True):
+        try:
+            deger = uretici()
+            cls._yaz(key, deger, timeout, stale)
+            return deger
+        finally:
+            if kilitli:
+                try:
+                    cache.delete(f"{key}:kilit")
+                except Exception:
+                    pass
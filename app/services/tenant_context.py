@@ -0,0 +1,349 @@
+# app/services/tenant_context.py
+"""
+Tenant Context Resolver
+Request yolundaki tenant / rol / lisans kontrollerini tek seferde çözer
+
+Eskiden her @tenant_route isteğinde:
+    1. UserTenantRole sorgusu       (validate_tenant_session)
+    2. Tenant aktif mi sorgusu      (validate_tenant_session)
+    3. Tenant tekrar yükleniyor     (get_tenant_db)
+    4. INFORMATION_SCHEMA kontrolü  (check_database_exists)
+    5. License sorgusu              (LicenseClient.check_license)
+master DB'ye gidiyordu.
+
+Artık bu bilgiler iki katmanlı kısa TTL'li cache'te tutulur:
+    - Process içi (dict, birkaç saniye)  → Redis'e bile gitmez
+    - Paylaşılan cache (Redis/FileSystem) → tüm worker'lar ortak
+
+Geçersiz kılma (invalidation):
+    Tenant, UserTenantRole veya License değiştiğinde (ORM event'leri, commit
+    sonrası) tenant'ın "generation" sayacı artırılır. Paylaşılan cache anahtarları
+    generation içerdiği için eski kayıtlar anında devre dışı kalır. Diğer
+    worker'ların process içi kopyaları en geç LOCAL_TTL saniye içinde düşer.
+
+    ⚠️ Toplu query.update() / query.delete() ve ham SQL ORM event'lerini
+    tetiklemez. Bu yollarla Tenant / UserTenantRole / License değiştiren kod,
+    commit'ten sonra TenantContextResolver.invalidate(tenant_id) çağırmalıdır;
+    aksi halde eski paket SHARED_TTL dolana kadar kullanılır.
+"""
+
+import json
+import logging
+import threading
+import time
+
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from app.extensions import db, cache
+
+logger = logging.getLogger(__name__)
+
+
+class _LocalTTLCache:
+    """Process içi, thread-safe, boyut sınırlı TTL cache"""
+
+    def __init__(self, max_items=5000):
+        self._data = {}
+        self._lock = threading.Lock()
+        self.max_items = max_items
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            with self._lock:
+                self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            if len(self._data) >= self.max_items:
+                self._purge()
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _purge(self):
+        now = time.monotonic()
+        expired = [k for k, (exp, _) in self._data.items() if exp < now]
+        for k in expired:
+            del self._data[k]
+        # Hâlâ doluysa en eski yarısını at
+        if len(self._data) >= self.max_items:
+            for k in list(self._data)[: self.max_items // 2]:
+                del self._data[k]
+
+
+class TenantContextResolver:
+    """
+    ✅ TENANT CONTEXT RESOLVER
+
+    Kullanım:
+        ctx = TenantContextResolver.resolve(tenant_id, user_id)
+        if ctx and ctx['role'] and ctx['tenant']['is_active']:
+            ...
+
+    Dönen paket:
+        {
+            'tenant': {'id', 'kod', 'unvan', 'is_active', 'db_name', 'vergi_no', 'vergi_dairesi'},
+            'db_name': str | None,
+            'db_exists': bool,
+            'license': {'valid': bool, 'reason': str, 'data': {...}},
+            'aktif_moduller': [str],
+            'role': str | None      # user_id verilmişse
+        }
+    """
+
+    # Paylaşılan cache (Redis) TTL
+    SHARED_TTL = 60
+    # Process içi cache TTL (diğer worker'lardaki invalidation gecikmesi üst sınırı)
+    LOCAL_TTL = 5
+
+    DEFAULT_MODULES = ['stok', 'cari', 'fatura', 'siparis', 'kasa', 'banka']
+
+    _local = _LocalTTLCache()
+
+    # ========================================
+    # 🔍 ÇÖZÜMLEME
+    # ========================================
+
+    @classmethod
+    def resolve(cls, tenant_id, user_id=None):
+        """
+        Tenant (+ opsiyonel kullanıcı rolü) paketini döner.
+
+        Args:
+            tenant_id (str): Tenant UUID
+            user_id (str): Kullanıcı UUID (rol için, opsiyonel)
+
+        Returns:
+            dict | None: Tenant bulunamazsa None
+        """
+        if not tenant_id:
+            return None
+
+        # 0. Aynı request içinde tekrar çağrılırsa g'den dön
+        memo_key = f"{tenant_id}:{user_id}"
+        memo = cls._request_memo()
+        if memo is not None and memo_key in memo:
+            return memo[memo_key]
+
+        tenant_ctx = cls._get_tenant_bundle(tenant_id)
+        if tenant_ctx is None:
+            result = None
+        else:
+            result = dict(tenant_ctx)
+            result['role'] = cls._get_role(tenant_id, user_id) if user_id else None
+
+        if memo is not None:
+            memo[memo_key] = result
+        return result
+
+    @classmethod
+    def get_role(cls, tenant_id, user_id):
+        """Kullanıcının tenant'taki aktif rolü (yoksa None)"""
+        return cls._get_role(tenant_id, user_id)
+
+    @classmethod
+    def _get_tenant_bundle(cls, tenant_id):
+        gen = cls._generation(tenant_id)
+        key = f"tenant_ctx:{tenant_id}:{gen}"
+
+        value = cls._local.get(key)
+        if value is not None:
+            return value or None
+
+        value = cache.get(key)
+        if value is None:
+            value = cls._load_tenant_bundle(tenant_id) or {}
+            cache.set(key, value, timeout=cls.SHARED_TTL)
+
+        cls._local.set(key, value, cls.LOCAL_TTL)
+        # Boş dict = "tenant yok" (negatif cache)
+        return value or None
+
+    @classmethod
+    def _get_role(cls, tenant_id, user_id):
+        gen = cls._generation(tenant_id)
+        key = f"tenant_role:{tenant_id}:{gen}:{user_id}"
+
+        value = cls._local.get(key)
+        if value is not None:
+            return value or None
+
+        value = cache.get(key)
+        if value is None:
+            value = cls._load_role(tenant_id, user_id) or ''
+            cache.set(key, value, timeout=cls.SHARED_TTL)
+
+        cls._local.set(key, value, cls.LOCAL_TTL)
+        return value or None
+
+    # ========================================
+    # 🗄️ MASTER DB YÜKLEME
+    # ========================================
+
+    @classmethod
+    def _load_tenant_bundle(cls, tenant_id):
+        from flask import current_app
+        from app.models.master import Tenant
+        from app.extensions import check_database_exists
+
+        tenant = db.session.get(Tenant, tenant_id)
+        if not tenant:
+            return None
+
+        # db_name yoksa get_tenant_db ile aynı fallback (prefix + kod)
+        db_name = tenant.db_name
+        if not db_name and tenant.kod:
+            prefix = current_app.config.get('TENANT_DB_PREFIX', 'erp_tenant_')
+            db_name = f"{prefix}{tenant.kod.lower()}"
+        license_info = cls._load_license(tenant_id)
+
+        moduller = []
+        if license_info.get('valid'):
+            moduller = license_info.get('data', {}).get('modules') or []
+
+        return {
+            'tenant': {
+                'id': tenant.id,
+                'kod': tenant.kod,
+                'unvan': tenant.unvan,
+                'is_active': bool(tenant.is_active),
+                'db_name': db_name,
+                'vergi_no': tenant.vergi_no,
+                'vergi_dairesi': tenant.vergi_dairesi,
+            },
+            'db_name': db_name,
+            'db_exists': check_database_exists(db_name) if db_name else False,
+            'license': license_info,
+            'aktif_moduller': moduller or list(cls.DEFAULT_MODULES),
+        }
+
+    @staticmethod
+    def _load_role(tenant_id, user_id):
+        from app.models.master import UserTenantRole
+
+        role = db.session.query(UserTenantRole.role).filter_by(
+            user_id=user_id,
+            tenant_id=tenant_id,
+            is_active=True
+        ).first()
+        return role[0] if role else None
+
+    @staticmethod
+    def _load_license(tenant_id):
+        from app.services.license_client import LicenseClient
+        from app.models.master import License
+
+        result = LicenseClient().check_license(tenant_id)
+        if result.get('valid'):
+            # Modül listesi (JSON string) pakete eklenir
+            row = db.session.query(License.enabled_modules).filter_by(
+                tenant_id=tenant_id, is_active=True
+            ).first()
+            try:
+                modules = json.loads(row[0]) if row and row[0] else []
+            except (TypeError, ValueError):
+                modules = []
+            result['data']['modules'] = modules
+        return result
+
+    # ========================================
+    # ♻️ INVALIDATION
+    # ========================================
+
+    @staticmethod
+    def _generation(tenant_id):
+        return cache.get(f"tenant_ctx_gen:{tenant_id}") or 0
+
+    @classmethod
+    def invalidate(cls, tenant_id):
+        """
+        Tenant'a ait tüm context paketlerini (tüm kullanıcı rolleri dahil) geçersiz kıl.
+
+        Tenant, rol veya lisans değiştiğinde çağrılır. ORM üzerinden yapılan
+        değişikliklerde otomatik tetiklenir (bkz. register_invalidation_listeners).
+        """
+        if not tenant_id:
+            return
+        key = f"tenant_ctx_gen:{tenant_id}"
+        try:
+            cache.set(key, (cache.get(key) or 0) + 1, timeout=0)
+        except Exception as e:
+            logger.error(f"❌ Tenant context invalidation hatası: {e}")
+        cls._local.delete_prefix(f"tenant_ctx:{tenant_id}:")
+        cls._local.delete_prefix(f"tenant_role:{tenant_id}:")
+
+        memo = cls._request_memo()
+        if memo is not None:
+            memo.clear()
+
+        logger.debug(f"🗑️ Tenant context geçersiz kılındı: {tenant_id}")
+
+    @staticmethod
+    def _request_memo():
+        if not has_request_context():
+            return None
+        if not hasattr(g, '_tenant_ctx_memo'):
+            g._tenant_ctx_memo = {}
+        return g._tenant_ctx_memo
+
+
+# ========================================
+# 🔔 ORM EVENT HOOK'LARI
+# ========================================
+
+_listeners_registered = False
+
+
+def _mark_dirty_tenant(target):
+    """Değişen kaydın tenant_id'sini session'a not et (commit sonrası invalidation)"""
+    session = object_session(target)
+    tenant_id = getattr(target, 'tenant_id', None) or getattr(target, 'id', None)
+    if session is None or not tenant_id:
+        TenantContextResolver.invalidate(tenant_id)
+        return
+    session.info.setdefault('_tenant_ctx_dirty', set()).add(tenant_id)
+
+
+def register_invalidation_listeners():
+    """
+    Tenant / UserTenantRole / License değişikliklerinde cache'i otomatik temizle.
+
+    init_extensions() tarafından bir kez çağrılır.
+    """
+    global _listeners_registered
+    if _listeners_registered:
+        return
+
+    from sqlalchemy.orm import Session
+    from app.models.master import Tenant, UserTenantRole, License
+
+    for model in (Tenant, UserTenantRole, License):
+        for evt in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, evt, lambda mapper, connection, target: _mark_dirty_tenant(target))
+
+    @event.listens_for(Session, 'after_commit')
+    def _flush_tenant_invalidations(session):
+        dirty = session.info.pop('_tenant_ctx_dirty', None)
+        for tenant_id in dirty or ():
+            TenantContextResolver.invalidate(tenant_id)
+
+    @event.listens_for(Session, 'after_rollback')
+    def _drop_tenant_invalidations(session):
+        session.info.pop('_tenant_ctx_dirty', None)
+
+    _listeners_registered = True
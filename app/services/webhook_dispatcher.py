@@ -0,0 +1,374 @@
+# app/services/webhook_dispatcher.py
+"""
+Giden Webhook Dağıtıcısı (Outbox + sınırlı worker havuzu)
+
+Akış:
+    0. init_app() → dağıtıcı açılışta başlar (yeniden başlatma öncesinden kalan kayıtlar da gider)
+    1. enqueue()  → olay webhook_outbox tablosuna ayrı bir session'da yazılır (kalıcı),
+                    dağıtıcı uyandırılır; çağıranın transaction'ına dokunulmaz
+    2. bir_tur()  → zamanı gelen kayıtlar talep edilir (kilit), uç (webhook_path) bazında
+                    gruplanır ve sabit boyutlu ThreadPoolExecutor'a verilir
+    3. Sonuç      → gonderildi | bekliyor (üstel geri çekilme ile tekrar) | olu (dead-letter)
+
+Sınırlar:
+    - Process başına en fazla WEBHOOK_WORKER_SAYISI eşzamanlı istek (thread patlaması yok)
+    - Uç başına en fazla 'limit' eşzamanlı istek (WEBHOOK_UC_AYARLARI)
+    - Alıcı toplu kabul ediyorsa ('batch' > 1) olaylar {'events': [...]} olarak tek istekte gider
+    - Şerit başına talep, KILIT_TTL içinde bitecek kadar parçayla sınırlıdır (fazlası kuyruğa döner)
+"""
+
+import logging
+import os
+import random
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from flask import current_app, has_request_context, session
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.master.webhook_outbox import WebhookOutbox
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookDispatcher:
+    """Outbox tablosundaki webhook olaylarını sınırlı eşzamanlılıkla gönderir"""
+
+    # Uç başına varsayılan eşzamanlı istek sınırı
+    VARSAYILAN_LIMIT = 2
+    # Bir turda talep edilen en fazla kayıt
+    TALEP_BOYUTU = 200
+    # Boşta iken outbox'ın yoklanma aralığı (sn)
+    POLL_INTERVAL = 5
+    # 'isleniyor' kalmış kayıtların (çöken worker) geri alınma süresi (sn)
+    KILIT_TTL = 300
+    # Tekrar deneme: taban * 2^deneme (üst sınırlı, ±%20 jitter); MAX_DENEME sonra dead-letter
+    MAX_DENEME = 8
+    GERI_CEKILME_TABAN = 10
+    GERI_CEKILME_UST = 3600
+    ISTEK_TIMEOUT = 10
+    # Şerit başına bir turda gönderilecek en fazla parça: her istek en kötü ihtimalle
+    # bağlantı + okuma timeout'u (2 × ISTEK_TIMEOUT) sürer, şerit KILIT_TTL içinde bitmeli
+    SERIT_PARCA_LIMITI = max(1, KILIT_TTL // (2 * ISTEK_TIMEOUT))
+
+    _executor = None
+    _executor_pid = None
+    _thread = None
+    _thread_pid = None
+    _uyandir = threading.Event()
+    _lock = threading.Lock()
+    _yerel = threading.local()
+
+    # ========================================
+    # 📥 KUYRUĞA ALMA
+    # ========================================
+
+    @classmethod
+    def enqueue(cls, webhook_path, payload=None, method='POST', tenant_id=None):
+        """
+        Webhook olayını outbox'a yazar (commit eder) ve dağıtıcıyı uyandırır.
+
+        Returns:
+            str: Outbox kayıt ID'si
+        """
+        return cls.enqueue_many([(webhook_path, payload)], method=method, tenant_id=tenant_id)[0]
+
+    @classmethod
+    def enqueue_many(cls, olaylar, method='POST', tenant_id=None):
+        """
+        Toplu kuyruğa alma (örn: toplu fatura onayı) - tek commit.
+
+        Kayıtlar ayrı bir session'da yazılır: istek ortasında çağıranın
+        db.session'ındaki bekleyen değişiklikler commit edilmez.
+
+        Args:
+            olaylar (list): [(webhook_path, payload), ...]
+        """
+        if tenant_id is None and has_request_context():
+            tenant_id = session.get('tenant_id')
+
+        kayitlar = [
+            WebhookOutbox(tenant_id=tenant_id, webhook_path=path.strip('/'), method=method.upper(),
+                          payload=payload or {}, sonraki_deneme=datetime.now())
+            for path, payload in olaylar
+        ]
+        with Session(db.engine, expire_on_commit=False) as outbox_session:
+            outbox_session.add_all(kayitlar)
+            outbox_session.commit()
+
+        cls.baslat()
+        cls._uyandir.set()
+        return [k.id for k in kayitlar]
+
+    # ========================================
+    # 🔁 DAĞITIM
+    # ========================================
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        Dağıtıcıyı açılışta başlatır; böylece yeniden başlatma öncesinden kalan
+        'bekliyor' / geri çekilmedeki kayıtlar yeni bir enqueue beklemeden gönderilir.
+        fork sonrası (gunicorn preload) ilk istekte çocuk process'te yeniden başlatılır.
+        """
+        if not app.config.get('WEBHOOK_OTOMATIK_BASLAT', True):
+            return
+        cls.baslat(app)
+
+        @app.before_request
+        def _webhook_dagiticisi_kontrol():
+            if cls._thread_pid != os.getpid():
+                cls.baslat(app)
+
+    @classmethod
+    def baslat(cls, app=None):
+        """Process başına tek dağıtıcı thread'i başlatır (WEBHOOK_OTOMATIK_BASLAT False ise başlatmaz)"""
+        app = app or current_app._get_current_object()
+        if not app.config.get('WEBHOOK_OTOMATIK_BASLAT', True):
+            return
+        with cls._lock:
+            # fork sonrası (gunicorn/celery) thread çocuk process'e geçmez
+            if cls._thread is not None and cls._thread.is_alive() and cls._thread_pid == os.getpid():
+                return
+            cls._thread = threading.Thread(target=cls._dongu, args=(app,), name='webhook-dispatcher', daemon=True)
+            cls._thread_pid = os.getpid()
+            cls._thread.start()
+            logger.info("🔗 Webhook dağıtıcısı başlatıldı")
+
+    @classmethod
+    def _dongu(cls, app):
+        while True:
+            islenen = 0
+            with app.app_context():
+                try:
+                    islenen = cls.bir_tur()
+                except Exception as e:
+                    logger.error(f"❌ Webhook dağıtım turu hatası: {e}")
+                finally:
+                    db.session.remove()
+            if not islenen:
+                cls._uyandir.wait(cls.POLL_INTERVAL)
+                cls._uyandir.clear()
+
+    @classmethod
+    def bir_tur(cls):
+        """
+        Zamanı gelen kayıtları talep edip gönderir, sonuçları outbox'a yazar.
+
+        Returns:
+            int: İşlenen kayıt sayısı
+        """
+        kayitlar = cls._talep_et()
+        if not kayitlar:
+            return 0
+
+        ayarlar = current_app.config.get('WEBHOOK_UC_AYARLARI') or {}
+        gruplar = defaultdict(list)
+        for kayit in kayitlar:
+            gruplar[(kayit.webhook_path, kayit.method)].append(kayit)
+
+        # Uç başına 'limit' şerit: her şerit parçalarını sırayla gönderir → uçta en fazla
+        # 'limit' eşzamanlı istek; toplam eşzamanlılık executor boyutuyla sınırlı
+        from app.services.n8n_client import N8NClient
+
+        executor = cls._havuz()
+        futures = []
+        birakilan = []
+        for (path, method), liste in gruplar.items():
+            ayar = ayarlar.get(path, {})
+            batch = max(1, int(ayar.get('batch', 1))) if method == 'POST' else 1
+            limit = max(1, int(ayar.get('limit', cls.VARSAYILAN_LIMIT)))
+            url, headers = N8NClient.hedef(path)
+
+            parcalar = [liste[i:i + batch] for i in range(0, len(liste), batch)]
+            # Şeritler KILIT_TTL dolmadan bitmeli; fazlası bir sonraki tura kalır
+            azami = limit * cls.SERIT_PARCA_LIMITI
+            for parca in parcalar[azami:]:
+                birakilan.extend(k.id for k in parca)
+            parcalar = parcalar[:azami]
+            for serit in range(min(limit, len(parcalar))):
+                futures.append(executor.submit(
+                    cls._serit_gonder, url, method, headers, parcalar[serit::limit], batch > 1
+                ))
+
+        if birakilan:
+            cls._birak(birakilan)
+
+        sonuclar = []
+        for future in futures:
+            sonuclar.extend(future.result())
+        cls._sonuclari_yaz(sonuclar)
+        return len(kayitlar) - len(birakilan)
+
+    @classmethod
+    def _havuz(cls):
+        with cls._lock:
+            if cls._executor is None or cls._executor_pid != os.getpid():
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=int(current_app.config.get('WEBHOOK_WORKER_SAYISI', 4)),
+                    thread_name_prefix='webhook'
+                )
+                cls._executor_pid = os.getpid()
+        return cls._executor
+
+    @classmethod
+    def _talep_et(cls):
+        t = WebhookOutbox.__table__
+        now = datetime.now()
+        try:
+            # Çöken worker'ın yarım kalan talepleri
+            db.session.execute(
+                t.update().where(
+                    t.c.durum == 'isleniyor', t.c.kilit_zamani < now - timedelta(seconds=cls.KILIT_TTL)
+                ).values(durum='bekliyor', kilit=None)
+            )
+            ids = db.session.execute(
+                select(t.c.id).where(t.c.durum == 'bekliyor', t.c.sonraki_deneme <= now)
+                .order_by(t.c.created_at).limit(cls.TALEP_BOYUTU)
+            ).scalars().all()
+            if not ids:
+                db.session.commit()
+                return []
+
+            # durum koşulu: aynı kaydı başka process aynı anda talep ettiyse onda kalır
+            kilit = str(uuid.uuid4())
+            db.session.execute(
+                t.update().where(t.c.id.in_(ids), t.c.durum == 'bekliyor')
+                .values(durum='isleniyor', kilit=kilit, kilit_zamani=now)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return db.session.execute(
+            select(t.c.id, t.c.webhook_path, t.c.method, t.c.payload, t.c.deneme_sayisi)
+            .where(t.c.kilit == kilit).order_by(t.c.created_at)
+        ).all()
+
+    @classmethod
+    def _birak(cls, ids):
+        """Talep edilip bu turda gönderilmeyecek kayıtları kuyruğa geri verir"""
+        t = WebhookOutbox.__table__
+        try:
+            db.session.execute(
+                t.update().where(t.c.id.in_(ids), t.c.durum == 'isleniyor')
+                .values(durum='bekliyor', kilit=None, kilit_zamani=None)
+            )
+            db.session.commit()
+        except Exception as e:
+            # Bırakılamayan kayıtlar KILIT_TTL sonra zaten geri alınır
+            db.session.rollback()
+            logger.error(f"❌ Webhook talepleri bırakılamadı: {e}")
+        else:
+            cls._uyandir.set()
+
+    @classmethod
+    def _serit_gonder(cls, url, method, headers, parcalar, toplu):
+        """Worker thread: parçaları sırayla gönderir. DB'ye dokunmaz, sonuç listesi döner."""
+        sonuclar = []
+        for parca in parcalar:
+            hata, kalici = cls._gonder(url, method, headers, [k.payload for k in parca], toplu)
+            sonuclar.extend((k, hata, kalici) for k in parca)
+        return sonuclar
+
+    @classmethod
+    def _gonder(cls, url, method, headers, payloadlar, toplu):
+        oturum = getattr(cls._yerel, 'oturum', None)
+        if oturum is None:
+            oturum = cls._yerel.oturum = requests.Session()
+        try:
+            if method == 'GET':
+                yanit = oturum.get(url, params=payloadlar[0], headers=headers, timeout=cls.ISTEK_TIMEOUT)
+            else:
+                govde = {'events': payloadlar} if toplu else payloadlar[0]
+                yanit = oturum.request(method, url, json=govde, headers=headers, timeout=cls.ISTEK_TIMEOUT)
+        except requests.RequestException as e:
+            return f"Bağlantı hatası: {e}", False
+
+        if yanit.status_code < 300:
+            return None, False
+        # 4xx (408/429 hariç) tekrar denemekle düzelmez → doğrudan dead-letter
+        kalici = 400 <= yanit.status_code < 500 and yanit.status_code not in (408, 429)
+        return f"HTTP {yanit.status_code}: {yanit.text[:500]}", kalici
+
+    @classmethod
+    def _sonuclari_yaz(cls, sonuclar):
+        t = WebhookOutbox.__table__
+        now = datetime.now()
+        basarili = [k.id for k, hata, _ in sonuclar if hata is None]
+        hatali = []
+        for kayit, hata, kalici in sonuclar:
+            if hata is None:
+                continue
+            deneme = kayit.deneme_sayisi + 1
+            olu = kalici or deneme >= cls.MAX_DENEME
+            bekleme = min(cls.GERI_CEKILME_TABAN * 2 ** (deneme - 1), cls.GERI_CEKILME_UST)
+            hatali.append({
+                'b_id': kayit.id,
+                'b_durum': 'olu' if olu else 'bekliyor',
+                'b_deneme': deneme,
+                'b_sonraki': now + timedelta(seconds=bekleme * random.uniform(0.8, 1.2)),
+                'b_hata': hata,
+            })
+            if olu:
+                logger.error(f"☠️ Webhook dead-letter: {kayit.webhook_path} ({deneme}. deneme) - {hata}")
+            else:
+                logger.warning(f"⚠️ Webhook tekrar denenecek: {kayit.webhook_path} ({deneme}. deneme) - {hata}")
+
+        try:
+            if basarili:
+                db.session.execute(
+                    t.update().where(t.c.id.in_(basarili))
+                    .values(durum='gonderildi', gonderildi_at=now, kilit=None, son_hata=None)
+                )
+            if hatali:
+                db.session.execute(
+                    t.update().where(t.c.id == bindparam('b_id')).values(
+                        durum=bindparam('b_durum'), deneme_sayisi=bindparam('b_deneme'),
+                        sonraki_deneme=bindparam('b_sonraki'), son_hata=bindparam('b_hata'), kilit=None
+                    ),
+                    hatali,
+                )
+            db.session.commit()
+        except Exception as e:
+            # Kayıtlar 'isleniyor' kalır, KILIT_TTL sonra tekrar denenir
+            db.session.rollback()
+            logger.error(f"❌ Webhook sonuçları yazılamadı: {e}")
+
+    # ========================================
+    # ☠️ DEAD-LETTER YÖNETİMİ
+    # ========================================
+
+    @staticmethod
+    def durum_ozeti():
+        """{'bekliyor': n, 'isleniyor': n, 'gonderildi': n, 'olu': n}"""
+        t = WebhookOutbox.__table__
+        satirlar = db.session.execute(
+            select(t.c.durum, db.func.count()).group_by(t.c.durum)
+        ).all()
+        return {durum: sayi for durum, sayi in satirlar}
+
+    @staticmethod
+    def olu_mektuplar(limit=50):
+        return WebhookOutbox.query.filter_by(durum='olu').order_by(WebhookOutbox.created_at.desc()).limit(limit).all()
+
+    @classmethod
+    def yeniden_dene(cls, ids=None):
+        """Dead-letter kayıtlarını (veya verilen ID'leri) sıfırlayıp kuyruğa geri alır"""
+        t = WebhookOutbox.__table__
+        sorgu = t.update().where(t.c.durum == 'olu')
+        if ids:
+            sorgu = sorgu.where(t.c.id.in_(ids))
+        sonuc = db.session.execute(
+            sorgu.values(durum='bekliyor', deneme_sayisi=0, sonraki_deneme=datetime.now(), kilit=None)
+        )
+        db.session.commit()
+        cls._uyandir.set()
+        return sonuc.rowcount
@@ -0,0 +1,78 @@
+# app/services/webhook_stub.py
+"""
+Testler ve yerel geliştirme için sahte webhook alıcısı (n8n yerine).
+
+Kullanım:
+    with YerelWebhookAlicisi(durumlar=[500, 200]) as alici:
+        app.config['N8N_WEBHOOK_URL'] = alici.url
+        ...
+        alici.istekler  → [{'yol', 'method', 'govde'}, ...]
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class YerelWebhookAlicisi:
+    """localhost'ta rastgele portta çalışan, gelen istekleri kaydeden HTTP sunucusu"""
+
+    def __init__(self, durumlar=None, gecikme=0.0):
+        """
+        Args:
+            durumlar (list): Sırayla dönülecek HTTP kodları (bitince 200)
+            gecikme (float): Her isteği yanıtlamadan önce bekleme (eşzamanlılık testleri için)
+        """
+        self.istekler = []
+        self.durumlar = deque(durumlar or [])
+        self.gecikme = gecikme
+        self.eszamanli = 0
+        self.max_eszamanli = 0
+        self._lock = threading.Lock()
+        self._sunucu = None
+        self.url = None
+
+    def __enter__(self):
+        alici = self
+
+        class _Isleyici(BaseHTTPRequestHandler):
+            def _isle(self):
+                with alici._lock:
+                    alici.eszamanli += 1
+                    alici.max_eszamanli = max(alici.max_eszamanli, alici.eszamanli)
+                    durum = alici.durumlar.popleft() if alici.durumlar else 200
+                try:
+                    uzunluk = int(self.headers.get('Content-Length') or 0)
+                    ham = self.rfile.read(uzunluk) if uzunluk else b''
+                    if alici.gecikme:
+                        time.sleep(alici.gecikme)
+                    with alici._lock:
+                        alici.istekler.append({
+                            'yol': self.path,
+                            'method': self.command,
+                            'govde': json.loads(ham) if ham else None,
+                            'durum': durum,
+                        })
+                    self.send_response(durum)
+                    self.send_header('Content-Type', 'application/json')
+                    self.end_headers()
+                    self.wfile.write(b'{}')
+                finally:
+                    with alici._lock:
+                        alici.eszamanli -= 1
+
+            do_POST = do_GET = do_PUT = _isle
+
+            def log_message(self, *args):
+                pass
+
+        self._sunucu = ThreadingHTTPServer(('127.0.0.1', 0), _Isleyici)
+        self.url = f"http://127.0.0.1:{self._sunucu.server_address[1]}"
+        threading.Thread(target=self._sunucu.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._sunucu.shutdown()
+        self._sunucu.server_close()
@@ -358,6 +358,7 @@
                 var params = new URLSearchParams(window.location.search);
                 
                 params.set('page', 1); // Yeni bir arama yapıldığında her zaman 1. sayfaya dön
+                params.delete('after'); params.delete('before'); // Keyset cursor'ları da sıfırla
                 
                 if (val) {
                     params.set('q', val); // URL'e q=VESTEL ekle
@@ -376,6 +377,7 @@
             if (e.type === 'keyup' && e.key !== 'Enter') return;
             var params = new URLSearchParams(window.location.search);
             params.set('page', 1);
+            params.delete('after'); params.delete('before');
             $('.dx-column-filter').each(function() {
                 var val = $(this).val().trim();
                 val ? params.set($(this).data('field'), val) : params.delete($(this).data('field'));
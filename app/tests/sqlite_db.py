@@ -0,0 +1,52 @@
+# tests/sqlite_db.py
+"""
+Tenant modeli testleri için ortak SQLite yardımcıları
+
+MySQL'e özgü kolon tipleri (ENUM, LONGTEXT) SQLite'ta karşılıklarıyla derlenir;
+sqlite_session() sadece verilen modellerin tablolarını bellek içi veritabanında kurar.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.mysql import ENUM, LONGTEXT
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.modules.cari.models import CariHareket, CariHesap, CariRiskOzeti
+from app.modules.cek.models import CekSenet
+
+# Cari hareket flush'ında risk özeti listener'ları çek ve özet tablolarını da okur
+CARI_TABLOLARI = (CariHesap, CariHareket, CekSenet, CariRiskOzeti)
+
+
+@compiles(ENUM, 'sqlite')
+def _enum_sqlite(type_, compiler, **kw):
+    return 'VARCHAR(50)'
+
+
+@compiles(LONGTEXT, 'sqlite')
+def _longtext_sqlite(type_, compiler, **kw):
+    return 'TEXT'
+
+
+@contextmanager
+def sqlite_session(*modeller, ddl=()):
+    """
+    Bellek içi SQLite'ta tabloları kurup Session açar.
+
+    Args:
+        modeller: Tablosu oluşturulacak modeller (sırayla)
+        ddl: Model yerine elle kurulan tablolar için ham CREATE komutları
+    """
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        for komut in ddl:
+            conn.exec_driver_sql(komut)
+    for model in modeller:
+        model.__table__.create(engine)
+    try:
+        with Session(engine) as s:
+            yield s
+    finally:
+        engine.dispose()
@@ -0,0 +1,97 @@
+# tests/test_ai_client.py
+"""
+Tembel AI istemcisi (model keşfi önbelleği) ve açılış profili testleri
+"""
+import sys
+import types
+
+import pytest
+
+from app.services.ai_client import AIIstemcisi
+from app.services.startup_profiler import BaslangicProfili, import_zamanlari
+
+
+def _sahte_genai(modeller, hata=None):
+    cagrilar = []
+
+    def list_models(**kwargs):
+        cagrilar.append(kwargs)
+        if hata:
+            raise hata
+        return [types.SimpleNamespace(name=ad, supported_generation_methods=['generateContent']) for ad in modeller]
+
+    return types.SimpleNamespace(list_models=list_models), cagrilar
+
+
+def _hazirla(monkeypatch, genai):
+    monkeypatch.setenv('GEMINI_API_KEY', 'test')
+    monkeypatch.delenv('GEMINI_MODEL', raising=False)
+    monkeypatch.setattr(AIIstemcisi, 'kutuphane_var', staticmethod(lambda: True))
+    monkeypatch.setattr(AIIstemcisi, '_genai', genai)
+    monkeypatch.setattr(AIIstemcisi, '_model', None)
+    # Paylaşımlı cache başka testlerden kalan değeri döndürmesin
+    monkeypatch.setattr(AIIstemcisi, '_cache_oku', classmethod(lambda cls: None))
+
+
+def test_model_kesfi_bir_kez_yapilir_ve_tercih_sirasina_uyar(monkeypatch):
+    genai, cagrilar = _sahte_genai(['models/gemini-1.0-pro', 'models/gemini-1.5-pro'])
+    _hazirla(monkeypatch, genai)
+
+    assert AIIstemcisi.aktif_model() == 'models/gemini-1.5-pro'
+    assert AIIstemcisi.aktif_model() == 'models/gemini-1.5-pro'
+    assert len(cagrilar) == 1
+    assert cagrilar[0]['request_options']['timeout'] == AIIstemcisi.KESIF_ZAMAN_ASIMI
+
+
+def test_ag_yoksa_varsayilan_model_ve_sabit_model(monkeypatch):
+    genai, cagrilar = _sahte_genai([], hata=ConnectionError('ağ yok'))
+    _hazirla(monkeypatch, genai)
+
+    assert AIIstemcisi.aktif_model() == AIIstemcisi.VARSAYILAN_MODEL
+    AIIstemcisi.aktif_model()
+    assert len(cagrilar) == 1  # HATA_TTL boyunca tekrar denenmez
+
+    monkeypatch.setattr(AIIstemcisi, '_model', None)
+    monkeypatch.setenv('GEMINI_MODEL', 'models/ozel')
+    assert AIIstemcisi.aktif_model() == 'models/ozel'
+    assert len(cagrilar) == 1
+
+    monkeypatch.delenv('GEMINI_API_KEY')
+    monkeypatch.delenv('GEMINI_MODEL')
+    assert AIIstemcisi.aktif_model() is None
+
+
+def test_baslangic_profili_ve_import_zamanlari():
+    profil = BaslangicProfili(aktif=True)
+    with profil.olc('json_modulu', grup='blueprint'):
+        sys.modules.pop('json.tool', None)
+        __import__('json.tool')
+    satir = profil.ozet('blueprint')[0]
+    assert satir['ad'] == 'json_modulu' and satir['yeni_modul'] >= 1
+
+    pasif = BaslangicProfili()
+    with pasif.olc('x'):
+        pass
+    assert pasif.ozet() == []
+
+    sonuc = import_zamanlari(hedef='email.mime.text', limit=500)
+    assert sonuc['toplam_ms'] > 0
+    assert any(s['modul'] == 'email.mime.text' for s in sonuc['en_yavas_kumulatif'])
+
+
+def test_ocr_servisi_ilk_kullanimda_kurulur(monkeypatch):
+    pytest.importorskip('PIL')
+    from app.modules.ai_destek import ocr_service as modul
+
+    modeller = []
+    genai = types.SimpleNamespace(GenerativeModel=lambda model_name: modeller.append(model_name) or model_name)
+    _hazirla(monkeypatch, genai)
+    monkeypatch.setattr(modul, '_ocr_service', None)
+
+    servis = modul.get_ocr_service()
+    assert servis.is_active and modeller == []  # model import/oluşturma anında kurulmaz
+    assert modul.get_ocr_service() is servis
+
+    assert servis.vision_model == modul.FaturaOCRService.VISION_MODEL
+    servis.vision_model
+    assert modeller == [modul.FaturaOCRService.VISION_MODEL]
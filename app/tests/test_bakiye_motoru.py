@@ -0,0 +1,115 @@
+# tests/test_bakiye_motoru.py
+"""
+Bakiye delta motoru (muhasebe hesapları / kasa / banka) testleri
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.enums import BankaIslemTuru
+from app.modules.banka.models import BankaHesap
+from app.modules.banka_hareket.models import BankaHareket
+from app.modules.kasa_hareket.models import KasaHareket
+from app.modules.muhasebe import bakiye
+from app.modules.muhasebe.bakiye import BakiyeMotoru, MUHASEBE, KASA, BANKA
+from app.modules.muhasebe.models import HesapPlani, MuhasebeFisi, MuhasebeFisiDetay, BakiyeOzeti
+from app.tests.sqlite_db import sqlite_session
+
+
+@pytest.fixture
+def db_session():
+    with sqlite_session(HesapPlani, MuhasebeFisi, MuhasebeFisiDetay, BakiyeOzeti,
+                        KasaHareket, BankaHareket, BankaHesap) as s:
+        s.add_all([
+            HesapPlani(id='100', firma_id='F1', kod='100', ad='Kasa', borc_bakiye=0, alacak_bakiye=0),
+            HesapPlani(id='100.01', firma_id='F1', kod='100.01', ad='Merkez Kasa', ust_hesap_id='100',
+                       borc_bakiye=0, alacak_bakiye=0),
+            HesapPlani(id='600', firma_id='F1', kod='600', ad='Satışlar', borc_bakiye=0, alacak_bakiye=0),
+        ])
+        s.commit()
+        yield s
+
+
+def _fis(session, fis_id, tarih, tutar):
+    fis = MuhasebeFisi(id=fis_id, firma_id='F1', donem_id='D1', sube_id='S1', fis_no=fis_id, tarih=tarih)
+    session.add(fis)
+    session.flush()
+    session.add_all([
+        MuhasebeFisiDetay(fis_id=fis_id, hesap_id='100.01', borc=Decimal(tutar), alacak=Decimal('0')),
+        MuhasebeFisiDetay(fis_id=fis_id, hesap_id='600', borc=Decimal('0'), alacak=Decimal(tutar)),
+    ])
+    session.flush()
+    BakiyeMotoru.fis_uygula(session, fis)
+    return fis
+
+
+def test_fis_deltalari_ust_hesaplara_ve_aylik_ozete_yansir(db_session):
+    _fis(db_session, 'F-1', date(2025, 1, 15), '100')
+    ikinci = _fis(db_session, 'F-2', date(2025, 2, 3), '40')
+
+    for hesap_id, borc, alacak in (('100', 140, 0), ('100.01', 140, 0), ('600', 0, 140)):
+        hesap = db_session.get(HesapPlani, hesap_id)
+        db_session.refresh(hesap)
+        assert (hesap.borc_bakiye, hesap.alacak_bakiye) == (Decimal(borc), Decimal(alacak))
+
+    # Geçmiş bakiye: ocak özeti + şubat kısmi ay
+    assert BakiyeMotoru.bakiye(MUHASEBE, '100', date(2025, 1, 31), tenant_db=db_session)[0] == Decimal('100')
+    assert BakiyeMotoru.bakiye(MUHASEBE, '100', date(2025, 2, 2), tenant_db=db_session)[0] == Decimal('100')
+    assert BakiyeMotoru.bakiye(MUHASEBE, '100', date(2025, 2, 3), tenant_db=db_session)[0] == Decimal('140')
+
+    # Fiş satırlarını silme: önce geri al
+    BakiyeMotoru.fis_uygula(db_session, ikinci, isaret=-1)
+    db_session.query(MuhasebeFisiDetay).filter_by(fis_id='F-2').delete()
+    db_session.flush()
+
+    assert BakiyeMotoru.dogrula('F1', hesap_turleri=(MUHASEBE,), tenant_db=db_session) == []
+
+
+def test_dogrulama_farki_bulur_ve_yeniden_olusturur(db_session):
+    _fis(db_session, 'F-1', date(2025, 1, 15), '100')
+    # Delta motoru atlanarak eklenmiş satır (eski veri / elle müdahale)
+    db_session.add(MuhasebeFisiDetay(fis_id='F-1', hesap_id='600', borc=Decimal('5'), alacak=Decimal('0')))
+    db_session.flush()
+
+    farklar = BakiyeMotoru.dogrula('F1', hesap_turleri=(MUHASEBE,), tenant_db=db_session)
+    assert {(f['hesap_id'], f['donem']) for f in farklar} == {('600', '202501'), ('600', '*')}
+
+    BakiyeMotoru.yeniden_olustur('F1', hesap_turleri=(MUHASEBE,), tenant_db=db_session)
+    assert BakiyeMotoru.dogrula('F1', hesap_turleri=(MUHASEBE,), tenant_db=db_session) == []
+
+
+def test_kasa_banka_hareketleri_delta_ile_islenir(db_session):
+    db_session.add(BankaHesap(id='B1', firma_id='F1', sube_id='S1', kod='B1', ad='Banka', banka_adi='Banka', bakiye=0))
+    db_session.flush()
+
+    giris = KasaHareket(firma_id='F1', kasa_id='K1', islem_turu=BankaIslemTuru.TAHSILAT,
+                        tarih=date(2025, 3, 1), tutar=Decimal('500'), onaylandi=True)
+    cikis = KasaHareket(firma_id='F1', kasa_id='K1', islem_turu=BankaIslemTuru.TEDIYE,
+                        tarih=date(2025, 3, 5), tutar=Decimal('120'), onaylandi=True)
+    onaysiz = KasaHareket(firma_id='F1', kasa_id='K1', islem_turu=BankaIslemTuru.TAHSILAT,
+                          tarih=date(2025, 3, 5), tutar=Decimal('999'), onaylandi=False)
+    banka = BankaHareket(firma_id='F1', donem_id='D1', banka_id='B1', islem_turu=BankaIslemTuru.TAHSILAT,
+                         tarih=date(2025, 3, 2), tutar=Decimal('300'))
+    db_session.add_all([giris, cikis, onaysiz, banka])
+    db_session.flush()
+
+    assert BakiyeMotoru.bakiye(KASA, 'K1', date(2025, 3, 31), tenant_db=db_session) == (Decimal('500'), Decimal('120'))
+
+    # Güncelleme: eski katkı geri alınır, yenisi eklenir
+    cikis.tutar = Decimal('200')
+    banka.tarih = date(2025, 4, 1)
+    db_session.delete(giris)
+    db_session.flush()
+
+    assert BakiyeMotoru.bakiye(KASA, 'K1', date(2025, 3, 31), tenant_db=db_session) == (Decimal('0'), Decimal('200'))
+    db_session.refresh(db_session.get(BankaHesap, 'B1'))
+    assert db_session.get(BankaHesap, 'B1').bakiye == Decimal('300')
+    assert BakiyeMotoru.dogrula('F1', hesap_turleri=(KASA, BANKA), tenant_db=db_session) == []
+
+    # Rollback bekleyen deltaları temizler
+    db_session.add(KasaHareket(firma_id='F1', kasa_id='K1', islem_turu=BankaIslemTuru.TAHSILAT,
+                               tarih=date(2025, 3, 9), tutar=Decimal('1'), onaylandi=True))
+    db_session.rollback()
+    assert bakiye._DELTA_KEY not in db_session.info
@@ -0,0 +1,85 @@
+# tests/test_banka_eslestirme.py
+"""
+Banka ekstresi eşleştirme motoru (kural otomatı + cari ters indeksi) testleri
+"""
+import io
+from types import SimpleNamespace
+
+import pandas as pd
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.modules.banka_import.benchmark import calistir
+from app.modules.banka_import.engine import BankaImportEngine
+from app.modules.banka_import.matcher import AnahtarKelimeOtomati, CariEslestirmeIndeksi
+from app.modules.banka_import.models import BankaImportKurali
+
+
+def _motor(kurallar=()):
+    index = CariEslestirmeIndeksi.indeks_olustur(
+        [
+            ('C1', 'Koçtaş Yapı Market A.Ş.', '1111111111', None),
+            ('C2', 'Ahmet Yılmaz', None, '22222222222'),
+            ('C3', 'Ahmet Yılmaz Mobilya Ltd. Şti.', None, None),
+        ],
+        [('C3', 'FAST TR33 0006 1005 1978 6457 8413 26 GELEN')],
+    )
+    kurallar = [BankaImportKurali(anahtar_kelime=k, hedef_turu='muhasebe', kural_tipi='standart') for k in kurallar]
+    return BankaImportEngine('F1', kurallar=kurallar, cari_indeksi=index)
+
+
+def test_otomat_ilk_tanimli_kurali_bulur():
+    otomat = AnahtarKelimeOtomati(['POS SATIS', 'SATIS', 'HE', 'SHE', 'HERS'])
+    assert otomat.ilk_eslesen('USHERS') == 2
+    assert otomat.ilk_eslesen('XPOS SATIS') == 0
+    assert otomat.ilk_eslesen('NAKIT SATISI') == 1
+    assert otomat.ilk_eslesen('HAVALE') is None
+
+
+def test_eslestirme_sirasi_skor_ve_gerekce():
+    motor = _motor(kurallar=['KIRA', 'YILMAZ'])
+
+    kural = motor.akilli_eslestirme('Ahmet Yılmaz kira ödemesi', 100)
+    assert (kural['kaynak'], kural['kural_anahtar'], kural['skor']) == ('kural', 'KIRA', 1.0)
+
+    motor = _motor()
+    vkn = motor.akilli_eslestirme('HAVALE 22222222222 ODEME', 100)
+    assert (vkn['kaynak'], vkn['target_id']) == ('vkn_eslesmesi', 'C2')
+
+    iban = motor.akilli_eslestirme('EFT TR330006100519786457841326', 100)
+    assert (iban['kaynak'], iban['target_id']) == ('iban_eslesmesi', 'C3')
+
+    # Eşit skorda (1.0) listede önce gelen cari; gerekçede ortak kelimeler
+    isim = motor.akilli_eslestirme('FAST AHMET YILMAZ', 100)
+    assert (isim['kaynak'], isim['target_id'], isim['skor']) == ('isim_eslesmesi', 'C2', 1.0)
+    assert 'AHMET' in isim['gerekce']
+
+    # Tek kelime eşleşmesi 3 kelimelik unvan için eşiğin altında
+    assert motor.akilli_eslestirme('KOCTAS', 100)['bulundu'] is False
+
+
+def test_excel_vektorel_normalizasyon():
+    df = pd.DataFrame({
+        'Tarih': ['05.01.2025 10:22', pd.Timestamp('2025-01-06'), None, 'bozuk'],
+        'Açıklama': ['Koçtaş Yapı Market ödeme', 'Ahmet Yılmaz', 'x', 'y'],
+        'Tutar': ['-1.250,50', 300, 5, 7],
+    })
+    tampon = io.BytesIO()
+    df.to_excel(tampon, index=False)
+    tampon.seek(0)
+    tampon.filename = 'ekstre.xlsx'
+
+    sablon = SimpleNamespace(baslangic_satiri=1, col_tarih='Tarih', col_aciklama='Açıklama', col_belge_no=None,
+                             tutar_yapis_tipi='tek', col_tutar='Tutar', col_borc=None, col_alacak=None,
+                             tarih_formati='%d.%m.%Y')
+    satirlar = _motor().excel_oku_ve_isle(tampon, sablon)
+
+    assert [(s['tarih'], s['tutar'], s['yon']) for s in satirlar] == [
+        ('2025-01-05', 1250.5, 'cikis'), ('2025-01-06', 300.0, 'giris')
+    ]
+    assert satirlar[0]['oneri']['target_id'] == 'C1'
+
+
+def test_benchmark_eski_algoritma_ile_ayni_sonuc():
+    sonuc = calistir(cari_sayisi=2000, satir_sayisi=300, kural_sayisi=20, eski_ornek=300)
+    assert sonuc['fark'] == 0
+    assert sonuc['bulunan'] > 0
@@ -0,0 +1,87 @@
+# tests/test_cari_ekstre.py
+"""
+Pencereli cari ekstre motoru testleri (devir, SQL window bakiye, keyset sayfalama)
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.modules.cari.ekstre import CariEkstreMotoru
+from app.modules.cari.models import CariHareket, CariHesap
+from app.tests.sqlite_db import CARI_TABLOLARI, sqlite_session
+
+
+@pytest.fixture
+def tenant_db():
+    with sqlite_session(*CARI_TABLOLARI) as s:
+        # 2023: +1000, 2024: 12 ay × (+300 / -100), başka cari gürültü
+        kayitlar = [dict(tarih=date(2023, 6, 1), borc=1000, alacak=0)]
+        for ay in range(1, 13):
+            kayitlar.append(dict(tarih=date(2024, ay, 10), borc=300, alacak=0))
+            kayitlar.append(dict(tarih=date(2024, ay, 10), borc=0, alacak=100))
+        s.add_all([
+            CariHareket(firma_id='F1', donem_id='D1', cari_id='C1', islem_turu='FATURA',
+                        belge_no=f'B{i}', **k) for i, k in enumerate(kayitlar)
+        ])
+        s.add(CariHareket(firma_id='F1', donem_id='D1', cari_id='C2', islem_turu='FATURA',
+                          tarih=date(2024, 1, 1), borc=5000, alacak=0))
+        s.commit()
+        yield s
+
+
+def test_devir_toplamlar_ve_sql_yuruyen_bakiye(tenant_db):
+    motor = CariEkstreMotoru('C1', '2024-01-01', '31.03.2024', tenant_db=tenant_db)
+    assert motor.devir() == Decimal('1000')
+
+    toplam = motor.toplamlar()
+    assert (toplam['borc'], toplam['alacak'], toplam['adet']) == (Decimal('900'), Decimal('300'), 6)
+    assert toplam['kapanis'] == Decimal('1600')
+
+    satirlar = list(motor.satirlar(chunk_size=2))
+    assert [s['bakiye'] for s in satirlar][-1] == toplam['kapanis']
+    assert all(s['yuruyen_bakiye'] == s['bakiye'] for s in satirlar)
+
+    sayfalar = motor.baski_sayfalari(satir_sayisi=4)
+    assert [len(s['hareketler']) for s in sayfalar] == [4, 2]
+    assert sayfalar[1]['devreden_bakiye'] == sayfalar[0]['hareketler'][-1]['bakiye']
+    assert sayfalar[-1]['son_sayfa_mi'] is True
+
+    assert CariEkstreMotoru('C1', tenant_db=tenant_db).toplamlar()['kapanis'] == Decimal('3400')
+
+
+def test_keyset_sayfalari_tam_pencere_ile_ayni_bakiye(tenant_db):
+    motor = CariEkstreMotoru('C1', '2024-01-01', '2024-12-31', tenant_db=tenant_db)
+    beklenen = [(s['id'], s['bakiye']) for s in motor.satirlar()]
+
+    toplanan, after = [], None
+    while True:
+        sayfa = motor.sayfa(after=after, per_page=5)
+        toplanan += [(s['id'], s['bakiye']) for s in sayfa['items']]
+        if not sayfa['has_next']:
+            break
+        after = sayfa['next_cursor']
+    assert toplanan == beklenen
+
+    # Yeniden eskiye (B2B görünümü) ve geri sayfa
+    ilk = motor.sayfa(per_page=5, direction='desc')
+    assert [s['id'] for s in ilk['items']] == [i for i, _ in reversed(beklenen[-5:])]
+    assert ilk['items'][0]['bakiye'] == Decimal('3400')
+    ikinci = motor.sayfa(after=ilk['next_cursor'], per_page=5, direction='desc')
+    geri = motor.sayfa(before=ikinci['prev_cursor'], per_page=5, direction='desc')
+    assert [(s['id'], s['bakiye']) for s in geri['items']] == [(s['id'], s['bakiye']) for s in ilk['items']]
+
+
+def test_export_kaynagi_baska_firmanin_carisini_vermez(tenant_db):
+    from werkzeug.exceptions import NotFound
+    from app.modules.rapor.export_sources import cari_ekstre_export
+
+    tenant_db.add(CariHesap(id='C1', firma_id='F1', kod='C001', unvan='Test Cari'))
+    tenant_db.commit()
+
+    params = {'cari_id': 'C1', 'baslangic': '2024-01-01', 'bitis': '2024-12-31'}
+    query, _ = cari_ekstre_export(tenant_db, dict(params, firma_id='F1'))
+    assert query.count() == 24
+    with pytest.raises(NotFound):
+        cari_ekstre_export(tenant_db, dict(params, firma_id='F2'))
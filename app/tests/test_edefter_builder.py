@@ -0,0 +1,84 @@
+# tests/test_edefter_builder.py
+"""
+Streaming e-Defter (Yevmiye XBRL) yazıcısı testleri
+"""
+import hashlib
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from lxml import etree
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.modules.firmalar.models import Firma
+from app.modules.muhasebe.models import HesapPlani, MuhasebeFisi, MuhasebeFisiDetay
+from app.modules.rapor.xml_builder import EDefterBuilder
+from app.tests.sqlite_db import sqlite_session
+
+GL_COR = "http://www.xbrl.org/int/gl/cor/2006-10-25"
+
+
+@pytest.fixture
+def db_session():
+    with sqlite_session(Firma, HesapPlani, MuhasebeFisi, MuhasebeFisiDetay) as s:
+        s.add(Firma(id='F1', kod='01', unvan='Test A.Ş.', vergi_no='1234567890'))
+        s.add_all([
+            HesapPlani(id='100', firma_id='F1', kod='100', ad='Kasa'),
+            HesapPlani(id='600', firma_id='F1', kod='600', ad='Satışlar'),
+        ])
+        for i in range(1, 21):
+            fis_id = f'FIS-{i:02d}'
+            s.add(MuhasebeFisi(id=fis_id, firma_id='F1', donem_id='D1', sube_id='S1', fis_no=fis_id,
+                               tarih=date(2025, 1, min(i, 28)), yevmiye_madde_no=i, aciklama=f'Satış {i}',
+                               resmi_defter_basildi=(i != 20)))
+            s.add_all([
+                MuhasebeFisiDetay(id=f'{fis_id}-1', fis_id=fis_id, hesap_id='100', borc=Decimal(i), alacak=0,
+                                  belge_no=f'A{i}', belge_turu='invoice', belge_tarihi=date(2025, 1, 1)),
+                MuhasebeFisiDetay(id=f'{fis_id}-2', fis_id=fis_id, hesap_id='600', borc=0, alacak=Decimal(i)),
+            ])
+        s.commit()
+        yield s
+
+
+def _builder(session, **kw):
+    return EDefterBuilder('F1', None, date(2025, 1, 1), date(2025, 1, 31), tenant_db=session, chunk_size=3, **kw)
+
+
+def test_tek_parca_kesinlesmis_fisleri_yazar(db_session):
+    xml = _builder(db_session).yevmiye_xml_olustur()
+    root = etree.fromstring(xml)
+
+    numaralar = [e.text for e in root.iter(f'{{{GL_COR}}}entryNumber')]
+    assert numaralar == [str(i) for i in range(1, 20)]  # kilitlenmemiş fiş (20) dahil değil
+    assert len(list(root.iter(f'{{{GL_COR}}}entryDetail'))) == 38
+    # Namespace tanımları kökte; fiş elemanlarında tekrarlanmaz
+    assert xml.count(b'xmlns:gl-cor=') == 1
+
+
+def test_boyut_sinirinda_fis_bolmeden_parcalar(db_session, tmp_path):
+    tek = _builder(db_session).yevmiye_dosyalari_yaz(str(tmp_path / 'tek'))[0]
+    parcalar = _builder(db_session, max_parca_boyutu=tek['boyut'] // 3).yevmiye_dosyalari_yaz(str(tmp_path / 'cok'))
+
+    assert len(parcalar) >= 3
+    assert [p['dosya_adi'] for p in parcalar][:2] == ['1234567890-202501-Y-000001.xml',
+                                                     '1234567890-202501-Y-000002.xml']
+
+    toplam = []
+    for p in parcalar:
+        data = open(p['yol'], 'rb').read()
+        assert p['boyut'] == len(data) <= tek['boyut'] // 3
+        assert p['sha256'] == hashlib.sha256(data).hexdigest()
+        # Her parça kendi başına geçerli XML, başlık bilgisi dahil
+        root = etree.fromstring(data)
+        assert root.find('.//{*}organizationIdentifier').text == '1234567890'
+        madde = [int(e.text) for e in root.iter(f'{{{GL_COR}}}entryNumber')]
+        assert (madde[0], madde[-1]) == (p['ilk_madde'], p['son_madde'])
+        toplam += madde
+
+    assert toplam == list(range(1, 20))
+
+
+def test_fis_yoksa_hata_verir(db_session):
+    builder = EDefterBuilder('F1', None, date(2024, 1, 1), date(2024, 1, 31), tenant_db=db_session)
+    with pytest.raises(Exception, match='kesinleşmiş'):
+        builder.yevmiye_xml_olustur()
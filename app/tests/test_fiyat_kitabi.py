@@ -0,0 +1,101 @@
+# tests/test_fiyat_kitabi.py
+"""
+Derlenmiş fiyat kitabı (FiyatKitabi) testleri
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.modules.fiyat.models import FiyatListesi, FiyatListesiDetay
+from app.modules.fiyat.pricebook import FiyatKitabi
+from app.modules.stok.models import StokKDVGrubu
+from app.tests.sqlite_db import sqlite_session
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    # stok_kartlari MySQL'e özgü tipler içerdiğinden sadece derlemenin okuduğu kolonlar
+    ddl = [
+        'CREATE TABLE stok_kartlari (id CHAR(36) PRIMARY KEY, satis_fiyati NUMERIC, alis_fiyati NUMERIC, '
+        'doviz_turu VARCHAR(3), birim VARCHAR(20), aktif BOOLEAN, kdv_kod_id CHAR(36), deleted_at DATETIME)'
+    ]
+    with sqlite_session(StokKDVGrubu, FiyatListesi, FiyatListesiDetay, ddl=ddl) as s:
+        s.add(StokKDVGrubu(id='KDV10', firma_id='F1', kod='K10', ad='%10', alis_kdv_orani=10, satis_kdv_orani=10))
+        s.flush()
+        s.execute(FiyatListesi.__table__.insert(), [
+            dict(id='GENEL', firma_id='F1', kod='GENEL', ad='Genel', aktif=True, varsayilan=True, oncelik=0),
+            dict(id='TOPTAN', firma_id='F1', kod='toptanci', ad='Toptancı', aktif=True, varsayilan=False, oncelik=5),
+        ])
+        s.execute(FiyatListesi.__table__.insert(), dict(
+            id='ESKI', firma_id='F1', kod='ESKI', ad='Eski', aktif=True, varsayilan=True, oncelik=9,
+            bitis_tarihi=date(2020, 1, 1)
+        ))
+        s.execute(FiyatListesiDetay.__table__.insert(), [
+            dict(id='d1', fiyat_listesi_id='GENEL', stok_id='K1', fiyat=90, doviz='TL', min_miktar=0, iskonto_orani=0),
+            dict(id='d2', fiyat_listesi_id='TOPTAN', stok_id='K1', fiyat=80, doviz='TL', min_miktar=0, iskonto_orani=0),
+            dict(id='d3', fiyat_listesi_id='TOPTAN', stok_id='K1', fiyat=70, doviz='TL', min_miktar=10, iskonto_orani=0),
+            dict(id='d4', fiyat_listesi_id='GENEL', stok_id='K2', fiyat=0, doviz='TL', min_miktar=0, iskonto_orani=10),
+            dict(id='d5', fiyat_listesi_id='ESKI', stok_id='K1', fiyat=1, doviz='TL', min_miktar=0, iskonto_orani=0),
+            dict(id='d6', fiyat_listesi_id='GENEL', stok_id='K3', fiyat=2, doviz='USD', min_miktar=0, iskonto_orani=0),
+        ])
+        s.connection().exec_driver_sql(
+            "INSERT INTO stok_kartlari (id, satis_fiyati, alis_fiyati, doviz_turu, birim, aktif, kdv_kod_id) VALUES "
+            "('K1', 100, 60, 'TL', 'ADET', 1, 'KDV10'), ('K2', 50, 30, 'TL', 'KG', 1, NULL), "
+            "('K3', 10, 5, 'TL', 'ADET', 1, NULL)"
+        )
+        s.commit()
+
+        index = FiyatKitabi.derle(s)
+        monkeypatch.setattr(FiyatKitabi, '_index', classmethod(lambda cls, tenant_id=None: index))
+        monkeypatch.setattr(FiyatKitabi, '_kur', classmethod(lambda cls, doviz: Decimal('30') if doviz == 'USD' else Decimal('1')))
+        yield s
+
+
+def test_liste_onceligi_barem_ve_gecerlilik(db_session):
+    # Liste seçilmediyse baz fiyat + stok KDV grubu
+    k1 = FiyatKitabi.fiyatla('K1')
+    assert (k1['fiyat'], k1['kdv_orani'], k1['kaynak']) == (Decimal('100'), 10, 'Stok Kartı (TL)')
+    assert FiyatKitabi.fiyatla('K1', fatura_turu='ALIS')['fiyat'] == Decimal('60')
+
+    # Süresi dolmuş (yüksek öncelikli) liste atlanır, varsayılan liste uygulanır
+    assert FiyatKitabi.fiyatla('K1', varsayilan_liste=True)['fiyat'] == Decimal('90')
+
+    # Müşteri grubu listesi (kod eşleşmesi, büyük/küçük harf duyarsız) varsayılanın önüne geçer; barem miktara göre
+    grup = dict(musteri_grubu='TOPTANCI', varsayilan_liste=True)
+    assert FiyatKitabi.fiyatla('K1', miktar=Decimal('5'), **grup)['fiyat'] == Decimal('80')
+    assert FiyatKitabi.fiyatla('K1', miktar=Decimal('12'), **grup)['fiyat'] == Decimal('70')
+
+    # Açık seçilen liste her şeyin önünde
+    assert FiyatKitabi.fiyatla('K1', liste_id='GENEL', **grup)['fiyat'] == Decimal('90')
+
+
+def test_iskonto_doviz_ve_toplu_fiyatlama(db_session):
+    sepet = FiyatKitabi.toplu_fiyatla(
+        [('K2', 1), ('K3', 1), ('YOK', 1)], varsayilan_liste=True, para_birimi='TL', kur=Decimal('1')
+    )
+    assert set(sepet) == {'K2', 'K3'}
+
+    # Fiyatı 0 olan liste satırı: baz fiyat korunur, iskonto uygulanır
+    assert (sepet['K2']['fiyat'], sepet['K2']['net_fiyat']) == (Decimal('50'), Decimal('45'))
+    assert sepet['K2']['birim'] == 'KG'
+
+    # Listedeki döviz fiyatı TL üzerinden fatura dövizine çevrilir
+    assert sepet['K3']['fiyat'] == Decimal('60')
+    usd = FiyatKitabi.fiyatla('K3', varsayilan_liste=True, para_birimi='EUR', kur=Decimal('32'))
+    assert usd['fiyat'] == Decimal('1.8750')
+
+
+def test_commit_sonrasi_surum_artar(db_session, monkeypatch):
+    cagrilar = []
+    monkeypatch.setattr(FiyatKitabi, 'invalidate', classmethod(lambda cls, tenant_id=None: cagrilar.append(1)))
+
+    detay = db_session.get(FiyatListesiDetay, 'd1')
+    detay.fiyat = Decimal('95')
+    db_session.commit()
+    assert cagrilar == [1]
+
+    # Fiyatı etkilemeyen commit geçersiz kılma yapmaz
+    db_session.commit()
+    assert cagrilar == [1]
@@ -0,0 +1,108 @@
+# tests/test_keyset_pagination.py
+"""
+Keyset (seek) pagination ve üst sınırlı sayım testleri
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, Column, Integer, Date, String
+from sqlalchemy.orm import declarative_base, Session
+
+from app.form_builder.keyset import (
+    encode_cursor, decode_cursor, keyset_page, capped_count, format_count
+)
+
+Base = declarative_base()
+
+
+class Hareket(Base):
+    __tablename__ = 'hareket'
+    id = Column(Integer, primary_key=True)
+    tarih = Column(Date, index=True)
+    aciklama = Column(String(50))
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        bugun = date(2025, 1, 1)
+        # Aynı tarihte birden fazla kayıt: PK ile kesin sıralama gerekir
+        s.add_all([Hareket(id=i, tarih=bugun + timedelta(days=i // 3), aciklama=f'H{i}') for i in range(1, 51)])
+        s.commit()
+        yield s
+
+
+def test_cursor_tip_korunur():
+    cursor = encode_cursor(date(2025, 3, 1), 'abc-uuid')
+    assert decode_cursor(cursor) == (date(2025, 3, 1), 'abc-uuid')
+    assert decode_cursor(encode_cursor(Decimal('1.50'), 7)) == (Decimal('1.50'), 7)
+    assert decode_cursor('bozuk!!') is None
+
+
+def test_ileri_geri_sayfalar_tutarli(db_session):
+    q = db_session.query(Hareket)
+    tum = [h.id for h in q.order_by(Hareket.tarih.desc(), Hareket.id.desc())]
+
+    gorulen, after = [], None
+    sayfalar = []
+    while True:
+        page = keyset_page(q, Hareket.tarih, Hareket.id, 'desc', after=after, per_page=7)
+        ids = [h.id for h in page['items']]
+        sayfalar.append((ids, page))
+        gorulen.extend(ids)
+        if not page['has_next']:
+            break
+        after = page['next_cursor']
+
+    assert gorulen == tum
+    assert sayfalar[0][1]['has_prev'] is False
+
+    # Son sayfadan bir önceki sayfaya geri dön
+    son_ids, son_page = sayfalar[-1]
+    geri = keyset_page(q, Hareket.tarih, Hareket.id, 'desc', before=son_page['prev_cursor'], per_page=7)
+    assert [h.id for h in geri['items']] == sayfalar[-2][0]
+    assert geri['has_next'] is True
+
+
+@pytest.mark.parametrize('yon', ['asc', 'desc'])
+def test_null_siralama_degerleri_atlanmaz(db_session, yon):
+    # NULL tarihli kayıtlar: artanda sonda, azalanda başta
+    db_session.add_all([Hareket(id=i, tarih=None, aciklama=f'N{i}') for i in range(51, 61)])
+    db_session.commit()
+    q = db_session.query(Hareket)
+
+    gorulen, sayfalar, after = [], [], None
+    while True:
+        page = keyset_page(q, Hareket.tarih, Hareket.id, yon, after=after, per_page=7)
+        sayfalar.append(page)
+        gorulen.extend(h.id for h in page['items'])
+        if not page['has_next']:
+            break
+        after = page['next_cursor']
+
+    assert sorted(gorulen) == list(range(1, 61)) and len(gorulen) == 60
+    nulllar = [i for i in gorulen if i > 50]
+    assert (gorulen[-10:] if yon == 'asc' else gorulen[:10]) == nulllar
+
+    # NULL grubundaki / sınırındaki sayfadan geri gelmek aynı sayfayı verir
+    for onceki, sonraki in zip(sayfalar, sayfalar[1:]):
+        geri = keyset_page(q, Hareket.tarih, Hareket.id, yon, before=sonraki['prev_cursor'], per_page=7)
+        assert [h.id for h in geri['items']] == [h.id for h in onceki['items']]
+
+
+def test_ust_sinirli_sayim(db_session):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    from app.extensions import cache
+    cache.init_app(app)
+
+    with app.app_context():
+        q = db_session.query(Hareket)
+        assert capped_count(q, cap=10) == (10, True)
+        assert capped_count(q.filter(Hareket.id <= 5), cap=10) == (5, False)
+
+    assert format_count(10000, True) == '10.000+'
@@ -0,0 +1,81 @@
+# tests/test_lookup_registry.py
+"""
+Form seçenek kaynakları (LookupRegistry) testleri
+"""
+import app.models  # noqa: F401  (model kayıtları)
+
+import pytest
+from flask import Flask
+
+from app.extensions import cache, db
+from app.form_builder.lookup import AramaIndeksi, LookupRegistry
+from app.modules.lokasyon.models import Sehir
+from app.services.tenant_cache import TenantCache
+
+
+@pytest.fixture
+def flask_app():
+    flask_app = Flask(__name__)
+    flask_app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://', CACHE_TYPE='SimpleCache')
+    db.init_app(flask_app)
+    cache.init_app(flask_app)
+    TenantCache._gen_checked.clear()
+    with flask_app.app_context():
+        cache.clear()
+        Sehir.__table__.create(db.engine)
+        yield flask_app
+
+
+def test_cache_ve_model_degisince_invalidation(flask_app):
+    db.session.add_all([Sehir(kod='35', ad='İzmir'), Sehir(kod='06', ad='Ankara')])
+    db.session.commit()
+
+    ilk = LookupRegistry.satirlar('sehir', tenant_db=db.session, firma_id='F1')
+    assert [s[1] for s in ilk] == ['06 - Ankara', '35 - İzmir']
+
+    # Cache'ten gelir: doğrudan SQL ile eklenen kayıt görünmez
+    db.session.execute(Sehir.__table__.insert().values(id='x', kod='01', ad='Adana'))
+    assert len(LookupRegistry.satirlar('sehir', tenant_db=db.session, firma_id='F1')) == 2
+
+    # ORM üzerinden değişiklik commit edilince liste yenilenir
+    db.session.add(Sehir(kod='34', ad='İstanbul'))
+    db.session.commit()
+    TenantCache._gen_checked.clear()
+    assert len(LookupRegistry.satirlar('sehir', tenant_db=db.session, firma_id='F1')) == 4
+
+
+def test_buyuk_liste_ajax_aramaya_gecer(flask_app, monkeypatch):
+    db.session.add_all([Sehir(kod=f'{i:02d}', ad=f'Şehir {i}') for i in range(1, 12)])
+    db.session.add(Sehir(kod='81', ad='Düzce'))
+    db.session.commit()
+    secili = db.session.query(Sehir.id).filter_by(kod='81').scalar()
+
+    ayar = LookupRegistry.alan_ayarlari('sehir', tenant_db=db.session, firma_id='F1')
+    assert len(ayar['options']) == 12 and 'data-ajax-url' not in ayar['html_attributes']
+
+    monkeypatch.setattr(LookupRegistry, 'UZAK_ESIK', 5)
+    ayar = LookupRegistry.alan_ayarlari('sehir', tenant_db=db.session, firma_id='F1', secili=secili, bos_secenek='Seçiniz')
+    assert ayar['options'] == [('', 'Seçiniz'), (secili, '81 - Düzce')]
+    assert ayar['html_attributes']['data-ajax-url'] == '/api/lookup/sehir'
+
+    sonuc = LookupRegistry.ara('sehir', 'düz', tenant_db=db.session, firma_id='F1')
+    assert sonuc['results'] == [{'id': secili, 'text': '81 - Düzce'}]
+
+    sayfa = LookupRegistry.ara('sehir', 'şehir', sayfa=1, limit=5, tenant_db=db.session, firma_id='F1')
+    assert len(sayfa['results']) == 5 and sayfa['pagination']['more'] is True
+    assert LookupRegistry.parametre_adlari('ilce') == ['sehir_id']
+
+
+def test_arama_indeksi_kelime_basi():
+    indeks = AramaIndeksi([(1, '120.01 - ABC Ticaret'), (2, '320.01 - IŞIK Gıda'), (3, '600 - Yurt İçi Satışlar')])
+    assert [s[0] for s in indeks.ara('120')[0]] == [1]
+    assert [s[0] for s in indeks.ara('ışık')[0]] == [2]
+    assert [s[0] for s in indeks.ara('yurt iç')[0]] == [3]
+    assert indeks.ara('ticaret gıda') == ([], False)
+    assert len(indeks.ara('')[0]) == 3
+
+
+def test_init_app_listenerlari_acilista_kaydeder(flask_app):
+    LookupRegistry.init_app(flask_app)
+    assert {'sube', 'depo', 'sehir'} <= set(LookupRegistry._kaynaklar)
+    assert Sehir in LookupRegistry._izlenen_modeller
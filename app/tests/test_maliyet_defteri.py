@@ -0,0 +1,92 @@
+# tests/test_maliyet_defteri.py
+"""
+Maliyet defteri (artımlı hareketli ortalama) testleri
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.modules.stok import costing, listeners  # noqa: F401 (event kayıtları)
+from app.modules.stok.costing import MaliyetMotoru
+from app.enums import HareketTuru
+from app.modules.stok.models import StokHareketi, StokDepoDurumu, StokMaliyetDefteri
+from app.tests.sqlite_db import sqlite_session
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    # stok_kartlari'ndan sadece kritik seviye kontrolünün kullandığı kolonlar
+    ddl = ['CREATE TABLE stok_kartlari (id CHAR(36) PRIMARY KEY, kritik_seviye NUMERIC)']
+    with sqlite_session(StokHareketi, StokDepoDurumu, StokMaliyetDefteri, ddl=ddl) as s:
+        monkeypatch.setattr(costing, 'get_tenant_db', lambda: s)
+        yield s
+
+
+def _alis(tarih, miktar, fiyat, depo='D1', tur='ALIS'):
+    # Stok servisi 'ALIS' (enum adı), fatura servisi 'alis' (enum değeri) yazar
+    return StokHareketi(
+        firma_id='F1', donem_id='P1', sube_id='S1', stok_id='K1', giris_depo_id=depo,
+        tarih=tarih, hareket_turu=tur, miktar=Decimal(miktar), birim_fiyat=Decimal(fiyat)
+    )
+
+
+def _tarama(session, tarih):
+    """Eski yöntem: tüm girişleri baştan tarayarak ortalama"""
+    rows = session.query(StokHareketi).filter(
+        StokHareketi.tarih <= tarih, StokHareketi.hareket_turu.in_(costing.MALIYET_HAREKET_TURLERI)
+    ).all()
+    miktar = sum(Decimal(str(r.miktar)) for r in rows)
+    tutar = sum(Decimal(str(r.miktar)) * Decimal(str(r.birim_fiyat)) for r in rows)
+    return round(tutar / miktar, 4) if miktar else Decimal('0.0')
+
+
+def test_artimli_defter_tarama_ile_ayni(db_session):
+    db_session.add_all([_alis(date(2025, 1, 10), '10', '100'), _alis(date(2025, 3, 1), '5', '130')])
+    db_session.flush()
+
+    # Geriye tarihli kayıt (fatura servisi biçimi): sadece sonraki günler kaydırılır
+    db_session.add(_alis(date(2025, 2, 1), '5', '90', depo='D2', tur=HareketTuru.ALIS.value))
+    # Satış hareketi maliyete girmez
+    db_session.add(_alis(date(2025, 2, 1), '1', '500', tur=HareketTuru.SATIS.value))
+    db_session.flush()
+
+    for gun in (date(2025, 1, 9), date(2025, 1, 31), date(2025, 2, 15), date(2025, 12, 31)):
+        assert MaliyetMotoru.ortalama_maliyet_hesapla('K1', gun, 'F1') == _tarama(db_session, gun)
+    assert MaliyetMotoru.ortalama_maliyet_hesapla('K1', date(2025, 12, 31), 'F1') == Decimal('105')
+
+    assert MaliyetMotoru.ortalama_maliyet_hesapla('K1', date(2025, 12, 31), 'F1', depo_id='D2') == Decimal('90')
+    # Gün başına bir satır: 3 gün (tüm depolar) + 3 (depo bazında)
+    assert db_session.query(StokMaliyetDefteri).count() == 6
+
+
+def test_guncelleme_ve_silme_defteri_onarir(db_session):
+    ilk, ikinci = _alis(date(2025, 1, 10), '10', '100'), _alis(date(2025, 3, 1), '10', '200')
+    db_session.add_all([ilk, ikinci])
+    db_session.flush()
+
+    ikinci.birim_fiyat = Decimal('300')
+    ikinci.tarih = date(2025, 1, 5)
+    db_session.flush()
+    assert MaliyetMotoru.ortalama_maliyet_hesapla('K1', date(2025, 1, 6), 'F1') == Decimal('300')
+    assert MaliyetMotoru.ortalama_maliyet_hesapla('K1', date(2025, 6, 1), 'F1') == Decimal('200')
+
+    db_session.delete(ikinci)
+    db_session.flush()
+    assert MaliyetMotoru.ortalama_maliyet_hesapla('K1', date(2025, 6, 1), 'F1') == Decimal('100')
+
+
+def test_geriye_tarihli_giris_ve_sonraki_duzeltme_ayni_flush(db_session):
+    ilk, ikinci = _alis(date(2025, 1, 10), '10', '100'), _alis(date(2025, 3, 1), '10', '200')
+    db_session.add_all([ilk, ikinci])
+    db_session.flush()
+
+    # Onarım 1 Mart'tan başlar; 5 Ocak tarihli giriş deltası kaybolmamalı
+    db_session.add(_alis(date(2025, 1, 5), '10', '300'))
+    ikinci.birim_fiyat = Decimal('250')
+    db_session.flush()
+
+    for gun in (date(2025, 1, 5), date(2025, 2, 1), date(2025, 12, 31)):
+        assert MaliyetMotoru.ortalama_maliyet_hesapla('K1', gun, 'F1') == _tarama(db_session, gun)
+    assert MaliyetMotoru.ortalama_maliyet_hesapla('K1', date(2025, 12, 31), 'F1') == Decimal('216.6667')
@@ -0,0 +1,119 @@
+# tests/test_menu_cache.py
+"""
+Derlenmiş (rol / modül / dil bazlı) menü cache'i testleri
+"""
+import os
+
+import pytest
+from flask import Blueprint, Flask, session
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.extensions import cache
+from app.form_builder import menu_manager
+from app.form_builder.menu_manager import MenuManager
+from app.services.tenant_cache import TenantCache
+from app.modules.firmalar.models import SystemMenu
+
+TEMPLATES = os.path.join(os.path.dirname(__file__), '..', 'templates')
+
+
+@pytest.fixture
+def ortam(monkeypatch):
+    flask_app = Flask(__name__, template_folder=TEMPLATES)
+    flask_app.config.update(SECRET_KEY='test', CACHE_TYPE='SimpleCache')
+    cache.init_app(flask_app)
+
+    for ad in ('stok', 'muhasebe'):
+        bp = Blueprint(ad, __name__)
+        bp.add_url_rule('/', 'index', lambda: '')
+        flask_app.register_blueprint(bp, url_prefix=f'/{ad}')
+
+    engine = create_engine('sqlite://')
+    SystemMenu.__table__.create(engine)
+    db_session = Session(engine)
+    db_session.add_all([
+        SystemMenu(id='M1', baslik='Stok', icon='bi bi-box', endpoint='stok.index', sira=1),
+        SystemMenu(id='M2', baslik='Muhasebe', icon='bi bi-calc', sira=2),
+        SystemMenu(id='M3', baslik='Fişler', icon='bi bi-list', endpoint='muhasebe.index', parent_id='M2',
+                   yetkili_roller='admin,muhasebeci', sira=3),
+        SystemMenu(id='M4', baslik='Kayıp', icon='bi bi-x', endpoint='yok.index', sira=4),
+    ])
+    db_session.commit()
+
+    derleme_sayisi = []
+    asil_derle = MenuManager._derle.__func__
+
+    def _say(cls, *args):
+        derleme_sayisi.append(1)
+        return asil_derle(cls, *args)
+
+    moduller = {'deger': None}
+    monkeypatch.setattr(menu_manager, 'get_tenant_db', lambda: db_session)
+    monkeypatch.setattr(MenuManager, '_derle', classmethod(_say))
+    monkeypatch.setattr(MenuManager, '_aktif_moduller', staticmethod(lambda tid: (moduller['deger'], 0)))
+    MenuManager._local.clear()
+    TenantCache._gen_checked.clear()
+
+    yield flask_app, db_session, derleme_sayisi, moduller
+    db_session.close()
+
+
+def _istek(flask_app, yol='/', rol='user'):
+    ctx = flask_app.test_request_context(yol)
+    ctx.push()
+    session['tenant_id'] = 'T1'
+    session['tenant_role'] = rol
+    return ctx
+
+
+def test_rol_filtresi_ve_tek_derleme(ortam):
+    flask_app, _, derleme, _ = ortam
+
+    ctx = _istek(flask_app, rol='user')
+    agac = MenuManager.get_tree()
+    # Yetkisiz alt menü ve linksiz üst menü gizlenir, çözülemeyen endpoint atılır
+    assert [n['baslik'] for n in agac] == ['Stok']
+    MenuManager.get_tree()
+    ctx.pop()
+
+    ctx = _istek(flask_app, rol='muhasebeci')
+    agac = MenuManager.get_tree()
+    assert [n['baslik'] for n in agac] == ['Stok', 'Muhasebe']
+    assert agac[1]['children'][0]['url'] == '/muhasebe/'
+    ctx.pop()
+
+    assert len(derleme) == 2  # rol başına bir derleme
+
+
+def test_html_aktif_menu_isaretlenir(ortam):
+    flask_app, _, _, _ = ortam
+
+    ctx = _istek(flask_app, yol='/muhasebe/', rol='admin')
+    html = str(MenuManager.get_html())
+    ctx.pop()
+
+    assert '[[aktif' not in html
+    assert 'class="dropdown-item active fw-bold"' in html
+    assert html.count('active') == 1
+    assert 'me-2 text-primary' in html and 'me-2 text-muted' not in html
+
+
+def test_menu_ve_modul_degisikligi_gecersiz_kilar(ortam):
+    flask_app, db_session, derleme, moduller = ortam
+
+    ctx = _istek(flask_app, rol='admin')
+    assert len(MenuManager.get_tree()) == 2
+
+    # Menü kaydı değişince commit sonrası sürüm artar
+    db_session.get(SystemMenu, 'M1').baslik = 'Stoklar'
+    db_session.commit()
+    assert MenuManager.get_tree()[0]['baslik'] == 'Stoklar'
+
+    # Lisansta olmayan modülün menüsü gizlenir
+    moduller['deger'] = frozenset(['stok'])
+    assert [n['baslik'] for n in MenuManager.get_tree()] == ['Stoklar']
+    ctx.pop()
+
+    assert len(derleme) == 3
@@ -0,0 +1,104 @@
+# tests/test_numara_servisi.py
+"""
+Belge numara servisi testleri: hi-lo blok, commit anında boşluksuz atama, metrikler
+"""
+import pytest
+from sqlalchemy import Column, Integer, String, Table, create_engine, select
+from sqlalchemy.orm import Session, registry
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.araclar import numara_uret
+from app.models import Sayac
+from app.services.numara_servisi import TASLAK_ONEK, NumaraServisi
+
+_reg = registry()
+_BELGE = Table('test_belgeler', _reg.metadata, Column('id', Integer, primary_key=True),
+               Column('belge_no', String(50)), Column('aciklama', String(100)))
+
+
+class _Belge:
+    def __init__(self, **kw):
+        for alan, deger in kw.items():
+            setattr(self, alan, deger)
+
+
+_reg.map_imperatively(_Belge, _BELGE)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'numara.db'}")
+    Sayac.__table__.create(engine)
+    _BELGE.create(engine)
+    NumaraServisi.metrikleri_sifirla()
+    NumaraServisi.bloklari_birak()
+    yield engine
+    NumaraServisi.bloklari_birak()
+    engine.dispose()
+
+
+def _son_no(engine, kod):
+    with engine.connect() as conn:
+        return conn.execute(select(Sayac.__table__.c.son_no).where(Sayac.__table__.c.kod == kod)).scalar_one()
+
+
+def test_blok_modu_ayri_transaction_ve_aralik(engine, monkeypatch):
+    monkeypatch.setattr(NumaraServisi, 'BLOK_BOYUTU', 5)
+
+    with Session(engine) as s:
+        ilk = [numara_uret('F1', 'BANKA', 2026, 'DEC-', 6, tenant_db=s, mod='blok') for _ in range(3)]
+        s.rollback()  # belge geri alınsa da ayrılan blok kalıcıdır
+    assert ilk == ['DEC-000001', 'DEC-000002', 'DEC-000003']
+    assert _son_no(engine, 'BANKA') == 5
+
+    # Başka bir işçi (süreç içi blokları yok) sonraki aralığı alır; ilk işçi kendi bloğuna devam eder
+    bloklar = dict(NumaraServisi._bloklar)
+    NumaraServisi.bloklari_birak()
+    with Session(engine) as s:
+        assert NumaraServisi.sonraki('F1', 'BANKA', 2026, 'DEC-', tenant_db=s) == 'DEC-000006'
+    NumaraServisi._bloklar.update(bloklar)
+    with Session(engine) as s:
+        assert [NumaraServisi.sonraki('F1', 'BANKA', 2026, 'DEC-', tenant_db=s) for _ in range(3)] == [
+            'DEC-000004', 'DEC-000005', 'DEC-000011']
+    assert _son_no(engine, 'BANKA') == 15
+
+    metrik = NumaraServisi.metrikler()['F1:BANKA:2026']
+    assert (metrik['mod'], metrik['numara'], metrik['rezervasyon']) == ('blok', 7, 3)
+
+
+def test_kesintisiz_mod_commit_aninda_ve_bosluksuz(engine):
+    with Session(engine) as s:
+        belge = _Belge()
+        taslak = NumaraServisi.ertele(belge, 'belge_no', 'F1', 'KASA', 2026, 'MAK-', tenant_db=s)
+        # Numara kopyaları (ör. cari hareket / muhasebe açıklaması) taslakla oluşturulur
+        kopya = _Belge(belge_no=taslak, aciklama=f"Kasa İşlemi: {taslak}")
+        s.add_all([belge, kopya])
+        s.flush()
+        assert belge.belge_no.startswith(TASLAK_ONEK)
+        s.commit()
+        assert (belge.belge_no, kopya.belge_no, kopya.aciklama) == (
+            'MAK-000001', 'MAK-000001', 'Kasa İşlemi: MAK-000001')
+
+        # Geri alınan belge numara tüketmez
+        geri = _Belge()
+        NumaraServisi.ertele(geri, 'belge_no', 'F1', 'KASA', 2026, 'MAK-', tenant_db=s)
+        s.add(geri)
+        s.flush()
+        s.rollback()
+        assert '_numara_bekleyen' not in s.info
+
+        iki = [_Belge(), _Belge()]
+        for b in iki:
+            NumaraServisi.ertele(b, 'belge_no', 'F1', 'KASA', 2026, 'MAK-', tenant_db=s)
+        s.add_all(iki)
+        s.commit()
+        assert [b.belge_no for b in iki] == ['MAK-000002', 'MAK-000003']
+
+        # Eski yol (numara hemen, aynı transaction) aynı seriden devam eder
+        assert numara_uret('F1', 'KASA', 2026, 'MAK-', 6, tenant_db=s) == 'MAK-000004'
+        s.commit()
+
+    with engine.connect() as conn:
+        assert conn.execute(select(_BELGE.c.belge_no).where(_BELGE.c.belge_no.like(f'{TASLAK_ONEK}%'))).first() is None
+    metrik = NumaraServisi.metrikler()['F1:KASA:2026']
+    assert (metrik['mod'], metrik['numara'], metrik['rezervasyon']) == ('kesintisiz', 4, 3)
@@ -0,0 +1,135 @@
+# tests/test_odeme_analizi.py
+"""
+Toplu ödeme analizi motoru testleri (vektörel FIFO, toplu yazma, artımlı seçim)
+"""
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.modules.cari.models import CariHareket, CariHesap
+from app.modules.cari.odeme_analizi import OdemeAnalizMotoru
+from app.tests.sqlite_db import CARI_TABLOLARI, sqlite_session
+
+
+def _dongulu_fifo(borclar, alacaklar):
+    """Eski algoritmanın (alacak başına borçları dolaşan) referans uygulaması"""
+    borclar = sorted(borclar, key=lambda b: (b[0], b[1]))
+    kalan = [b[2] for b in borclar]
+    puan = kapanan = geciken = 0
+    for tarih, tutar in sorted(alacaklar):
+        for k, (vade, _, _) in enumerate(borclar):
+            if tutar <= 0:
+                break
+            eslesen = min(tutar, kalan[k])
+            if eslesen <= 0:
+                continue
+            puan += eslesen * (tarih - vade)
+            kapanan += eslesen
+            geciken += eslesen if tarih > vade else 0
+            tutar -= eslesen
+            kalan[k] -= eslesen
+    return kapanan, puan, geciken, sum(kalan)
+
+
+def test_vektorel_fifo_dongulu_algoritma_ile_ayni():
+    rnd = random.Random(7)
+    borc_satirlari, alacak_satirlari, beklenen = [], [], {}
+    for c in range(40):
+        cari = f'C{c:03d}'
+        borclar = [(rnd.randint(0, 300), rnd.randint(0, 300), rnd.randint(1, 50000)) for _ in range(rnd.randint(0, 8))]
+        borclar = [(vade, min(tarih, vade), tutar) for vade, tarih, tutar in borclar]
+        alacaklar = [(rnd.randint(0, 400), rnd.randint(1, 60000)) for _ in range(rnd.randint(0, 8))]
+        borc_satirlari += [dict(cari_id=cari, vade=v, tarih=t, tutar=tt) for v, t, tt in borclar]
+        alacak_satirlari += [dict(cari_id=cari, tarih=t, tutar=tt) for t, tt in alacaklar]
+        if borclar or alacaklar:
+            beklenen[cari] = _dongulu_fifo(borclar, alacaklar)
+
+    sonuc = OdemeAnalizMotoru.fifo_eslestir(
+        pd.DataFrame(borc_satirlari, columns=['cari_id', 'vade', 'tarih', 'tutar']),
+        pd.DataFrame(alacak_satirlari, columns=['cari_id', 'tarih', 'tutar']),
+        bugun=500,
+    )
+
+    assert sorted(sonuc.index) == sorted(beklenen)
+    for cari, (kapanan, puan, geciken, kalan) in beklenen.items():
+        satir = sonuc.loc[cari]
+        assert satir.kapanan_tutar == kapanan and satir.kalan_borc == kalan
+        if kapanan:
+            assert satir.ortalama_odeme_gunu == int(puan / kapanan)
+            assert satir.gecikme_sikligi == pytest.approx(round(geciken / kapanan * 100, 2))
+
+
+def test_eslesme_yoksa_acik_borc_bugune_gore():
+    sonuc = OdemeAnalizMotoru.fifo_eslestir(
+        pd.DataFrame([dict(cari_id='A', vade=100, tarih=90, tutar=100), dict(cari_id='A', vade=130, tarih=90, tutar=300)]),
+        pd.DataFrame(columns=['cari_id', 'tarih', 'tutar']),
+        bugun=160,
+    )
+    assert sonuc.loc['A'].ortalama_odeme_gunu == int((100 * 60 + 300 * 30) / 400)
+    assert sonuc.loc['A'].odeme_performansi == 'GECİKMELİ'
+    assert list(OdemeAnalizMotoru.performans(np.array([-3, 10, 20, 45]))) == ['HIZLI', 'NORMAL', 'YAVAS', 'GECİKMELİ']
+
+
+@pytest.fixture
+def tenant_db():
+    with sqlite_session(*CARI_TABLOLARI) as s:
+        s.add_all([CariHesap(id=f'C{i}', firma_id='F1', kod=f'K{i}', unvan=f'Cari {i}') for i in range(3)])
+        s.flush()
+        for cari, gecikme in (('C0', 10), ('C1', -5)):
+            s.add(CariHareket(firma_id='F1', donem_id='D1', cari_id=cari, islem_turu='FATURA',
+                              tarih=date(2024, 1, 1), vade_tarihi=date(2024, 1, 31), borc=1000, alacak=0))
+            s.add(CariHareket(firma_id='F1', donem_id='D1', cari_id=cari, islem_turu='TAHSILAT',
+                              tarih=date(2024, 1, 31) + timedelta(days=gecikme), borc=0, alacak=1000))
+        s.commit()
+        yield s
+
+
+def test_toplu_calistirma_ve_artimli_secim(tenant_db):
+    ozet = OdemeAnalizMotoru.calistir(tenant_db=tenant_db, isci=4)
+    assert ozet['toplam_cari'] == 3
+
+    tablo = CariHesap.__table__
+    c0, c1, c2 = tenant_db.execute(tablo.select().order_by(tablo.c.id)).all()
+    assert (c0.ortalama_odeme_gunu, c0.ortalama_odeme_suresi, float(c0.gecikme_sikligi)) == (10, 40, 100.0)
+    assert (c1.ortalama_odeme_gunu, c1.odeme_performansi) == (-5, 'HIZLI')
+    assert c2.ortalama_odeme_gunu == 0 and c2.odeme_analiz_tarihi is not None
+
+    # Yeni hareket olmadan ikinci tur boş; sadece hareketi değişen cari yeniden hesaplanır
+    assert OdemeAnalizMotoru.calistir(tenant_db=tenant_db)['toplam_cari'] == 0
+    tenant_db.add(CariHareket(firma_id='F1', donem_id='D1', cari_id='C2', islem_turu='FATURA',
+                              tarih=date(2024, 2, 1), borc=500, alacak=0))
+    tenant_db.commit()
+    assert OdemeAnalizMotoru.bekleyen_cariler(tenant_db.connection()) == ['C2']
+    assert OdemeAnalizMotoru.calistir(tenant_db=tenant_db)['toplam_cari'] == 1
+    assert len(OdemeAnalizMotoru.bekleyen_cariler(tenant_db.connection(), tam=True)) == 3
+
+    tek = OdemeAnalizMotoru.cari_hesapla('C0', tenant_db=tenant_db)
+    assert tek['ortalama_gun'] == 10 and str(tek['kapanan_tutar']) == '1000.00'
+
+
+def test_acik_borclu_cari_her_gun_yeniden_secilir(tenant_db):
+    OdemeAnalizMotoru.calistir(tenant_db=tenant_db)
+    tablo = CariHesap.__table__
+    assert OdemeAnalizMotoru.bekleyen_cariler(tenant_db.connection()) == []
+
+    # Hareketsiz ama açık borçlu cari: dünkü hesap eskidi (gecikme bugüne göre büyür)
+    dun = datetime.now() - timedelta(days=1)
+    tenant_db.execute(tablo.update().where(tablo.c.id == 'C2').values(bakiye=500, odeme_analiz_tarihi=dun))
+    assert OdemeAnalizMotoru.bekleyen_cariler(tenant_db.connection()) == ['C2']
+
+    # Aynı gün ikinci tur tekrar seçmez
+    OdemeAnalizMotoru.calistir(tenant_db=tenant_db)
+    assert OdemeAnalizMotoru.bekleyen_cariler(tenant_db.connection()) == []
+
+
+def test_sema_guncelle_kolonu_bir_kez_ekler():
+    ddl = ["CREATE TABLE cari_hesaplar (id VARCHAR(36) PRIMARY KEY, unvan VARCHAR(200))"]
+    with sqlite_session(ddl=ddl) as s:
+        conn = s.connection()
+        assert OdemeAnalizMotoru.sema_guncelle(conn) is True
+        assert OdemeAnalizMotoru.sema_guncelle(conn) is False
+        conn.exec_driver_sql("INSERT INTO cari_hesaplar (id, unvan, odeme_analiz_tarihi) VALUES ('C1', 'A', NULL)")
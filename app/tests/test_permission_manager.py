@@ -0,0 +1,45 @@
+# tests/test_permission_manager.py
+"""
+Derlenmiş yetki matcher'ı (PermissionManager) testleri
+"""
+from flask import Flask, g
+
+from app.services.permission_manager import PermissionManager
+
+
+def test_derlenmis_kontrol_eski_kurallarla_ayni():
+    yetkiler = ['fatura.view', 'fatura_sil', 'bolge_guncelle', 'stok_gor', 'rapor.genel',
+                'dashboard.bolge', 'cari.delete', 'x.view', 'admin', '', 'depo.create.ek', '_gor']
+    for rol in list(PermissionManager.ROLE_DEFINITIONS) + ['tanimsiz', None, '']:
+        for yetki in yetkiler:
+            assert PermissionManager.check(rol, yetki) == PermissionManager._check_eski(rol, yetki), (rol, yetki)
+
+    assert PermissionManager.check('admin', 'herhangi.bir_sey')
+    assert PermissionManager.check('manager', 'bolge_sil')
+    assert PermissionManager.check('viewer', 'stok.view')
+    assert not PermissionManager.check('viewer', 'stok.delete')
+
+
+def test_toplu_kontrol_ve_ek_yetkiler():
+    sonuc = PermissionManager.check_many('viewer', ['fatura.view', 'fatura.delete'])
+    assert sonuc == {'fatura.view': True, 'fatura.delete': False}
+    assert PermissionManager.check_many(None, ['fatura.view']) == {'fatura.view': False}
+
+    # Kullanıcıya özel ek yetki rol matcher'ını değiştirmez
+    assert PermissionManager.derle('viewer', ['fatura.*']).izin_var('fatura.delete')
+    assert not PermissionManager.check('viewer', 'fatura.delete')
+    assert PermissionManager.derle('viewer') is PermissionManager.derle('viewer')
+
+
+def test_istek_icinde_memo():
+    flask_app = Flask(__name__)
+    with flask_app.test_request_context('/'):
+        assert PermissionManager.istek_icin_kontrol('user', 'stok_gor') == (True, True)
+        assert PermissionManager.istek_icin_kontrol('user', 'stok_gor') == (True, False)
+        assert g._yetki_sonuclari == {('user', 'stok_gor'): True}
+
+
+def test_benchmark_fark_yok():
+    sonuc = PermissionManager.benchmark(tekrar=2000)
+    assert sonuc['fark'] == 0
+    assert sonuc['derlenmis_memo_ns'] > 0
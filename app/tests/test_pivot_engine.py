@@ -0,0 +1,74 @@
+# tests/test_pivot_engine.py
+"""
+PivotEngine vektörel gruplama, SQL GROUP BY ve JSON küp testleri
+"""
+import pandas as pd
+import pytest
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine, select
+from sqlalchemy.orm import Session
+
+from app.form_builder.pivot import PivotEngine
+
+
+VERI = [
+    {'bolge': 'Ege', 'sube': 'İzmir', 'ay': '01', 'tutar': 100},
+    {'bolge': 'Ege', 'sube': 'İzmir', 'ay': '02', 'tutar': 50},
+    {'bolge': 'Ege', 'sube': 'Manisa', 'ay': '01', 'tutar': 30},
+    {'bolge': 'Marmara', 'sube': 'Bursa', 'ay': '02', 'tutar': 200},
+    {'sube': 'Bursa', 'ay': '02'},  # bölge / tutar yok → 'Diğer', 0
+]
+
+
+def test_eski_tek_boyut_davranisi():
+    assert PivotEngine(VERI, 'bolge', 'tutar')._process_data() == {'Marmara': 200.0, 'Ege': 180.0, 'Diğer': 0.0}
+    assert PivotEngine(VERI, 'bolge', 'tutar', 'count')._process_data()['Ege'] == 3
+    assert PivotEngine(VERI, 'bolge', 'tutar', 'avg')._process_data()['Ege'] == pytest.approx(60.0)
+    assert 'chart_' in PivotEngine(VERI, 'bolge', 'tutar').render()
+    assert PivotEngine([], 'bolge', 'tutar')._process_data() == {}
+
+
+def test_cok_boyutlu_kup_ve_ara_toplamlar():
+    pivot = PivotEngine(pd.DataFrame(VERI), ['bolge', 'sube'], columns=['ay'],
+                        measures=[('tutar', 'sum'), ('tutar', 'max', 'en_yuksek'), ('tutar', 'count', 'adet')])
+    kup = pivot.cube()
+
+    assert kup['sozluk']['bolge'] == ['Diğer', 'Ege', 'Marmara']
+    assert [o['ad'] for o in kup['olculer']] == ['tutar', 'en_yuksek', 'adet']
+    assert kup['genel_toplam'] == [380.0, 200.0, 5.0]
+
+    def _coz(satirlar, boyutlar):
+        return {tuple(kup['sozluk'][b][s[i]] for i, b in enumerate(boyutlar)): s[len(boyutlar):] for s in satirlar}
+
+    hucreler = _coz(kup['hucreler'], ['bolge', 'sube', 'ay'])
+    assert hucreler[('Ege', 'İzmir', '01')] == [100.0, 100.0, 1.0]
+    assert len(hucreler) == 5
+
+    assert _coz(kup['ara_toplamlar']['satir:bolge'], ['bolge'])[('Ege',)] == [180.0, 100.0, 3.0]
+    assert _coz(kup['ara_toplamlar']['satir:bolge,sube'], ['bolge', 'sube'])[('Ege', 'İzmir')] == [150.0, 100.0, 2.0]
+    assert _coz(kup['ara_toplamlar']['sutun:ay'], ['ay'])[('02',)] == [250.0, 200.0, 3.0]
+    assert pivot.to_json().startswith('{"satirlar":["bolge","sube"]')
+
+
+def test_sql_group_by_ile_ayni_sonuc():
+    tablo = Table('satis', MetaData(), Column('id', Integer, primary_key=True),
+                  Column('bolge', String), Column('ay', String), Column('tutar', Float))
+    engine = create_engine('sqlite://')
+    tablo.create(engine)
+    with engine.begin() as conn:
+        conn.execute(tablo.insert(), [{k: v.get(k) for k in ('bolge', 'ay', 'tutar')} for v in VERI])
+
+    with Session(engine) as session:
+        sorgu = select(tablo.c.bolge, tablo.c.ay, tablo.c.tutar)
+        olculer = [('tutar', 'sum'), ('tutar', 'avg'), ('tutar', 'min')]
+        sql_kup = PivotEngine(sorgu, 'bolge', columns='ay', measures=olculer, session=session).cube()
+        df_kup = PivotEngine(pd.DataFrame(VERI), 'bolge', columns='ay', measures=olculer).cube()
+
+    assert sql_kup['genel_toplam'] == df_kup['genel_toplam'] == [380.0, 76.0, 0.0]
+    assert sql_kup['sozluk'] == df_kup['sozluk']
+    assert sorted(sql_kup['hucreler']) == sorted(df_kup['hucreler'])
+    assert sorted(sql_kup['ara_toplamlar']['satir:bolge']) == sorted(df_kup['ara_toplamlar']['satir:bolge'])
+
+
+def test_benchmark():
+    sonuc = PivotEngine.benchmark(kayit=500, tekrar=1)
+    assert sonuc['kayit'] == 500 and sonuc['sql_group_by_ms'] > 0 and 'fark' in sonuc
@@ -0,0 +1,50 @@
+# tests/test_request_metrics.py
+"""
+İstek metrikleri (süre / SQL / cache / template) testleri
+"""
+import logging
+
+from flask import Flask, render_template_string
+from sqlalchemy import create_engine, text
+
+from app.extensions import cache, db
+from app.services.request_metrics import IstekMetrikleri
+
+
+def test_istek_olcumu_histogram_ve_yavas_log(caplog):
+    flask_app = Flask(__name__)
+    flask_app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://', CACHE_TYPE='SimpleCache',
+                            SLOW_REQUEST_MS=0, SERVER_TIMING=True)
+    db.init_app(flask_app)
+    cache.init_app(flask_app)
+    IstekMetrikleri.init_app(flask_app)
+    IstekMetrikleri.sifirla()
+    tenant_engine = create_engine('sqlite://')
+
+    @flask_app.route('/rapor')
+    def rapor():
+        db.session.execute(text('SELECT 1'))
+        with tenant_engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+            conn.execute(text('SELECT 2'))
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('yok')
+        return render_template_string('{{ x }}', x='ok')
+
+    with caplog.at_level(logging.WARNING, logger='app.services.request_metrics'):
+        yanit = flask_app.test_client().get('/rapor')
+        flask_app.test_client().get('/rapor')
+
+    zamanlama = yanit.headers['Server-Timing']
+    assert 'db-master;desc="1 sorgu"' in zamanlama
+    assert 'db-tenant;desc="2 sorgu"' in zamanlama
+    assert 'cache;desc="hit=1 miss=1"' in zamanlama
+    assert 'tpl;dur=' in zamanlama
+
+    assert 'Yavaş istek: GET /rapor' in caplog.text
+    assert 'SELECT 2' in caplog.text
+
+    ozet = IstekMetrikleri.ozet()['endpointler']['rapor']
+    assert (ozet['sayi'], ozet['ort_sql']) == (2, 3.0)
+    assert sum(ozet['histogram'].values()) == 2
@@ -0,0 +1,111 @@
+# tests/test_risk_ozeti.py
+"""
+Cari risk özeti (snapshot) testleri: flush ile tazeleme, yaşlandırma, çek riski, uzlaştırma
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.enums import CekDurumu, PortfoyTipi
+from app.modules.cari.models import CariHareket, CariHesap, CariRiskOzeti
+from app.modules.cari.risk_ozeti import CariRiskMotoru
+from app.modules.cek.models import CekSenet
+from app.tests.sqlite_db import CARI_TABLOLARI, sqlite_session
+
+
+BUGUN = date.today()
+
+
+def _hareket(cari_id, gun_once, borc=0, alacak=0, vade_gun_once=None, islem_turu='FATURA'):
+    tarih = BUGUN - timedelta(days=gun_once)
+    vade = BUGUN - timedelta(days=vade_gun_once) if vade_gun_once is not None else None
+    return CariHareket(firma_id='F1', donem_id='D1', cari_id=cari_id, islem_turu=islem_turu,
+                       tarih=tarih, vade_tarihi=vade, borc=borc, alacak=alacak)
+
+
+@pytest.fixture
+def tenant_db():
+    with sqlite_session(*CARI_TABLOLARI) as s:
+        s.add_all([CariHesap(id=cari, firma_id='F1', kod=cari, unvan=cari, risk_limiti=Decimal('5000'))
+                   for cari in ('C1', 'C2')])
+        s.commit()
+        yield s
+
+
+def _ozet(tenant_db, cari_id):
+    return tenant_db.get(CariRiskOzeti, cari_id, populate_existing=True)
+
+
+def test_flush_ile_yaslandirma_ve_cek_riski(tenant_db):
+    tenant_db.add_all([
+        _hareket('C1', 120, borc=1000, vade_gun_once=100),   # 90+ (kısmen kapanır)
+        _hareket('C1', 60, borc=2000, vade_gun_once=45),     # 31-60
+        _hareket('C1', 10, borc=500, vade_gun_once=-20),     # vadesi gelmemiş
+        _hareket('C1', 5, alacak=600, islem_turu='TAHSILAT'),
+        _hareket('C2', 3, borc=100),
+    ])
+    tenant_db.commit()
+
+    ozet = _ozet(tenant_db, 'C1')
+    assert ozet.bakiye == Decimal('2900.00')
+    assert (ozet.gecikme_90_ustu, ozet.gecikme_31_60, ozet.vadesi_gelmemis) == (
+        Decimal('400.00'), Decimal('2000.00'), Decimal('500.00'))
+    assert ozet.vadesi_gecen_toplam == Decimal('2400.00')
+    assert ozet.son_odeme_tarihi == BUGUN - timedelta(days=5)
+    assert ozet.hareket_sayisi == 4 and ozet.ortalama_odeme_gunu == 95
+    assert _ozet(tenant_db, 'C2').gecikme_0_30 == Decimal('100.00')
+
+    # Vadesi geçmiş müşteri çeki → sadece C1 tazelenir
+    tenant_db.add(CekSenet(firma_id='F1', belge_no='P1', cari_id='C1', portfoy_tipi=PortfoyTipi.ALINAN,
+                           cek_durumu=CekDurumu.PORTFOYDE, vade_tarihi=BUGUN - timedelta(days=2),
+                           tutar=Decimal('1500')))
+    tenant_db.commit()
+    ozet = _ozet(tenant_db, 'C1')
+    assert (ozet.acik_cek_tutari, ozet.vadesi_gecmis_cek_tutari) == (Decimal('1500.00'), Decimal('1500.00'))
+    assert ozet.toplam_risk == Decimal('4400.00')
+
+    kontrol = CariRiskMotoru.limit_kontrol('C1', ek_tutar=Decimal('700'), tenant_db=tenant_db)
+    assert kontrol['asim'] is True and kontrol['kalan_limit'] == Decimal('-100.00')
+    assert CariRiskMotoru.limit_kontrol('C1', ek_tutar=Decimal('600'), tenant_db=tenant_db)['asim'] is False
+
+
+def test_tam_uzlastirma_ve_bayat_okuma(tenant_db):
+    tenant_db.add(_hareket('C1', 40, borc=300, vade_gun_once=35))
+    tenant_db.commit()
+
+    # Dünkü snapshot: dilimler kaymış olmalı, oku() bellekte hesaplar ama yazmaz
+    tenant_db.execute(CariRiskOzeti.__table__.update().values(
+        hesaplama_tarihi=BUGUN - timedelta(days=1), gecikme_31_60=0, gecikme_0_30=300))
+    tenant_db.commit()
+    assert CariRiskMotoru.oku('C1', tenant_db=tenant_db)['gecikme_31_60'] == Decimal('300.00')
+    assert _ozet(tenant_db, 'C1').gecikme_0_30 == Decimal('300.00')
+
+    # Olay dışı (toplu) değişiklik → uzlaştırma farkı yakalar ve düzeltir
+    tenant_db.execute(CariRiskOzeti.__table__.update().values(bakiye=0))
+    tenant_db.commit()
+    sonuc = CariRiskMotoru.tam_uzlastir(tenant_db=tenant_db)
+    assert (sonuc['toplam_cari'], sonuc['fark']) == (2, 2)
+    assert _ozet(tenant_db, 'C1').bakiye == Decimal('300.00')
+    assert CariRiskMotoru.tam_uzlastir(tenant_db=tenant_db)['fark'] == 0
+
+
+def test_transaction_boyunca_tek_tazeleme(tenant_db, monkeypatch):
+    cagrilar = []
+    yenile = CariRiskMotoru.yenile
+    monkeypatch.setattr(CariRiskMotoru, 'yenile',
+                        classmethod(lambda cls, conn, ids, bugun=None: cagrilar.append(set(ids)) or yenile(conn, ids)))
+
+    tenant_db.add(_hareket('C1', 10, borc=100))
+    tenant_db.flush()
+    tenant_db.add(_hareket('C2', 10, borc=200))
+    tenant_db.flush()
+    assert cagrilar == []
+    # Commit bekleyen cari okunurken özet bellekte hesaplanır
+    assert CariRiskMotoru.oku('C1', tenant_db=tenant_db)['bakiye'] == Decimal('100.00')
+
+    tenant_db.add(_hareket('C1', 5, alacak=40, islem_turu='TAHSILAT'))
+    tenant_db.commit()
+    assert cagrilar == [{'C1', 'C2'}]
+    assert (_ozet(tenant_db, 'C1').bakiye, _ozet(tenant_db, 'C2').bakiye) == (Decimal('60.00'), Decimal('200.00'))
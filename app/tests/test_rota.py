@@ -0,0 +1,89 @@
+# tests/test_rota.py
+"""
+Rota motoru testleri: vektörel matris, matris önbelleği, 2-opt / Or-opt, çok araç, zaman penceresi
+"""
+from math import asin, cos, radians, sin, sqrt
+
+import numpy as np
+import pytest
+
+from app.modules.cari.rota import DUNYA_YARICAPI_KM, RotaMotoru, haversine_matrisi
+
+BASLANGIC = (41.0082, 28.9784)
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * DUNYA_YARICAPI_KM * asin(sqrt(a))
+
+
+def _konumlar(n, tohum=7):
+    rnd = np.random.default_rng(tohum)
+    return np.column_stack((rnd.uniform(40.9, 41.1, n), rnd.uniform(28.8, 29.2, n)))
+
+
+@pytest.fixture(autouse=True)
+def _temiz_onbellek():
+    RotaMotoru.onbellek_temizle()
+    yield
+    RotaMotoru.onbellek_temizle()
+
+
+def test_vektorel_matris_ve_kume_onbellegi():
+    konumlar = _konumlar(25)
+    matris = RotaMotoru.matris(konumlar)
+    beklenen = [[_haversine(*a, *b) for b in konumlar] for a in konumlar]
+    assert np.allclose(matris, beklenen, atol=1e-3)  # koordinatlar 6 haneye (~0.1 m) yuvarlanır
+    assert np.allclose(haversine_matrisi([BASLANGIC], konumlar)[0], [_haversine(*BASLANGIC, *k) for k in konumlar])
+
+    # Aynı küme farklı sırayla → önbellekten, çağrının sırasına göre
+    ters = RotaMotoru.matris(konumlar[::-1])
+    assert np.allclose(ters, matris[::-1, ::-1])
+    assert RotaMotoru.onbellek_durumu() == {'isabet': 1, 'iska': 1, 'kayit': 1}
+
+
+def test_iki_opt_kazanclari_asimetrik_matriste_dogru():
+    rnd = np.random.default_rng(3)
+    W = rnd.uniform(1, 10, (9, 9))
+    yol = np.array([0, 3, 1, 6, 2, 5, 4, 7, 8])
+
+    def maliyet(y):
+        return W[y[:-1], y[1:]].sum()
+
+    fark = RotaMotoru._iki_opt_kazanclari(W, yol)
+    for i in range(1, 7):
+        for j in range(i + 1, 8):
+            yeni = RotaMotoru._uygula(yol, ('2opt', i, j, 0))
+            assert fark[i - 1, j] == pytest.approx(maliyet(yeni) - maliyet(yol))
+
+    fark = RotaMotoru._or_opt_kazanclari(W, yol, 2)
+    i, j = 2, 6
+    assert fark[i - 1, j] == pytest.approx(maliyet(RotaMotoru._uygula(yol, ('oropt', i, j, 2))) - maliyet(yol))
+
+
+def test_iyilestirme_en_yakin_komsudan_kotu_olmaz():
+    konumlar = _konumlar(120).tolist()
+    sonuc = RotaMotoru.coz(BASLANGIC, konumlar, sure_butcesi=5)
+
+    assert sorted(sonuc['rotalar'][0]) == list(range(120))
+    assert sonuc['toplam_km'] < sonuc['ilk_tur_km'] and sonuc['hamle'] > 0
+    # Bacaklar gerçek mesafelerle tutarlı
+    rota = sonuc['rotalar'][0]
+    assert sonuc['bacak_km'][0][0] == pytest.approx(_haversine(*BASLANGIC, *konumlar[rota[0]]), abs=1e-3)
+    assert sum(sonuc['bacak_km'][0]) == pytest.approx(sonuc['toplam_km'], abs=1e-2)
+
+
+def test_cok_arac_ve_zaman_penceresi():
+    konumlar = _konumlar(30).tolist()
+    sonuc = RotaMotoru.coz(BASLANGIC, konumlar, arac_sayisi=3, donus=True)
+    assert len(sonuc['rotalar']) == 3 and all(sonuc['rotalar'])
+    assert sorted(sum(sonuc['rotalar'], [])) == list(range(30))
+    assert len(sonuc['bacak_km'][0]) == len(sonuc['rotalar'][0]) + 1  # dönüş bacağı
+
+    # En uzak durak ilk yarım saatte ziyaret edilmeli
+    uzak = int(np.argmax(haversine_matrisi([BASLANGIC], konumlar)[0]))
+    pencereler = [None] * 30
+    pencereler[uzak] = (0, 30)
+    sonuc = RotaMotoru.coz(BASLANGIC, konumlar, pencereler=pencereler)
+    assert sonuc['rotalar'][0][0] == uzak and sonuc['gecikme_dk'] == 0
@@ -0,0 +1,76 @@
+# tests/test_session_heartbeat.py
+"""
+Write-behind oturum nabzı (SessionService + BellekNabizDeposu) testleri
+"""
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, session
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.extensions import db
+from app.models.master import MasterActiveSession
+from app.services.session_service import BellekNabizDeposu, SessionService
+
+
+@pytest.fixture
+def flask_app(monkeypatch):
+    flask_app = Flask(__name__)
+    flask_app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://')
+    db.init_app(flask_app)
+    monkeypatch.setattr(SessionService, '_nabiz_deposu', BellekNabizDeposu())
+    with flask_app.app_context():
+        MasterActiveSession.__table__.create(db.engine)
+        eski = datetime.now() - timedelta(minutes=5)
+        db.session.add_all([
+            MasterActiveSession(session_token='ESKI', user_id='U0', tenant_id='T1', last_activity=eski),
+            MasterActiveSession(session_token='ZOMBI', user_id='U0', tenant_id='T1',
+                                last_activity=datetime.now() - timedelta(hours=2)),
+        ])
+        db.session.commit()
+        yield flask_app
+
+
+def _satir(token):
+    t = MasterActiveSession.__table__
+    return db.session.execute(t.select().where(t.c.session_token == token)).first()
+
+
+def test_nabiz_db_ye_toplu_yazilir(flask_app):
+    with flask_app.test_request_context('/', environ_base={'REMOTE_ADDR': '10.0.0.9'}):
+        # İlk sayımda depo DB'den doldurulur; zombi oturum sayılmaz
+        assert SessionService.can_login('T1', 2) == (True, 'OK')
+        session['tenant_id'] = 'T1'
+        SessionService.register_session(SimpleNamespace(id='U1'), 'T1')
+        token = session['_session_token']
+        assert SessionService.can_login('T1', 2)[0] is False
+
+        kayit_zamani = _satir(token).last_activity
+        for _ in range(5):
+            assert SessionService.heartbeat() is True
+        # Nabızlar henüz DB'ye gitmedi
+        assert _satir(token).last_activity == kayit_zamani
+
+        assert SessionService.flush() == 1
+        satir = _satir(token)
+        assert satir.last_activity > kayit_zamani and satir.ip_address == '10.0.0.9'
+        # Flush, süresi dolan oturumları DB'den de siler
+        assert _satir('ZOMBI') is None
+
+        SessionService.logout()
+        assert SessionService.heartbeat() is False
+        assert SessionService.can_login('T1', 2) == (True, 'OK')
+
+
+def test_zombi_oturum_depodan_duser(flask_app, monkeypatch):
+    with flask_app.test_request_context('/'):
+        session['tenant_id'] = 'T1'
+        session['_session_token'] = 'ESKI'
+        assert SessionService.heartbeat() is True
+
+        monkeypatch.setattr(SessionService, 'TIMEOUT_MINUTES', 0)
+        time.sleep(0.01)
+        assert SessionService.cleanup_stale_sessions() == 1
+        assert SessionService.heartbeat() is False
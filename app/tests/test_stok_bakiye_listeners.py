@@ -0,0 +1,75 @@
+# tests/test_stok_bakiye_listeners.py
+"""
+Stok hareketlerinin flush başına toplu depo bakiyesi güncellemesi testleri
+"""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.modules.stok import listeners
+from app.modules.stok.models import StokHareketi, StokDepoDurumu, StokKart
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine('sqlite://')
+    StokDepoDurumu.__table__.create(engine)
+    with Session(engine) as s:
+        yield s
+
+
+def _hareket(stok_id, miktar, giris=None, cikis=None, tur='ALIS'):
+    h = StokHareketi(firma_id='F1', stok_id=stok_id, giris_depo_id=giris, cikis_depo_id=cikis,
+                     hareket_turu=tur, miktar=Decimal(miktar))
+    return h
+
+
+def test_deltalar_biriktirilir_ve_tek_upsert_ile_yazilir(db_session, monkeypatch):
+    # Sadece biriktirme + upsert kısmı (hareket tablosu olmadan)
+    monkeypatch.setattr(listeners, '_kritik_seviye_kontrol', lambda conn, keys: None)
+    monkeypatch.setattr(listeners, 'object_session', lambda target: db_session)
+
+    for _ in range(3):
+        listeners._delta_biriktir(_hareket('S1', '1.125', giris='D1'), 1)
+    listeners._delta_biriktir(_hareket('S2', '2', giris='D1'), 1)
+    listeners._delta_biriktir(_hareket('S1', '0.5', giris='D1'), -1)  # silinen hareket
+
+    deltalar = db_session.info[listeners._DELTA_KEY]
+    assert deltalar == {('F1', 'D1', 'S1'): Decimal('2.875'), ('F1', 'D1', 'S2'): Decimal('2')}
+
+    statements = []
+    event.listen(db_session.get_bind(), 'before_cursor_execute',
+                 lambda conn, cursor, stmt, params, context, many: statements.append(stmt))
+
+    listeners.stok_bakiyelerini_uygula(db_session, None)
+    listeners._delta_biriktir(_hareket('S1', '1', giris='D1'), 1)
+    listeners.stok_bakiyelerini_uygula(db_session, None)
+
+    assert sum('INSERT INTO stok_depo_durumu' in s for s in statements) == 2
+    bakiyeler = dict(db_session.query(StokDepoDurumu.stok_id, StokDepoDurumu.miktar))
+    assert bakiyeler['S1'] == Decimal('3.875')
+    assert listeners._DELTA_KEY not in db_session.info
+
+
+def test_sifir_net_delta_yazilmaz(db_session, monkeypatch):
+    monkeypatch.setattr(listeners, 'object_session', lambda target: db_session)
+    listeners._delta_biriktir(_hareket('S1', '5', giris='D1'), 1)
+    listeners._delta_biriktir(_hareket('S1', '5', giris='D1'), -1)  # silindi
+
+    listeners.stok_bakiyelerini_uygula(db_session, None)
+    assert db_session.query(StokDepoDurumu).count() == 0
+
+
+def test_upsert_satirlari_depo_stok_sirasinda(db_session):
+    satirlar = [
+        {'firma_id': 'F1', 'depo_id': d, 'stok_id': s, 'miktar': Decimal('1')}
+        for d, s in [('D2', 'S1'), ('D1', 'S3'), ('D2', 'S0'), ('D1', 'S1')]
+    ]
+    stmt = listeners._upsert_statement('sqlite', StokDepoDurumu.__table__, satirlar)
+    params = stmt.compile(dialect=db_session.get_bind().dialect).params
+
+    sira = [(params[f'depo_id_m{i}'], params[f'stok_id_m{i}']) for i in range(len(satirlar))]
+    assert sira == [('D1', 'S1'), ('D1', 'S3'), ('D2', 'S0'), ('D2', 'S1')]
@@ -0,0 +1,156 @@
+# tests/test_stream_export.py
+"""
+Streaming export (CSV parçalama, XLSX write-only, ilişki yükleme) testleri
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, Column, Integer, Date, String, Numeric, ForeignKey
+from sqlalchemy.orm import declarative_base, relationship, Session
+
+from app.modules.rapor.stream_export import StreamingExporter
+
+Base = declarative_base()
+
+
+class Cari(Base):
+    __tablename__ = 'cari'
+    id = Column(Integer, primary_key=True)
+    unvan = Column(String(50))
+
+
+class Hareket(Base):
+    __tablename__ = 'hareket'
+    id = Column(Integer, primary_key=True)
+    cari_id = Column(Integer, ForeignKey('cari.id'))
+    tarih = Column(Date)
+    tutar = Column(Numeric(18, 2))
+    cari = relationship(Cari)
+
+
+@pytest.fixture
+def app_ctx(tmp_path):
+    app = Flask(__name__)
+    app.config['EXPORT_DIR'] = str(tmp_path)
+    with app.test_request_context('/'):
+        yield app
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        s.add_all([Cari(id=1, unvan='Ahmet Ticaret'), Cari(id=2, unvan='Öz Gıda')])
+        s.add_all([
+            Hareket(id=i, cari_id=1 + i % 2, tarih=date(2025, 1, 1) + timedelta(days=i), tutar=Decimal('10.50'))
+            for i in range(1, 26)
+        ])
+        s.commit()
+        yield s
+
+
+COLUMNS = [('tarih', 'Tarih'), ('cari.unvan', 'Cari'), ('tutar', 'Tutar')]
+
+
+def test_csv_parca_parca_uretilir(app_ctx, db_session):
+    exporter = StreamingExporter(db_session.query(Hareket).order_by(Hareket.id), COLUMNS, chunk_size=10)
+    chunks = list(exporter.iter_csv())
+
+    # BOM + 2 tam parça (10'ar satır) + kalan
+    assert chunks[0] == '\ufeff'.encode('utf-8')
+    assert len(chunks) == 4
+    text = b''.join(chunks).decode('utf-8-sig').splitlines()
+    assert text[0] == 'Tarih;Cari;Tutar'
+    assert text[1] == '02.01.2025;Öz Gıda;10,50'
+    assert len(text) == 26
+    assert exporter.rows_written == 25
+
+
+def test_iliskiler_joinedload_ile_yuklenir(app_ctx, db_session):
+    exporter = StreamingExporter(db_session.query(Hareket), COLUMNS)
+    sql = str(exporter._prepared_query().statement.compile())
+    assert 'JOIN cari' in sql
+
+
+def test_xlsx_write_only(app_ctx, db_session, tmp_path):
+    from openpyxl import load_workbook
+
+    path = tmp_path / 'rapor.xlsx'
+    exporter = StreamingExporter(db_session.query(Hareket).order_by(Hareket.id), COLUMNS, chunk_size=7)
+    assert exporter.write_xlsx(str(path)) == 25
+
+    ws = load_workbook(path).active
+    rows = list(ws.iter_rows(values_only=True))
+    assert rows[0] == ('Tarih', 'Cari', 'Tutar')
+    assert rows[1][1] == 'Öz Gıda'
+    assert len(rows) == 26
+
+
+def test_response_streaming(app_ctx, db_session):
+    exporter = StreamingExporter(db_session.query(Hareket), COLUMNS)
+    resp = exporter.response('csv', 'hareketler')
+    assert resp.is_streamed
+    assert 'hareketler.csv' in resp.headers['Content-Disposition']
+
+    resp = exporter.response('xlsx', 'hareketler')
+    assert b''.join(resp.response)[:2] == b'PK'
+
+
+def test_keyset_grid_sayfa_exportu(db_session):
+    from app.form_builder.data_grid import DataGrid
+    from app.form_builder.keyset import keyset_page
+
+    q = db_session.query(Hareket)
+    ikinci = keyset_page(q, Hareket.tarih, Hareket.id, 'desc',
+                         after=keyset_page(q, Hareket.tarih, Hareket.id, 'desc', per_page=5)['next_cursor'],
+                         per_page=5)
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    url = f"/?scope=page&format=csv&sort=tarih&direction=desc&after={ikinci['prev_cursor']}"
+    with app.test_request_context(url):
+        # İkinci sayfanın ilk satırından sonrası: 2. sayfanın kalan 4 satırı + 3. sayfanın ilki
+        grid = DataGrid('hareket', Hareket, per_page=5, pagination_mode='keyset')
+        resp = grid.export(q, filename='sayfa')
+        satirlar = b''.join(resp.response).decode('utf-8-sig').splitlines()[1:]
+
+    beklenen = [str(h.id) for h in q.order_by(Hareket.tarih.desc(), Hareket.id.desc())][6:11]
+    assert [s.split(';')[0] for s in satirlar] == beklenen  # ilk kolon: id
+
+
+def test_grid_export_kaynagi_esik_kontrolune_gider(db_session, monkeypatch):
+    from app.form_builder.data_grid import DataGrid
+    from app.modules.rapor import stream_export
+
+    cagrilar = []
+    monkeypatch.setattr(stream_export, 'export_or_enqueue',
+                        lambda kaynak, params, fmt, filename: cagrilar.append((kaynak, params, fmt, filename)))
+
+    app = Flask(__name__)
+    with app.test_request_context('/?scope=all&format=xlsx&sort=tarih&direction=desc'):
+        grid = DataGrid('hareket', Hareket, per_page=5)
+        grid.export(kaynak='hareket_grid')
+
+        # Kaynak (arka plan işi dahil) sorguyu aynı request argümanlarıyla kurar
+        query, columns = grid.export_sorgusu(db_session.query(Hareket))
+        assert query.count() == 25
+
+    assert cagrilar == [('hareket_grid', {'scope': 'all', 'format': 'xlsx', 'sort': 'tarih', 'direction': 'desc'},
+                         'xlsx', 'hareket')]
+
+
+def test_rapor_builder_satirlari_akitilir(app_ctx, db_session):
+    from app.modules.rapor.rapor_builder import RaporBuilder
+
+    builder = RaporBuilder(db_session)
+    builder.add_group('cari_id', 'cari_id')
+    builder.add_aggregation('COUNT', 'id', 'adet')
+    builder.add_order('cari_id')
+
+    exporter = StreamingExporter(builder.iter_rows('hareket', chunk_size=1),
+                                 [('cari_id', 'Cari'), ('adet', 'Adet')])
+    assert list(exporter.iter_rows()) == [[1, 12], [2, 13]]
+    assert exporter.rows_written == 2
@@ -0,0 +1,100 @@
+# tests/test_tenant_cache.py
+"""
+Tenant / veri alanı bazlı cache katmanı (TenantCache) testleri
+"""
+import time
+
+import pytest
+from flask import Flask, session
+
+from app.extensions import cache
+from app.services.tenant_cache import TenantCache
+
+
+@pytest.fixture
+def flask_app():
+    flask_app = Flask(__name__)
+    flask_app.config.update(SECRET_KEY='test', CACHE_TYPE='SimpleCache')
+    cache.init_app(flask_app)
+    TenantCache._gen_checked.clear()
+    TenantCache.istatistik_sifirla()
+    with flask_app.app_context():
+        cache.clear()
+    return flask_app
+
+
+def _tenant(flask_app, tenant_id):
+    ctx = flask_app.test_request_context('/')
+    ctx.push()
+    session['tenant_id'] = tenant_id
+    return ctx
+
+
+def test_tenant_ve_alan_izolasyonu(flask_app):
+    ctx = _tenant(flask_app, 'T1')
+    TenantCache.set('stok', 'x', 'T1-stok')
+    TenantCache.set('cari', 'x', 'T1-cari')
+    ctx.pop()
+
+    ctx = _tenant(flask_app, 'T2')
+    assert TenantCache.get('stok', 'x') is None
+    TenantCache.set('stok', 'x', 'T2-stok')
+    ctx.pop()
+
+    ctx = _tenant(flask_app, 'T1')
+    TenantCache.invalidate('stok')
+    assert TenantCache.get('stok', 'x') is None
+    assert TenantCache.get('cari', 'x') == 'T1-cari'
+    ctx.pop()
+
+    # Diğer tenant'ın aynı alanı etkilenmez
+    ctx = _tenant(flask_app, 'T2')
+    assert TenantCache.get('stok', 'x') == 'T2-stok'
+    ctx.pop()
+
+    with pytest.raises(ValueError):
+        TenantCache.key('tanimsiz', 'x')
+
+
+def test_bayat_deger_tek_yenileme(flask_app):
+    ctx = _tenant(flask_app, 'T1')
+    hesaplama = []
+
+    def _uret():
+        hesaplama.append(1)
+        return len(hesaplama)
+
+    assert TenantCache.get_or_set('rapor', 'k', _uret, timeout=0.05) == 1
+    time.sleep(0.1)
+
+    # Başka bir istek yenileme kilidini tutuyorsa bayat değer beklemeden döner
+    key = TenantCache.key('rapor', 'k')
+    cache.add(f"{key}:kilit", 1)
+    assert TenantCache.get_or_set('rapor', 'k', _uret, timeout=60) == 1
+    cache.delete(f"{key}:kilit")
+
+    # Kilit boşsa bu istek yeniler
+    assert TenantCache.get_or_set('rapor', 'k', _uret, timeout=60) == 2
+    assert TenantCache.get_or_set('rapor', 'k', _uret, timeout=60) == 2
+    ctx.pop()
+
+    metrik = TenantCache.istatistikler()['rapor']
+    assert (metrik['miss'], metrik['stale'], metrik['yenileme'], metrik['hit']) == (1, 1, 1, 1)
+    assert metrik['hit_orani'] == 0.5
+
+
+def test_dekorator_anahtar_ve_silme(flask_app):
+    cagri = []
+
+    @TenantCache.cached('stok', timeout=60)
+    def toplam(stok_id, firma_id, tenant_db=None):
+        cagri.append(stok_id)
+        return len(cagri)
+
+    ctx = _tenant(flask_app, 'T1')
+    assert toplam('S1', 'F1', tenant_db=object()) == 1
+    assert toplam('S1', 'F1', tenant_db=object()) == 1
+    assert toplam('S2', 'F1') == 2
+    toplam.delete('S1', 'F1')
+    assert toplam('S1', 'F1') == 3
+    ctx.pop()
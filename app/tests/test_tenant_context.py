@@ -0,0 +1,123 @@
+# tests/test_tenant_context.py
+"""
+Tenant context çözümleyici (iki katmanlı cache + generation invalidation) testleri
+"""
+import app.models  # noqa: F401  (model kayıtları)
+
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from app.extensions import cache, db
+from app.models.master import License, Tenant, UserTenantRole
+from app.services.tenant_context import TenantContextResolver, register_invalidation_listeners
+
+
+@pytest.fixture
+def flask_app(monkeypatch):
+    flask_app = Flask(__name__)
+    flask_app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://', CACHE_TYPE='SimpleCache')
+    db.init_app(flask_app)
+    cache.init_app(flask_app)
+    register_invalidation_listeners()
+    TenantContextResolver._local.clear()
+
+    # Lisans / veritabanı kontrolü yerine tenant satırından sade paket
+    yuklemeler = []
+
+    def _yukle(cls, tenant_id):
+        yuklemeler.append(tenant_id)
+        tenant = db.session.get(Tenant, tenant_id)
+        return {'tenant': {'id': tenant.id, 'unvan': tenant.unvan}} if tenant else None
+
+    monkeypatch.setattr(TenantContextResolver, '_load_tenant_bundle', classmethod(_yukle))
+
+    with flask_app.app_context():
+        cache.clear()
+        for model in (Tenant, UserTenantRole, License):
+            model.__table__.create(db.engine)
+        db.session.add(Tenant(id='T1', kod='T1', unvan='Deneme A.Ş.'))
+        db.session.add(UserTenantRole(id='R1', user_id='U1', tenant_id='T1', role='admin'))
+        db.session.commit()
+        flask_app.yuklemeler = yuklemeler
+        yield flask_app
+        db.session.remove()
+
+
+def _generation():
+    return TenantContextResolver._generation('T1')
+
+
+def test_process_ici_ve_paylasilan_cache_isabeti(flask_app):
+    ctx = TenantContextResolver.resolve('T1', 'U1')
+    assert ctx['tenant']['unvan'] == 'Deneme A.Ş.' and ctx['role'] == 'admin'
+    assert TenantContextResolver.resolve('T1', 'U1') == ctx
+    assert flask_app.yuklemeler == ['T1']
+
+    # Başka worker: process içi kopya yok, paylaşılan cache'ten gelir
+    TenantContextResolver._local.clear()
+    assert TenantContextResolver.resolve('T1', 'U1') == ctx
+    assert flask_app.yuklemeler == ['T1']
+
+    # Olmayan tenant negatif cache'lenir
+    assert TenantContextResolver.resolve('YOK') is None
+    assert TenantContextResolver.resolve('YOK') is None
+    assert flask_app.yuklemeler == ['T1', 'YOK']
+
+
+@pytest.mark.parametrize('degistir', ['tenant', 'rol', 'lisans'])
+def test_commit_generation_artirir(flask_app, degistir):
+    TenantContextResolver.resolve('T1', 'U1')
+    onceki = _generation()
+
+    if degistir == 'tenant':
+        db.session.get(Tenant, 'T1').unvan = 'Yeni Unvan'
+    elif degistir == 'rol':
+        db.session.get(UserTenantRole, 'R1').role = 'user'
+    else:
+        db.session.add(License(tenant_id='T1', valid_until=datetime.utcnow() + timedelta(days=30)))
+    db.session.flush()
+    assert _generation() == onceki  # commit'ten önce bump yok
+
+    db.session.commit()
+    assert _generation() == onceki + 1
+
+    ctx = TenantContextResolver.resolve('T1', 'U1')
+    assert len(flask_app.yuklemeler) == 2
+    if degistir == 'tenant':
+        assert ctx['tenant']['unvan'] == 'Yeni Unvan'
+    elif degistir == 'rol':
+        assert ctx['role'] == 'user'
+
+
+def test_rollback_generation_artirmaz(flask_app):
+    TenantContextResolver.resolve('T1', 'U1')
+    onceki = _generation()
+
+    db.session.get(Tenant, 'T1').unvan = 'Geri Alınacak'
+    db.session.flush()
+    db.session.rollback()
+
+    assert _generation() == onceki
+    assert TenantContextResolver.resolve('T1', 'U1')['tenant']['unvan'] == 'Deneme A.Ş.'
+    assert flask_app.yuklemeler == ['T1']
+
+    # Rollback sonrası kirli liste sonraki commit'e taşınmaz
+    db.session.commit()
+    assert _generation() == onceki
+
+
+def test_toplu_delete_elle_invalidate_edilir(flask_app):
+    assert TenantContextResolver.resolve('T1', 'U1')['role'] == 'admin'
+    onceki = _generation()
+
+    # Toplu delete listener'ları atlar
+    UserTenantRole.query.filter_by(user_id='U1', tenant_id='T1').delete()
+    db.session.commit()
+    assert _generation() == onceki
+    assert TenantContextResolver.get_role('T1', 'U1') == 'admin'
+
+    TenantContextResolver.invalidate('T1')
+    assert _generation() == onceki + 1
+    assert TenantContextResolver.get_role('T1', 'U1') is None
@@ -0,0 +1,67 @@
+# tests/test_tenant_engine_registry.py
+"""
+TenantEngineRegistry testleri (LRU tahliye ve bağlantı bütçesi)
+"""
+from sqlalchemy import text
+
+from app.utils.tenant_engine_registry import TenantEngineRegistry
+
+
+def _url(tmp_path, name):
+    return f"sqlite:///{tmp_path / name}.db"
+
+
+def test_engine_paylasilir(tmp_path):
+    """Aynı tenant için her çağrıda aynı engine döner"""
+    registry = TenantEngineRegistry()
+    e1 = registry.get_engine('t1', _url(tmp_path, 't1'))
+    e2 = registry.get_engine('t1', _url(tmp_path, 't1'))
+
+    assert e1 is e2
+    assert registry.stats()['misses'] == 1
+    registry.dispose_all()
+
+
+def test_lru_tahliye(tmp_path):
+    """Limit aşılınca en eski boşta engine kapatılır"""
+    registry = TenantEngineRegistry()
+    registry.max_engines = 2
+
+    registry.get_engine('t1', _url(tmp_path, 't1'))
+    registry.get_engine('t2', _url(tmp_path, 't2'))
+    registry.get_engine('t1', _url(tmp_path, 't1'))  # t1 tekrar kullanıldı
+    registry.get_engine('t3', _url(tmp_path, 't3'))
+
+    assert 't2' not in registry
+    assert 't1' in registry and 't3' in registry
+    assert registry.evictions == 1
+    registry.dispose_all()
+
+
+def test_kullanimdaki_engine_tahliye_edilmez(tmp_path):
+    """Bağlantısı dışarıda olan engine LRU'da en eski olsa bile korunur"""
+    registry = TenantEngineRegistry()
+    registry.max_engines = 1
+
+    engine = registry.get_engine('t1', _url(tmp_path, 't1'))
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        registry.get_engine('t2', _url(tmp_path, 't2'))
+        assert 't1' in registry
+
+    registry.dispose_all()
+
+
+def test_baglanti_butcesi(tmp_path):
+    """Toplam kapasite max_connections'ı aşmaz"""
+    registry = TenantEngineRegistry()
+    registry.pool_size, registry.max_overflow = 5, 5
+    registry.max_connections = 15
+
+    registry.get_engine('t1', _url(tmp_path, 't1'))
+    with registry.get_engine('t1', _url(tmp_path, 't1')).connect():
+        registry.get_engine('t2', _url(tmp_path, 't2'))
+
+    stats = registry.stats()
+    assert stats['capacity'] <= 15
+    registry.dispose_all()
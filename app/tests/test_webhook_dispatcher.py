@@ -0,0 +1,117 @@
+# tests/test_webhook_dispatcher.py
+"""
+Webhook outbox + sınırlı dağıtıcı testleri (yerel sahte alıcı ile)
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+import app.models  # noqa: F401 (model kayıt sırası)
+from app.extensions import db
+from app.models.master import WebhookOutbox
+from app.services.n8n_client import N8NClient
+from app.services.webhook_dispatcher import WebhookDispatcher
+from app.services.webhook_stub import YerelWebhookAlicisi
+
+
+@pytest.fixture
+def flask_app():
+    flask_app = Flask(__name__)
+    flask_app.config.update(SECRET_KEY='test', SQLALCHEMY_DATABASE_URI='sqlite://',
+                            WEBHOOK_OTOMATIK_BASLAT=False, WEBHOOK_WORKER_SAYISI=4)
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        WebhookOutbox.__table__.create(db.engine)
+        yield flask_app
+
+
+def _durumlar():
+    db.session.expire_all()
+    return sorted(k.durum for k in WebhookOutbox.query.all())
+
+
+def test_toplu_gonderim_ve_uc_limiti(flask_app):
+    flask_app.config['WEBHOOK_UC_AYARLARI'] = {'toplu': {'batch': 2}, 'yavas': {'limit': 2}}
+    with YerelWebhookAlicisi(gecikme=0.05) as alici:
+        flask_app.config['N8N_WEBHOOK_URL'] = alici.url + '/webhook/'
+
+        with flask_app.test_request_context('/'):
+            for i in range(5):
+                assert N8NClient.trigger('toplu', {'no': i}) is True
+        WebhookDispatcher.enqueue_many([('yavas', {'no': i}) for i in range(6)], tenant_id='T1')
+
+        assert WebhookDispatcher.bir_tur() == 11
+        assert WebhookDispatcher.bir_tur() == 0
+
+    toplu = [i['govde'] for i in alici.istekler if i['yol'] == '/webhook/toplu']
+    assert sorted(len(g['events']) for g in toplu) == [1, 2, 2]
+    assert sorted(e['no'] for g in toplu for e in g['events']) == [0, 1, 2, 3, 4]
+    # 'toplu' için 2 şerit (varsayılan limit) + 'yavas' için 2 şerit
+    assert alici.max_eszamanli <= 4
+    assert _durumlar() == ['gonderildi'] * 11
+
+
+def test_tekrar_deneme_ve_dead_letter(flask_app):
+    with YerelWebhookAlicisi(durumlar=[503, 404]) as alici:
+        flask_app.config['N8N_WEBHOOK_URL'] = alici.url
+        flask_app.config['WEBHOOK_UC_AYARLARI'] = {'a': {'limit': 1}}
+        ilk = WebhookDispatcher.enqueue('a', {'no': 1})
+        ikinci = WebhookDispatcher.enqueue('a', {'no': 2})
+
+        WebhookDispatcher.bir_tur()
+        db.session.expire_all()
+        k1, k2 = db.session.get(WebhookOutbox, ilk), db.session.get(WebhookOutbox, ikinci)
+        # 503 → geri çekilme ile tekrar; 404 → doğrudan dead-letter
+        assert (k1.durum, k1.deneme_sayisi) == ('bekliyor', 1)
+        assert k1.sonraki_deneme > datetime.now()
+        assert (k2.durum, k2.son_hata[:8]) == ('olu', 'HTTP 404')
+
+        # Zamanı gelmeden tekrar gönderilmez
+        assert WebhookDispatcher.bir_tur() == 0
+        k1.sonraki_deneme = datetime.now() - timedelta(seconds=1)
+        db.session.commit()
+        assert WebhookDispatcher.bir_tur() == 1
+
+        assert WebhookDispatcher.yeniden_dene() == 1
+        assert WebhookDispatcher.bir_tur() == 1
+
+    assert _durumlar() == ['gonderildi', 'gonderildi']
+    assert WebhookDispatcher.durum_ozeti() == {'gonderildi': 2}
+
+
+def test_coken_worker_talebi_geri_alinir(flask_app):
+    with YerelWebhookAlicisi() as alici:
+        flask_app.config['N8N_WEBHOOK_URL'] = alici.url
+        kayit_id = WebhookDispatcher.enqueue('a', {})
+        kayit = db.session.get(WebhookOutbox, kayit_id)
+        kayit.durum, kayit.kilit = 'isleniyor', 'olu-worker'
+        kayit.kilit_zamani = datetime.now() - timedelta(seconds=WebhookDispatcher.KILIT_TTL + 1)
+        db.session.commit()
+
+        assert WebhookDispatcher.bir_tur() == 1
+    assert _durumlar() == ['gonderildi']
+
+
+def test_enqueue_cagiranin_transactionini_commit_etmez(flask_app):
+    db.session.add(WebhookOutbox(webhook_path='yarim', payload={}))
+    WebhookDispatcher.enqueue('a', {'no': 1})
+    db.session.rollback()
+    assert [k.webhook_path for k in WebhookOutbox.query.all()] == ['a']
+
+
+def test_serit_talebi_kilit_suresiyle_sinirli(flask_app, monkeypatch):
+    monkeypatch.setattr(WebhookDispatcher, 'SERIT_PARCA_LIMITI', 2)
+    with YerelWebhookAlicisi() as alici:
+        flask_app.config['N8N_WEBHOOK_URL'] = alici.url
+        flask_app.config['WEBHOOK_UC_AYARLARI'] = {'a': {'limit': 1}}
+        WebhookDispatcher.enqueue_many([('a', {'no': i}) for i in range(5)])
+
+        # Tek şerit × 2 parça gönderilir, kalanlar kilitsiz olarak kuyruğa döner
+        assert WebhookDispatcher.bir_tur() == 2
+        assert _durumlar() == ['bekliyor'] * 3 + ['gonderildi'] * 2
+        assert WebhookOutbox.query.filter(WebhookOutbox.kilit.isnot(None)).count() == 0
+        assert WebhookDispatcher.bir_tur() == 2
+        assert WebhookDispatcher.bir_tur() == 1
+
+    assert [i['govde']['no'] for i in alici.istekler] == [0, 1, 2, 3, 4]
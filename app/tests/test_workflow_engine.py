@@ -0,0 +1,68 @@
+# tests/test_workflow_engine.py
+"""
+WorkflowEngine derlenmiş koşullar ve commit sonrası asenkron eylem testleri
+"""
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.form_builder.workflow import DerlenmisKosul, WorkflowEngine
+
+
+TANIM = {
+    'start_step': 'kontrol',
+    'steps': {
+        'kontrol': {'type': 'condition', 'condition': "tutar > 1000 and tur in ['satis', 'iade']",
+                    'true_step': 'bildir', 'false_step': 'END'},
+        'bildir': {'action': {'type': 'send_email', 'to': 'a@b.c', 'subject': 'Onay'}, 'next_step': 'durum'},
+        'durum': {'action': {'type': 'update_status', 'value': 'onay_bekliyor'}, 'type': 'approval'},
+    }
+}
+
+
+def test_kosul_derleme_ve_surum_onbellegi():
+    for ifade, veri, beklenen in [
+        ("tutar > 1000 and tur == 'satis'", {'tutar': 1500, 'tur': 'satis'}, True),
+        ("not aktif or float(oran) >= 0.5", {'aktif': True, 'oran': '0.7'}, True),
+        ("tutar * 2 > 100", {'tutar': 40}, False),  # simpleeval yolu
+    ]:
+        assert DerlenmisKosul(ifade)(veri) is beklenen
+
+    assert DerlenmisKosul("tutar * 2 > 100")._kod is None
+    assert DerlenmisKosul("__import__('os')")._kod is None
+
+    WorkflowEngine.derleme_temizle()
+    assert WorkflowEngine(TANIM)._akis is WorkflowEngine(dict(TANIM))._akis
+    assert WorkflowEngine({**TANIM, 'version': 'v2'})._akis.surum == 'v2'
+
+    # Aynı sürüm numaralı iki farklı iş akışı aynı derlemeyi paylaşmaz
+    baska = {'version': 1, 'start_step': 'son', 'steps': {'son': {'type': 'task'}}}
+    assert WorkflowEngine({**TANIM, 'version': 1}).start_step == 'kontrol'
+    assert WorkflowEngine(baska).start_step == 'son'
+
+    # Tanımsız değişken / hatalı kural → False (eski davranış)
+    sonuc = WorkflowEngine(TANIM).run(None, {'tutar': 5})
+    assert sonuc['status'] == 'COMPLETED'
+
+
+def test_yan_etkili_eylemler_commit_sonrasi_gonderilir(monkeypatch):
+    gonderilen = []
+    monkeypatch.setattr(WorkflowEngine, 'eylemleri_gonder',
+                        classmethod(lambda cls, eylemler: gonderilen.extend(a['type'] for _, a, _ in eylemler)))
+    s = Session(create_engine('sqlite://'))
+
+    sonuc = WorkflowEngine(TANIM).run(None, {'tutar': 5000, 'tur': 'satis'}, session=s)
+    assert sonuc['status'] == 'WAITING' and sonuc['context']['status'] == 'onay_bekliyor'
+    assert gonderilen == []  # kayıt bekletilmez, commit beklenir
+    s.commit()
+    assert gonderilen == ['send_email']
+
+    s.execute(text('SELECT 1'))
+    WorkflowEngine(TANIM).run(None, {'tutar': 5000, 'tur': 'satis'}, session=s)
+    s.rollback()
+    s.commit()
+    assert gonderilen == ['send_email']
+
+
+def test_benchmark():
+    sonuc = WorkflowEngine.benchmark(kayit=50, kural=20)
+    assert sonuc['kayit'] == 50 and sonuc['derlenmis_ms'] > 0 and 'fark' in sonuc
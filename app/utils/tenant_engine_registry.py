@@ -0,0 +1,328 @@
+# app/utils/tenant_engine_registry.py
+"""
+Tenant Engine Registry
+Process genelinde paylaşılan, LRU tahliyeli tenant engine havuzu
+
+Her istekte create_engine() + dispose() yapmak yerine tenant engine'leri
+database adına göre process ömrü boyunca saklar. Böylece MySQL
+TCP/auth el sıkışması sadece ilk bağlantıda ödenir ve connection pool
+gerçekten işe yarar.
+
+Limitler:
+    - max_engines: Aynı anda canlı tutulacak en fazla engine sayısı
+    - max_connections: Tüm engine'lerin (pool_size + max_overflow) toplam üst sınırı
+
+Limit aşıldığında en uzun süredir kullanılmayan ve o an bağlantısı
+dışarıda olmayan (idle) tenant engine'leri dispose edilir.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+
+class _TenantEngineEntry:
+    """Registry içindeki tek bir tenant engine kaydı"""
+
+    __slots__ = (
+        'db_name', 'engine', 'session_factory', 'pool_size', 'max_overflow',
+        'created_at', 'last_used', 'hits', 'connects', 'checkouts'
+    )
+
+    def __init__(self, db_name, engine, pool_size, max_overflow):
+        self.db_name = db_name
+        self.engine = engine
+        self.session_factory = sessionmaker(bind=engine)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.hits = 0
+        self.connects = 0
+        self.checkouts = 0
+
+    @property
+    def capacity(self):
+        """Engine'in açabileceği en fazla bağlantı sayısı"""
+        return self.pool_size + self.max_overflow
+
+    def checked_out(self):
+        """Şu an kullanımda olan bağlantı sayısı"""
+        try:
+            return self.engine.pool.checkedout()
+        except Exception:
+            return 0
+
+    def is_idle(self):
+        return self.checked_out() == 0
+
+    def stats(self):
+        pool = self.engine.pool
+        now = time.time()
+        return {
+            'db_name': self.db_name,
+            'pool_size': self.pool_size,
+            'max_overflow': self.max_overflow,
+            'checked_out': self.checked_out(),
+            'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+            'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+            'hits': self.hits,
+            'connects': self.connects,
+            'checkouts': self.checkouts,
+            'age_seconds': round(now - self.created_at, 1),
+            'idle_seconds': round(now - self.last_used, 1),
+        }
+
+
+class TenantEngineRegistry:
+    """
+    ✅ PROCESS-WIDE TENANT ENGINE REGISTRY
+
+    Kullanım:
+        engine = tenant_engine_registry.get_engine(db_name, db_url)
+        session = tenant_engine_registry.get_session(db_name, db_url)
+
+        # Monitoring
+        tenant_engine_registry.stats()
+
+    Thread-safe'dir (gunicorn thread worker'ları ile paylaşılabilir).
+    Fork sonrası her worker kendi engine'lerini açar (pid kontrolü).
+    """
+
+    DEFAULT_MAX_ENGINES = 50
+    DEFAULT_MAX_CONNECTIONS = 300
+    DEFAULT_POOL_SIZE = 5
+    DEFAULT_MAX_OVERFLOW = 10
+    DEFAULT_POOL_RECYCLE = 3600
+    DEFAULT_POOL_TIMEOUT = 30
+
+    def __init__(self, app=None):
+        self._engines = OrderedDict()
+        self._lock = threading.RLock()
+        self._pid = None
+        self.evictions = 0
+        self.misses = 0
+
+        self.max_engines = self.DEFAULT_MAX_ENGINES
+        self.max_connections = self.DEFAULT_MAX_CONNECTIONS
+        self.pool_size = self.DEFAULT_POOL_SIZE
+        self.max_overflow = self.DEFAULT_MAX_OVERFLOW
+        self.pool_recycle = self.DEFAULT_POOL_RECYCLE
+        self.pool_timeout = self.DEFAULT_POOL_TIMEOUT
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Limitleri app config'inden oku"""
+        self.max_engines = int(app.config.get('TENANT_ENGINE_MAX_ENGINES', self.DEFAULT_MAX_ENGINES))
+        self.max_connections = int(app.config.get('TENANT_ENGINE_MAX_CONNECTIONS', self.DEFAULT_MAX_CONNECTIONS))
+        self.pool_size = int(app.config.get('TENANT_ENGINE_POOL_SIZE', self.DEFAULT_POOL_SIZE))
+        self.max_overflow = int(app.config.get('TENANT_ENGINE_MAX_OVERFLOW', self.DEFAULT_MAX_OVERFLOW))
+        self.pool_recycle = int(app.config.get('TENANT_ENGINE_POOL_RECYCLE', self.DEFAULT_POOL_RECYCLE))
+        self.pool_timeout = int(app.config.get('TENANT_ENGINE_POOL_TIMEOUT', self.DEFAULT_POOL_TIMEOUT))
+
+        app.extensions['tenant_engine_registry'] = self
+
+    # ========================================
+    # 🔌 ENGINE ERİŞİMİ
+    # ========================================
+
+    def get_engine(self, db_name, db_url):
+        """
+        Tenant engine'ini döner (yoksa oluşturur).
+
+        Args:
+            db_name (str): Tenant database adı (registry anahtarı)
+            db_url (str): SQLAlchemy bağlantı URL'i
+
+        Returns:
+            Engine: Paylaşılan SQLAlchemy engine
+        """
+        with self._lock:
+            self._check_fork()
+
+            entry = self._engines.get(db_name)
+            if entry is not None:
+                self._engines.move_to_end(db_name)
+                entry.hits += 1
+                entry.last_used = time.time()
+                return entry.engine
+
+            self.misses += 1
+            entry = self._create_entry(db_name, db_url)
+            self._engines[db_name] = entry
+            entry.hits += 1
+            return entry.engine
+
+    def get_session(self, db_name, db_url):
+        """Tenant engine'ine bağlı yeni bir Session döner"""
+        with self._lock:
+            self.get_engine(db_name, db_url)
+            return self._engines[db_name].session_factory()
+
+    def _create_entry(self, db_name, db_url):
+        """Yeni engine oluştur (limitleri gözeterek)"""
+        # 1. Engine sayısı limiti
+        while len(self._engines) >= self.max_engines:
+            if not self._evict_one():
+                logger.warning(
+                    f"⚠️ Tenant engine limiti aşıldı ({len(self._engines)}/{self.max_engines}), "
+                    f"tahliye edilebilecek boşta engine yok"
+                )
+                break
+
+        # 2. Toplam bağlantı limiti
+        wanted = self.pool_size + self.max_overflow
+        while self._total_capacity() + wanted > self.max_connections:
+            if not self._evict_one():
+                break
+
+        remaining = self.max_connections - self._total_capacity()
+        pool_size, max_overflow = self.pool_size, self.max_overflow
+        if remaining < wanted:
+            # Bütçe yetmiyorsa havuzu küçült (en az 1 bağlantı)
+            pool_size = max(1, min(self.pool_size, remaining))
+            max_overflow = max(0, remaining - pool_size)
+            logger.warning(
+                f"⚠️ Tenant bağlantı bütçesi dar: {db_name} için "
+                f"pool_size={pool_size}, max_overflow={max_overflow}"
+            )
+
+        engine = create_engine(
+            db_url,
+            pool_pre_ping=True,
+            pool_recycle=self.pool_recycle,
+            pool_timeout=self.pool_timeout,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            echo=False
+        )
+        entry = _TenantEngineEntry(db_name, engine, pool_size, max_overflow)
+        self._attach_pool_events(entry)
+
+        logger.info(f"🔌 Tenant engine oluşturuldu: {db_name} (pool={pool_size}+{max_overflow})")
+        return entry
+
+    @staticmethod
+    def _attach_pool_events(entry):
+        @event.listens_for(entry.engine, 'connect')
+        def _on_connect(dbapi_conn, conn_record):
+            entry.connects += 1
+
+        @event.listens_for(entry.engine, 'checkout')
+        def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+            entry.checkouts += 1
+            entry.last_used = time.time()
+
+    def _total_capacity(self):
+        return sum(e.capacity for e in self._engines.values())
+
+    def _evict_one(self):
+        """En eski boşta engine'i dispose et. Başarılıysa True"""
+        for db_name, entry in self._engines.items():
+            if entry.is_idle():
+                self._dispose_entry(db_name)
+                self.evictions += 1
+                logger.info(f"♻️ Tenant engine tahliye edildi (LRU): {db_name}")
+                return True
+        return False
+
+    def _dispose_entry(self, db_name):
+        entry = self._engines.pop(db_name, None)
+        if entry is not None:
+            try:
+                entry.engine.dispose()
+            except Exception as e:
+                logger.debug(f"⚠️ Engine dispose uyarısı ({db_name}): {e}")
+
+    def _check_fork(self):
+        """
+        Fork sonrası parent'tan gelen bağlantılar paylaşılamaz.
+        Yeni pid'de registry'yi sessizce sıfırla.
+        """
+        import os
+        pid = os.getpid()
+        if self._pid != pid:
+            if self._pid is not None:
+                for entry in self._engines.values():
+                    try:
+                        entry.engine.dispose(close=False)
+                    except Exception:
+                        pass
+                self._engines.clear()
+            self._pid = pid
+
+    # ========================================
+    # 🧹 YÖNETİM
+    # ========================================
+
+    def evict_idle(self, max_idle_seconds):
+        """
+        Belirtilen süreden uzun süredir kullanılmayan engine'leri kapat.
+
+        Returns:
+            int: Kapatılan engine sayısı
+        """
+        cutoff = time.time() - max_idle_seconds
+        with self._lock:
+            stale = [
+                name for name, entry in self._engines.items()
+                if entry.last_used < cutoff and entry.is_idle()
+            ]
+            for name in stale:
+                self._dispose_entry(name)
+            self.evictions += len(stale)
+        return len(stale)
+
+    def dispose(self, db_name):
+        """Tek tenant engine'ini kapat (tenant silindi/taşındı vb.)"""
+        with self._lock:
+            self._dispose_entry(db_name)
+
+    def dispose_all(self):
+        """Tüm engine'leri kapat (shutdown / testler)"""
+        with self._lock:
+            for name in list(self._engines):
+                self._dispose_entry(name)
+
+    # ========================================
+    # 📊 MONITORING
+    # ========================================
+
+    def engines(self):
+        """{db_name: engine} kopyası"""
+        with self._lock:
+            return {name: entry.engine for name, entry in self._engines.items()}
+
+    def stats(self):
+        """
+        Registry ve tenant bazlı pool istatistikleri
+
+        Returns:
+            dict: {'engines': int, 'capacity': int, ..., 'tenants': [..]}
+        """
+        with self._lock:
+            tenants = [entry.stats() for entry in self._engines.values()]
+            return {
+                'engines': len(self._engines),
+                'max_engines': self.max_engines,
+                'capacity': self._total_capacity(),
+                'max_connections': self.max_connections,
+                'checked_out': sum(t['checked_out'] for t in tenants),
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'tenants': tenants,
+            }
+
+    def __len__(self):
+        return len(self._engines)
+
+    def __contains__(self, db_name):
+        return db_name in self._engines
@@ -25,20 +25,17 @@ def has_tenant_access(user_id, tenant_id):
     Security:
         - Master DB'de UserTenantRole tablosundan kontrol eder
         - is_active=True olan kayıtları kabul eder
-        - Cache kullanılabilir (opsiyonel)
+        - TenantContextResolver ile kısa TTL'li cache'lenir
+          (rol değişince otomatik invalidation)
     """
     try:
-        from app.models.master import UserTenantRole
+        from app.services.tenant_context import TenantContextResolver
         
         # 1. Kullanıcının bu tenant'a aktif rolü var mı?
-        role = db.session.query(UserTenantRole).filter_by(
-            user_id=user_id,
-            tenant_id=tenant_id,
-            is_active=True
-        ).first()
+        role = TenantContextResolver.get_role(tenant_id, user_id)
         
         if role:
-            logger.debug(f"✅ Tenant erişim onaylandı: user={user_id}, tenant={tenant_id}, role={role.role}")
+            logger.debug(f"✅ Tenant erişim onaylandı: user={user_id}, tenant={tenant_id}, role={role}")
             return True
         else:
             logger.warning(f"⚠️ Yetkisiz tenant erişim denemesi: user={user_id}, tenant={tenant_id}")
@@ -70,30 +67,33 @@ def validate_tenant_session():
         logger.warning("⚠️ current_user authenticated değil")
         return False, "Lütfen giriş yapın."
     
-    # 3. ✅ Yetki kontrolü
-    if not has_tenant_access(current_user.id, tenant_id):
-        logger.warning(f"⚠️ Tenant erişim hakkı yok: user={current_user.id}, tenant={tenant_id}")
-        return False, "Bu firmaya erişim yetkiniz yok!"
-    
-    # 4. Tenant aktif mi?
+    # 3. Tenant + rol paketi (tek çözümleme, cache'li)
     try:
-        from app.models.master import Tenant
-        from app.extensions import db
-        
-        tenant = db.session.get(Tenant, tenant_id)
-        
-        if not tenant:
-            logger.error(f"❌ Tenant bulunamadı: {tenant_id}")
-            return False, "Firma bulunamadı."
+        from app.services.tenant_context import TenantContextResolver
         
-        if not tenant.is_active:
-            logger.warning(f"⚠️ Tenant pasif: {tenant_id}")
-            return False, "Bu firma devre dışı bırakılmış."
+        ctx = TenantContextResolver.resolve(tenant_id, current_user.id)
     
     except Exception as e:
         logger.error(f"❌ Tenant validation hatası: {e}", exc_info=True)
         return False, "Firma doğrulaması başarısız."
     
+    # 4. ✅ Yetki kontrolü
+    if ctx is not None and not ctx['role']:
+        logger.warning(f"⚠️ Tenant erişim hakkı yok: user={current_user.id}, tenant={tenant_id}")
+        return False, "Bu firmaya erişim yetkiniz yok!"
+    
+    # 5. Tenant aktif mi?
+    if not ctx:
+        logger.error(f"❌ Tenant bulunamadı: {tenant_id}")
+        return False, "Firma bulunamadı."
+    
+    if not ctx['tenant']['is_active']:
+        logger.warning(f"⚠️ Tenant pasif: {tenant_id}")
+        return False, "Bu firma devre dışı bırakılmış."
+    
+    # Request boyunca erişilebilir (template/route'lar için)
+    g.tenant_context = ctx
+    
     return True, None
     
     
@@ -106,6 +106,14 @@ class Config:
         f"/{{tenant_code}}?charset={TENANT_DB_CHARSET}"
     )
     
+    # Tenant Engine Registry (process başına paylaşılan engine havuzu)
+    TENANT_ENGINE_MAX_ENGINES = int(os.environ.get('TENANT_ENGINE_MAX_ENGINES', 50))
+    TENANT_ENGINE_MAX_CONNECTIONS = int(os.environ.get('TENANT_ENGINE_MAX_CONNECTIONS', 300))
+    TENANT_ENGINE_POOL_SIZE = int(os.environ.get('TENANT_ENGINE_POOL_SIZE', 5))
+    TENANT_ENGINE_MAX_OVERFLOW = int(os.environ.get('TENANT_ENGINE_MAX_OVERFLOW', 10))
+    TENANT_ENGINE_POOL_RECYCLE = 3600
+    TENANT_ENGINE_POOL_TIMEOUT = 30
+    
     # ========================================
     # 🌍 BABEL (i18n)
     # ========================================
@@ -152,16 +160,53 @@ class Config:
         'http://127.0.0.1:5001/api/license/validate'
     )
     
+    # n8n webhook'ları (Outbox + WebhookDispatcher)
+    N8N_WEBHOOK_URL = os.environ.get('N8N_WEBHOOK_URL', 'http://localhost:5678/webhook')
+    N8N_API_KEY = os.environ.get('N8N_API_KEY')
+    WEBHOOK_WORKER_SAYISI = int(os.environ.get('WEBHOOK_WORKER_SAYISI', 4))
+    # Uç (webhook_path) bazlı ayarlar: {'fatura-onay': {'limit': 2, 'batch': 50}}
+    # limit: aynı anda en fazla istek, batch: alıcı toplu kabul ediyorsa olay sayısı
+    WEBHOOK_UC_AYARLARI = {}
+    
     # ========================================
     # 📁 UPLOAD & STATIC
     # ========================================
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'app', 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+
+    # ========================================
+    # 📤 EXPORT
+    # ========================================
+    # Bu satır sayısının üzerindeki export'lar Celery ile arka planda hazırlanır
+    EXPORT_ASYNC_ROW_THRESHOLD = int(os.environ.get('EXPORT_ASYNC_ROW_THRESHOLD', 50000))
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+    EXPORT_DIR = os.environ.get('EXPORT_DIR') or os.path.join(os.getcwd(), 'exports')
+    # e-Defter: parça başına üst sınır (byte) ve fiş satırı okuma boyutu
+    EDEFTER_MAX_PARCA_BOYUTU = int(os.environ.get('EDEFTER_MAX_PARCA_BOYUTU', 100 * 1024 * 1024))
+    EDEFTER_CHUNK_SIZE = int(os.environ.get('EDEFTER_CHUNK_SIZE', 2000))
+    
+    # ========================================
+    # ⏱️ İSTEK METRİKLERİ
+    # ========================================
+    # Bu sürenin (ms) üzerindeki istekler en yavaş sorgularıyla loglanır
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 1000))
+    # Server-Timing header'ı (debug modda her zaman açık)
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false').lower() == 'true'
+    
+    # ========================================
+    # 🚀 BAŞLANGIÇ
+    # ========================================
+    # Açılışta blueprint başına import + kayıt süresini raporla
+    STARTUP_PROFILE = os.environ.get('STARTUP_PROFILE', 'false').lower() == 'true'
+    # Bu process'te kaydedilmeyecek modüller (ör. worker / API node'ları için: "b2b,mobile,efatura")
+    PASIF_MODULLER = [m.strip() for m in os.environ.get('PASIF_MODULLER', '').split(',') if m.strip()]
     
     # ========================================
     # 🤖 AI & OCR
     # ========================================
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+    # Verilirse model keşfi (list_models) yapılmaz
+    GEMINI_MODEL = os.environ.get('GEMINI_MODEL')
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     
     # ========================================
@@ -210,6 +255,7 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     CACHE_TYPE = 'SimpleCache'
+    WEBHOOK_OTOMATIK_BASLAT = False
 
 
 # Config seçici
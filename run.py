@@ -15,6 +15,7 @@ from sqlalchemy import text
 
 from app.extensions import db, cache, login_manager, babel, init_extensions
 from app.context_manager import GlobalContextManager
+from app.services.startup_profiler import BaslangicProfili
 from config import get_config
 
 #from app.patches import apply_firebird_patches
@@ -58,15 +59,30 @@ def create_app(config_name=None):
     
     logger.info(f"🚀 Uygulama başlatılıyor: {config_name} modu")
 
+    # Açılış profili (STARTUP_PROFILE=true ise aşama / blueprint süreleri loglanır)
+    profil = BaslangicProfili(aktif=app.config.get('STARTUP_PROFILE', False))
+    app.extensions['baslangic_profili'] = profil
+
     # ✅ Extension'ları başlat
-    init_extensions(app)
+    with profil.olc('init_extensions'):
+        init_extensions(app)
         
     # Middleware
-    register_middleware(app)
+    with profil.olc('register_middleware'):
+        register_middleware(app)
     
     # Blueprints
-    register_blueprints(app)
+    with profil.olc('register_blueprints'):
+        register_blueprints(app)
     
+    # Lookup kaynakları (modellerin commit listener'ları dahil)
+    from app.form_builder.lookup import LookupRegistry
+    LookupRegistry.init_app(app)
+
+    # Webhook dağıtıcısı (outbox'ta bekleyen olaylar açılışta gönderilmeye başlar)
+    from app.services.webhook_dispatcher import WebhookDispatcher
+    WebhookDispatcher.init_app(app)
+
     # Error handlers
     register_error_handlers(app)
     
@@ -95,6 +111,7 @@ def create_app(config_name=None):
         logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
         logger.info("✅ SQL query logging aktif (DEBUG mode)")
     
+    profil.raporla()
     logger.info("✅ Uygulama başarıyla yapılandırıldı")
     
     return app
@@ -109,6 +126,10 @@ def register_middleware(app):
         app (Flask): Flask uygulaması
     """
     
+    # İstek süresi / SQL sayısı / cache / template ölçümü (diğer hook'lardan önce kayıtlı olmalı)
+    from app.services.request_metrics import IstekMetrikleri
+    IstekMetrikleri.init_app(app)
+    
     @app.before_request
     def load_global_context():
         """
@@ -166,6 +187,11 @@ def register_middleware(app):
             g.user_name = session.get('user_name', '')
             g.user_email = session.get('user_email', '')
             g.user_role = session.get('user_role', 'user')
+        
+        # 6. Oturum nabzı (nabız deposuna yazılır, DB'ye toplu flush ile gider)
+        if session.get('_session_token'):
+            from app.services.session_service import SessionService
+            SessionService.heartbeat()
     
     
     @app.after_request
@@ -176,13 +202,7 @@ def register_middleware(app):
         MySQL'de schema sıfırlama YOK
         """
         
-        # Performance tracking (debug modda)
-        if app.debug and hasattr(g, 'request_start_time'):
-            duration = (datetime.now(timezone.utc) - g.request_start_time).total_seconds()
-            response.headers['X-Request-Duration'] = f"{duration:.3f}s"
-            
-            if duration > 1.0:
-                logger.warning(f"⚠️ Yavaş istek: {request.path} - {duration:.2f}s")
+        # Süre / SQL ölçümü ve yavaş istek logu: IstekMetrikleri (Server-Timing, X-Request-Duration)
         
         # Security headers (production'da)
         if not app.debug:
@@ -218,9 +238,12 @@ def register_middleware(app):
             dict: Template değişkenleri
         """
         dynamic_menu = []
+        dynamic_menu_html = ''
         try:
-            from app.form_builder.menu_manager import MenuManager
+            from app.form_builder.menu_manager import MenuManager, LazyMenuHtml
+            # Derlenmiş menü cache'inden (url_for / yetki filtresi her render'da tekrarlanmaz)
             dynamic_menu = MenuManager.get_tree()
+            dynamic_menu_html = LazyMenuHtml()
         except Exception as e:
             logger.warning(f"⚠️ Menü yüklenirken hata: {e}")
             dynamic_menu = []
@@ -231,28 +254,50 @@ def register_middleware(app):
             'app_version': app.config.get('APP_VERSION', '1.0.0'),
             'current_year': datetime.now(timezone.utc).year,  # ✅ DÜZELTİLDİ
             'dynamic_menu': dynamic_menu, 
+            'dynamic_menu_html': dynamic_menu_html,
         }
     
     
+# Her process'te kayıtlı olması gereken modüller (PASIF_MODULLER ile kapatılamaz)
+ZORUNLU_MODULLER = frozenset(['auth', 'main', 'sistem'])
+
+
 def register_blueprints(app):
     """
     Blueprint kayıtları - REPO'DAKİ GERÇEK MODÜLLER
     
+    PASIF_MODULLER config'inde adı geçen modüller (ör. 'b2b') bu process'te
+    import edilmez / kaydedilmez. Flask ilk istekten sonra blueprint kaydına
+    izin vermediği için "tembel" kayıt, modülü hiç yüklememek şeklindedir.
+    
     Args:
         app (Flask): Flask uygulaması
     """
+    import importlib
+    
+    pasif = set(app.config.get('PASIF_MODULLER') or ()) - ZORUNLU_MODULLER
+    profil = app.extensions.get('baslangic_profili') or BaslangicProfili()
+    
+    def _kaydet(modul_yolu, bp_adi, url_prefix=None):
+        if modul_yolu.split('.')[2] in pasif or bp_adi in pasif:
+            logger.info(f"⏸️ Pasif modül atlandı: {bp_adi}")
+            return
+        with profil.olc(bp_adi, grup='blueprint'):
+            bp = getattr(importlib.import_module(modul_yolu), bp_adi)
+            if url_prefix is None:
+                app.register_blueprint(bp)
+            else:
+                app.register_blueprint(bp, url_prefix=url_prefix)
     
     # ============================================================================
     # TEMEL MODÜLLER
     # ============================================================================
     
     # Auth modülü (Kimlik doğrulama)
-    from app.modules.auth.routes import auth_bp
-    app.register_blueprint(auth_bp, url_prefix='/auth')
+    _kaydet('app.modules.auth.routes', 'auth_bp', '/auth')
     
     #Main modülü
-    from app.modules.main.routes import main_bp
-    app.register_blueprint(main_bp, url_prefix='')
+    _kaydet('app.modules.main.routes', 'main_bp', '')
     
     # Ana sayfa (index route'ları auth içinde olabilir)
     # Eğer ayrı bir index route'ı varsa burada ekle
@@ -262,145 +307,112 @@ def register_blueprints(app):
     # ============================================================================
     
     # Firma modülü
-    from app.modules.firmalar.routes import firmalar_bp
-    app.register_blueprint(firmalar_bp, url_prefix='/firmalar')
+    _kaydet('app.modules.firmalar.routes', 'firmalar_bp', '/firmalar')
     
     # Şube modülü
-    from app.modules.sube.routes import sube_bp
-    app.register_blueprint(sube_bp, url_prefix='/sube')
+    _kaydet('app.modules.sube.routes', 'sube_bp', '/sube')
     
     # Depo modülü
-    from app.modules.depo.routes import depo_bp
-    app.register_blueprint(depo_bp, url_prefix='/depo')
+    _kaydet('app.modules.depo.routes', 'depo_bp', '/depo')
     
     # Stok modülü
-    from app.modules.stok.routes import stok_bp
-    app.register_blueprint(stok_bp, url_prefix='/stok')
+    _kaydet('app.modules.stok.routes', 'stok_bp', '/stok')
     
     # Stok-fisi modülü
-    from app.modules.stok_fisi.routes import stok_fisi_bp
-    app.register_blueprint(stok_fisi_bp, url_prefix='/stok-fisi')
+    _kaydet('app.modules.stok_fisi.routes', 'stok_fisi_bp', '/stok-fisi')
     
     # CRM Modülü
-    from app.modules.crm.routes import crm_bp
-    app.register_blueprint(crm_bp, url_prefix='/crm')
+    _kaydet('app.modules.crm.routes', 'crm_bp', '/crm')
     
     # Cari modülü
-    from app.modules.cari.routes import cari_bp
-    app.register_blueprint(cari_bp, url_prefix='/cari')
+    _kaydet('app.modules.cari.routes', 'cari_bp', '/cari')
     
     # Kategori modülü
-    from app.modules.kategori.routes import kategori_bp
-    app.register_blueprint(kategori_bp, url_prefix='/kategori')
+    _kaydet('app.modules.kategori.routes', 'kategori_bp', '/kategori')
     
     # ABONELİK modülü
-    from app.modules.subscription.routes import subscription_bp
-    app.register_blueprint(subscription_bp, url_prefix='/paketler')
+    _kaydet('app.modules.subscription.routes', 'subscription_bp', '/paketler')
     
     # Kullanıcı modülü
-    from app.modules.kullanici.routes import kullanici_bp
-    app.register_blueprint(kullanici_bp, url_prefix='/kullanici')
+    _kaydet('app.modules.kullanici.routes', 'kullanici_bp', '/kullanici')
     
     # ============================================================================
     # OPERASYONEL MODÜLLER
     # ============================================================================
     
     # İrsaliye modülü
-    from app.modules.irsaliye.routes import irsaliye_bp
-    app.register_blueprint(irsaliye_bp, url_prefix='/irsaliye')
+    _kaydet('app.modules.irsaliye.routes', 'irsaliye_bp', '/irsaliye')
     
     # E-İrsaliye modülü
-    from app.modules.eirsaliye.routes import eirsaliye_bp
-    app.register_blueprint(eirsaliye_bp, url_prefix='/eirsaliye')
+    _kaydet('app.modules.eirsaliye.routes', 'eirsaliye_bp', '/eirsaliye')
     
     # Fatura modülü
-    from app.modules.fatura.routes import fatura_bp
-    app.register_blueprint(fatura_bp, url_prefix='/fatura')
+    _kaydet('app.modules.fatura.routes', 'fatura_bp', '/fatura')
         
     # E-fatura modülü    
-    from app.modules.efatura.routes import efatura_bp
-    app.register_blueprint(efatura_bp, url_prefix='/efatura')
+    _kaydet('app.modules.efatura.routes', 'efatura_bp', '/efatura')
     
-    from app.modules.fatura.ocr_routes import fatura_ocr_bp
-    app.register_blueprint(fatura_ocr_bp)
+    _kaydet('app.modules.fatura.ocr_routes', 'fatura_ocr_bp')
 
     # Doviz modülü
-    from app.modules.doviz.routes import doviz_bp
-    app.register_blueprint(doviz_bp, url_prefix='/doviz')
+    _kaydet('app.modules.doviz.routes', 'doviz_bp', '/doviz')
     
     # Lokasyon modülü
-    from app.modules.lokasyon.routes import lokasyon_bp
-    app.register_blueprint(lokasyon_bp, url_prefix='/lokasyon')
+    _kaydet('app.modules.lokasyon.routes', 'lokasyon_bp', '/lokasyon')
     
     # fiyat modülü
-    from app.modules.fiyat.routes import fiyat_bp
-    app.register_blueprint(fiyat_bp, url_prefix='/fiyat')
+    _kaydet('app.modules.fiyat.routes', 'fiyat_bp', '/fiyat')
     
     # sistem modülü
-    from app.modules.sistem.routes import sistem_bp
-    app.register_blueprint(sistem_bp, url_prefix='/sistem')
+    _kaydet('app.modules.sistem.routes', 'sistem_bp', '/sistem')
     
     # bolge modülü
-    from app.modules.bolge.routes import bolge_bp
-    app.register_blueprint(bolge_bp, url_prefix='/bolge')
+    _kaydet('app.modules.bolge.routes', 'bolge_bp', '/bolge')
     
     # Sipariş modülü
-    from app.modules.siparis.routes import siparis_bp
-    app.register_blueprint(siparis_bp, url_prefix='/siparis')
+    _kaydet('app.modules.siparis.routes', 'siparis_bp', '/siparis')
     
     # Mobile modülü
-    from app.modules.mobile.routes import mobile_bp
-    app.register_blueprint(mobile_bp, url_prefix='/mobile')
+    _kaydet('app.modules.mobile.routes', 'mobile_bp', '/mobile')
     
     # Finans modülü
-    from app.modules.finans.routes import finans_bp
-    app.register_blueprint(finans_bp, url_prefix='/finans')
+    _kaydet('app.modules.finans.routes', 'finans_bp', '/finans')
     
     # Kasa modülü
-    from app.modules.kasa.routes import kasa_bp
-    app.register_blueprint(kasa_bp, url_prefix='/kasa')
+    _kaydet('app.modules.kasa.routes', 'kasa_bp', '/kasa')
     
     # kasa_hareket modülü
-    from app.modules.kasa_hareket.routes import kasa_hareket_bp
-    app.register_blueprint(kasa_hareket_bp, url_prefix='/kasa-hareket')
+    _kaydet('app.modules.kasa_hareket.routes', 'kasa_hareket_bp', '/kasa-hareket')
     
     # Banka modülü
-    from app.modules.banka.routes import banka_bp
-    app.register_blueprint(banka_bp, url_prefix='/banka')
+    _kaydet('app.modules.banka.routes', 'banka_bp', '/banka')
     
     # Banka_hareket modülü
-    from app.modules.banka_hareket.routes import banka_hareket_bp
-    app.register_blueprint(banka_hareket_bp, url_prefix='/banka-hareket')
+    _kaydet('app.modules.banka_hareket.routes', 'banka_hareket_bp', '/banka-hareket')
     
     # Banka_import modülü
-    from app.modules.banka_import.routes import banka_import_bp
-    app.register_blueprint(banka_import_bp, url_prefix='/banka-import')
+    _kaydet('app.modules.banka_import.routes', 'banka_import_bp', '/banka-import')
     
     # Çek/Senet modülü
-    from app.modules.cek.routes import cek_bp
-    app.register_blueprint(cek_bp, url_prefix='/cek')
+    _kaydet('app.modules.cek.routes', 'cek_bp', '/cek')
     
     # ============================================================================
     # FİNANS MODÜLLERI
     # ============================================================================
     
     # Muhasebe modülü
-    from app.modules.muhasebe.routes import muhasebe_bp
-    app.register_blueprint(muhasebe_bp, url_prefix='/muhasebe')
+    _kaydet('app.modules.muhasebe.routes', 'muhasebe_bp', '/muhasebe')
     
     # ============================================================================
     # RAPORLAMA
     # ============================================================================
     
     # Rapor modülü
-    from app.modules.rapor.routes import rapor_bp
-    app.register_blueprint(rapor_bp, url_prefix='/rapor')
+    _kaydet('app.modules.rapor.routes', 'rapor_bp', '/rapor')
     
     # B2B modülü
-    from app.modules.b2b.routes import b2b_bp
-    app.register_blueprint(b2b_bp, url_prefix='/b2b')
-    from app.modules.b2b.admin_routes import b2b_admin_bp
-    app.register_blueprint(b2b_admin_bp, url_prefix='/b2b-yonetim')
+    _kaydet('app.modules.b2b.routes', 'b2b_bp', '/b2b')
+    _kaydet('app.modules.b2b.admin_routes', 'b2b_admin_bp', '/b2b-yonetim')
     
     
     logger.info(f"📘 {len(app.blueprints)} blueprint kaydedildi")
@@ -629,6 +641,198 @@ def register_cli_commands(app):
             db.session.rollback()
             click.echo(f'❌ Hata: {e}', err=True)
     
+    @app.cli.command('maliyet-defteri-olustur')
+    @click.argument('tenant_id')
+    def maliyet_defteri_olustur(tenant_id):
+        """
+        Stok maliyet defterini hareketlerden sıfırdan oluştur.
+        
+        Kullanım: flask maliyet-defteri-olustur <tenant_id>
+        """
+        from app.modules.stok.costing import MaliyetMotoru
+        
+        with app.test_request_context('/'):
+            session['tenant_id'] = str(tenant_id)
+            try:
+                adet = MaliyetMotoru.tum_defteri_olustur()
+                click.echo(f'✅ Maliyet defteri oluşturuldu: {adet} ürün')
+            except Exception as e:
+                click.echo(f'❌ Hata: {e}', err=True)
+    
+    @app.cli.command('muhasebe-bakiye-dogrula')
+    @click.argument('tenant_id')
+    @click.option('--onar', is_flag=True, help='Farkları ham kayıtlardan yeniden oluşturarak düzelt')
+    def muhasebe_bakiye_dogrula(tenant_id, onar):
+        """
+        Muhasebe / kasa / banka bakiye özetlerini ham kayıtlarla karşılaştır.
+
+        Kullanım: flask muhasebe-bakiye-dogrula <tenant_id> [--onar]
+        """
+        from app.extensions import get_tenant_db
+        from app.modules.firmalar.models import Firma
+        from app.modules.muhasebe.bakiye import BakiyeMotoru
+
+        with app.test_request_context('/'):
+            session['tenant_id'] = str(tenant_id)
+            try:
+                tenant_db = get_tenant_db()
+                for (firma_id,) in tenant_db.query(Firma.id).all():
+                    farklar = BakiyeMotoru.dogrula(str(firma_id), tenant_db=tenant_db)
+                    for fark in farklar[:50]:
+                        click.echo(
+                            f"   ⚠️ {fark['hesap_turu']}:{fark['hesap_id']} [{fark['donem']}] "
+                            f"beklenen={fark['beklenen']} mevcut={fark['mevcut']}"
+                        )
+                    if not farklar:
+                        click.echo(f'✅ {firma_id}: Bakiye özetleri ham kayıtlarla tutarlı')
+                        continue
+
+                    click.echo(f'❌ {firma_id}: {len(farklar)} fark bulundu')
+                    if onar:
+                        adet = BakiyeMotoru.yeniden_olustur(str(firma_id), tenant_db=tenant_db)
+                        tenant_db.commit()
+                        click.echo(f'♻️ {firma_id}: Yeniden oluşturuldu ({adet} özet satırı)')
+            except Exception as e:
+                click.echo(f'❌ Hata: {e}', err=True)
+
+    @app.cli.command('banka-eslestirme-benchmark')
+    @click.option('--satir', default=5000, help='Sentetik ekstre satır sayısı')
+    @click.option('--cari', default=40000, help='Sentetik cari sayısı')
+    @click.option('--kural', default=200, help='Kural (anahtar kelime) sayısı')
+    @click.option('--eski-ornek', default=500, help='Eski algoritmanın ölçüleceği satır sayısı')
+    def banka_eslestirme_benchmark(satir, cari, kural, eski_ornek):
+        """
+        Banka ekstresi eşleştirme motorunu sentetik veriyle ölç.
+
+        Kullanım: flask banka-eslestirme-benchmark --satir 5000 --cari 40000
+        """
+        from app.modules.banka_import.benchmark import calistir
+
+        sonuc = calistir(cari_sayisi=cari, satir_sayisi=satir, kural_sayisi=kural, eski_ornek=eski_ornek)
+        for anahtar, deger in sonuc.items():
+            click.echo(f'   {anahtar:<24} {deger}')
+
+    @app.cli.command('yetki-benchmark')
+    @click.option('--tekrar', default=200000, help='Toplam kontrol sayısı')
+    def yetki_benchmark(tekrar):
+        """
+        PermissionManager kontrol başına maliyetini ölç (eski tarama / derlenmiş).
+
+        Kullanım: flask yetki-benchmark --tekrar 200000
+        """
+        from app.services.permission_manager import PermissionManager
+
+        sonuc = PermissionManager.benchmark(tekrar=tekrar)
+        for anahtar, deger in sonuc.items():
+            click.echo(f'   {anahtar:<24} {deger}')
+
+    @app.cli.command('workflow-benchmark')
+    @click.option('--kayit', default=1000, help='Belge kaydı sayısı')
+    @click.option('--kural', default=20, help='Akıştaki koşul sayısı')
+    def workflow_benchmark(kayit, kural):
+        """
+        WorkflowEngine koşul değerlendirme maliyetini ölç (simple_eval / derlenmiş).
+
+        Kullanım: flask workflow-benchmark --kayit 1000 --kural 20
+        """
+        from app.form_builder.workflow import WorkflowEngine
+
+        sonuc = WorkflowEngine.benchmark(kayit=kayit, kural=kural)
+        for anahtar, deger in sonuc.items():
+            click.echo(f'   {anahtar:<24} {deger}')
+
+    @app.cli.command('pivot-benchmark')
+    @click.option('--kayit', default=100000, help='Satır sayısı')
+    def pivot_benchmark(kayit):
+        """
+        PivotEngine gruplama maliyetini ölç (dict döngüsü / vektörel).
+
+        Kullanım: flask pivot-benchmark --kayit 100000
+        """
+        from app.form_builder.pivot import PivotEngine
+
+        sonuc = PivotEngine.benchmark(kayit=kayit)
+        for anahtar, deger in sonuc.items():
+            click.echo(f'   {anahtar:<24} {deger}')
+
+    @app.cli.command('rota-benchmark')
+    @click.option('--durak', default=300, help='Sentetik durak sayısı')
+    @click.option('--arac', default=3, help='Çok araçlı senaryoda araç sayısı')
+    @click.option('--sure', default=2.0, help='İyileştirme süre bütçesi (saniye)')
+    def rota_benchmark(durak, arac, sure):
+        """
+        RotaMotoru maliyetini ve rota kalitesini sentetik koordinatlarla ölç (ağ gerekmez).
+
+        Kullanım: flask rota-benchmark --durak 300 --arac 3
+        """
+        from app.modules.cari.rota import RotaMotoru
+
+        sonuc = RotaMotoru.benchmark(durak=durak, arac=arac, sure_butcesi=sure)
+        for anahtar, deger in sonuc.items():
+            click.echo(f'   {anahtar:<24} {deger}')
+
+    @app.cli.command('numara-benchmark')
+    @click.option('--kaydedici', default=50, help='Paralel kayıt yapan thread sayısı')
+    @click.option('--belge', default=500, help='Toplam belge sayısı')
+    @click.option('--is-ms', default=10, help='Belge başına diğer işlerin süresi (ms)')
+    def numara_benchmark(kaydedici, belge, is_ms):
+        """
+        Belge numarası serisinde eşzamanlı kayıt verimini ölç (eski kilit / blok / kesintisiz).
+
+        Kullanım: flask numara-benchmark --kaydedici 50 --belge 500
+        """
+        from app.services.numara_servisi import NumaraServisi
+
+        sonuc = NumaraServisi.benchmark(kaydedici=kaydedici, belge=belge, is_ms=is_ms)
+        for anahtar, deger in sonuc.items():
+            click.echo(f'   {anahtar:<24} {deger}')
+
+    @app.cli.command('webhook-outbox')
+    @click.option('--isle', is_flag=True, help='Bekleyen olayları şimdi gönder (tek tur)')
+    @click.option('--yeniden-dene', is_flag=True, help='Dead-letter kayıtlarını kuyruğa geri al')
+    def webhook_outbox(isle, yeniden_dene):
+        """
+        Webhook outbox durumu / dead-letter yönetimi.
+
+        Kullanım: flask webhook-outbox --yeniden-dene --isle
+        """
+        from app.services.webhook_dispatcher import WebhookDispatcher
+
+        if yeniden_dene:
+            click.echo(f'♻️ {WebhookDispatcher.yeniden_dene()} kayıt kuyruğa geri alındı')
+        if isle:
+            click.echo(f'🔗 {WebhookDispatcher.bir_tur()} olay işlendi')
+        for durum, sayi in sorted(WebhookDispatcher.durum_ozeti().items()):
+            click.echo(f'   {durum:<12} {sayi}')
+        for kayit in WebhookDispatcher.olu_mektuplar(limit=10):
+            click.echo(f'   ☠️ {kayit.webhook_path} #{kayit.deneme_sayisi}: {(kayit.son_hata or "")[:80]}')
+
+    @app.cli.command('baslangic-profili')
+    @click.option('--limit', default=25, help='Listelenecek modül sayısı')
+    @click.option('--hedef', default='run', help='Import edilecek modül')
+    def baslangic_profili(limit, hedef):
+        """
+        Açılışta modül bazında import sürelerini ölç (python -X importtime).
+
+        Kullanım: flask baslangic-profili --limit 25
+        """
+        from app.services.startup_profiler import import_zamanlari
+
+        sonuc = import_zamanlari(hedef=hedef, limit=limit)
+        click.echo(f'⏱️ Toplam import süresi: {sonuc["toplam_ms"]}ms')
+        click.echo('   -- Kümülatif (alt modüller dahil) --')
+        for satir in sonuc['en_yavas_kumulatif']:
+            click.echo(f'   {satir["kumulatif_ms"]:>9.1f}ms  {satir["modul"]}')
+        click.echo('   -- Kendi süresi --')
+        for satir in sonuc['en_yavas_kendi']:
+            click.echo(f'   {satir["kendi_ms"]:>9.1f}ms  {satir["modul"]}')
+
+        profil = app.extensions.get('baslangic_profili')
+        if profil and profil.aktif:
+            click.echo('   -- Blueprint (import + kayıt) --')
+            for satir in profil.ozet('blueprint')[:limit]:
+                click.echo(f'   {satir["ms"]:>9.1f}ms  +{satir["yeni_modul"]:<4} {satir["ad"]}')
+
     @app.cli.command('clear-cache')
     def clear_cache():
         """Cache'i temizle."""
@@ -654,6 +858,10 @@ def register_cli_commands(app):
         except Exception as e:
             click.echo(f'❌ Hata: {e}', err=True)
 
+    # Grup komutları (flask cari hesapla-odemeler ...)
+    from app.cli import cari_cli
+    app.cli.add_command(cari_cli)
+
 
 # ============================================================================
 # ANA UYGULAMA BAŞLATMA